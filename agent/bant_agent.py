@@ -1,11 +1,14 @@
 from livekit.agents import Agent
-from .prompt import SYSTEM_PROMPT
-from .tools import submit_lead
+from config.settings import PROMPT_VARIANT
+from .prompt import PROMPT_VARIANTS
+from .tools import lookup_programs, submit_lead
 
 
 class EdTechBANTAgent(Agent):
-    def __init__(self):
+    def __init__(self, instructions: str | None = None, tools: list | None = None):
+        # instructions/tools are passed in by the entrypoint from the per-process prewarm cache;
+        # by default the PROMPT_VARIANT setting selects the instructions
         super().__init__(
-            instructions=SYSTEM_PROMPT,
-            tools=[submit_lead]   
+            instructions=instructions if instructions is not None else PROMPT_VARIANTS[PROMPT_VARIANT],
+            tools=tools if tools is not None else [submit_lead, lookup_programs]
         )
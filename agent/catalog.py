@@ -0,0 +1,279 @@
+"""
+Program catalog search for the lookup_programs tool.
+
+The catalog is a local JSON file (CATALOG_PATH) of programs:
+
+    {"currency": "INR", "programs": [{"id", "name", "classes", "subjects", "exams",
+                                      "mode", "fee_per_month", "batches", "duration",
+                                      "description"}, ...]}
+
+CatalogIndex is built once per worker process (at prewarm) and never
+changes:
+  - a TF-IDF matrix, programs x terms, with L2-normalized rows, stored
+    term-major (the postings of each term are contiguous, CSR style), so a
+    query is scored with one vectorized multiply-add per query term and
+    memory grows with the catalog's text, not programs x vocabulary
+  - one boolean mask per class, subject token and exam token, so exact
+    filters ("10", "Math", "NEET") are a few vectorized ANDs/ORs
+
+Catalog wraps the index and reloads it without a restart: at most every
+CATALOG_RELOAD_SECONDS a lookup stats the file, and if it changed a new
+index is built on a thread and swapped in. Lookups keep using the old index
+until then, so a reload never delays the agent.
+"""
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from config.settings import CATALOG_PATH, CATALOG_RELOAD_SECONDS, CATALOG_MAX_RESULTS
+
+# Fields returned to the model for each matching program
+RESULT_FIELDS = ("name", "classes", "subjects", "exams", "mode", "fee_per_month", "batches", "duration", "description")
+
+# Spoken and written variants that should match the catalog's wording
+_ALIASES = {
+    "maths": "math", "mathematics": "math", "bio": "biology", "chem": "chemistry", "phy": "physics",
+    "sst": "social", "evs": "science", "repeater": "dropper", "drop": "dropper",
+}
+# Words every program (or question) shares, which would only add noise to the ranking
+_STOPWORDS = frozenset(
+    "a an and are the for of to in on with is it my our your his her their do does what which how "
+    "much about any there you have has class grade std standard program course coaching tuition fee "
+    "batche batch timing time price cost child son daughter kid".split()
+)
+_WORD = re.compile(r"[a-z0-9]+")
+# Filter values that name several subjects or exams
+_SEPARATORS = re.compile(r",|/|&|\band\b|\bor\b")
+# Name and subjects count more than the description when ranking
+_FIELD_WEIGHTS = (("name", 2), ("subjects", 2), ("exams", 2), ("classes", 1), ("description", 1))
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased word tokens with aliases applied, a trailing plural "s" dropped and stopwords removed."""
+    tokens = []
+    for word in _WORD.findall(text.lower()):
+        word = _ALIASES.get(word, word)
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        if word not in _STOPWORDS:
+            tokens.append(word)
+    return tokens
+
+
+def normalize_class(text: str) -> str | None:
+    """Catalog class for a spoken class ("10th grade", "Class 5", "dropper"), or None."""
+    words = tokenize(text)
+    if "dropper" in words or "pass" in words:
+        return "Dropper"
+    match = re.search(r"\d+", text)
+    if match and 1 <= int(match.group()) <= 12:
+        return str(int(match.group()))
+    return None
+
+
+def _as_list(value) -> list[str]:
+    if value is None:
+        return []
+    return [str(v) for v in value] if isinstance(value, list) else [str(value)]
+
+
+class CatalogIndex:
+    """
+    Immutable search index over a list of programs.
+
+    Args:
+        programs: Program dicts as in the catalog file
+        currency: Currency of the fees
+    """
+
+    def __init__(self, programs: list[dict], currency: str = "INR"):
+        self.programs = programs
+        self.currency = currency
+        self.results = [
+            {name: program[name] for name in RESULT_FIELDS if program.get(name) not in (None, "", [])}
+            for program in programs
+        ]
+        docs = []
+        for row, program in enumerate(programs):
+            if row % 64 == 63:
+                # Built on a thread during a reload: hand the GIL back to the event loop now and then
+                time.sleep(0)
+            tokens = []
+            for name, weight in _FIELD_WEIGHTS:
+                tokens += tokenize(" ".join(_as_list(program.get(name)))) * weight
+            docs.append(tokens)
+
+        self.vocabulary: dict[str, int] = {}
+        rows, terms = [], []
+        for row, tokens in enumerate(docs):
+            for token in tokens:
+                terms.append(self.vocabulary.setdefault(token, len(self.vocabulary)))
+            rows.extend([row] * len(tokens))
+        # (row, term) pairs sorted term-major, then collapsed to one entry per pair with its count
+        pairs = np.unique(np.array(terms, dtype=np.int64) * len(programs) + np.array(rows, dtype=np.int64),
+                          return_counts=True)
+        term_ids, row_ids = np.divmod(pairs[0], len(programs))
+        document_frequency = np.bincount(term_ids, minlength=len(self.vocabulary))
+        self.idf = (np.log((1 + len(programs)) / (1 + document_frequency)) + 1).astype(np.float32)
+        weights = np.log1p(pairs[1]).astype(np.float32) * self.idf[term_ids]
+        norms = np.sqrt(np.bincount(row_ids, weights=weights.astype(np.float64) ** 2, minlength=len(programs)))
+        self.weights = (weights / np.where(norms > 0, norms, 1)[row_ids]).astype(np.float32)
+        self.rows = row_ids.astype(np.int32)
+        # Postings of term t are rows/weights[offsets[t]:offsets[t + 1]]
+        self.offsets = np.concatenate(([0], np.cumsum(document_frequency))).astype(np.int64)
+
+        self._all = np.ones(len(programs), dtype=bool)
+        self._none = np.zeros(len(programs), dtype=bool)
+        self.class_masks = self._masks(programs, "classes", lambda value: [normalize_class(value) or value])
+        self.subject_masks = self._masks(programs, "subjects", tokenize)
+        self.exam_masks = self._masks(programs, "exams", tokenize)
+
+    @staticmethod
+    def _masks(programs: list[dict], field: str, keys) -> dict[str, np.ndarray]:
+        masks: dict[str, np.ndarray] = {}
+        for row, program in enumerate(programs):
+            for value in _as_list(program.get(field)):
+                for key in keys(value):
+                    masks.setdefault(key, np.zeros(len(programs), dtype=bool))[row] = True
+        return masks
+
+    def _token_filter(self, masks: dict[str, np.ndarray], text: str) -> np.ndarray:
+        # Any of the named values; each value must match all of its tokens ("JEE Main")
+        result = self._none.copy()
+        for part in _SEPARATORS.split(text):
+            tokens = tokenize(part)
+            if not tokens:
+                continue
+            mask = self._all.copy()
+            for token in tokens:
+                mask &= masks.get(token, self._none)
+            result |= mask
+        return result
+
+    def filter(self, child_class: str | None = None, subject: str | None = None, exam: str | None = None) -> np.ndarray:
+        """Boolean mask of the programs that match every given filter."""
+        mask = self._all.copy()
+        if child_class:
+            key = normalize_class(child_class)
+            mask &= self.class_masks.get(key, self._none) if key else self._none
+        if subject:
+            mask &= self._token_filter(self.subject_masks, subject)
+        if exam:
+            mask &= self._token_filter(self.exam_masks, exam)
+        return mask
+
+    def search(
+        self,
+        query: str = "",
+        child_class: str | None = None,
+        subject: str | None = None,
+        exam: str | None = None,
+        limit: int = CATALOG_MAX_RESULTS,
+    ) -> list[dict]:
+        """
+        Rank the programs that pass the filters by TF-IDF similarity to `query`.
+
+        Returns:
+            Up to `limit` programs (RESULT_FIELDS only), best match first. Programs sharing no
+            term with the query are left out; with no known query terms, every program that
+            passes the filters qualifies, in catalog order
+        """
+        mask = self.filter(child_class, subject, exam)
+        counts: dict[int, int] = {}
+        for token in tokenize(query):
+            term = self.vocabulary.get(token)
+            if term is not None:
+                counts[term] = counts.get(term, 0) + 1
+        scores = np.zeros(len(self.programs), dtype=np.float32)
+        if counts:
+            for term, count in counts.items():
+                start, end = self.offsets[term], self.offsets[term + 1]
+                # A term has one posting per program, so the fancy-indexed add never collides
+                scores[self.rows[start:end]] += self.weights[start:end] * (np.log1p(count) * self.idf[term])
+            mask = mask & (scores > 0)
+        # Filtered-out programs rank below everything; stable, so ties keep catalog order
+        scores = np.where(mask, scores, -1.0)
+        matches = min(limit, int(np.count_nonzero(mask)))
+        order = np.argsort(-scores, kind="stable")[:matches]
+        return [self.results[i] for i in order]
+
+
+def load_index(path: str | Path) -> CatalogIndex:
+    """Read a catalog file and build its index."""
+    with open(path, encoding="utf-8") as f:
+        catalog = json.load(f)
+    return CatalogIndex(catalog["programs"], catalog.get("currency", "INR"))
+
+
+class Catalog:
+    """
+    The process-wide catalog index, reloaded when the file changes.
+
+    Args:
+        path: Catalog JSON file
+        reload_interval: Minimum seconds between checks of the file; 0 never reloads
+    """
+
+    def __init__(self, path: str | Path = CATALOG_PATH, reload_interval: float = CATALOG_RELOAD_SECONDS):
+        self.path = Path(path)
+        self.reload_interval = reload_interval
+        self.reloads = 0
+        self._version = self._stat()
+        self.index = load_index(self.path)
+        self._checked_at = time.monotonic()
+        self._reloading = False
+
+    def _stat(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def search(self, *args, **kwargs) -> list[dict]:
+        """CatalogIndex.search() on the current index, after a cheap check for a changed file."""
+        self.check_reload()
+        return self.index.search(*args, **kwargs)
+
+    def check_reload(self) -> bool:
+        """Start a background reload if the file changed since the index was built; True if started."""
+        now = time.monotonic()
+        if not self.reload_interval or self._reloading or now - self._checked_at < self.reload_interval:
+            return False
+        self._checked_at = now
+        version = self._stat()
+        if version is None or version == self._version:
+            return False
+        self._reloading = True
+        threading.Thread(target=self._reload, args=(version,), name="catalog-reload", daemon=True).start()
+        return True
+
+    def _reload(self, version: tuple[int, int]) -> None:
+        try:
+            index = load_index(self.path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # A half-written or broken file keeps the current index; the next change is tried again
+            print(f"Catalog reload from {self.path} failed, keeping the current index: {e!r}")
+        else:
+            self.index = index
+            self.reloads += 1
+            print(f"Catalog reloaded from {self.path}: {len(index.programs)} programs")
+        finally:
+            self._version = version
+            self._reloading = False
+
+
+_catalog: Catalog | None = None
+
+
+def get_catalog() -> Catalog:
+    """Return the process-wide catalog, loading it on first use."""
+    global _catalog
+    if _catalog is None:
+        _catalog = Catalog()
+    return _catalog
@@ -0,0 +1,276 @@
+"""
+Pre-rendered greeting audio.
+
+Every call opens with the same introduction. Generating it costs a model
+round trip before the parent hears anything, plus billed output audio
+tokens. The greeting cache plays a stored rendering instead:
+
+- The first session for a greeting key with nothing cached generates the
+  greeting as before. GreetingRecorder copies the agent's audio on its way
+  to the room, and the rendering is saved as Ogg/Opus next to its
+  transcript.
+- Job processes decode the rendering once (at prewarm) into 20 ms frames.
+  Sessions play it with session.say() as soon as they start, and seed the
+  realtime conversation with the greeting text so the model knows it was
+  said.
+
+The key covers the voice, prompt version, prompt text, greeting
+instructions and model, so changing any of them renders a new greeting.
+
+    data/greetings/<voice>-<prompt_version>-<hash>.ogg
+    data/greetings/<voice>-<prompt_version>-<hash>.json   {"text", "seconds", ...}
+"""
+import asyncio
+import hashlib
+import io as _io
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator
+
+import av
+import numpy as np
+from livekit import rtc
+from livekit.agents import llm
+from livekit.agents.voice import io
+
+from config.settings import GREETING_CACHE_DIR, GREETING_OPUS_BITRATE
+from .prompt import GREETING_INSTRUCTIONS
+
+# Realtime model audio is 24 kHz mono
+SAMPLE_RATE = 24000
+FRAME_MS = 20
+
+
+def greeting_key(voice: str, prompt_version: str, instructions: str, model: str = "") -> str:
+    """Cache key of the greeting a session with these settings would generate."""
+    digest = hashlib.sha256("\0".join((instructions, GREETING_INSTRUCTIONS, model)).encode()).hexdigest()[:12]
+    return f"{voice}-{prompt_version}-{digest}"
+
+
+@dataclass
+class CachedGreeting:
+    """A decoded greeting rendering, shared by every session of the process."""
+
+    key: str
+    text: str
+    sample_rate: int
+    frames: list[rtc.AudioFrame] = field(repr=False)
+
+    @property
+    def seconds(self) -> float:
+        return sum(frame.duration for frame in self.frames)
+
+    async def audio(self) -> AsyncIterator[rtc.AudioFrame]:
+        """The frames, for session.say(audio=...)."""
+        for frame in self.frames:
+            yield frame
+
+
+class GreetingCache:
+    """
+    Greeting renderings on local disk, decoded on first use and kept in memory.
+
+    Args:
+        directory: Cache directory (created on first save)
+        bitrate: Opus bitrate of saved renderings
+    """
+
+    def __init__(self, directory: str | Path = GREETING_CACHE_DIR, bitrate: int = GREETING_OPUS_BITRATE):
+        self.directory = Path(directory)
+        self.bitrate = bitrate
+        self._loaded: dict[str, CachedGreeting] = {}
+
+    def get(self, key: str) -> CachedGreeting | None:
+        """The greeting for `key`, or None if it has not been rendered yet."""
+        greeting = self._loaded.get(key)
+        if greeting is None:
+            greeting = self.load(key)
+            if greeting is not None:
+                self._loaded[key] = greeting
+        return greeting
+
+    def load(self, key: str) -> CachedGreeting | None:
+        """Read and decode a rendering from disk; None if it is missing or unreadable."""
+        # The transcript is written last, so its presence means the audio is complete
+        try:
+            meta = json.loads((self.directory / f"{key}.json").read_text())
+            pcm = _decode_opus(self.directory / f"{key}.ogg", SAMPLE_RATE)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, av.FFmpegError) as e:
+            print(f"Ignoring unreadable greeting rendering {key}: {e!r}")
+            return None
+        return CachedGreeting(key, meta["text"], SAMPLE_RATE, _split_frames(pcm, SAMPLE_RATE))
+
+    def save(self, key: str, text: str, pcm: np.ndarray, sample_rate: int) -> CachedGreeting:
+        """
+        Encode and store a rendering, replacing any earlier one.
+
+        Args:
+            key: greeting_key() of the session that rendered it
+            text: Transcript of the greeting
+            pcm: int16 mono samples
+            sample_rate: Sample rate of `pcm`
+
+        Returns:
+            The greeting as later sessions will play it
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        started = time.perf_counter()
+        data = _encode_opus(pcm, sample_rate, self.bitrate)
+        meta = {
+            "text": text,
+            "seconds": round(len(pcm) / sample_rate, 3),
+            "bytes": len(data),
+            "bitrate": self.bitrate,
+            "created_at": time.time(),
+        }
+        # Written under temporary names and renamed, so readers never see a partial rendering
+        for suffix, payload in ((".ogg", data), (".json", json.dumps(meta).encode())):
+            tmp = self.directory / f".tmp-{os.getpid()}-{key}{suffix}"
+            tmp.write_bytes(payload)
+            os.replace(tmp, self.directory / f"{key}{suffix}")
+        print(f"Greeting rendering saved: {key} ({meta['seconds']:.1f}s, {len(data):,} bytes, "
+              f"{(time.perf_counter() - started) * 1000:.0f} ms)")
+        self._loaded.pop(key, None)
+        return self.get(key)
+
+
+class GreetingRecorder(io.AudioOutput):
+    """
+    Audio output that passes frames on to the room and keeps a copy until stop().
+
+    Wrap the session's audio output with it before generating the greeting.
+    """
+
+    def __init__(self, audio_output: io.AudioOutput | None):
+        super().__init__(
+            label="GreetingRecorder",
+            next_in_chain=audio_output,
+            sample_rate=None,
+            capabilities=io.AudioOutputCapabilities(pause=True),  # depends on the next_in_chain
+        )
+        self.recording = True
+        self.interrupted = False
+        self.sample_rate_seen: int | None = None
+        self._chunks: list[bytes] = []
+
+    async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+        await super().capture_frame(frame)
+        if self.recording:
+            if frame.num_channels == 1 and frame.sample_rate == (self.sample_rate_seen or frame.sample_rate):
+                self.sample_rate_seen = frame.sample_rate
+                self._chunks.append(bytes(frame.data))
+            else:
+                # Not something the cache can replay as recorded
+                self.interrupted = True
+        if self.next_in_chain:
+            await self.next_in_chain.capture_frame(frame)
+
+    def flush(self) -> None:
+        super().flush()
+        if self.next_in_chain:
+            self.next_in_chain.flush()
+
+    def clear_buffer(self) -> None:
+        # The parent cut the greeting off; the recording is incomplete
+        if self.recording:
+            self.interrupted = True
+        if self.next_in_chain:
+            self.next_in_chain.clear_buffer()
+
+    def stop(self) -> np.ndarray | None:
+        """Stop recording; returns the int16 samples, or None if the greeting was cut off."""
+        self.recording = False
+        chunks, self._chunks = self._chunks, []
+        if self.interrupted or not chunks:
+            return None
+        return np.frombuffer(b"".join(chunks), dtype=np.int16)
+
+
+async def seed_greeting(agent, text: str) -> llm.ChatMessage:
+    """
+    Add the greeting to the agent's and the realtime session's conversation as an assistant message.
+
+    Returns:
+        The added message
+    """
+    chat_ctx = agent.chat_ctx.copy()
+    message = chat_ctx.add_message(role="assistant", content=text)
+    await agent.update_chat_ctx(chat_ctx)
+    return message
+
+
+async def save_rendering(key: str, recorder: GreetingRecorder, handle, cache: GreetingCache | None = None) -> None:
+    """
+    Save the greeting a session just generated, unless it was cut off.
+
+    Args:
+        key: The session's greeting_key()
+        recorder: The recorder the greeting played through (stopped here)
+        handle: SpeechHandle of the greeting, after playout
+    """
+    pcm = recorder.stop()
+    text = " ".join(
+        item.text_content or "" for item in handle.chat_items if item.type == "message" and item.role == "assistant"
+    ).strip()
+    if pcm is None or not text or handle.interrupted:
+        return
+    cache = cache or get_greeting_cache()
+    try:
+        # Encoding takes tens of milliseconds; keep it off the event loop
+        await asyncio.to_thread(cache.save, key, text, pcm, recorder.sample_rate_seen)
+    except (OSError, av.FFmpegError) as e:
+        print(f"Failed to save greeting rendering {key}: {e!r}")
+
+
+def _split_frames(pcm: np.ndarray, sample_rate: int) -> list[rtc.AudioFrame]:
+    samples = sample_rate * FRAME_MS // 1000
+    return [
+        rtc.AudioFrame(pcm[i:i + samples].tobytes(), sample_rate, 1, len(pcm[i:i + samples]))
+        for i in range(0, len(pcm), samples)
+    ]
+
+
+def _encode_opus(pcm: np.ndarray, sample_rate: int, bitrate: int) -> bytes:
+    buffer = _io.BytesIO()
+    samples = sample_rate * FRAME_MS // 1000
+    with av.open(buffer, "w", format="ogg") as container:
+        stream = container.add_stream("libopus", rate=sample_rate, layout="mono")
+        stream.bit_rate = bitrate
+        for i in range(0, len(pcm), samples):
+            frame = av.AudioFrame.from_ndarray(pcm[i:i + samples].reshape(1, -1), format="s16", layout="mono")
+            frame.sample_rate = sample_rate
+            frame.pts = i
+            for packet in stream.encode(frame):
+                container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return buffer.getvalue()
+
+
+def _decode_opus(path: Path, sample_rate: int) -> np.ndarray:
+    chunks = []
+    with av.open(str(path)) as container:
+        # Opus decodes at 48 kHz; resample to the rate the room output expects
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+        for frame in container.decode(container.streams.audio[0]):
+            chunks.extend(resampled.to_ndarray().reshape(-1) for resampled in resampler.resample(frame))
+        chunks.extend(resampled.to_ndarray().reshape(-1) for resampled in resampler.resample(None))
+    if not chunks:
+        raise ValueError(f"no audio in {path}")
+    return np.concatenate(chunks).astype(np.int16, copy=False)
+
+
+_greeting_cache: GreetingCache | None = None
+
+
+def get_greeting_cache() -> GreetingCache:
+    """Return the process-wide greeting cache."""
+    global _greeting_cache
+    if _greeting_cache is None:
+        _greeting_cache = GreetingCache()
+    return _greeting_cache
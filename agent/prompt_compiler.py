@@ -0,0 +1,104 @@
+"""
+Composable system prompts with token accounting.
+
+A prompt variant is an ordered list of sections (persona, flow, field spec,
+examples, ...). Sections marked stable are identical for every session and
+must come first: OpenAI caches identical prompt prefixes of at least
+MIN_CACHEABLE_TOKENS tokens, so keeping per-session text at the end lets
+every session after the first reuse the cached prefix.
+
+Token counts use tiktoken's o200k_base encoding (the GPT-4o family) when
+tiktoken is installed, and a word-piece estimate otherwise.
+"""
+import functools
+import math
+import re
+from dataclasses import dataclass
+
+try:
+    import tiktoken
+except ImportError:  # optional: only makes the counts exact
+    tiktoken = None
+
+# OpenAI prompt caching applies to prefixes of at least this many tokens
+MIN_CACHEABLE_TOKENS = 1024
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]+")
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    return tiktoken.get_encoding("o200k_base") if tiktoken is not None else None
+
+
+def count_tokens(text: str) -> int:
+    """Count (or, without tiktoken, estimate) the model tokens in `text`."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # Words up to ~6 characters are usually one token; longer ones split
+    return sum(max(1, math.ceil(len(piece) / 6)) for piece in _PIECE_RE.findall(text))
+
+
+@dataclass(frozen=True)
+class PromptSection:
+    """
+    One named block of prompt text.
+
+    Args:
+        name: Section name used in reports (e.g. "persona", "examples")
+        text: Text inserted verbatim; sections are concatenated without separators
+        stable: True if the text is the same for every session
+    """
+
+    name: str
+    text: str
+    stable: bool = True
+
+
+@dataclass(frozen=True)
+class PromptVariant:
+    """A named, ordered combination of sections."""
+
+    name: str
+    sections: tuple[PromptSection, ...]
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    """Prompt text with per-section token counts."""
+
+    variant: str
+    text: str
+    section_tokens: dict[str, int]
+    tokens: int
+    stable_prefix_tokens: int
+
+    @property
+    def cacheable(self) -> bool:
+        """True if the stable prefix is long enough for OpenAI prompt caching."""
+        return self.stable_prefix_tokens >= MIN_CACHEABLE_TOKENS
+
+
+@functools.lru_cache(maxsize=32)
+def compile_prompt(variant: PromptVariant, volatile: tuple[PromptSection, ...] = ()) -> CompiledPrompt:
+    """
+    Concatenate a variant's sections, followed by any per-session sections.
+
+    Raises:
+        ValueError: If a stable section comes after a volatile one
+    """
+    sections = variant.sections + volatile
+    first_volatile = next((i for i, s in enumerate(sections) if not s.stable), len(sections))
+    if any(s.stable for s in sections[first_volatile:]):
+        raise ValueError(f"Prompt variant {variant.name!r}: stable sections must precede volatile ones")
+
+    text = "".join(s.text for s in sections)
+    stable_prefix = "".join(s.text for s in sections[:first_volatile])
+    return CompiledPrompt(
+        variant=variant.name,
+        text=text,
+        section_tokens={s.name: count_tokens(s.text) for s in sections},
+        tokens=count_tokens(text),
+        stable_prefix_tokens=count_tokens(stable_prefix),
+    )
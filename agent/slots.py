@@ -0,0 +1,360 @@
+"""
+Incremental BANT slot tracking.
+
+SlotTracker reads each conversation item once as it is added to the chat
+and fills the lead slots (class, subjects, budget, decision maker,
+timeline, urgency, phone) from what the parent says, using the agent's
+last question to interpret short answers ("10th", "Me and my wife").
+
+Once every slot is filled, or the required ones are and the parent has
+gone SLOT_STALE_TURNS turns without adding anything, the tracker appends a
+wrap-up section to the agent's instructions. In "nudge" mode that asks the
+model to call submit_lead and close the call; in "submit" mode the tracker
+persists the lead itself first. Realtime models start replying before the
+parent's transcript arrives, so the section takes effect from the next
+model response. If the call ends before any lead is submitted, whatever was
+collected is persisted as a partial lead.
+
+Extraction is a handful of precompiled regular expressions per message,
+cheap enough to run on the audio event loop.
+"""
+import asyncio
+import re
+
+from config.settings import SLOT_TRACKER, SLOT_STALE_TURNS
+from .prompt import wrapup_section
+
+# Slots that decide when the lead is complete, in lead field names
+SLOTS = ("child_class", "subjects", "budget_range", "decision_maker", "timeline", "urgency", "contact_phone")
+# submit_lead refuses a lead without these (agent/tools.py)
+REQUIRED_SLOTS = ("child_class", "subjects", "contact_phone")
+# Filled when mentioned but not needed for completion
+EXTRA_SLOTS = ("exam_info",)
+SLOT_TRACKER_MODES = ("off", "nudge", "submit")
+
+_I = re.IGNORECASE
+
+# What the agent's question was about, so a bare answer can be attributed to a slot
+_ASKED = {
+    "child_class": re.compile(r"\b(class|grade|standard|std)\b", _I),
+    "subjects": re.compile(r"\bsubjects?\b", _I),
+    "budget_range": re.compile(r"\b(budget|fee|afford|spend|rupees)\b|₹", _I),
+    "decision_maker": re.compile(r"\b(decid\w*|decisions?)\b", _I),
+    "timeline": re.compile(r"\b(when|start|timeline)\b", _I),
+    "urgency": re.compile(r"\burgen\w*\b", _I),
+    "contact_phone": re.compile(r"\b(phone|number|contact)\b", _I),
+}
+
+_ORDINAL = r"\d{1,2}(?:st|nd|rd|th)"
+_CLASS_RE = re.compile(
+    rf"\b(?:{_ORDINAL}|\d{{1,2}})\s*(?:grade|class|standard|std)\b|\b(?:class|grade|standard|std)\s*\d{{1,2}}\b|\b(?:LKG|UKG|KG|nursery)\b",
+    _I,
+)
+# A bare "10th" or "12" only counts as the class when the agent just asked for it
+_CLASS_ANSWER_RE = re.compile(rf"\b(?:{_ORDINAL}|\d{{1,2}})\b", _I)
+
+_SUBJECTS = {
+    "computer science": "Computer Science",
+    "social studies": "Social Studies",
+    "social science": "Social Science",
+    "mathematics": "Mathematics",
+    "maths": "Maths",
+    "math": "Math",
+    "science": "Science",
+    "physics": "Physics",
+    "chemistry": "Chemistry",
+    "biology": "Biology",
+    "english": "English",
+    "hindi": "Hindi",
+    "sanskrit": "Sanskrit",
+    "history": "History",
+    "geography": "Geography",
+    "economics": "Economics",
+    "accountancy": "Accountancy",
+    "accounts": "Accounts",
+    "coding": "Coding",
+    "evs": "EVS",
+}
+_SUBJECT_RE = re.compile(r"\b(" + "|".join(_SUBJECTS) + r")\b", _I)
+
+_EXAM_RE = re.compile(
+    r"\b(?:NEET|JEE(?: Mains?| Advanced)?|CUET|olympiads?|board exams?|boards|NTSE)\b"
+    r"(?: exams?)?(?: (?:in|this|next) (?:year|month|january|february|march|april|may|june|july|august|september|october|november|december))?",
+    _I,
+)
+
+_MONEY_CUE_RE = re.compile(r"₹|\b(rs\.?|inr|rupees?|budget|afford|spend|thousand|lakhs?|per month|monthly|fees?)\b", _I)
+_AMOUNT = r"(?:₹|rs\.?\s*|inr\s*)?\d[\d,]*(?:\.\d+)?\s*(?:k|thousand|lakhs?)?"
+_BUDGET_RE = re.compile(
+    rf"(?:\b(?:under|below|less than|within|up ?to|around|about|approximately|between|max(?:imum)?|not more than)\s+)?"
+    rf"{_AMOUNT}(?:\s*(?:-|to|and)\s*{_AMOUNT})?(?:\s*(?:rupees|rs|inr))?"
+    rf"(?:\s*(?:(?:per|a|/|every)\s*(?:month|year|annum|quarter|term)|monthly|yearly|annually))?",
+    _I,
+)
+
+_DECISION_BOTH_RE = re.compile(r"\b(both|together|we (?:both )?decide|me and my|my (?:husband|wife) and I)\b", _I)
+_DECISION_FATHER_RE = re.compile(r"\b(my husband|his father|her father|the father|my father)\b", _I)
+_DECISION_MOTHER_RE = re.compile(r"\b(my wife|his mother|her mother|the mother|my mother)\b", _I)
+_DECISION_SELF_RE = re.compile(r"\b(I decide|I make|I'll decide|I will decide|me only|only me|myself|it's me|I do)\b", _I)
+_DECISION_CUE_RE = re.compile(r"\b(decid\w*|decisions?|discuss with|check with|ask my)\b", _I)
+
+_TIMELINE_RE = re.compile(
+    r"\b(as soon as possible|asap|right away|right now|immediately|today|tomorrow"
+    r"|this (?:week|month|weekend)|next (?:week|month|year|session|academic year)"
+    r"|in (?:a|one|two|three|a few|\d+) (?:days?|weeks?|months?)"
+    r"|(?:from|in|by) (?:january|february|march|april|may|june|july|august|september|october|november|december)"
+    r"|after (?:the )?(?:exams?|vacations?|holidays|results))\b",
+    _I,
+)
+# "next year" or "right now" only means when to start if the agent asked or the parent talks about starting
+_TIMELINE_CUE_RE = re.compile(r"\b(start\w*|join\w*|begin\w*|enrol\w*|admission|from)\b", _I)
+
+# Urgency buckets, checked in order
+_URGENCY = (
+    ("Low", re.compile(r"\b(not (?:that |very |too )?urgent|no (?:hurry|rush)|planning ahead|just exploring|just looking)\b", _I)),
+    ("Immediate", re.compile(r"\b(immediate(?:ly)?|right away|right now|as soon as possible|asap|urgent(?:ly)?)\b", _I)),
+    ("Within a month", re.compile(r"\b(this month|next month|in (?:a|one|two|three|a few|\d+) weeks?)\b", _I)),
+    ("Planning ahead", re.compile(r"\b(next year|next session|in (?:a few|\d+|two|three|six) months|after (?:the )?(?:exams?|results))\b", _I)),
+)
+
+_DIGIT_WORDS = {
+    "zero": "0", "oh": "0", "one": "1", "two": "2", "three": "3", "four": "4",
+    "five": "5", "six": "6", "seven": "7", "eight": "8", "nine": "9",
+}
+_REPEAT_WORDS = {"double": 2, "triple": 3}
+_SPOKEN_DIGITS_RE = re.compile(r"\b(?:(?:double|triple|zero|oh|one|two|three|four|five|six|seven|eight|nine)[\s,-]*){4,}", _I)
+_PHONE_RE = re.compile(r"(?<!\d)(?:\+?91[\s-]*|0)?([6-9](?:[\s-]*\d){9})(?!\d)")
+
+
+def _spoken_to_digits(match: re.Match) -> str:
+    digits, repeat = [], 1
+    for word in re.findall(r"[a-z]+", match.group(0).lower()):
+        if word in _REPEAT_WORDS:
+            repeat = _REPEAT_WORDS[word]
+        else:
+            digits.append(_DIGIT_WORDS[word] * repeat)
+            repeat = 1
+    return "".join(digits) + " "
+
+
+def _phrase(text: str) -> str:
+    text = text.strip(" .,!?")
+    return text[:1].upper() + text[1:]
+
+
+def extract_phone(text: str) -> str | None:
+    """Indian mobile number in `text` as 10 digits, with digits spoken as words allowed."""
+    match = _PHONE_RE.search(_SPOKEN_DIGITS_RE.sub(_spoken_to_digits, text))
+    return re.sub(r"\D", "", match.group(1)) if match else None
+
+
+def extract_subjects(text: str) -> str | None:
+    """Subjects named in `text`, in order, e.g. "Physics, Chemistry"."""
+    seen: list[str] = []
+    for match in _SUBJECT_RE.finditer(text):
+        name = _SUBJECTS[match.group(1).lower()]
+        if name not in seen:
+            seen.append(name)
+    return ", ".join(seen) or None
+
+
+def extract_budget(text: str, asked: bool = False) -> str | None:
+    """Budget phrase such as "Under ₹10,000 per month", if `text` talks about money."""
+    if not (asked or _MONEY_CUE_RE.search(text)):
+        return None
+    for match in _BUDGET_RE.finditer(text):
+        numbers = [n.replace(",", "") for n in re.findall(r"\d[\d,]*", match.group(0))]
+        # Skip phone numbers and bare small numbers like a class or a count of days
+        if max(map(len, numbers)) < 8 and (max(map(len, numbers)) >= 3 or re.search(r"k\b|thousand|lakh", match.group(0), _I)):
+            # "8,000 rupees" -> "₹8,000", matching how the agent is told to state budgets
+            value = re.sub(r"\s*\b(?:rupees|rs\.?|inr)(?=\s|$)", "", match.group(0), flags=_I)
+            return _phrase(re.sub(r"(?<![₹\d,.])(\d[\d,]*)", r"₹\1", value))
+    return None
+
+
+def extract_decision_maker(text: str, asked: bool = False) -> str | None:
+    """Who decides about the child's education: "Both parents", "Father", "Mother" or "Parent"."""
+    if not (asked or _DECISION_CUE_RE.search(text)):
+        return None
+    if _DECISION_BOTH_RE.search(text):
+        return "Both parents"
+    if _DECISION_FATHER_RE.search(text):
+        return "Father"
+    if _DECISION_MOTHER_RE.search(text):
+        return "Mother"
+    if _DECISION_SELF_RE.search(text):
+        return "Parent"
+    return None
+
+
+def extract_timeline(text: str, asked: bool = False) -> str | None:
+    """When the parent wants to start, e.g. "Next month", if `text` is about starting."""
+    if not (asked or _TIMELINE_CUE_RE.search(text)):
+        return None
+    match = _TIMELINE_RE.search(text)
+    return _phrase(match.group(0)) if match else None
+
+
+def extract_urgency(text: str) -> str | None:
+    """Urgency bucket: "Immediate", "Within a month", "Planning ahead" or "Low"."""
+    for bucket, pattern in _URGENCY:
+        if pattern.search(text):
+            return bucket
+    return None
+
+
+class SlotTracker:
+    """
+    Fills lead slots from one session's conversation items.
+
+    Args:
+        agent: The session's agent; its conversation_id and lead_submitter are used,
+            and its instructions are extended with the wrap-up section
+        mode: "off", "nudge" or "submit" (see module docstring)
+        stale_turns: Parent turns without a new slot, once the required ones are known,
+            before wrapping up anyway; 0 waits for every slot
+    """
+
+    def __init__(self, agent, mode: str = SLOT_TRACKER, stale_turns: int = SLOT_STALE_TURNS):
+        if mode not in SLOT_TRACKER_MODES:
+            raise ValueError(f"Unknown SLOT_TRACKER mode: {mode!r}")
+        self.agent = agent
+        self.mode = mode
+        self.stale_turns = stale_turns
+        self.slots: dict[str, str] = {}
+        self.parent_turns = 0
+        # Parent turn on which the tracker wrapped up, if it did
+        self.wrapped_up_at: int | None = None
+        self.submitted = False
+        self._asked: set[str] = set()
+        self._stale = 0
+        self._base_instructions = agent.instructions
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def missing(self) -> list[str]:
+        return [slot for slot in SLOTS if slot not in self.slots]
+
+    @property
+    def complete(self) -> bool:
+        return all(slot in self.slots for slot in SLOTS)
+
+    @property
+    def ready(self) -> bool:
+        return all(slot in self.slots for slot in REQUIRED_SLOTS)
+
+    @property
+    def turns_without_progress(self) -> int:
+        """Parent turns in a row that filled no new slot."""
+        return self._stale
+
+    def observe(self, item) -> None:
+        """Update the slots from a conversation item (a ChatMessage)."""
+        if self.mode == "off" or getattr(item, "type", "message") != "message":
+            return
+        text = item.text_content or ""
+        if item.role == "assistant":
+            self._asked = {slot for slot, pattern in _ASKED.items() if pattern.search(text)}
+            return
+        if item.role != "user" or not text:
+            return
+
+        self.parent_turns += 1
+        new = self.update(text)
+        self._stale = 0 if new else self._stale + 1
+        if self.wrapped_up_at is None and (
+            self.complete or (self.ready and self.stale_turns and self._stale >= self.stale_turns)
+        ):
+            self._wrap_up()
+
+    def update(self, text: str) -> list[str]:
+        """
+        Fill slots from one parent utterance.
+
+        Returns:
+            Names of the slots this utterance filled or changed
+        """
+        asked = self._asked
+        found = {
+            "contact_phone": extract_phone(text),
+            "subjects": extract_subjects(text),
+            "budget_range": extract_budget(text, "budget_range" in asked),
+            "decision_maker": extract_decision_maker(text, "decision_maker" in asked),
+            "timeline": extract_timeline(text, "timeline" in asked),
+            "urgency": extract_urgency(text),
+            "exam_info": (match := _EXAM_RE.search(text)) and _phrase(match.group(0)),
+        }
+        if match := _CLASS_RE.search(text):
+            found["child_class"] = match.group(0)
+        elif "child_class" in asked and (match := _CLASS_ANSWER_RE.search(text)) and not found["contact_phone"]:
+            found["child_class"] = match.group(0)
+
+        changed = []
+        for slot, value in found.items():
+            # The first mention wins, unless the agent just asked about this slot
+            if value and (slot not in self.slots or (slot in asked and self.slots[slot] != value)):
+                self.slots[slot] = value
+                changed.append(slot)
+        return changed
+
+    def lead(self, conversation_id: str | None = None) -> dict:
+        """The collected slots in submit_lead's lead format."""
+        lead = {"conversation_id": conversation_id or getattr(self.agent, "conversation_id", None)}
+        for field in ("child_class", "subjects", "exam_info", "budget_range", "decision_maker", "timeline", "urgency", "contact_phone"):
+            lead[field] = self.slots.get(field)
+        return lead
+
+    def mark_submitted(self) -> None:
+        """Record that submit_lead persisted a lead for this session."""
+        self.submitted = True
+
+    def fill_missing(self, lead: dict) -> dict:
+        """Fill fields the model left empty with values the parent stated."""
+        for field, value in self.slots.items():
+            if field in lead and not lead[field]:
+                lead[field] = value
+        return lead
+
+    def finalize(self) -> dict | None:
+        """
+        Persist a partial lead if the call ends before one was submitted.
+
+        Call before the session's lead submitter is closed.
+
+        Returns:
+            The partial lead, or None if nothing was collected or a lead was submitted
+        """
+        if self.mode == "off" or self.submitted or not self.slots:
+            return None
+        submitter = getattr(self.agent, "lead_submitter", None)
+        if submitter is None:
+            return None
+        lead = self.lead()
+        lead["partial"] = True
+        lead["missing"] = self.missing
+        try:
+            submitter.enqueue(lead)
+        except RuntimeError as e:
+            print(f"Partial lead not persisted: {e}")
+            return None
+        self.submitted = True
+        return lead
+
+    def _wrap_up(self) -> None:
+        self.wrapped_up_at = self.parent_turns
+        submitter = getattr(self.agent, "lead_submitter", None)
+        if self.mode == "submit" and not self.submitted and submitter is not None:
+            submitter.enqueue(self.lead())
+            self.submitted = True
+        details = {slot: self.slots[slot] for slot in (*SLOTS, *EXTRA_SLOTS) if slot in self.slots}
+        # Appended after the stable prompt, so the cached prefix is unchanged
+        instructions = self._base_instructions + wrapup_section(details, self.submitted).text
+        task = asyncio.create_task(self._update_instructions(instructions))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _update_instructions(self, instructions: str) -> None:
+        try:
+            await self.agent.update_instructions(instructions)
+        except Exception as e:
+            print(f"Slot tracker could not update instructions: {e!r}")
@@ -0,0 +1,38 @@
+"""
+Tool-call latency hooks.
+
+Tools report how long they took from invocation until they returned control
+to the model. Hooks receive (tool_name, seconds, conversation_id) and must be
+cheap, since they run on the audio event loop.
+"""
+from typing import Callable
+
+ToolTimingHook = Callable[[str, float, str | None], None]
+
+
+def log_tool_latency(tool_name: str, seconds: float, conversation_id: str | None) -> None:
+    print(f"Tool {tool_name} returned in {seconds * 1000:.1f} ms (conversation {conversation_id})")
+
+
+_hooks: list[ToolTimingHook] = [log_tool_latency]
+
+
+def add_tool_timing_hook(hook: ToolTimingHook) -> None:
+    """Register a hook that is called after every timed tool call."""
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def remove_tool_timing_hook(hook: ToolTimingHook) -> None:
+    """Unregister a previously added hook."""
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def record_tool_latency(tool_name: str, seconds: float, conversation_id: str | None = None) -> None:
+    """Report one tool call's call-to-return latency to every registered hook."""
+    for hook in list(_hooks):
+        try:
+            hook(tool_name, seconds, conversation_id)
+        except Exception as e:
+            print(f"Tool timing hook {hook!r} failed: {e!r}")
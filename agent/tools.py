@@ -1,5 +1,32 @@
-import json
-from livekit.agents import function_tool, RunContext
+import re
+import time
+from livekit.agents import function_tool, RunContext, ToolError
+from opentelemetry import trace
+
+from config.settings import LEAD_SUBMIT_MODE
+from leads import get_lead_sink
+from .catalog import get_catalog
+from .timing import record_tool_latency
+
+# API-only tracer: a no-op unless the runner installed a tracer provider (runner/tracing.py)
+_tracer = trace.get_tracer(__name__)
+
+
+def _validate_lead(child_class: str, subjects: str, contact_phone: str) -> None:
+    # Reject leads the CRM cannot use; the message is shown to the model so it can re-ask
+    missing = [
+        name for name, value in (
+            ("child_class", child_class),
+            ("subjects", subjects),
+            ("contact_phone", contact_phone),
+        )
+        if not value or not value.strip()
+    ]
+    if missing:
+        raise ToolError(f"Missing required fields: {', '.join(missing)}. Ask the parent for them.")
+    if len(re.sub(r"\D", "", contact_phone)) < 10:
+        raise ToolError("The contact phone number looks incomplete. Politely ask the parent to repeat it.")
+
 
 @function_tool()
 async def submit_lead(
@@ -13,14 +40,17 @@ async def submit_lead(
     timeline: str | None = None,
     urgency: str | None = None,
 ):
+    started = time.perf_counter()
     # Get conversation_id for tracking - try multiple sources
     conversation_id = None
     
     # First try to get from agent instance (primary source - set in entrypoint.py)
+    # RunContext has no agent attribute; the running agent is the session's current_agent
+    agent = None
     try:
-        if hasattr(context.agent, 'conversation_id'):
-            conversation_id = context.agent.conversation_id
-    except (AttributeError, TypeError):
+        agent = context.session.current_agent
+        conversation_id = getattr(agent, 'conversation_id', None)
+    except (AttributeError, RuntimeError):
         pass
     
     # Fallback: try to get from session userdata (if available)
@@ -31,30 +61,132 @@ async def submit_lead(
         except (ValueError, AttributeError, TypeError):
             # userdata is not set or not available, continue with None
             pass
-    
-    lead = {
-        "conversation_id": conversation_id,
-        "child_class": child_class,
-        "subjects": subjects,
-        "exam_info": exam_info,
-        "budget_range": budget_range,
-        "decision_maker": decision_maker,
-        "timeline": timeline,
-        "urgency": urgency,
-        "contact_phone": contact_phone,
+
+    # Child of the session span; a ToolError is recorded on the span as an exception
+    with _tracer.start_as_current_span("submit_lead") as span:
+        if conversation_id:
+            span.set_attribute("conversation_id", conversation_id)
+        try:
+            _validate_lead(child_class, subjects, contact_phone)
+        except ToolError:
+            record_tool_latency("submit_lead", time.perf_counter() - started, conversation_id)
+            raise
+
+        lead = {
+            "conversation_id": conversation_id,
+            "child_class": child_class,
+            "subjects": subjects,
+            "exam_info": exam_info,
+            "budget_range": budget_range,
+            "decision_maker": decision_maker,
+            "timeline": timeline,
+            "urgency": urgency,
+            "contact_phone": contact_phone,
+        }
+
+        # In background mode the session's submitter owns the write,
+        # so the model can start its thank-you without waiting for the outbox/CRM.
+        submitter = getattr(agent, "lead_submitter", None)
+        background = LEAD_SUBMIT_MODE == "background" and submitter is not None
+        sink = submitter.sink if background else get_lead_sink()
+
+        # A parent calling back is merged into their earlier lead by the sink (leads/dedup.py);
+        # the lookup is a bloom filter probe for new callers
+        repeat_of = sink.find_lead(contact_phone)
+        if repeat_of:
+            span.set_attribute("repeat_of", repeat_of)
+
+        # Values the parent stated but the model left out (agent/slots.py)
+        tracker = getattr(agent, "slot_tracker", None)
+        if tracker is not None:
+            tracker.fill_missing(lead)
+
+        # Store in session userdata if available
+        try:
+            context.session.userdata["lead"] = lead
+        except (AttributeError, ValueError):
+            # userdata not available or not set, continue without storing
+            # The lead is still persisted below
+            pass
+        # Persist the lead
+        if background:
+            submitter.enqueue(lead)
+        else:
+            await sink.submit(lead)
+        if tracker is not None:
+            tracker.mark_submitted()
+
+    record_tool_latency("submit_lead", time.perf_counter() - started, conversation_id)
+    if repeat_of:
+        return {
+            "status": "ok",
+            "message": "This parent has enquired before; their earlier enquiry was updated. A counselor will follow up soon."
+        }
+    return {
+        "status": "ok",
+        "message": "Lead captured. A counselor will follow up soon."
     }
 
-    # Store in session userdata if available
+
+def _conversation_id(context: RunContext) -> str | None:
+    # Same sources as submit_lead: the running agent, then session userdata
     try:
-        context.session.userdata["lead"] = lead
-    except (AttributeError, ValueError):
-        # userdata not available or not set, continue without storing
-        # The lead is still printed below
+        conversation_id = getattr(context.session.current_agent, "conversation_id", None)
+        if conversation_id:
+            return conversation_id
+    except (AttributeError, RuntimeError):
         pass
-    # Store the lead in the database/CRM
-    print(json.dumps(lead, indent=2, ensure_ascii=False))
+    try:
+        return context.session.userdata.get("conversation_id")
+    except (ValueError, AttributeError, TypeError):
+        return None
+
 
+@function_tool()
+async def lookup_programs(
+    context: RunContext,
+    question: str,
+    child_class: str | None = None,
+    subject: str | None = None,
+    exam: str | None = None,
+):
+    """
+    Look up our programs, fees, batch timings and durations in the program catalog.
+    Call it whenever the parent asks about courses, fees, batches or timings, and answer only from its result.
+
+    Args:
+        question: What the parent wants to know, in a few words (e.g. "NEET batch timings")
+        child_class: The child's class, if known (e.g. "10th", "Class 5", "dropper")
+        subject: Subjects the parent asked about, if any (e.g. "Math", "Physics and Chemistry")
+        exam: Exam the parent mentioned, if any (e.g. "NEET", "JEE Main", "CBSE Board")
+    """
+    started = time.perf_counter()
+    conversation_id = _conversation_id(context)
+    catalog = get_catalog()
+    with _tracer.start_as_current_span("lookup_programs") as span:
+        if conversation_id:
+            span.set_attribute("conversation_id", conversation_id)
+        # The index is in memory, so the lookup runs inline on the event loop
+        programs = catalog.search(question, child_class=child_class, subject=subject, exam=exam)
+        status = "ok"
+        if not programs:
+            status = "no_match"
+            # Show what exists for the child before giving up on the filters
+            programs = catalog.search("", child_class=child_class, subject=subject, exam=exam)
+        span.set_attribute("programs", len(programs))
+        span.set_attribute("status", status)
+
+    record_tool_latency("lookup_programs", time.perf_counter() - started, conversation_id)
+    if status == "ok":
+        return {"status": "ok", "currency": catalog.index.currency, "programs": programs}
+    if programs:
+        return {
+            "status": "no_match",
+            "message": "No program matches that exactly. Offer these programs for the child instead.",
+            "currency": catalog.index.currency,
+            "programs": programs,
+        }
     return {
-        "status": "ok",
-        "message": "Lead captured. A counselor will follow up soon."
+        "status": "no_match",
+        "message": "The catalog has no program for this. Say a counselor will share suitable options when they call.",
     }
@@ -0,0 +1,105 @@
+"""
+Activity monitor: session time reclaimed from silent parents and dead connections.
+
+Replays scripted calls through an AgentSession with the SessionGovernor,
+once without and once with the ActivityMonitor (runner/activity.py):
+  - silent:   the parent answers one question and then never speaks again
+  - returns:  the parent goes quiet once and answers after the reprompt
+  - dead:     the model connection stops responding after a parent turn
+  - normal:   conversation_sample_minimal.md
+
+Without the monitor, the silent and dead calls hold their session until the
+governor's minutes cap. The report shows the real-time seconds each call
+held its session, the reprompts, how it ended and the seconds the monitor
+reclaimed (time left before the minutes cap).
+
+Usage:
+    python -m benchmarks.activity_monitor [--speed 200] [--max-minutes 15] [--reprompt-after 12] [--hangup-after 15]
+"""
+import argparse
+import asyncio
+
+from .fake_realtime import ScriptStep
+from .load_test import DEFAULT_SCRIPT
+from .session_governor import replay
+
+# DEFAULT_SCRIPT up to the agent asking for the subjects
+_ASKED_SUBJECTS = DEFAULT_SCRIPT[:5]
+_REPROMPTS = [
+    ScriptStep("agent", "Hello, are you still there? Which subjects does your son need help with?"),
+    ScriptStep("agent", "I can't hear you, are you still on the line? Could you tell me the subjects?"),
+]
+_GOODBYE = ScriptStep("agent", "It seems we've lost you. A counselor will call you back soon. Have a good day, goodbye!")
+
+
+def silent_script() -> list[ScriptStep]:
+    script = list(_ASKED_SUBJECTS)
+    for reprompt in _REPROMPTS:
+        script += [ScriptStep("silence"), reprompt]
+    return script + [ScriptStep("silence"), _GOODBYE]
+
+
+def returning_script() -> list[ScriptStep]:
+    return _ASKED_SUBJECTS + [ScriptStep("silence"), _REPROMPTS[0]] + DEFAULT_SCRIPT[5:]
+
+
+def dead_script() -> list[ScriptStep]:
+    return DEFAULT_SCRIPT[:4] + [ScriptStep("hang")]
+
+
+async def run(args) -> None:
+    from agent.timing import log_tool_latency, remove_tool_timing_hook
+    from .replay import build_script, parse_transcript
+    remove_tool_timing_hook(log_tool_latency)
+
+    scripts = {
+        "silent": silent_script(),
+        "returns": returning_script(),
+        "dead": dead_script(),
+        "normal": build_script(parse_transcript("conversation_sample_minimal.md")),
+    }
+    caps = {"max_minutes": args.max_minutes}
+    activity = {
+        "reprompt_after": args.reprompt_after,
+        "max_reprompts": args.max_reprompts,
+        "hangup_after": args.hangup_after,
+        "zombie_after": args.zombie_after,
+    }
+
+    print("=" * 80)
+    print(f"Activity monitor: reprompt after {args.reprompt_after:g}s (x{args.max_reprompts}), hang up after "
+          f"{args.hangup_after:g}s, reap after {args.zombie_after:g}s; minutes cap {args.max_minutes:g}; speed x{args.speed:g}")
+    print("=" * 80)
+    print(f"{'call':<9} {'monitor':<8} {'session s':>10} {'reprompts':>10} {'ended by':>12} {'reclaimed s':>12}")
+    held = {"off": 0.0, "on": 0.0}
+    reclaimed = 0.0
+    index = 0
+    for name, script in scripts.items():
+        for label, monitor in (("off", None), ("on", activity)):
+            index += 1
+            result = await replay(script, index, args, caps, activity=monitor)
+            held[label] += result["seconds"]
+            reclaimed += result["reclaimed_seconds"]
+            ended = result["cut_reason"] or ("script" if result["completed"] else "-")
+            print(f"{name:<9} {label:<8} {result['seconds']:>10.0f} {result['reprompts']:>10} {ended:>12} "
+                  f"{result['reclaimed_seconds']:>12.0f}")
+    print("-" * 80)
+    print(f"Session seconds held:       {held['off']:,.0f} without the monitor, {held['on']:,.0f} with it "
+          f"({1 - held['on'] / held['off']:.0%} less); {reclaimed:,.0f}s reported reclaimed")
+    print("=" * 80)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure session time the activity monitor reclaims")
+    parser.add_argument("--speed", type=float, default=200.0, help="Replay speed-up over real time")
+    parser.add_argument("--max-minutes", type=float, default=15.0, help="Governor minutes cap (real time)")
+    parser.add_argument("--reprompt-after", type=float, default=12.0)
+    parser.add_argument("--max-reprompts", type=int, default=2)
+    parser.add_argument("--hangup-after", type=float, default=15.0)
+    parser.add_argument("--zombie-after", type=float, default=90.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+In-worker call recorder benchmark.
+
+Runs `--sessions` concurrent synthetic calls (`--minutes` long, `--speed`
+times faster than real time) through three taps on one event loop:
+  - off:    no recording
+  - naive:  each frame's bytes appended to a list per channel; on close the
+            lists are joined, interleaved and encoded to Opus on the loop
+  - ring:   CallRecorder (recording/recorder.py): frames copied into a
+            preallocated ring, encoded on a background thread
+
+The parent's 20 ms frames arrive steadily; the agent's arrive in bursts
+ahead of playout, and a third of its turns are interrupted. Reports the
+cost of a tap per frame, event loop lag (including the close), encoder CPU
+per call-minute and bytes per call-minute. Then records one call of each
+`--memory-minutes` length under tracemalloc, to show how the memory a
+session holds grows with the call length (naive) or does not (ring).
+
+Usage:
+    python -m benchmarks.call_recorder [--sessions 10] [--minutes 2] [--speed 5] [--memory-minutes 1 4]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+import av
+import numpy as np
+from livekit import rtc
+
+from .common import LoopLagMonitor, percentile
+from .recording_formats import synthetic_call
+
+RATE = 24000
+FRAME = RATE // 50  # 20 ms
+TICKS = 5  # frames written per wake-up (100 ms of call)
+AHEAD = 25  # agent frames queued ahead of playout (500 ms)
+
+
+class NaiveRecorder:
+    """Keeps every frame's bytes and encodes the whole call on close."""
+
+    def __init__(self, conversation_id: str, directory: str, bitrate: int):
+        self.path = os.path.join(directory, f"{conversation_id}.ogg")
+        self.bitrate = bitrate
+        self.chunks: list[list[bytes]] = [[], []]
+        self.encode_seconds = 0.0
+        self.dropped = 0
+        self.bytes = 0
+
+    def write(self, channel: int, frame: rtc.AudioFrame) -> None:
+        self.chunks[channel].append(bytes(frame.data))
+
+    def rewind(self, channel: int) -> None:
+        pass  # Has no timeline to erase from
+
+    def start(self) -> None:
+        pass
+
+    async def aclose(self) -> bool:
+        started = time.thread_time()
+        channels = [np.frombuffer(b"".join(chunks), dtype=np.int16) for chunks in self.chunks]
+        length = max(len(c) for c in channels)
+        stereo = np.zeros((length, 2), dtype=np.int16)
+        for i, samples in enumerate(channels):
+            stereo[:len(samples), i] = samples
+        with av.open(self.path, "w", format="ogg") as container:
+            stream = container.add_stream("libopus", rate=RATE, layout="stereo")
+            stream.bit_rate = self.bitrate
+            frame = av.AudioFrame.from_ndarray(stereo.reshape(1, -1), format="s16", layout="stereo")
+            frame.sample_rate = RATE
+            frame.pts = 0
+            for packet in stream.encode(frame):
+                container.mux(packet)
+            for packet in stream.encode(None):
+                container.mux(packet)
+        self.encode_seconds = time.thread_time() - started
+        self.bytes = os.path.getsize(self.path)
+        return True
+
+
+def call_frames(minutes: float) -> tuple[list[rtc.AudioFrame], list[rtc.AudioFrame], list[tuple[int, int, int | None]]]:
+    """Parent and agent frames of a synthetic call at RATE, and the agent's turns as (first, last, interrupted at) frames."""
+    tracks, turns = synthetic_call(minutes)
+    # The clients' 48 kHz speech, decimated to the session's rate
+    agent, parent = (track[::2] for track in tracks)
+    frames = [
+        [rtc.AudioFrame(track[i:i + FRAME].tobytes(), RATE, 1, FRAME) for i in range(0, len(track) - FRAME + 1, FRAME)]
+        for track in (parent, agent)
+    ]
+    agent_turns = []
+    for n, (start, end, speaker) in enumerate(t for t in turns if t[2] == 0):
+        first, last = int(start * 50), int(end * 50)
+        agent_turns.append((first, last, (first + last) // 2 if n % 3 == 2 else None))
+    return frames[0], frames[1], agent_turns
+
+
+async def session(recorder, frames, clock, speed: float, taps: list[float] | None) -> None:
+    """Replay one call into `recorder`, with `clock` running `speed` times real time; tap times go to `taps`."""
+    parent, agent, turns = frames
+
+    def timed_write(channel: int, frame: rtc.AudioFrame) -> None:
+        started = time.perf_counter()
+        recorder.write(channel, frame)
+        taps.append(time.perf_counter() - started)
+
+    write = recorder.write if taps is None else timed_write
+
+    origin = clock()
+    turn, written = 0, 0  # the agent's current turn, and its next frame to queue
+    for tick in range(0, len(parent), TICKS):
+        wait = tick * 0.02 - (clock() - origin)
+        if wait > 0:
+            await asyncio.sleep(wait / speed)
+        for i in range(tick, min(tick + TICKS, len(parent))):
+            write(0, parent[i])
+            while turn < len(turns) and i >= turns[turn][1]:
+                turn += 1
+            if turn == len(turns) or i < turns[turn][0]:
+                continue
+            first, last, interrupted = turns[turn]
+            if i == interrupted:
+                # The parent barged in: what was queued but not played is discarded
+                recorder.rewind(1)
+                turn += 1
+                continue
+            # The agent's output queues its audio up to AHEAD frames before it plays
+            written = max(written, i)
+            while written < min(last, i + AHEAD):
+                write(1, agent[written])
+                written += 1
+    await recorder.aclose()
+
+
+async def run_mode(mode: str, args, frames, directory: str, timed: bool = True) -> dict:
+    from recording import CallRecorder
+
+    base = time.monotonic()
+
+    def clock() -> float:
+        return (time.monotonic() - base) * args.speed
+
+    recorders = []
+    for i in range(args.sessions):
+        if mode == "ring":
+            recorders.append(CallRecorder(f"{mode}-{i}", directory, sample_rate=RATE, bitrate=args.bitrate,
+                                          flush_interval=1.0 / args.speed, clock=clock))
+        elif mode == "naive":
+            recorders.append(NaiveRecorder(f"{mode}-{i}", directory, args.bitrate))
+    taps: list[float] | None = [] if timed else None
+    monitor = LoopLagMonitor()
+    monitor.start()
+    cpu = time.process_time()
+    for recorder in recorders:
+        recorder.start()
+    await asyncio.gather(*(session(r, frames, clock, args.speed, taps) for r in recorders)) if recorders else \
+        await asyncio.sleep(len(frames[0]) * 0.02 / args.speed)
+    cpu = time.process_time() - cpu
+    lags = await monitor.stop()
+    return {
+        "taps": taps or [],
+        "lags": lags,
+        "cpu": cpu,
+        "encode": sum(r.encode_seconds for r in recorders),
+        "bytes": sum(r.bytes for r in recorders),
+        "dropped": sum(r.dropped for r in recorders) / RATE,
+    }
+
+
+async def peak_memory(mode: str, minutes: float, args, directory: str) -> int:
+    """Peak bytes traced while recording one `minutes`-long call, less the frames being replayed (untimed)."""
+    frames = call_frames(minutes)
+    args = argparse.Namespace(**{**vars(args), "sessions": 1})
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    await run_mode(mode, args, frames, directory, timed=False)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak - baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the in-worker call recorder against recording on close")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent calls")
+    parser.add_argument("--minutes", type=float, default=2.0, help="Call length")
+    parser.add_argument("--speed", type=float, default=5.0, help="Times faster than real time")
+    parser.add_argument("--bitrate", type=int, default=32000, help="Opus bitrate (bits/s)")
+    parser.add_argument("--memory-minutes", type=float, nargs="+", default=[1.0, 4.0],
+                        help="Call lengths for the memory measurement")
+    args = parser.parse_args()
+
+    frames = call_frames(args.minutes)
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {mode: asyncio.run(run_mode(mode, args, frames, tmp)) for mode in ("off", "naive", "ring")}
+        # Memory is measured at a higher speed; the timings above are not taken under tracemalloc
+        memory_args = argparse.Namespace(**{**vars(args), "speed": max(args.speed, 20.0)})
+        memory = {
+            mode: [asyncio.run(peak_memory(mode, m, memory_args, tmp)) for m in args.memory_minutes]
+            for mode in ("naive", "ring")
+        }
+
+    call_minutes = args.sessions * args.minutes
+    print("=" * 100)
+    print(f"Call recorder: {args.sessions} sessions x {args.minutes:g} min at {args.speed:g}x "
+          f"({args.sessions * args.speed:g} real-time calls), {RATE // 1000} kHz stereo Opus at {args.bitrate // 1000} kbps")
+    print("=" * 100)
+    print(f"{'tap':<8} {'tap p50 us':>11} {'tap p99 us':>11} {'lag p99 ms':>11} {'lag max ms':>11} "
+          f"{'encode ms/call-min':>19} {'KB/call-min':>12} {'dropped s':>10}")
+    for mode, r in results.items():
+        taps = [t * 1e6 for t in r["taps"]]
+        print(f"{mode:<8} {percentile(taps, 50):>11.1f} {percentile(taps, 99):>11.1f} "
+              f"{percentile(r['lags'], 99) * 1000:>11.1f} {max(r['lags'], default=0) * 1000:>11.1f} "
+              f"{r['encode'] * 1000 / call_minutes:>19,.0f} {r['bytes'] / 1024 / call_minutes:>12,.0f} {r['dropped']:>10.1f}")
+    print("-" * 100)
+    print(f"{'memory per session':<24}" + "".join(f"{f'{m:g}-min call':>16}" for m in args.memory_minutes))
+    for mode, peaks in memory.items():
+        print(f"{mode:<24}" + "".join(f"{p / 1e6:>13,.2f} MB" for p in peaks))
+    print("  (Python and numpy allocations under tracemalloc; the Opus encoder's own state is not traced)")
+    print("-" * 100)
+    ring = results["ring"]
+    print(f"Ring encoder:      {ring['encode'] * 1000 / call_minutes:,.0f} ms CPU per call-minute, off the loop; "
+          f"one encoder thread keeps up with ~{60 / max(ring['encode'] / call_minutes, 1e-9):,.0f} live calls")
+    print(f"Loop CPU:          off {results['off']['cpu']:.2f}s, naive {results['naive']['cpu']:.2f}s, "
+          f"ring {ring['cpu']:.2f}s (process total, encoder threads included)")
+    print("=" * 100)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Program catalog lookup benchmark.
+
+Measures, for the shipped catalog (config/catalog.json) and for a synthetic
+catalog of `--programs` programs built from it:
+  - index build time and matrix size
+  - CatalogIndex.search() latency on a mix of parent questions, with and
+    without class/subject/exam filters
+  - lookup_programs call-to-return latency, as the model sees it
+  - the same questions answered by a pure-Python token-overlap scan, for scale
+  - hot reload: time from rewriting the file until lookups see the new
+    index, and lookup latency while the reload runs
+
+Usage:
+    python -m benchmarks.catalog_lookup [--programs 5000] [--lookups 20000]
+"""
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from agent.catalog import Catalog, load_index, tokenize
+from .common import percentile
+
+QUESTIONS = [
+    ("NEET coaching fees", "11th", None, None),
+    ("batch timings for maths", "Class 10", "Maths", None),
+    ("JEE crash course", None, None, "JEE Main"),
+    ("drop year preparation", "12th pass", None, "NEET"),
+    ("spoken english classes", None, None, None),
+    ("boards physics and chemistry", "12", "Physics and Chemistry", None),
+    ("coding for my son", "7", None, None),
+    ("one on one tutor for science", "9th", "Science", None),
+    ("olympiad", "6", "Math", "Olympiad"),
+    ("what programs do you have", "4", None, None),
+]
+
+_WORDS = ("revision practice mock tests doubt sessions concept building weekly reports mentors "
+          "worksheets recorded lectures live classes personal attention board pattern previous papers "
+          "speed accuracy foundation advanced crash intensive weekend evening morning").split()
+
+
+def synthetic_catalog(base: list[dict], count: int, rng: random.Random) -> dict:
+    """`count` programs varied from the shipped ones: names, descriptions, fees and batches."""
+    programs = []
+    for i in range(count):
+        program = dict(base[i % len(base)])
+        program["id"] = f"{program['id']}-{i}"
+        extra = rng.sample(_WORDS, 3)
+        program["name"] = f"{program['name']} {' '.join(w.capitalize() for w in extra[:2])} {i}"
+        program["description"] = f"{program['description']} {' '.join(rng.sample(_WORDS, 8))}"
+        program["fee_per_month"] = program["fee_per_month"] + rng.randrange(-5, 6) * 100
+        programs.append(program)
+    return {"currency": "INR", "programs": programs}
+
+
+def python_scan(programs: list[dict], question: str, limit: int = 3) -> list[dict]:
+    """Baseline: tokenize every program per question and count overlapping terms."""
+    terms = set(tokenize(question))
+    scored = []
+    for program in programs:
+        text = " ".join(str(v) for v in program.values())
+        overlap = sum(1 for token in tokenize(text) if token in terms)
+        if overlap:
+            scored.append((overlap, program))
+    scored.sort(key=lambda item: -item[0])
+    return [program for _, program in scored[:limit]]
+
+
+def time_search(search, lookups: int) -> list[float]:
+    latencies = []
+    for i in range(lookups):
+        question, child_class, subject, exam = QUESTIONS[i % len(QUESTIONS)]
+        started = time.perf_counter_ns()
+        search(question, child_class=child_class, subject=subject, exam=exam)
+        latencies.append((time.perf_counter_ns() - started) / 1000)
+    return latencies
+
+
+def time_tool(lookups: int) -> list[float]:
+    from agent.timing import add_tool_timing_hook, log_tool_latency, remove_tool_timing_hook
+    from agent.tools import lookup_programs
+
+    latencies: list[float] = []
+    remove_tool_timing_hook(log_tool_latency)
+    add_tool_timing_hook(lambda tool_name, seconds, conversation_id: latencies.append(seconds * 1e6))
+    context = SimpleNamespace(session=SimpleNamespace(current_agent=SimpleNamespace(conversation_id="bench"), userdata={}))
+
+    async def run() -> None:
+        for i in range(lookups):
+            await lookup_programs(context, *QUESTIONS[i % len(QUESTIONS)])
+
+    asyncio.run(run())
+    return latencies
+
+
+def time_reload(path: Path, catalog: dict, rng: random.Random) -> tuple[float, list[float]]:
+    """Seconds until a rewritten catalog is served, and lookup latencies (us) meanwhile."""
+    reloading = Catalog(path, reload_interval=0.001)
+    old_index = reloading.index
+    changed = dict(catalog, programs=[dict(p, fee_per_month=p["fee_per_month"] + 100) for p in catalog["programs"]])
+    time.sleep(0.002)
+    path.write_text(json.dumps(changed))
+    started = time.perf_counter()
+    latencies = []
+    while reloading.index is old_index:
+        question, child_class, subject, exam = rng.choice(QUESTIONS)
+        t = time.perf_counter_ns()
+        reloading.search(question, child_class=child_class, subject=subject, exam=exam)
+        latencies.append((time.perf_counter_ns() - t) / 1000)
+        if time.perf_counter() - started > 60:
+            raise RuntimeError("catalog was not reloaded within 60s")
+    return time.perf_counter() - started, latencies
+
+
+def report(label: str, latencies: list[float]) -> str:
+    return (f"{label:<34} p50 {percentile(latencies, 50):>8.1f} us   p99 {percentile(latencies, 99):>8.1f} us   "
+            f"max {max(latencies):>9.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the program catalog lookup")
+    parser.add_argument("--catalog", default="config/catalog.json", help="Shipped catalog to start from")
+    parser.add_argument("--programs", type=int, default=5000, help="Programs in the synthetic catalog")
+    parser.add_argument("--lookups", type=int, default=20000, help="Lookups per measurement")
+    parser.add_argument("--scan-lookups", type=int, default=200, help="Lookups for the pure-Python baseline")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    shipped = json.loads(Path(args.catalog).read_text())
+    synthetic = synthetic_catalog(shipped["programs"], args.programs, rng)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, catalog in (("shipped", shipped), ("synthetic", synthetic)):
+            path = Path(tmp) / f"{label}.json"
+            path.write_text(json.dumps(catalog))
+            started = time.perf_counter()
+            index = load_index(path)
+            build = time.perf_counter() - started
+            time_search(index.search, 100)  # warm up
+            search = time_search(index.search, args.lookups)
+            unfiltered = time_search(lambda q, **_: index.search(q), args.lookups)
+            scan = time_search(lambda q, **_: python_scan(catalog["programs"], q), args.scan_lookups)
+            reload_seconds, during_reload = time_reload(path, catalog, rng)
+            rows.append((label, len(catalog["programs"]), index, build, search, unfiltered, scan,
+                         reload_seconds, during_reload))
+    tool = time_tool(args.lookups)
+
+    print("=" * 88)
+    print(f"Catalog lookup: {args.lookups:,} lookups over {len(QUESTIONS)} parent questions")
+    print("=" * 88)
+    for label, programs, index, build, search, unfiltered, scan, reload_seconds, during_reload in rows:
+        print(f"{label} catalog: {programs:,} programs, {len(index.vocabulary):,} terms, "
+              f"index {(index.weights.nbytes + index.rows.nbytes + index.offsets.nbytes) / 1024:,.0f} KB, built in {build * 1000:,.0f} ms")
+        print("  " + report("search with filters", search))
+        print("  " + report("search, question only", unfiltered))
+        print("  " + report("pure-Python scan (baseline)", scan))
+        print(f"  hot reload: new index served {reload_seconds * 1000:,.0f} ms after the file changed; "
+              f"{len(during_reload):,} lookups meanwhile, p99 {percentile(during_reload, 99):,.1f} us")
+    print("-" * 88)
+    print(report("lookup_programs call-to-return", tool) + "   (shipped catalog)")
+    print("=" * 88)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Egress index benchmark.
+
+Starts the local LiveKit stand-in (config/room_service_stub.py, `--latency-ms`
+per API request) and the egress index (config/egress_index.py), then:
+  - ingest:  replays synthetic egress webhooks for `--rooms` rooms to the index,
+             shuffled, 10% sent twice and 1% with a bad signature
+             (config/webhook_replayer.py), and checks the index ends with each
+             egress's last state
+  - sweep:   the status of every room, as an ops script polling them does:
+             list_recordings() per room against the Egress API (a new client
+             per call) vs the index per room vs one index query for all
+  - stop:    `--stops` active egresses stopped through stop_recording() vs the
+             index's pooled client
+  - restart: snapshot size and write time, and the index restored from it
+
+Usage:
+    python -m benchmarks.egress_index [--rooms 500] [--latency-ms 20] [--stops 50]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import socket
+import tempfile
+import time
+
+import aiohttp
+
+_KEY = "bench-key"
+_SECRET = "bench-secret-bench-secret-bench-secret"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def expected_states(events) -> dict[str, tuple[int, int]]:
+    """(status, updated_at) each egress ends with, from events in the order the server sent them."""
+    return {e.egress_info.egress_id: (e.egress_info.status, e.egress_info.updated_at) for e in events}
+
+
+async def sweep_api(rooms: list[str], url: str) -> float:
+    """Seconds to list every room's recordings with list_recordings(), a new client per call."""
+    import record_session
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for room in rooms:
+            await record_session.list_recordings(room, index_url="")
+    return time.perf_counter() - started
+
+
+async def sweep_index(rooms: list[str], index_url: str) -> tuple[float, float]:
+    """Seconds to ask the index about every room over one session, and for one query of all active egresses."""
+    async with aiohttp.ClientSession() as session:
+        started = time.perf_counter()
+        for room in rooms:
+            async with session.get(f"{index_url}/egress", params={"room": room}) as response:
+                response.raise_for_status()
+                await response.json()
+        per_room = time.perf_counter() - started
+        started = time.perf_counter()
+        async with session.get(f"{index_url}/egress", params={"active": "1"}) as response:
+            await response.json()
+        all_active = time.perf_counter() - started
+    return per_room, all_active
+
+
+async def stop_each(egress_ids: list[str], index_url: str) -> float:
+    import record_session
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for egress_id in egress_ids:
+            await record_session.stop_recording(egress_id, index_url=index_url)
+    return time.perf_counter() - started
+
+
+async def run(args, tmp: str, port: int) -> None:
+    from google.protobuf.json_format import MessageToJson
+    from livekit import api
+
+    from config.egress_index import EgressIndex, EgressIndexService, start_egress_index
+    from config.room_service_stub import start_room_service_stub
+    from config.webhook_replayer import egress_events, replay, shuffled
+
+    events = egress_events(args.rooms)
+    expected = expected_states(events)
+    rooms = sorted({e.egress_info.room_name for e in events})
+    active = [egress_id for egress_id, (status, _) in expected.items()
+              if status != api.EgressStatus.EGRESS_COMPLETE]
+    stops = min(args.stops, len(active) // 2)
+
+    stub, stub_runner, url = await start_room_service_stub(port=port, latency_ms=args.latency_ms)
+    snapshot_path = os.path.join(tmp, "egress_index.pb")
+    service, runner, index_url = await start_egress_index(url=url, api_key=_KEY, api_secret=_SECRET, auth_key="",
+                                                          snapshot_path=snapshot_path)
+    try:
+        # The server's view of the same egresses, for the API path
+        for e in events:
+            info = e.egress_info
+            if info.egress_id not in stub.egresses:
+                stub.add_egress(info.room_name, expected[info.egress_id][0], egress_id=info.egress_id)
+
+        bodies = shuffled([MessageToJson(e, indent=None) for e in events], duplicates=0.1)
+        ingest = await replay(f"{index_url}/webhook", bodies, _KEY, _SECRET, concurrency=8, bad_signatures=0.01)
+        index = service.index
+        correct = sum(
+            1 for egress_id, state in expected.items()
+            if (info := index.get(egress_id)) is not None and (info.status, info.updated_at) == state
+        )
+
+        before = stub.connections, stub.requests
+        api_sweep = await sweep_api(rooms, url)
+        api_connections, api_requests = stub.connections - before[0], stub.requests - before[1]
+        index_sweep, index_all = await sweep_index(rooms, index_url)
+
+        before = stub.connections
+        direct_stop = await stop_each(active[:stops], "")
+        direct_connections = stub.connections - before
+        before = stub.connections, service.api_calls
+        index_stop = await stop_each(active[stops:2 * stops], index_url)
+        index_connections, index_calls = stub.connections - before[0], service.api_calls - before[1]
+        stopped = sum(1 for egress_id in active[stops:2 * stops] if index.get(egress_id).status == api.EgressStatus.EGRESS_ENDING)
+        still_active = index.active_count()
+    finally:
+        await runner.cleanup()
+        await stub_runner.cleanup()
+
+    size = os.path.getsize(snapshot_path)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        restored = EgressIndexService(url=url, api_key=_KEY, api_secret=_SECRET, snapshot_path=snapshot_path)
+    restore_seconds = time.perf_counter() - started
+    matches = restored.index.active_count() == still_active and len(restored.index) == len(expected)
+
+    # Snapshot cost of a large index
+    big = EgressIndex()
+    for e in egress_events(args.snapshot_egresses):
+        big.update(e.egress_info)
+    started = time.perf_counter()
+    data = big.snapshot()
+    big_write = time.perf_counter() - started
+    started = time.perf_counter()
+    EgressIndex().restore(data)
+    big_restore = time.perf_counter() - started
+
+    n = len(rooms)
+    print("=" * 88)
+    print(f"Egress index: {n:,} rooms, {len(events):,} webhooks, Egress API latency {args.latency_ms:g} ms")
+    print("=" * 88)
+    print(f"Ingest:   {ingest['sent']:,} webhooks in {ingest['seconds']:.2f}s ({ingest['sent'] / ingest['seconds']:,.0f}/s), "
+          f"{ingest['rejected']} rejected ({ingest['bad_signatures']} bad signatures sent)")
+    print(f"          final state correct for {correct:,}/{len(expected):,} egresses "
+          f"(shuffled, 10% duplicated); {service.stale:,} stale updates ignored")
+    print("-" * 88)
+    print(f"{'status of every room':<34} {'seconds':>9} {'per room ms':>12} {'API calls':>10} {'connections':>12}")
+    print(f"{'list_recordings() per room':<34} {api_sweep:>9.2f} {api_sweep * 1000 / n:>12.2f} {api_requests:>10,} "
+          f"{api_connections:>12,}")
+    print(f"{'index, per room':<34} {index_sweep:>9.2f} {index_sweep * 1000 / n:>12.2f} {0:>10} {0:>12}")
+    print(f"{'index, all active in one query':<34} {index_all:>9.3f} {'-':>12} {0:>10} {0:>12}")
+    print(f"  sweep speed-up: {api_sweep / index_sweep:,.0f}x per room, {api_sweep / index_all:,.0f}x with one query")
+    print("-" * 88)
+    print(f"{'stop ' + str(stops) + ' egresses':<34} {'seconds':>9} {'per stop ms':>12} {'API calls':>10} {'connections':>12}")
+    print(f"{'stop_recording() direct':<34} {direct_stop:>9.2f} {direct_stop * 1000 / stops:>12.2f} {stops:>10} "
+          f"{direct_connections:>12}")
+    print(f"{'through the index':<34} {index_stop:>9.2f} {index_stop * 1000 / stops:>12.2f} {index_calls:>10} "
+          f"{index_connections:>12}")
+    print(f"  stops reflected in the index: {stopped}/{stops}")
+    print("-" * 88)
+    print(f"Snapshot: {size / 1024:,.0f} KB for {n:,} egresses; restart restored {len(restored.index):,} "
+          f"in {restore_seconds * 1000:.1f} ms, state {'matches' if matches else 'DIFFERS'}")
+    print(f"          {args.snapshot_egresses:,} egresses: {len(data) / 1e6:,.1f} MB, "
+          f"serialized in {big_write * 1000:.0f} ms, restored in {big_restore * 1000:.0f} ms")
+    print("=" * 88)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the webhook-fed egress index against polling the Egress API")
+    parser.add_argument("--rooms", type=int, default=500, help="Rooms with an egress")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Stand-in Egress API latency per request")
+    parser.add_argument("--stops", type=int, default=50, help="Egresses stopped each way")
+    parser.add_argument("--snapshot-egresses", type=int, default=100000, help="Egresses in the large snapshot measurement")
+    args = parser.parse_args()
+
+    # Settings are read at import time; record_session.py calls the stand-in at LIVEKIT_URL
+    port = _free_port()
+    os.environ.update({"LIVEKIT_URL": f"http://127.0.0.1:{port}", "LIVEKIT_API_KEY": _KEY,
+                       "LIVEKIT_API_SECRET": _SECRET, "EGRESS_INDEX_URL": "", "EGRESS_INDEX_API_KEY": ""})
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(args, tmp, port))
+
+
+if __name__ == "__main__":
+    main()
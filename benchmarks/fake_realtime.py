@@ -0,0 +1,475 @@
+"""
+Deterministic, offline stand-in for the OpenAI RealtimeModel.
+
+FakeRealtimeModel plays a scripted call through the same RealtimeSession
+interface AgentActivity drives in production: agent lines are streamed as
+text deltas plus 24 kHz audio frames, parent lines arrive as server VAD and
+transcription events, and tool steps are emitted as function calls. Nothing
+touches the network. All pacing is divided by `speed`, so a multi-minute
+call can be replayed in seconds.
+
+With `wrapup_marker` set, the model follows a wrap-up instruction the way a
+compliant model would: once its instructions (or a generate_reply call's)
+contain the marker, its next reply skips ahead to the script's pending tool
+call (unless told "do not call <tool>") and then to the closing line.
+
+An assistant message added through update_chat_ctx() that the model did
+not generate (a pre-rendered greeting, see agent/greeting.py) stands in for
+the script's next agent line: it joins the history and the call carries on
+once the line would have finished playing.
+
+NullAudioOutput is the matching audio sink: it accepts the agent's frames
+and reports playout as finished as soon as a segment is flushed.
+"""
+import asyncio
+import json
+import math
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import llm, utils
+from livekit.agents.llm import utils as llm_utils
+from livekit.agents.metrics import RealtimeModelMetrics
+from livekit.agents.metrics.base import Metadata
+from livekit.agents.types import NOT_GIVEN, NotGivenOr
+from livekit.agents.voice import io
+
+from agent.prompt_compiler import MIN_CACHEABLE_TOKENS, count_tokens
+
+SAMPLE_RATE = 24000
+# Speaking rate used to size the audio for a line of text
+CHARS_PER_SECOND = 15.0
+# Realtime audio output is billed at roughly this many tokens per second
+AUDIO_TOKENS_PER_SECOND = 20
+
+
+@dataclass
+class ScriptStep:
+    """
+    One step of a scripted call.
+
+    Args:
+        role: "agent" (model speaks), "parent" (user speaks), "tool" (model calls a function),
+            "silence" (the parent says nothing; the call waits for the agent's next reply) or
+            "hang" (the model connection goes dead and never responds again)
+        text: What is said (agent and parent steps)
+        tool_name: Function to call (tool steps)
+        arguments: Function arguments (tool steps)
+    """
+
+    role: str
+    text: str = ""
+    tool_name: str | None = None
+    arguments: dict | None = None
+
+    @property
+    def speech_seconds(self) -> float:
+        return max(0.5, len(self.text) / CHARS_PER_SECOND)
+
+
+def script_duration(script: list[ScriptStep], first_token_delay: float = 0.4, pause: float = 0.8) -> float:
+    """Length of a scripted call in real time (seconds), using the fake model's pacing."""
+    total = 0.0
+    for step in script:
+        if step.role == "parent":
+            total += pause + step.speech_seconds
+        elif step.role in ("silence", "hang"):
+            continue
+        else:
+            total += first_token_delay + (step.speech_seconds if step.role == "agent" else 0.0)
+    return total
+
+
+class FakeRealtimeModel(llm.RealtimeModel):
+    """
+    Scripted realtime model for offline load tests and replays.
+
+    Args:
+        script: Steps of the call in order; the first agent step is the greeting
+        speed: Pacing divisor; 1.0 replays the call in real time
+        first_token_delay: Seconds from request to the first token (at speed 1.0)
+        pause: Seconds the parent waits after the agent finishes before speaking (at speed 1.0)
+        frame_ms: Duration of each streamed audio frame
+        wrapup_marker: Instructions text that makes the model skip to the end of the call
+    """
+
+    def __init__(
+        self,
+        script: list[ScriptStep],
+        *,
+        speed: float = 1.0,
+        first_token_delay: float = 0.4,
+        pause: float = 0.8,
+        frame_ms: int = 20,
+        wrapup_marker: str | None = None,
+    ):
+        super().__init__(
+            capabilities=llm.RealtimeCapabilities(
+                message_truncation=False,
+                turn_detection=True,
+                user_transcription=True,
+                auto_tool_reply_generation=False,
+                audio_output=True,
+                manual_function_calls=True,
+            )
+        )
+        self.script = list(script)
+        self.speed = speed
+        self.first_token_delay = first_token_delay
+        self.pause = pause
+        self.wrapup_marker = wrapup_marker
+        self.frame_samples = SAMPLE_RATE * frame_ms // 1000
+        # One low-amplitude tone frame, reused for every frame the model streams
+        t = np.arange(self.frame_samples) / SAMPLE_RATE
+        self.frame_data = (np.sin(2 * np.pi * 220 * t) * 3000).astype(np.int16).tobytes()
+        self.finished = asyncio.Event()
+        self.generations = 0
+        self.function_calls = 0
+
+    @property
+    def model(self) -> str:
+        return "fake-realtime"
+
+    @property
+    def provider(self) -> str:
+        return "local"
+
+    def session(self) -> "FakeRealtimeSession":
+        return FakeRealtimeSession(self)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class FakeRealtimeSession(llm.RealtimeSession):
+    def __init__(self, realtime_model: FakeRealtimeModel):
+        super().__init__(realtime_model)
+        self._model = realtime_model
+        self._chat_ctx = llm.ChatContext.empty()
+        self._tools = llm.ToolContext.empty()
+        self._instruction_tokens = 0
+        self._instructions = ""
+        self._cursor = 0
+        self._history_tokens = 0
+        self._last_input_tokens = 0
+        self._hung = False
+        self._generated: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def chat_ctx(self) -> llm.ChatContext:
+        return self._chat_ctx.copy()
+
+    @property
+    def tools(self) -> llm.ToolContext:
+        return self._tools.copy()
+
+    async def update_instructions(self, instructions: str) -> None:
+        self._instructions = instructions
+        self._instruction_tokens = count_tokens(instructions)
+
+    async def update_chat_ctx(self, chat_ctx: llm.ChatContext) -> None:
+        known = {item.id for item in self._chat_ctx.items} | self._generated
+        self._chat_ctx = chat_ctx.copy()
+        for item in chat_ctx.items:
+            if item.id in known or item.type != "message" or item.role != "assistant":
+                continue
+            self._history_tokens += count_tokens(item.text_content or "")
+            step = self._peek_step()
+            if step is not None and step.role == "agent":
+                self._cursor += 1
+                self._spawn(self._said_for_model(step))
+
+    async def update_tools(self, tools: list) -> None:
+        self._tools = llm.ToolContext(tools)
+
+    def update_options(self, *, tool_choice: NotGivenOr[llm.ToolChoice | None] = NOT_GIVEN) -> None:
+        pass
+
+    def push_audio(self, frame: rtc.AudioFrame) -> None:
+        pass
+
+    def push_video(self, frame: rtc.VideoFrame) -> None:
+        pass
+
+    def generate_reply(
+        self, *, instructions: NotGivenOr[str] = NOT_GIVEN
+    ) -> asyncio.Future[llm.GenerationCreatedEvent]:
+        fut: asyncio.Future[llm.GenerationCreatedEvent] = asyncio.get_running_loop().create_future()
+        if self._hung:
+            # Like the OpenAI plugin, which gives up when no response is created within 5s
+            asyncio.get_running_loop().call_later(
+                5.0 / self._model.speed,
+                lambda: fut.done() or fut.set_exception(llm.RealtimeError("generate_reply timed out.")),
+            )
+            return fut
+        # A wrap-up in the reply's own instructions (e.g. the session governor's closing reply) counts too
+        self._skip_to_wrapup(instructions if utils.is_given(instructions) else "")
+        step = self._next_step()
+        if step is None or step.role == "parent":
+            fut.set_exception(llm.RealtimeError(f"script expects {step.role if step else 'no'} turn at step {self._cursor}"))
+        else:
+            fut.set_result(self._start_generation(step, user_initiated=True))
+        return fut
+
+    def commit_audio(self) -> None:
+        pass
+
+    def clear_audio(self) -> None:
+        pass
+
+    def interrupt(self) -> None:
+        pass
+
+    def truncate(self, *, message_id: str, modalities: list, audio_end_ms: int, audio_transcript: NotGivenOr[str] = NOT_GIVEN) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        await utils.aio.cancel_and_wait(*self._tasks)
+
+    def _next_step(self) -> ScriptStep | None:
+        if self._cursor >= len(self._model.script):
+            return None
+        step = self._model.script[self._cursor]
+        self._cursor += 1
+        return step
+
+    def _skip_to_wrapup(self, reply_instructions: str = "") -> None:
+        # Called before the model picks its next step; only ever moves forward
+        marker = self._model.wrapup_marker
+        instructions = f"{self._instructions}\n{reply_instructions}"
+        if not marker or marker not in instructions:
+            return
+        script = self._model.script
+        instructions = instructions.lower()
+        target = next(
+            (i for i in range(self._cursor, len(script))
+             if script[i].role == "tool" and f"do not call {script[i].tool_name}" not in instructions),
+            None,
+        )
+        if target is None:
+            target = max((i for i, step in enumerate(script) if step.role == "agent"), default=self._cursor)
+        self._cursor = max(self._cursor, target)
+
+    def _peek_step(self) -> ScriptStep | None:
+        return self._model.script[self._cursor] if self._cursor < len(self._model.script) else None
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _start_generation(self, step: ScriptStep, user_initiated: bool) -> llm.GenerationCreatedEvent:
+        response_id = utils.shortuuid("resp_")
+        message_ch = utils.aio.Chan[llm.MessageGeneration]()
+        function_ch = utils.aio.Chan[llm.FunctionCall]()
+        self._spawn(self._run_generation(step, response_id, message_ch, function_ch))
+        return llm.GenerationCreatedEvent(
+            message_stream=message_ch,
+            function_stream=function_ch,
+            user_initiated=user_initiated,
+            response_id=response_id,
+        )
+
+    async def _run_generation(
+        self,
+        step: ScriptStep,
+        response_id: str,
+        message_ch: utils.aio.Chan,
+        function_ch: utils.aio.Chan,
+    ) -> None:
+        model = self._model
+        created = time.time()
+        await asyncio.sleep(model.first_token_delay / model.speed)
+        ttft = -1.0
+        try:
+            if step.role == "tool":
+                model.function_calls += 1
+                function_ch.send_nowait(
+                    llm.FunctionCall(
+                        call_id=utils.shortuuid("call_"),
+                        name=step.tool_name,
+                        arguments=json.dumps(self._complete_arguments(step)),
+                    )
+                )
+            else:
+                ttft = time.time() - created
+                text_ch = utils.aio.Chan[str]()
+                audio_ch = utils.aio.Chan[rtc.AudioFrame]()
+                modalities = asyncio.get_running_loop().create_future()
+                modalities.set_result(["audio", "text"])
+                message_id = utils.shortuuid("item_")
+                self._generated.add(message_id)
+                message_ch.send_nowait(
+                    llm.MessageGeneration(
+                        message_id=message_id,
+                        text_stream=text_ch,
+                        audio_stream=audio_ch,
+                        modalities=modalities,
+                    )
+                )
+                await self._stream_speech(step, text_ch, audio_ch)
+        finally:
+            message_ch.close()
+            function_ch.close()
+
+        model.generations += 1
+        self._emit_metrics(step, response_id, created, ttft)
+        self._after_model_turn()
+
+    async def _said_for_model(self, step: ScriptStep) -> None:
+        # The line plays from elsewhere; the parent answers once it would have finished
+        await asyncio.sleep(step.speech_seconds / self._model.speed)
+        self._after_model_turn()
+
+    def _after_model_turn(self) -> None:
+        next_step = self._peek_step()
+        if next_step is None:
+            self._spawn(self._finish())
+        elif next_step.role == "parent":
+            self._spawn(self._parent_turn())
+        elif next_step.role in ("silence", "hang"):
+            self._cursor += 1
+            self._hung = next_step.role == "hang"
+        # Agent and tool steps after a tool call (or a silence) are requested by the agent through generate_reply
+
+    def _complete_arguments(self, step: ScriptStep) -> dict:
+        # The realtime API uses strict schemas: every parameter is sent, absent ones as null
+        arguments = dict(step.arguments or {})
+        tool = self._tools.function_tools.get(step.tool_name)
+        if tool is not None:
+            schema = llm_utils.build_legacy_openai_schema(tool, internally_tagged=True)
+            for name in schema["parameters"].get("properties", {}):
+                arguments.setdefault(name, None)
+        return arguments
+
+    async def _stream_speech(self, step: ScriptStep, text_ch: utils.aio.Chan, audio_ch: utils.aio.Chan) -> None:
+        model = self._model
+        loop = asyncio.get_running_loop()
+        frame_seconds = model.frame_samples / SAMPLE_RATE
+        frames = max(1, math.ceil(step.speech_seconds / frame_seconds))
+        words = step.text.split(" ")
+        started = loop.time()
+        word_index = 0
+        for i in range(frames):
+            # Spread the transcript deltas evenly over the audio
+            while word_index < len(words) and word_index * frames <= i * len(words):
+                text_ch.send_nowait(words[word_index] + (" " if word_index < len(words) - 1 else ""))
+                word_index += 1
+            audio_ch.send_nowait(rtc.AudioFrame(model.frame_data, SAMPLE_RATE, 1, model.frame_samples))
+            delay = started + (i + 1) * frame_seconds / model.speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        for word in words[word_index:]:
+            text_ch.send_nowait(word + " ")
+        text_ch.close()
+        audio_ch.close()
+
+    async def _parent_turn(self) -> None:
+        model = self._model
+        step = self._next_step()
+        await asyncio.sleep(model.pause / model.speed)
+        self.emit("input_speech_started", llm.InputSpeechStartedEvent())
+        await asyncio.sleep(step.speech_seconds / model.speed)
+        self.emit("input_speech_stopped", llm.InputSpeechStoppedEvent(user_transcription_enabled=True))
+        self._history_tokens += count_tokens(step.text)
+        self.emit(
+            "input_audio_transcription_completed",
+            llm.InputTranscriptionCompleted(item_id=utils.shortuuid("item_"), transcript=step.text, is_final=True),
+        )
+
+        if self._peek_step() is not None and self._peek_step().role != "parent":
+            self._skip_to_wrapup()
+        next_step = self._next_step()
+        if next_step is None:
+            self._spawn(self._finish())
+        elif next_step.role == "parent":
+            # Two parent lines in a row are one longer turn
+            self._cursor -= 1
+            self._spawn(self._parent_turn())
+        elif next_step.role in ("silence", "hang"):
+            # No reply to this turn; after a hang, none to any later request either
+            self._hung = next_step.role == "hang"
+        else:
+            self.emit("generation_created", self._start_generation(next_step, user_initiated=False))
+
+    async def _finish(self) -> None:
+        # Let the last agent line be committed before the parent hangs up
+        await asyncio.sleep(self._model.pause / self._model.speed)
+        self._model.finished.set()
+
+    def _emit_metrics(self, step: ScriptStep, response_id: str, created: float, ttft: float) -> None:
+        input_tokens = self._instruction_tokens + self._history_tokens
+        # Everything sent with the previous request is a cached prefix of this one
+        cached_tokens = self._last_input_tokens if self._last_input_tokens >= MIN_CACHEABLE_TOKENS else 0
+        self._last_input_tokens = input_tokens
+        text_tokens = count_tokens(step.text) + (count_tokens(json.dumps(step.arguments)) if step.arguments else 0)
+        self._history_tokens += text_tokens
+        audio_tokens = int(step.speech_seconds * AUDIO_TOKENS_PER_SECOND) if step.role == "agent" else 0
+        duration = time.time() - created
+        self.emit(
+            "metrics_collected",
+            RealtimeModelMetrics(
+                label=self._model.label,
+                request_id=response_id,
+                timestamp=created,
+                duration=duration,
+                ttft=ttft,
+                cancelled=False,
+                input_tokens=input_tokens,
+                output_tokens=text_tokens + audio_tokens,
+                total_tokens=input_tokens + text_tokens + audio_tokens,
+                tokens_per_second=(text_tokens + audio_tokens) / duration if duration > 0 else 0.0,
+                input_token_details=RealtimeModelMetrics.InputTokenDetails(
+                    audio_tokens=0,
+                    text_tokens=input_tokens,
+                    image_tokens=0,
+                    cached_tokens=cached_tokens,
+                    cached_tokens_details=None,
+                ),
+                output_token_details=RealtimeModelMetrics.OutputTokenDetails(
+                    text_tokens=text_tokens,
+                    audio_tokens=audio_tokens,
+                    image_tokens=0,
+                ),
+                metadata=Metadata(model_name=self._model.model, model_provider=self._model.provider),
+            ),
+        )
+
+
+class NullAudioOutput(io.AudioOutput):
+    """Audio sink that discards frames and finishes playout when a segment is flushed."""
+
+    def __init__(self):
+        super().__init__(
+            label="NullAudioOutput",
+            capabilities=io.AudioOutputCapabilities(pause=True),
+            sample_rate=SAMPLE_RATE,
+        )
+        self.frames = 0
+        self.seconds = 0.0
+        self._segment_seconds = 0.0
+        self._segment_open = False
+
+    async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+        await super().capture_frame(frame)
+        self._segment_open = True
+        self.frames += 1
+        self._segment_seconds += frame.duration
+
+    def flush(self) -> None:
+        super().flush()
+        self._finish_segment(interrupted=False)
+
+    def clear_buffer(self) -> None:
+        self._finish_segment(interrupted=True)
+
+    def _finish_segment(self, interrupted: bool) -> None:
+        if not self._segment_open:
+            return
+        self._segment_open = False
+        self.seconds += self._segment_seconds
+        position, self._segment_seconds = self._segment_seconds, 0.0
+        self.on_playback_finished(playback_position=position, interrupted=interrupted)
@@ -0,0 +1,174 @@
+"""
+Greeting cache: time to first audio and greeting tokens, generated vs pre-rendered.
+
+Runs calls through runner.entrypoint with a FakeRealtimeModel, one at a time:
+  - generated: GREETING_CACHE off; every call asks the model for the greeting
+  - first call: cache on but empty; the call generates the greeting and saves
+                its rendering
+  - cached:     later calls play the saved rendering and seed the model with it
+
+Time to first audio runs from session start to the first agent audio frame
+reaching the room output. The fake model waits `--first-token-ms` (in real
+time) before its first token, like the realtime API's response latency;
+everything else is replayed `--speed` times faster. Tokens are the model's
+billed tokens for the greeting response and for the whole call.
+
+Usage:
+    python -m benchmarks.greeting_cache [--calls 20] [--first-token-ms 700] [--speed 20]
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+from .common import percentile
+from .fake_realtime import NullAudioOutput, FakeRealtimeModel, script_duration
+from .load_test import DEFAULT_SCRIPT, FakeJobContext
+
+
+class FirstFrameOutput(NullAudioOutput):
+    """NullAudioOutput that notes when the first frame arrives."""
+
+    def __init__(self):
+        super().__init__()
+        self.first_frame_at: float | None = None
+
+    async def capture_frame(self, frame) -> None:
+        if self.first_frame_at is None:
+            self.first_frame_at = time.perf_counter()
+        await super().capture_frame(frame)
+
+
+async def run_call(index: int, args, cached: bool) -> dict:
+    from runner.entrypoint import entrypoint
+    from runner.prewarm import prewarm
+
+    model = FakeRealtimeModel(DEFAULT_SCRIPT, speed=args.speed,
+                              first_token_delay=args.first_token_ms / 1000 * args.speed)
+    output = FirstFrameOutput()
+    closed = asyncio.Event()
+    sessions = []
+    tokens = []
+    session_started = []
+
+    def attach_io(session) -> None:
+        session.output.audio = output
+        session.on("close", lambda _: closed.set())
+        session.on("metrics_collected", lambda ev: tokens.append(ev.metrics.total_tokens))
+        sessions.append(session)
+        session_started.append(time.perf_counter())
+
+    proc = SimpleNamespace(userdata={})
+    prewarm(proc, llm_factory=lambda: model)
+    if not cached:
+        proc.userdata.pop("greeting_key", None)
+    proc.userdata["attach_io"] = attach_io
+    ctx = FakeJobContext(index, proc)
+
+    timeout = script_duration(DEFAULT_SCRIPT, model.first_token_delay) / args.speed * 3 + 30
+    try:
+        await entrypoint(ctx)
+        waits = [asyncio.create_task(model.finished.wait()), asyncio.create_task(closed.wait())]
+        try:
+            await asyncio.wait_for(asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED), timeout)
+        finally:
+            for wait in waits:
+                wait.cancel()
+    finally:
+        if sessions:
+            await sessions[0].aclose()
+        await asyncio.gather(*(cb() for cb in ctx.shutdown_callbacks), return_exceptions=True)
+    return {
+        "ttfa": output.first_frame_at - session_started[0],
+        "tokens": sum(tokens),
+        # The greeting's response, when the model generated it
+        "first_response_tokens": tokens[0] if tokens else 0,
+        "completed": model.finished.is_set(),
+    }
+
+
+def summarize(label: str, results: list[dict], greeting_tokens: float) -> None:
+    ttfa = [r["ttfa"] * 1000 for r in results]
+    tokens = statistics.mean(r["tokens"] for r in results)
+    done = sum(r["completed"] for r in results)
+    print(f"{label:<12} {len(results):>6} {percentile(ttfa, 50):>10.0f} {percentile(ttfa, 95):>10.0f} "
+          f"{greeting_tokens:>16,.0f} {tokens:>12,.0f} {done:>10}")
+
+
+async def run(args) -> None:
+    from agent.greeting import get_greeting_cache
+    from agent.timing import log_tool_latency, remove_tool_timing_hook
+    remove_tool_timing_hook(log_tool_latency)
+
+    results: dict[str, list[dict]] = {"generated": [], "first call": [], "cached": []}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(args.calls):
+            results["generated"].append(await run_call(i, args, cached=False))
+        results["first call"].append(await run_call(args.calls, args, cached=True))
+        # The rendering is saved in the background once the first call's greeting has played
+        for _ in range(100):
+            if any(get_greeting_cache().directory.glob("*.json")):
+                break
+            await asyncio.sleep(0.05)
+        for i in range(args.calls):
+            results["cached"].append(await run_call(args.calls + 1 + i, args, cached=True))
+
+    cache = get_greeting_cache()
+    renderings = list(cache.directory.glob("*.ogg"))
+    greeting = cache.get(renderings[0].stem) if renderings else None
+    generated_greeting = statistics.mean(r["first_response_tokens"] for r in results["generated"])
+
+    print("=" * 84)
+    print(f"Greeting cache: {args.calls} calls per mode, first token after {args.first_token_ms:g} ms, "
+          f"speed x{args.speed:g}")
+    print("=" * 84)
+    print(f"{'greeting':<12} {'calls':>6} {'TTFA p50':>10} {'TTFA p95':>10} {'greeting tokens':>16} "
+          f"{'call tokens':>12} {'completed':>10}")
+    summarize("generated", results["generated"], generated_greeting)
+    summarize("first call", results["first call"], results["first call"][0]["first_response_tokens"])
+    summarize("cached", results["cached"], 0)
+    print("-" * 84)
+    if greeting is not None:
+        size = renderings[0].stat().st_size
+        print(f"Rendering:                 {greeting.seconds:.1f}s of audio, {size:,} bytes "
+              f"({size * 8 / greeting.seconds / 1000:.0f} kbit/s Opus), {len(greeting.frames)} frames")
+    ttfa_generated = percentile([r["ttfa"] for r in results["generated"]], 50)
+    ttfa_cached = percentile([r["ttfa"] for r in results["cached"]], 50)
+    tokens_generated = statistics.mean(r["tokens"] for r in results["generated"])
+    tokens_cached = statistics.mean(r["tokens"] for r in results["cached"])
+    print(f"TTFA p50 saved:            {(ttfa_generated - ttfa_cached) * 1000:.0f} ms "
+          f"({ttfa_generated / ttfa_cached:.0f}x faster)")
+    print(f"Tokens saved per call:     {tokens_generated - tokens_cached:,.0f} "
+          f"({1 - tokens_cached / tokens_generated:.0%})")
+    print("=" * 84)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare generated and pre-rendered greetings")
+    parser.add_argument("--calls", type=int, default=20, help="Calls per mode")
+    parser.add_argument("--first-token-ms", type=float, default=700.0, help="Model latency to the first token (real time)")
+    parser.add_argument("--speed", type=float, default=20.0, help="Replay speed-up over real time for the rest of the call")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settings are read at import time, so point the outputs at a scratch directory first
+        os.environ.update({
+            "LEAD_SINK": "outbox",
+            "LEAD_OUTBOX_PATH": os.path.join(tmp, "lead_outbox.sqlite3"),
+            "CRM_ENDPOINT_URL": "",
+            "LEAD_DEDUP_BLOOM_PATH": os.path.join(tmp, "lead_phones.bloom"),
+            "TRANSCRIPTS_DIR": os.path.join(tmp, "transcripts"),
+            "USAGE_DIR": os.path.join(tmp, "usage"),
+            "GREETING_CACHE": "true",
+            "GREETING_CACHE_DIR": os.path.join(tmp, "greetings"),
+            "TRACING_EXPORTER": "none",
+        })
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
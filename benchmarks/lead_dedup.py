@@ -0,0 +1,148 @@
+"""
+Lead dedup index benchmark.
+
+Fills an outbox with synthetic leads (phones in mixed Indian formats, a
+share of them repeat callers), then measures:
+  - rebuild time of the phone index and bloom filter from the outbox
+  - submit_lead lookup latency for new and known phones
+  - the bloom filter's false positive rate on phones that were never seen
+  - append throughput of the outbox writer with and without merging
+
+Usage:
+    python -m benchmarks.lead_dedup [--leads 1000000] [--repeat-rate 0.2] [--lookups 100000]
+"""
+import argparse
+import asyncio
+import json
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from leads import LeadDedupIndex, LeadOutbox, normalize_phone
+from leads.dedup import PhoneBloomFilter
+from .common import percentile
+
+_FORMATS = ("{}", "+91 {}", "+91-{}", "0{}", "91{}", "{} ", "{a} {b}", "{a}-{b}")
+
+
+def format_phone(number: int, rng: random.Random) -> str:
+    digits = str(number)
+    return rng.choice(_FORMATS).format(digits, a=digits[:5], b=digits[5:])
+
+
+def new_phone(rng: random.Random) -> int:
+    return rng.randrange(6_000_000_000, 10_000_000_000)
+
+
+def fill_outbox(path: Path, leads: int, repeat_rate: float, rng: random.Random) -> list[int]:
+    """Insert synthetic leads straight into the outbox table; returns the distinct phones."""
+    LeadOutbox(path)._connect().close()
+    conn = sqlite3.connect(str(path), isolation_level=None)
+    conn.execute("PRAGMA synchronous=OFF")
+    phones: list[int] = []
+    conn.execute("BEGIN")
+    batch = []
+    for i in range(leads):
+        if phones and rng.random() < repeat_rate:
+            number = rng.choice(phones)
+        else:
+            number = new_phone(rng)
+            phones.append(number)
+        conversation_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        lead = {"conversation_id": conversation_id, "child_class": "8th grade", "subjects": "Physics",
+                "contact_phone": format_phone(number, rng)}
+        batch.append((conversation_id, conversation_id, json.dumps(lead), time.time()))
+        if len(batch) == 50_000:
+            conn.executemany("INSERT INTO leads (idempotency_key, conversation_id, payload, created_at) VALUES (?, ?, ?, ?)", batch)
+            batch.clear()
+    conn.executemany("INSERT INTO leads (idempotency_key, conversation_id, payload, created_at) VALUES (?, ?, ?, ?)", batch)
+    conn.execute("COMMIT")
+    conn.close()
+    return phones
+
+
+def time_calls(fn, phones: list[str]) -> list[float]:
+    """Latency of fn(phone) for each phone, in microseconds."""
+    samples = []
+    for phone in phones:
+        started = time.perf_counter_ns()
+        fn(phone)
+        samples.append((time.perf_counter_ns() - started) / 1000)
+    return samples
+
+
+async def append_throughput(tmp: Path, leads: int, dedup: bool, rng: random.Random) -> tuple[float, int]:
+    path = tmp / f"append-{dedup}.sqlite3"
+    index = LeadDedupIndex(path, tmp / f"append-{dedup}.bloom", capacity=leads) if dedup else None
+    outbox = LeadOutbox(path, dedup=index)
+    callers = [new_phone(rng) for _ in range(leads // 2)]
+    batch = [
+        {"conversation_id": str(uuid.uuid4()), "child_class": "10th", "subjects": "Math",
+         "contact_phone": format_phone(rng.choice(callers), rng)}
+        for _ in range(leads)
+    ]
+    started = time.perf_counter()
+    await asyncio.gather(*(outbox.append(lead) for lead in batch))
+    elapsed = time.perf_counter() - started
+    stored = sum(outbox.counts().values())
+    await outbox.aclose()
+    return leads / elapsed, stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the lead phone dedup index")
+    parser.add_argument("--leads", type=int, default=1_000_000, help="Leads in the synthetic outbox")
+    parser.add_argument("--repeat-rate", type=float, default=0.2, help="Share of leads from a repeat caller")
+    parser.add_argument("--lookups", type=int, default=100_000, help="Lookups per measurement")
+    parser.add_argument("--appends", type=int, default=20_000, help="Leads appended through the outbox writer")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        started = time.perf_counter()
+        phones = fill_outbox(tmp / "outbox.sqlite3", args.leads, args.repeat_rate, rng)
+        fill_seconds = time.perf_counter() - started
+
+        index = LeadDedupIndex(tmp / "outbox.sqlite3", tmp / "phones.bloom", capacity=max(len(phones), 1))
+        stats = index.rebuild()
+
+        known = [format_phone(rng.choice(phones), rng) for _ in range(args.lookups)]
+        seen = set(phones)
+        unseen = []
+        while len(unseen) < args.lookups:
+            number = new_phone(rng)
+            if number not in seen:
+                unseen.append(number)
+        hits = time_calls(index.lookup, known)
+        misses = time_calls(index.lookup, [format_phone(n, rng) for n in unseen])
+        bloom = PhoneBloomFilter(tmp / "phones.bloom")
+        false_positives = sum(n in bloom for n in unseen)
+        bloom.close()
+        normalize = time_calls(normalize_phone, known)
+        bloom_mb = (tmp / "phones.bloom").stat().st_size / 1024 / 1024
+        index.close()
+
+        append_plain, stored_plain = asyncio.run(append_throughput(tmp, args.appends, False, rng))
+        append_dedup, stored_dedup = asyncio.run(append_throughput(tmp, args.appends, True, rng))
+
+    print("=" * 72)
+    print(f"Lead dedup: {args.leads:,} leads, {len(phones):,} distinct phones (filled in {fill_seconds:.1f}s)")
+    print("=" * 72)
+    print(f"Rebuild from outbox:        {stats['seconds']:.2f}s ({stats['leads'] / stats['seconds']:,.0f} leads/s), "
+          f"{stats['duplicates']:,} duplicates")
+    print(f"Bloom filter:               {bloom_mb:.1f} MB, false positive rate {false_positives / len(unseen):.4%}")
+    print(f"Phone normalization:        p50 {percentile(normalize, 50):.1f} us")
+    print(f"Lookup, new phone:          p50 {percentile(misses, 50):.1f} us, p99 {percentile(misses, 99):.1f} us")
+    print(f"Lookup, known phone:        p50 {percentile(hits, 50):.1f} us, p99 {percentile(hits, 99):.1f} us")
+    print(f"Outbox appends, no dedup:   {append_plain:,.0f} leads/s, {stored_plain:,} rows for {args.appends:,} leads")
+    print(f"Outbox appends, dedup:      {append_dedup:,.0f} leads/s, {stored_dedup:,} rows for {args.appends:,} leads")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Throughput benchmark for the lead outbox and CRM delivery.
+
+Simulates many concurrent sessions calling submit_lead, measures enqueue
+latency (time until the lead is durable on disk) and then drains the outbox
+to a local CRM stub. The sessions are coroutines in one process, so they share
+one outbox writer; jobs in a worker run in separate processes and do not.
+
+Usage:
+    python -m benchmarks.lead_outbox [--leads 5000] [--sessions 200] [--max-batch 256]
+
+    # Compare with one fsync per lead
+    python -m benchmarks.lead_outbox --max-batch 1
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from leads import LeadOutbox, LeadDelivery
+from leads.crm_stub import start_crm_stub
+from .common import percentile
+
+
+def make_lead(i: int) -> dict:
+    return {
+        "conversation_id": str(uuid.uuid4()),
+        "child_class": "8th grade",
+        "subjects": "Physics, Chemistry",
+        "exam_info": "Preparing for NEET exam next year",
+        "budget_range": "Under ₹10,000 per month",
+        "decision_maker": "Both parents",
+        "timeline": "As soon as possible",
+        "urgency": "Immediate",
+        "contact_phone": f"98{i:08d}",
+    }
+
+
+async def run(args) -> None:
+    stub, runner, endpoint = await start_crm_stub(
+        latency_ms=args.crm_latency_ms, fail_rate=args.fail_rate
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        outbox = LeadOutbox(
+            Path(tmp) / "outbox.sqlite3",
+            max_batch=args.max_batch,
+            synchronous=args.synchronous,
+        )
+        delivery = LeadDelivery(
+            outbox, endpoint, batch_size=args.crm_batch, backoff_base=0.05
+        )
+
+        latencies: list[float] = []
+        next_lead = iter(range(args.leads))
+
+        async def session_worker():
+            for i in next_lead:
+                t0 = time.perf_counter()
+                await outbox.append(make_lead(i))
+                latencies.append(time.perf_counter() - t0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(session_worker() for _ in range(args.sessions)))
+        enqueue_elapsed = time.perf_counter() - start
+
+        delivery_start = time.perf_counter()
+        while True:
+            claimed = await delivery.deliver_once()
+            if claimed == 0 and outbox.counts().get("pending", 0) == 0:
+                break
+            if claimed == 0:
+                await asyncio.sleep(0.01)
+        delivery_elapsed = time.perf_counter() - delivery_start
+
+        counts = outbox.counts()
+        await delivery.aclose()
+        await outbox.aclose()
+    await runner.cleanup()
+
+    print("=" * 60)
+    print("Lead outbox benchmark")
+    print("=" * 60)
+    print(f"Leads:                 {args.leads}")
+    print(f"Concurrent sessions:   {args.sessions} (in one process)")
+    print(f"Max leads per commit:  {args.max_batch} (synchronous={args.synchronous})")
+    print("-" * 60)
+    print(f"Enqueue throughput:    {args.leads / enqueue_elapsed:,.0f} leads/sec")
+    print(f"Enqueue latency p50:   {percentile(latencies, 50) * 1000:.2f} ms")
+    print(f"Enqueue latency p99:   {percentile(latencies, 99) * 1000:.2f} ms")
+    print(f"Commits (fsyncs):      {outbox.commits} ({args.leads / max(outbox.commits, 1):.1f} leads/commit)")
+    print("-" * 60)
+    print(f"Delivery throughput:   {args.leads / delivery_elapsed:,.0f} leads/sec")
+    print(f"Outbox status:         {counts}")
+    print(f"CRM stub:              {stub.stats()}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the lead outbox and CRM delivery")
+    parser.add_argument("--leads", type=int, default=5000, help="Number of leads to submit")
+    parser.add_argument("--sessions", type=int, default=200, help="Concurrent simulated sessions")
+    parser.add_argument("--max-batch", type=int, default=256, help="Maximum leads per outbox commit")
+    parser.add_argument("--synchronous", default="FULL", choices=["OFF", "NORMAL", "FULL"], help="SQLite synchronous pragma")
+    parser.add_argument("--crm-batch", type=int, default=100, help="Leads per CRM request")
+    parser.add_argument("--crm-latency-ms", type=float, default=5.0, help="Latency added by the CRM stub")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of CRM requests that fail")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Lead normalization and scoring pipeline benchmark.
+
+Writes a synthetic JSON lines dataset of leads whose fields are phrased the
+way parents and the model phrase them (budgets in mixed units and periods,
+classes as "8th grade" / "Class IX" / "second year PUC", repeat callers and
+partial leads from dropped calls), then measures:
+  - the per-record baseline: json.loads and uncached parsing of every field,
+    one lead at a time, on a sample
+  - pipeline wall time and leads/s across the process pool, and per worker
+  - input vs columnar output bytes per lead
+  - the score distribution and bucket shares of the result
+
+Usage:
+    python -m benchmarks.lead_pipeline [--leads 10000000] [--workers N] [--data leads.jsonl]
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from leads import normalize_phone, pipeline
+from leads.pipeline import TIMELINES, URGENCIES, load_columns, run_pipeline
+from .lead_dedup import format_phone, new_phone
+
+_CLASSES = ["{}th grade", "Class {}", "{}th standard", "Grade {}", "{}th", "class {} CBSE", "{}th std, state board"]
+_ROMAN = ["I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X", "XI", "XII"]
+_CLASS_EXTRAS = ["UKG", "LKG", "Nursery", "first year PUC", "second year PUC", "Dropper", "12th pass", "not sure"]
+_SUBJECTS = ["Maths", "Mathematics", "Physics", "Chemistry", "Biology", "Science", "English", "Hindi",
+             "Social Science", "SST", "Computer Science", "Accountancy", "Economics", "Kannada"]
+_EXAMS = ["JEE Mains in January", "JEE Advanced", "NEET", "NEET next year", "Board exams", "CBSE boards",
+          "Olympiad", "CUET", "No", "None", "", "Not yet", "School exams"]
+_DECIDERS = ["Both parents", "Father", "Mother", "Parent", "Me", "My husband and I", "My wife", "We decide together",
+             "His grandfather", ""]
+_TIMELINES = ["As soon as possible", "Next week", "Immediately", "This month", "Next month", "in 2 months",
+              "Within a week", "After exams", "Next academic year", "In 3 weeks", "Not sure", "from June", ""]
+_URGENCIES = ["Immediate", "High", "Urgent", "Within a month", "Medium", "Planning ahead", "Low", "Not urgent",
+              "No hurry", ""]
+
+
+def _budget(rng: random.Random) -> str:
+    amount = rng.choice([1500, 2000, 2500, 3000, 4000, 5000, 6000, 8000, 10000, 12000, 15000, 20000])
+    style = rng.randrange(9)
+    if style == 0:
+        return f"Under ₹{amount:,} per month"
+    if style == 1:
+        return f"Around ₹{amount:,} per month"
+    if style == 2:
+        return f"₹{amount // 1000}-{amount // 1000 + 2}k"
+    if style == 3:
+        return f"{amount * 12 / 100000:.1f} lakh per year"
+    if style == 4:
+        return f"Above {amount}"
+    if style == 5:
+        return f"₹{amount:,} to ₹{amount * 2:,} monthly"
+    if style == 6:
+        return f"Rs {amount} per month"
+    if style == 7:
+        return f"₹{amount // 10} per hour"
+    return rng.choice(["Flexible", "Not decided", ""])
+
+
+def _class(rng: random.Random) -> str:
+    if rng.random() < 0.1:
+        return rng.choice(_CLASS_EXTRAS)
+    grade = rng.randint(1, 12)
+    if rng.random() < 0.15:
+        return f"Class {_ROMAN[grade - 1]}"
+    return rng.choice(_CLASSES).format(grade)
+
+
+def lead_templates(count: int, rng: random.Random) -> list[str]:
+    """JSON bodies (without braces, conversation_id and phone) of `count` varied leads."""
+    templates = []
+    for _ in range(count):
+        lead = {
+            "child_class": _class(rng),
+            "subjects": ", ".join(rng.sample(_SUBJECTS, rng.randint(1, 3))),
+            "exam_info": rng.choice(_EXAMS),
+            "budget_range": _budget(rng),
+            "decision_maker": rng.choice(_DECIDERS),
+            "timeline": rng.choice(_TIMELINES),
+            "urgency": rng.choice(_URGENCIES),
+        }
+        if rng.random() < 0.05:
+            lead["partial"] = True
+            lead["missing"] = rng.sample(["budget_range", "timeline", "urgency"], rng.randint(1, 2))
+        templates.append(json.dumps(lead, ensure_ascii=False)[1:-1])
+    return templates
+
+
+def write_dataset(path: Path, leads: int, rng: random.Random, templates: int = 20_000) -> None:
+    """Write `leads` synthetic leads as JSON lines; about 10% are repeat callers with merged conversation_ids."""
+    bodies = lead_templates(templates, rng)
+    batch = []
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(leads):
+            hexid = f"{rng.getrandbits(128):032x}"
+            conversation_id = f"{hexid[:8]}-{hexid[8:12]}-{hexid[12:16]}-{hexid[16:20]}-{hexid[20:]}"
+            extra = ""
+            if rng.random() < 0.1:
+                extra = f', "conversation_ids": ["{conversation_id}", "{hexid[:8]}-0000-0000-0000-{hexid[20:]}"]'
+            batch.append(f'{{"conversation_id": "{conversation_id}", "contact_phone": '
+                         f'"{format_phone(new_phone(rng), rng)}", {rng.choice(bodies)}{extra}}}\n')
+            if len(batch) == 100_000:
+                f.write("".join(batch))
+                batch.clear()
+        f.write("".join(batch))
+
+
+def per_record_baseline(path: Path, sample: int) -> float:
+    """Leads/s parsing one record at a time, every field re-parsed (no factorization or caching)."""
+    parsers = [
+        (field, parser.__wrapped__)
+        for field, parser in zip(pipeline.TEXT_FIELDS, (
+            pipeline.parse_grade, pipeline.parse_subjects, pipeline.parse_exam, pipeline.parse_budget,
+            pipeline.parse_decision_maker, pipeline.parse_timeline, pipeline.parse_urgency,
+        ))
+    ]
+    with open(path, "rb") as f:
+        lines = [f.readline() for _ in range(sample)]
+    lines = [line for line in lines if line]
+    started = time.perf_counter()
+    for line in lines:
+        lead = json.loads(line)
+        record = {field: parse(lead.get(field) or "") for field, parse in parsers}
+        record["phone"] = normalize_phone(lead.get("contact_phone"))
+    return len(lines) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the lead normalization and scoring pipeline")
+    parser.add_argument("--leads", type=int, default=10_000_000, help="Leads in the synthetic dataset")
+    parser.add_argument("--workers", type=int, default=None, help="Pipeline worker processes (default: CPU count)")
+    parser.add_argument("--chunk-mb", type=int, default=32, help="Megabytes of input per task")
+    parser.add_argument("--baseline-sample", type=int, default=200_000, help="Leads parsed one at a time for the baseline")
+    parser.add_argument("--data", default=None, help="Keep the dataset at this path and reuse it when it exists")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        data = Path(args.data) if args.data else tmp / "leads.jsonl"
+        started = time.perf_counter()
+        if not data.exists():
+            write_dataset(data, args.leads, rng)
+        generate_seconds = time.perf_counter() - started
+        input_bytes = data.stat().st_size
+
+        baseline = per_record_baseline(data, args.baseline_sample)
+        stats = run_pipeline([data], tmp / "columns", workers=args.workers, chunk_bytes=args.chunk_mb << 20)
+        columns = load_columns(tmp / "columns", ["score", "urgency", "timeline", "budget_max", "phone"])
+
+    rows = stats["rows"]
+    rate = rows / stats["seconds"]
+    scores = columns["score"]
+    print("=" * 72)
+    print(f"Lead pipeline: {rows:,} leads, {input_bytes / 1024 / 1024:,.0f} MB of JSON lines "
+          f"({'reused' if generate_seconds < 1 else f'generated in {generate_seconds:.0f}s'})")
+    print("=" * 72)
+    print(f"Per-record baseline:        {baseline:,.0f} leads/s (1 process)")
+    print(f"Pipeline:                   {stats['seconds']:.1f}s, {rate:,.0f} leads/s on {stats['workers']} workers "
+          f"({rate / stats['workers']:,.0f} leads/s per worker, {rate / stats['workers'] / baseline:.1f}x baseline)")
+    print(f"Output:                     {stats['bytes'] / 1024 / 1024:,.0f} MB in {stats['parts']} parts, "
+          f"{stats['bytes'] / rows:.0f} bytes/lead vs {input_bytes / rows:.0f} in")
+    print(f"Score:                      p50 {np.percentile(scores, 50):.1f}, p90 {np.percentile(scores, 90):.1f}, "
+          f"{np.mean(columns['phone'] == 0):.1%} without a phone")
+    print(f"Known budget:               {np.mean(~np.isnan(columns['budget_max'])):.1%} with an upper bound")
+    for name, codes, labels in (("Urgency", columns["urgency"], URGENCIES), ("Timeline", columns["timeline"], TIMELINES)):
+        shares = np.bincount(codes, minlength=len(labels)) / rows
+        print(f"{name + ':':<28}" + ", ".join(f"{label or 'unknown'} {share:.0%}" for label, share in zip(labels, shares)))
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Offline load test: concurrent simulated calls against the real entrypoint.
+
+Runs N sessions through runner.entrypoint with EdTechBANTAgent, the real
+tools, lead outbox and transcript writer, each driven by a FakeRealtimeModel
+that streams scripted audio and text and calls submit_lead on cue. No
+network access is needed; LiveKit room I/O is replaced by a null audio sink.
+
+Calls are replayed `--speed` times faster than real time, so N sessions
+load the event loop like N x speed real calls. Reports CPU per call and
+sessions per core, memory per session, event loop lag and tool-call latency.
+
+Production runs one job process per call, so a call costs one process
+baseline (reported) plus the per-session increment measured here.
+
+Usage:
+    python -m benchmarks.load_test [--sessions 50] [--speed 10] [--ramp 2] [--transcript conversation_sample.md]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+import psutil
+
+from .common import LoopLagMonitor, percentile
+from .fake_realtime import FakeRealtimeModel, NullAudioOutput, ScriptStep, script_duration
+from .replay import build_script, parse_transcript
+
+# conversation_sample_minimal.md as a script
+DEFAULT_SCRIPT = [
+    ScriptStep("agent", "Hello! I'm Alex from XYZ Edtech. I'm here to help you find the best learning solutions for your child. How may I assist you today?"),
+    ScriptStep("parent", "Hi, I need help with my son's studies."),
+    ScriptStep("agent", "I'd be happy to help! Which class is your child currently in?"),
+    ScriptStep("parent", "He's in 10th grade."),
+    ScriptStep("agent", "Great! And which subjects does he need help with?"),
+    ScriptStep("parent", "Math and Science."),
+    ScriptStep("agent", "Perfect! To have one of our counselors follow up with you, could I please get your contact phone number?"),
+    ScriptStep("parent", "Sure, it's 9876543210."),
+    ScriptStep("tool", tool_name="submit_lead", arguments={
+        "child_class": "10th grade",
+        "subjects": "Math and Science",
+        "contact_phone": "9876543210",
+    }),
+    ScriptStep("agent", "Thank you! I've noted down that your child is in 10th grade, needs help with Math and Science, and your contact number is 9876543210. One of our counselors will reach out to you soon. Is there anything else I can help you with?"),
+    ScriptStep("parent", "No, that's all. Thanks!"),
+    ScriptStep("agent", "You're welcome! Have a great day!"),
+]
+
+
+class FakeJobContext:
+    """The parts of JobContext the entrypoint uses, without a LiveKit connection."""
+
+    def __init__(self, index: int, proc: SimpleNamespace):
+        self.proc = proc
+        self.job = SimpleNamespace(
+            id=f"job-load-{index}",
+            metadata=json.dumps({"conversation_id": f"load-{index:05d}"}),
+            room=SimpleNamespace(name=f"load-room-{index}"),
+        )
+        self.room = SimpleNamespace(name=self.job.room.name, metadata="")
+        self.shutdown_callbacks = []
+
+    async def connect(self) -> None:
+        await asyncio.sleep(0)
+
+    def add_shutdown_callback(self, callback) -> None:
+        self.shutdown_callbacks.append(callback)
+
+    def shutdown(self, reason: str = "") -> None:
+        self.shutdown_reason = reason
+
+
+class RssSampler:
+    """Tracks the peak resident memory of this process."""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = self.process.memory_info().rss
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        while True:
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> int:
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        return self.peak
+
+
+async def run_session(index: int, args, script: list[ScriptStep], timeout: float) -> dict:
+    from runner.entrypoint import entrypoint
+    from runner.prewarm import prewarm
+
+    # Every simulated call is a different parent, so repeat-caller merging does not fold the leads together
+    script = [
+        ScriptStep(step.role, step.text, step.tool_name, {**step.arguments, "contact_phone": f"98{index:08d}"})
+        if step.role == "tool" else step
+        for step in script
+    ]
+    model = FakeRealtimeModel(script, speed=args.speed)
+    sessions = []
+    closed = asyncio.Event()
+
+    def attach_io(session) -> None:
+        session.output.audio = NullAudioOutput()
+        # The session governor may end the call before the script does
+        session.on("close", lambda _: closed.set())
+        sessions.append(session)
+
+    proc = SimpleNamespace(userdata={})
+    prewarm(proc, llm_factory=lambda: model)
+    proc.userdata["attach_io"] = attach_io
+    ctx = FakeJobContext(index, proc)
+
+    started = time.perf_counter()
+    result = {"ctx": ctx, "completed": False, "error": None}
+    try:
+        await entrypoint(ctx)
+        waits = [asyncio.create_task(model.finished.wait()), asyncio.create_task(closed.wait())]
+        try:
+            await asyncio.wait_for(asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED), timeout)
+        finally:
+            for wait in waits:
+                wait.cancel()
+        result["completed"] = model.finished.is_set()
+        result["cut"] = getattr(ctx, "shutdown_reason", None)
+    except Exception as e:
+        result["error"] = repr(e)
+    finally:
+        if sessions:
+            await sessions[0].aclose()
+    result["seconds"] = time.perf_counter() - started
+    result["generations"] = model.generations
+    return result
+
+
+async def run(args, tmp: str) -> None:
+    from agent.timing import add_tool_timing_hook
+    from leads import LeadOutbox
+    from usage import UsageStore
+    # Import the agent stack before taking the baseline so it counts as process overhead
+    import runner.entrypoint  # noqa: F401
+
+    script = build_script(parse_transcript(args.transcript)) if args.transcript else DEFAULT_SCRIPT
+    call_seconds = script_duration(script)
+    timeout = call_seconds / args.speed * 3 + 30
+
+    tool_latencies: list[float] = []
+    add_tool_timing_hook(lambda tool_name, seconds, conversation_id: tool_latencies.append(seconds))
+
+    process = psutil.Process()
+    baseline_rss = process.memory_info().rss
+    rss = RssSampler()
+    lag = LoopLagMonitor(interval=0.005)
+    rss.start()
+    lag.start()
+    cpu_before = process.cpu_times()
+    started = time.perf_counter()
+
+    async def staggered(index: int) -> dict:
+        await asyncio.sleep(args.ramp * index / args.sessions)
+        return await run_session(index, args, script, timeout)
+
+    # Entrypoint and tool output (startup timing, token usage) is not part of the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = await asyncio.gather(*(staggered(i) for i in range(args.sessions)))
+        wall = time.perf_counter() - started
+        cpu_after = process.cpu_times()
+        lags = await lag.stop()
+        peak_rss = await rss.stop()
+        # Job shutdown: flush lead submitters, the outbox and the transcript writer
+        for result in results:
+            await asyncio.gather(*(cb() for cb in result["ctx"].shutdown_callbacks), return_exceptions=True)
+
+    outbox = LeadOutbox(os.path.join(tmp, "lead_outbox.sqlite3"))
+    leads = sum(outbox.counts().values())
+    await outbox.aclose()
+    usage_chunks = list(UsageStore(os.path.join(tmp, "usage")).scan(["end_reason"]))
+    usage_records = sum(len(chunk["end_reason"]) for chunk in usage_chunks)
+    cut_records = sum(bool(chunk["labels"]["end_reason"][code]) for chunk in usage_chunks for code in chunk["end_reason"])
+
+    cpu_seconds = (cpu_after.user + cpu_after.system) - (cpu_before.user + cpu_before.system)
+    completed = [r for r in results if r["completed"]]
+    cut = [r for r in results if r.get("cut")]
+    errors = [r["error"] for r in results if r["error"]]
+    cpu_per_call = cpu_seconds / args.sessions
+    mb = 1024 * 1024
+
+    print("=" * 72)
+    print(f"Load test: {args.sessions} sessions, speed x{args.speed:g}, ramp {args.ramp:g}s")
+    print(f"Script: {len(script)} steps, {call_seconds:.1f}s per call in real time")
+    print("=" * 72)
+    print(f"Sessions completed:         {len(completed)}/{args.sessions}")
+    print(f"Leads persisted:            {leads}")
+    print(f"Usage records:              {usage_records}")
+    if cut:
+        print(f"Sessions cut by governor:   {len(cut)} ({cut_records} usage records with an end reason)")
+    print(f"Wall time:                  {wall:.1f}s")
+    print(f"Real-time equivalent load:  {args.sessions * args.speed:,.0f} concurrent calls")
+    print(f"CPU per call:               {cpu_per_call * 1000:.1f} ms ({cpu_seconds:.2f}s total)")
+    print(f"Sessions per core:          {call_seconds / cpu_per_call:,.0f} (real-time calls one core sustains)")
+    print(f"Job process baseline RSS:   {baseline_rss / mb:.1f} MB")
+    print(f"Memory per session:         {(peak_rss - baseline_rss) / mb / args.sessions:.2f} MB (in-process increment)")
+    print(f"Event loop lag:             p50 {percentile(lags, 50) * 1000:.2f} ms, "
+          f"p99 {percentile(lags, 99) * 1000:.2f} ms, max {max(lags, default=0) * 1000:.2f} ms")
+    print(f"Tool calls:                 {len(tool_latencies)}, latency p50 {percentile(tool_latencies, 50) * 1000:.2f} ms, "
+          f"p95 {percentile(tool_latencies, 95) * 1000:.2f} ms, p99 {percentile(tool_latencies, 99) * 1000:.2f} ms")
+    if errors:
+        print(f"Errors ({len(errors)}): {errors[:3]}")
+    print("=" * 72)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of the agent entrypoint with a fake realtime model")
+    parser.add_argument("--sessions", type=int, default=50, help="Concurrent sessions")
+    parser.add_argument("--speed", type=float, default=10.0, help="Replay speed-up over real time")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Seconds over which sessions are started")
+    parser.add_argument("--transcript", help="Replay this sample transcript instead of the built-in script")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settings are read at import time, so point the outputs at a scratch directory first
+        os.environ.update({
+            "LEAD_SINK": "outbox",
+            "LEAD_OUTBOX_PATH": os.path.join(tmp, "lead_outbox.sqlite3"),
+            "CRM_ENDPOINT_URL": "",
+            "LEAD_DEDUP_BLOOM_PATH": os.path.join(tmp, "lead_phones.bloom"),
+            "TRANSCRIPTS_DIR": os.path.join(tmp, "transcripts"),
+            "USAGE_DIR": os.path.join(tmp, "usage"),
+            "TRANSCRIPT_INDEX_DIR": os.path.join(tmp, "transcript_index"),
+            "GREETING_CACHE_DIR": os.path.join(tmp, "greetings"),
+            "CALL_RECORDING_DIR": os.path.join(tmp, "recordings"),
+            "TRACING_EXPORTER": "none",
+        })
+        asyncio.run(run(args, tmp))
+
+
+if __name__ == "__main__":
+    main()
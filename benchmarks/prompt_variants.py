@@ -0,0 +1,118 @@
+"""
+Prompt variant report: prompt size, tokens per session and time-to-first-audio.
+
+For every variant in agent/prompt.py VARIANTS it reports:
+  - per-section token counts and whether the stable prefix is cacheable
+  - model tokens per session (input, cached, output) from the UsageCollector
+    while replaying the sample transcripts offline (see benchmarks/replay.py)
+  - with --live, time-to-first-audio and greeting tokens measured against the
+    OpenAI Realtime API (needs OPENAI_API_KEY and network access)
+
+Usage:
+    python -m benchmarks.prompt_variants [--live --runs 5] [transcripts ...]
+"""
+import argparse
+import asyncio
+import os
+
+from agent.prompt import VARIANTS, GREETING_INSTRUCTIONS
+from agent.prompt_compiler import compile_prompt, tiktoken
+from .common import percentile
+from .fake_realtime import NullAudioOutput
+from .replay import DEFAULT_CORPUS, parse_transcript, replay_one
+
+
+async def replay_tokens(variant: str, paths: list[str]) -> dict:
+    """Average UsageCollector tokens per session over the transcripts."""
+    results = [await replay_one(parse_transcript(path), i, 1000.0, variant) for i, path in enumerate(paths)]
+    return {
+        key: sum(r[key] for r in results) / len(results)
+        for key in ("input_tokens", "cached_tokens", "output_tokens")
+    }
+
+
+async def measure_live(instructions: str, runs: int) -> dict:
+    """Greeting time-to-first-audio and tokens against the Realtime API."""
+    from livekit.agents import AgentSession, metrics
+
+    from agent.bant_agent import EdTechBANTAgent
+    from runner.prewarm import create_realtime_model
+
+    ttfas: list[float] = []
+    input_tokens: list[int] = []
+    for _ in range(runs):
+        session = AgentSession(llm=create_realtime_model())
+        session.output.audio = NullAudioOutput()
+        usage = metrics.UsageCollector()
+        first_metrics = asyncio.get_running_loop().create_future()
+
+        def _on_metrics(ev):
+            usage.collect(ev.metrics)
+            if isinstance(ev.metrics, metrics.RealtimeModelMetrics) and not first_metrics.done():
+                first_metrics.set_result(ev.metrics)
+
+        session.on("metrics_collected", _on_metrics)
+        try:
+            await session.start(agent=EdTechBANTAgent(instructions=instructions))
+            await session.generate_reply(instructions=GREETING_INSTRUCTIONS)
+            greeting = await asyncio.wait_for(first_metrics, 30)
+        finally:
+            await session.aclose()
+        if greeting.ttft >= 0:
+            ttfas.append(greeting.ttft)
+        input_tokens.append(usage.get_summary().llm_prompt_tokens)
+    return {
+        "ttfa_p50": percentile(ttfas, 50),
+        "ttfa_p95": percentile(ttfas, 95),
+        "greeting_input_tokens": sum(input_tokens) / len(input_tokens),
+    }
+
+
+async def run(args) -> None:
+    from agent.timing import log_tool_latency, remove_tool_timing_hook
+    remove_tool_timing_hook(log_tool_latency)
+
+    counter = "tiktoken o200k_base" if tiktoken is not None else "estimated; install tiktoken for exact counts"
+    print("=" * 84)
+    print(f"Prompt variants (token counts: {counter})")
+    print("=" * 84)
+    for name, variant in VARIANTS.items():
+        compiled = compile_prompt(variant)
+        sections = ", ".join(f"{section}={tokens}" for section, tokens in compiled.section_tokens.items())
+        print(f"{name:<8} {compiled.tokens:>6} tokens, stable prefix {compiled.stable_prefix_tokens} "
+              f"({'cacheable' if compiled.cacheable else 'below cache minimum'})  [{sections}]")
+    print("-" * 84)
+
+    print(f"Tokens per session, offline replay of {len(args.paths)} transcripts (UsageCollector):")
+    print(f"{'variant':<8} {'input':>10} {'cached':>10} {'uncached':>10} {'output':>10}")
+    for name in VARIANTS:
+        tokens = await replay_tokens(name, args.paths)
+        print(f"{name:<8} {tokens['input_tokens']:>10,.0f} {tokens['cached_tokens']:>10,.0f} "
+              f"{tokens['input_tokens'] - tokens['cached_tokens']:>10,.0f} {tokens['output_tokens']:>10,.0f}")
+    print("-" * 84)
+
+    if not args.live:
+        print("Time-to-first-audio: run with --live (OPENAI_API_KEY, network) to measure against the Realtime API")
+    elif not os.getenv("OPENAI_API_KEY"):
+        print("Time-to-first-audio: skipped, OPENAI_API_KEY is not set")
+    else:
+        print(f"Greeting time-to-first-audio, Realtime API ({args.runs} runs per variant):")
+        print(f"{'variant':<8} {'p50 ms':>10} {'p95 ms':>10} {'input tokens':>14}")
+        for name, variant in VARIANTS.items():
+            live = await measure_live(compile_prompt(variant).text, args.runs)
+            print(f"{name:<8} {live['ttfa_p50'] * 1000:>10.0f} {live['ttfa_p95'] * 1000:>10.0f} "
+                  f"{live['greeting_input_tokens']:>14,.0f}")
+    print("=" * 84)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare prompt variants by tokens and time-to-first-audio")
+    parser.add_argument("paths", nargs="*", default=DEFAULT_CORPUS, help="Transcripts to replay for tokens per session")
+    parser.add_argument("--live", action="store_true", help="Measure time-to-first-audio against the Realtime API")
+    parser.add_argument("--runs", type=int, default=5, help="Live greetings per variant")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
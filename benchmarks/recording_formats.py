@@ -0,0 +1,196 @@
+"""
+Recording formats benchmark: CPU time and bytes per call-minute.
+
+There is no egress server here, so each recording mode's encode is done
+locally with PyAV, the same libraries the egress service uses. The input is
+a synthetic two-party call (`--minutes` long; speech-like turns with pauses),
+one Opus track per speaker as the clients publish it (32 kbps, DTX):
+  - MP4 composite (current): both tracks decoded and mixed; AAC 128 kbps plus
+    H.264 720p30 at 3 Mbps (egress's default preset) of a speaker layout that
+    only changes when the active speaker does
+  - OGG composite:           both tracks decoded and mixed; one Opus file at `--bitrate`
+  - OGG per participant:     each track decoded and re-encoded at `--bitrate`
+  - OGG per track:           each track's Opus packets copied into OGG, no transcoding
+
+The MP4 figure leaves out the headless browser that renders the layout for a
+real room composite, so it understates the current cost.
+
+Usage:
+    python -m benchmarks.recording_formats [--minutes 1] [--bitrate 24]
+"""
+import argparse
+import io
+import time
+
+import av
+import numpy as np
+
+RATE = 48000
+FRAME = RATE // 50  # 20 ms
+WIDTH, HEIGHT, FPS = 1280, 720, 30
+
+
+def synthetic_call(minutes: float, seed: int = 7) -> tuple[list[np.ndarray], list[tuple[float, float, int]]]:
+    """One int16 track per speaker (agent, parent) with alternating turns, and the (start, end, speaker) turns."""
+    rng = np.random.default_rng(seed)
+    total = int(minutes * 60 * RATE)
+    tracks = [np.zeros(total, dtype=np.float32) for _ in range(2)]
+    turns = []
+    t, speaker = 0.5, 0
+    while t < minutes * 60:
+        length = rng.uniform(6, 12) if speaker == 0 else rng.uniform(2, 7)
+        start, end = int(t * RATE), min(total, int((t + length) * RATE))
+        n = end - start
+        # A voice: a gliding pitch with harmonics up to ~4 kHz, shaped into syllables
+        f0 = (130 if speaker == 0 else 210) * (1 + 0.15 * np.sin(np.linspace(0, length * 1.7, n)))
+        phase = np.cumsum(2 * np.pi * f0 / RATE)
+        voice = sum(np.sin(k * phase) / k for k in range(1, 20))
+        syllables = np.abs(np.sin(np.pi * np.arange(n) / RATE * rng.uniform(3.5, 5)))
+        tracks[speaker][start:end] = (voice * syllables + 0.1 * rng.standard_normal(n)) * 4000
+        turns.append((start / RATE, end / RATE, speaker))
+        t += length + rng.uniform(0.4, 1.2)
+        speaker = 1 - speaker
+    # The parent's microphone has a noise floor; the agent's track is digital silence between turns
+    tracks[1] += rng.standard_normal(total).astype(np.float32) * 30
+    return [np.clip(track, -32768, 32767).astype(np.int16) for track in tracks], turns
+
+
+def encode_opus(pcm: np.ndarray, bitrate: int, options: dict | None = None) -> bytes:
+    buffer = io.BytesIO()
+    with av.open(buffer, "w", format="ogg") as container:
+        stream = container.add_stream("libopus", rate=RATE, layout="mono")
+        stream.bit_rate = bitrate
+        stream.options = {"application": "voip", **(options or {})}
+        for i in range(0, len(pcm) - FRAME + 1, FRAME):
+            frame = av.AudioFrame.from_ndarray(pcm[i:i + FRAME].reshape(1, -1), format="s16", layout="mono")
+            frame.sample_rate = RATE
+            frame.pts = i
+            for packet in stream.encode(frame):
+                container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return buffer.getvalue()
+
+
+def decode_opus(data: bytes) -> np.ndarray:
+    chunks = []
+    with av.open(io.BytesIO(data)) as container:
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=RATE)
+        for frame in container.decode(container.streams.audio[0]):
+            chunks.extend(f.to_ndarray().reshape(-1) for f in resampler.resample(frame))
+    return np.concatenate(chunks)
+
+
+def mix(tracks: list[np.ndarray]) -> np.ndarray:
+    length = min(len(track) for track in tracks)
+    mixed = sum(track[:length].astype(np.int32) for track in tracks)
+    return np.clip(mixed, -32768, 32767).astype(np.int16)
+
+
+def remux_ogg(data: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with av.open(io.BytesIO(data)) as source, av.open(buffer, "w", format="ogg") as container:
+        stream = container.add_stream_from_template(source.streams.audio[0])
+        for packet in source.demux(source.streams.audio[0]):
+            if packet.dts is None:
+                continue
+            packet.stream = stream
+            container.mux(packet)
+    return buffer.getvalue()
+
+
+def _layouts() -> list[np.ndarray]:
+    """Speaker layout frames (yuv420p planes): nobody, agent or parent speaking."""
+    frames = []
+    for active in (None, 0, 1):
+        rgb = np.full((HEIGHT, WIDTH, 3), 24, dtype=np.uint8)
+        for tile in (0, 1):
+            x = 80 + tile * 600
+            if tile == active:
+                rgb[160:560, x - 8:x + 528] = (40, 200, 120)
+            rgb[168:552, x:x + 520] = (60, 60, 72)
+            rgb[300:420, x + 200:x + 320] = (150, 150, 170) if tile == 0 else (190, 150, 120)
+        frames.append(av.VideoFrame.from_ndarray(rgb, format="rgb24").reformat(format="yuv420p").to_ndarray())
+    return frames
+
+
+def encode_mp4(pcm: np.ndarray, turns: list[tuple[float, float, int]]) -> bytes:
+    layouts = _layouts()
+    buffer = io.BytesIO()
+    with av.open(buffer, "w", format="mp4") as container:
+        video = container.add_stream("libx264", rate=FPS)
+        video.width, video.height, video.pix_fmt = WIDTH, HEIGHT, "yuv420p"
+        video.bit_rate = 3_000_000
+        video.options = {"preset": "veryfast", "maxrate": "3000k", "bufsize": "6000k"}
+        audio = container.add_stream("aac", rate=RATE, layout="stereo")
+        audio.bit_rate = 128_000
+
+        seconds = len(pcm) / RATE
+        active = np.zeros(int(seconds * FPS) + 1, dtype=np.int8)
+        for start, end, speaker in turns:
+            active[int(start * FPS):int(end * FPS)] = speaker + 1
+        for i in range(int(seconds * FPS)):
+            frame = av.VideoFrame.from_ndarray(layouts[active[i]], format="yuv420p")
+            frame.pts = i
+            for packet in video.encode(frame):
+                container.mux(packet)
+        for packet in video.encode(None):
+            container.mux(packet)
+
+        samples = 1024
+        for i in range(0, len(pcm) - samples + 1, samples):
+            chunk = pcm[i:i + samples]
+            frame = av.AudioFrame.from_ndarray(np.stack([chunk, chunk]).reshape(1, -1), format="s16", layout="stereo")
+            frame.sample_rate = RATE
+            frame.pts = i
+            for packet in audio.encode(frame):
+                container.mux(packet)
+        for packet in audio.encode(None):
+            container.mux(packet)
+    return buffer.getvalue()
+
+
+def measure(fn) -> tuple[float, list[bytes]]:
+    started = time.process_time()
+    outputs = fn()
+    return time.process_time() - started, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare recording formats by CPU time and bytes per call-minute")
+    parser.add_argument("--minutes", type=float, default=1.0, help="Call length")
+    parser.add_argument("--bitrate", type=int, default=24, help="Opus bitrate of audio-only recordings (kbps)")
+    parser.add_argument("--client-bitrate", type=int, default=32, help="Opus bitrate the clients publish (kbps)")
+    args = parser.parse_args()
+
+    tracks, turns = synthetic_call(args.minutes)
+    sources = [encode_opus(track, args.client_bitrate * 1000, {"dtx": "1"}) for track in tracks]
+    bitrate = args.bitrate * 1000
+
+    modes = {
+        "MP4 composite (current)": lambda: [encode_mp4(mix([decode_opus(s) for s in sources]), turns)],
+        "OGG composite": lambda: [encode_opus(mix([decode_opus(s) for s in sources]), bitrate)],
+        "OGG per participant": lambda: [encode_opus(decode_opus(s), bitrate) for s in sources],
+        "OGG per track": lambda: [remux_ogg(s) for s in sources],
+    }
+    results = {label: measure(fn) for label, fn in modes.items()}
+
+    baseline_cpu, baseline_outputs = results["MP4 composite (current)"]
+    baseline_bytes = sum(len(o) for o in baseline_outputs)
+    print("=" * 96)
+    print(f"Recording formats: {args.minutes:g}-minute two-party call, audio-only at {args.bitrate} kbps Opus, "
+          f"clients at {args.client_bitrate} kbps")
+    print("=" * 96)
+    print(f"{'mode':<26} {'files':>6} {'CPU ms/call-min':>16} {'KB/call-min':>12} {'GB per 100k min':>16} "
+          f"{'CPU vs MP4':>10} {'bytes vs MP4':>12}")
+    for label, (cpu, outputs) in results.items():
+        size = sum(len(o) for o in outputs)
+        print(f"{label:<26} {len(outputs):>6} {cpu * 1000 / args.minutes:>16,.0f} {size / 1024 / args.minutes:>12,.0f} "
+              f"{size / args.minutes * 100_000 / 1e9:>16,.2f} {cpu / baseline_cpu:>10.1%} {size / baseline_bytes:>12.1%}")
+    print("-" * 96)
+    print("  MP4 composite leaves out the headless browser that renders the layout; the real cost is higher")
+    print("=" * 96)
+
+
+if __name__ == "__main__":
+    main()
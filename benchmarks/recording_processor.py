@@ -0,0 +1,205 @@
+"""
+Post-call recording processor benchmark.
+
+Writes `--calls` synthetic calls (`--minutes` long) as the in-worker
+recorder does: stereo Ogg/Opus at 24 kHz, parent left and agent right, with
+a JSON sidecar, and a transcript per call as the agent logs it (an agent
+item at the start of its turn, a parent item 0.3 s after the end of theirs).
+Every fourth call has no sidecar, so it is placed from its greeting and cut
+from the mix. Then processes them (recording/processor.py):
+  - throughput: call-minutes per core-second and per wall-second, with one
+                worker and with `--workers`
+  - naive:      each file decoded whole into memory, downmixed, and cut at
+                consecutive transcript times ([t_i, t_i+1))
+  - boundaries: how far each clip's start and end (padding removed) are
+                from the true turn, processor vs naive
+  - memory:     tracemalloc peak for one `--long-minutes` call, streamed vs
+                decoded whole
+
+Usage:
+    python -m benchmarks.recording_processor [--calls 8] [--minutes 3] [--workers 4] [--long-minutes 30]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import av
+import numpy as np
+
+from .recording_formats import synthetic_call
+
+RATE = 24000
+STARTED_AT = 1_760_000_000.0
+_PAD = 0.2
+
+
+def write_call(directory: Path, transcripts: Path, conversation_id: str, minutes: float, seed: int,
+               sidecar: bool = True) -> list[tuple[float, float, int]]:
+    """One synthetic stereo recording, its sidecar and transcript; returns the true (start, end, speaker) turns."""
+    (agent, parent), turns = synthetic_call(minutes, seed=seed)
+    # synthetic_call is at 48 kHz; the recorder writes 24 kHz
+    stereo = np.stack([parent[::2], agent[::2]], axis=1)
+    path = directory / f"{conversation_id}.ogg"
+    with av.open(str(path), "w", format="ogg") as container:
+        stream = container.add_stream("libopus", rate=RATE, layout="stereo", options={"compression_level": "5"})
+        stream.bit_rate = 32000
+        for n in range(0, len(stereo), RATE):
+            frame = av.AudioFrame.from_ndarray(np.ascontiguousarray(stereo[n:n + RATE]).reshape(1, -1),
+                                               format="s16", layout="stereo")
+            frame.sample_rate = RATE
+            frame.pts = n
+            for packet in stream.encode(frame):
+                container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    if sidecar:
+        path.with_suffix(".json").write_text(json.dumps({
+            "conversation_id": conversation_id, "started_at": STARTED_AT,
+            "seconds": len(stereo) / RATE, "channels": ["parent", "agent"],
+        }))
+    with open(transcripts / f"{conversation_id}.jsonl", "w", encoding="utf-8") as f:
+        for i, (start, end, speaker) in enumerate(turns):
+            if speaker == 0:
+                item = {"i": i, "t": STARTED_AT + start, "r": "assistant", "x": "..."}
+            else:
+                item = {"i": i, "t": STARTED_AT + end + 0.3, "r": "user", "x": "..."}
+            f.write(json.dumps(item) + "\n")
+    return turns
+
+
+def naive_process(task: dict, out_dir: Path) -> list[tuple[int, float, float]]:
+    """Decode the whole file, write the mono copy and cut [t_i, t_i+1) from the mix; returns (turn, start, end)."""
+    from recording.processor import _OpusWriter
+    from transcripts import read_transcript
+
+    with av.open(task["path"]) as container:
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=16000)
+        blocks = [out.to_ndarray().reshape(-1) for frame in container.decode(audio=0)
+                  for out in resampler.resample(frame)]
+    pcm = np.concatenate(blocks)
+    del blocks
+    writer = _OpusWriter(out_dir / f"{task['conversation_id']}.ogg", 16000, 16000)
+    writer.write(pcm)
+    writer.close()
+    turns = sorted(read_transcript(task["transcript"]), key=lambda item: item["t"])
+    offset = task["started_at"] if task["started_at"] is not None else turns[0]["t"]
+    cuts = []
+    for n, item in enumerate(turns):
+        start = item["t"] - offset
+        end = min(turns[n + 1]["t"] - offset if n + 1 < len(turns) else len(pcm) / 16000, len(pcm) / 16000)
+        if end <= start:
+            continue
+        clip = _OpusWriter(out_dir / task["conversation_id"] / f"{item['i']:03d}-{item['r']}.ogg", 16000, 16000)
+        clip.write(pcm[int(max(0, start) * 16000):int(end * 16000)])
+        clip.close()
+        cuts.append((item["i"], start, end))
+    return cuts
+
+
+def boundary_errors(cuts: dict[str, list[tuple[int, float, float]]], truth: dict[str, list]) -> np.ndarray:
+    """|start error| and |end error| in seconds, one row per clip; turns without a clip count as their length."""
+    errors = []
+    for conversation_id, turns in truth.items():
+        found = {i: (s, e) for i, s, e in cuts.get(conversation_id, [])}
+        for i, (start, end, _) in enumerate(turns):
+            s, e = found.get(i, (start, start))
+            errors.append((abs(s - start), abs(e - end)))
+    return np.array(errors)
+
+
+def _describe(errors: np.ndarray) -> str:
+    within = np.mean(np.max(errors, axis=1) <= 0.5) * 100
+    return (f"start p50 {np.median(errors[:, 0]):.2f}s p95 {np.percentile(errors[:, 0], 95):.2f}s, "
+            f"end p50 {np.median(errors[:, 1]):.2f}s p95 {np.percentile(errors[:, 1], 95):.2f}s, "
+            f"{within:.0f}% within 0.5 s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the post-call recording processor")
+    parser.add_argument("--calls", type=int, default=8, help="Synthetic calls")
+    parser.add_argument("--minutes", type=float, default=3.0, help="Length of each call")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes for the pool run")
+    parser.add_argument("--long-minutes", type=float, default=30.0, help="Length of the call for the memory measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        # Settings are read at import time
+        os.environ["TRANSCRIPTS_DIR"] = str(tmp / "transcripts")
+        from recording.processor import find_recordings, process_recording, run_processor
+
+        inputs, transcripts = tmp / "recordings", tmp / "transcripts"
+        inputs.mkdir()
+        transcripts.mkdir()
+        truth = {}
+        started = time.perf_counter()
+        for n in range(args.calls):
+            conversation_id = f"conv-{n:04d}"
+            truth[conversation_id] = write_call(inputs, transcripts, conversation_id, args.minutes, seed=n,
+                                                sidecar=n % 4 != 3)
+        setup = time.perf_counter() - started
+        tasks = find_recordings(inputs, transcripts)
+
+        one = run_processor(tasks, tmp / "out-1", workers=1)
+        pool = run_processor(tasks, tmp / "out-pool", workers=args.workers)
+        again = run_processor(tasks, tmp / "out-pool", workers=args.workers)
+
+        started, cpu = time.perf_counter(), time.process_time()
+        naive_cuts = {task["conversation_id"]: naive_process(task, tmp / "out-naive") for task in tasks}
+        naive_wall, naive_cpu = time.perf_counter() - started, time.process_time() - cpu
+
+        cuts = {}
+        for result in one["results"]:
+            cuts[result["conversation_id"]] = [(e["i"], e["s"] + _PAD if e["s"] > 0 else 0.0, e["e"] - _PAD)
+                                               for e in result["segments"]]
+        aligned = [r["aligned"] for r in one["results"]]
+        ours = boundary_errors(cuts, truth)
+        theirs = boundary_errors(naive_cuts, truth)
+
+        # Memory for one long call
+        long_dir = tmp / "long"
+        long_dir.mkdir()
+        write_call(long_dir, transcripts, "conv-long", args.long_minutes, seed=99)
+        long_task = find_recordings(long_dir, transcripts)[0]
+        long_task.update(out_dir=str(tmp / "out-long"), rate=16000, bitrate=16000, silence_db=-40.0, max_gap=1.0)
+        tracemalloc.start()
+        result = process_recording(long_task)
+        streamed = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        tracemalloc.start()
+        naive_process(long_task, tmp / "out-long-naive")
+        whole = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    minutes = one["call_minutes"]
+    print("=" * 88)
+    print(f"Recording processor: {args.calls} calls x {args.minutes:g} min ({minutes:.1f} call-minutes, "
+          f"{setup:.1f}s to write), {os.cpu_count()} CPUs")
+    print("=" * 88)
+    print(f"{'run':<28} {'wall s':>8} {'CPU s':>8} {'call-min/core-s':>16} {'call-min/s':>11} {'segments':>9}")
+    for run in (one, pool):
+        name = f"processor, {run['workers']} worker{'s' if run['workers'] > 1 else ''}"
+        print(f"{name:<28} {run['seconds']:>8.2f} {run['cpu_seconds']:>8.2f} "
+              f"{run['call_minutes'] / run['cpu_seconds']:>16.2f} {run['call_minutes'] / run['seconds']:>11.2f} "
+              f"{run['segments']:>9,}")
+    print(f"{'naive (whole file)':<28} {naive_wall:>8.2f} {naive_cpu:>8.2f} {minutes / naive_cpu:>16.2f} "
+          f"{minutes / naive_wall:>11.2f} {sum(len(c) for c in naive_cuts.values()):>9,}")
+    print(f"  re-run: {again['skipped']} of {len(tasks)} skipped as already processed in {again['seconds']:.2f}s")
+    print("-" * 88)
+    print(f"Boundaries over {len(ours):,} turns (aligned by sidecar: {aligned.count('sidecar')}, "
+          f"by greeting: {aligned.count('greeting')})")
+    print(f"  processor: {_describe(ours)}")
+    print(f"  naive:     {_describe(theirs)}")
+    print("-" * 88)
+    print(f"Memory for one {args.long_minutes:g}-minute call ({result['seconds'] / 60:.1f} min decoded, "
+          f"{len(result['segments'])} segments):")
+    print(f"  streamed: {streamed / 1e6:,.1f} MB peak    decoded whole: {whole / 1e6:,.1f} MB peak")
+    print("=" * 88)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+Deterministic conversation replay from sample transcripts.
+
+Parses transcripts in the format of conversation_sample.md (bold
+"**Agent:**" / "**Parent:**" lines, a "Function Call Generated" JSON block
+and a "Lead Data Captured" JSON block), replays each one through an
+AgentSession running EdTechBANTAgent and the real submit_lead tool with a
+FakeRealtimeModel reading the script, and checks the captured lead against
+the expected payload.
+
+Reports turns-to-lead, tool calls, model tokens and wall time per
+conversation. Conversations are spread over a process pool. Exits with
+status 1 if any lead does not match, so it can gate changes to
+agent/prompt.py and agent/tools.py.
+
+Usage:
+    python -m benchmarks.replay [paths ...] [--repeat 100] [--workers 4] [--speed 1000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from .common import percentile
+from .fake_realtime import FakeRealtimeModel, NullAudioOutput, ScriptStep, script_duration
+
+DEFAULT_CORPUS = ["conversation_sample.md", "conversation_sample_minimal.md", "conversation_sample_extended.md"]
+
+_TURN_RE = re.compile(r"^\*\*(Agent|Parent):\*\*\s*(.+?)\s*$")
+_JSON_BLOCK_RE = re.compile(r"```json\s*\n(.*?)\n```", re.S)
+
+
+@dataclass
+class Transcript:
+    """A parsed sample conversation."""
+
+    name: str
+    turns: list[tuple[str, str]]
+    function_call: dict | None
+    expected_lead: dict | None
+
+
+def parse_transcript(path: str | Path) -> Transcript:
+    """
+    Parse a sample conversation file.
+
+    Raises:
+        ValueError: If the file contains no Agent/Parent turns
+    """
+    path = Path(path)
+    turns: list[tuple[str, str]] = []
+    sections: dict[str, str] = {}
+    heading = ""
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if line.startswith("## "):
+            heading = line[3:].strip().lower()
+            continue
+        match = _TURN_RE.match(line)
+        if match:
+            turns.append((match.group(1).lower(), match.group(2)))
+        else:
+            sections[heading] = sections.get(heading, "") + line + "\n"
+    if not turns:
+        raise ValueError(f"{path}: no **Agent:**/**Parent:** turns found")
+
+    def json_block(keyword: str) -> dict | None:
+        for name, body in sections.items():
+            if keyword in name and (match := _JSON_BLOCK_RE.search(body)):
+                return json.loads(match.group(1))
+        return None
+
+    return Transcript(
+        name=path.name,
+        turns=turns,
+        function_call=json_block("function call"),
+        expected_lead=json_block("lead data"),
+    )
+
+
+def _digits(text: str) -> str:
+    return re.sub(r"\D", "", text)
+
+
+def _mentions(text: str, value) -> bool:
+    if not isinstance(value, str) or not value:
+        return False
+    if len(_digits(value)) >= 10:
+        return _digits(value) in _digits(text)
+    return value.lower() in text.lower()
+
+
+def build_script(transcript: Transcript) -> list[ScriptStep]:
+    """
+    Turn a transcript into a FakeRealtimeModel script.
+
+    The submit_lead call is placed right after the last parent turn that
+    mentions a value of the expected lead, which is where the model has
+    everything it is going to collect.
+    """
+    script = [ScriptStep("agent" if role == "agent" else "parent", text) for role, text in transcript.turns]
+    if not transcript.function_call:
+        return script
+
+    values = list(transcript.function_call.values())
+    if transcript.expected_lead:
+        values += [v for k, v in transcript.expected_lead.items() if k != "conversation_id"]
+    last_parent = max(
+        (i for i, step in enumerate(script) if step.role == "parent" and any(_mentions(step.text, v) for v in values)),
+        default=None,
+    )
+    if last_parent is None:
+        # Nothing matched: call the tool before the closing exchange
+        last_parent = max(len(script) - 4, 0)
+    script.insert(last_parent + 1, ScriptStep("tool", tool_name="submit_lead", arguments=transcript.function_call))
+    return script
+
+
+def check_lead(transcript: Transcript, lead: dict | None, conversation_id: str) -> tuple[list[str], list[str]]:
+    """
+    Compare a captured lead with the transcript's expected payload.
+
+    Returns:
+        (problems, not_captured): mismatches that fail the replay, and expected
+        fields submit_lead has no parameter for
+    """
+    if not transcript.function_call:
+        return ([] if lead is None else ["lead captured but none expected"]), []
+    if lead is None:
+        return ["no lead captured"], []
+
+    problems = []
+    if lead.get("conversation_id") != conversation_id:
+        problems.append(f"conversation_id: {lead.get('conversation_id')!r} != {conversation_id!r}")
+    for key, value in transcript.function_call.items():
+        if key not in lead:
+            problems.append(f"{key}: dropped by submit_lead")
+    expected = transcript.expected_lead or transcript.function_call
+    for key, value in lead.items():
+        if key != "conversation_id" and value != expected.get(key):
+            problems.append(f"{key}: {value!r} != {expected.get(key)!r}")
+    not_captured = [key for key in expected if key not in lead]
+    return problems, not_captured
+
+
+async def replay_one(transcript: Transcript, index: int, speed: float, prompt_variant: str, slot_tracker: str = "off") -> dict:
+    """Replay one transcript through the agent's tool and state layer."""
+    from livekit.agents import AgentSession, metrics
+
+    from agent.bant_agent import EdTechBANTAgent
+    from agent.prompt import GREETING_INSTRUCTIONS, PROMPT_VARIANTS, WRAPUP_HEADING
+    from agent.slots import SlotTracker
+    from leads import LeadSink, LeadSubmitter
+
+    class MemorySink(LeadSink):
+        def __init__(self):
+            self.leads: list[dict] = []
+
+        async def submit(self, lead: dict) -> str | None:
+            self.leads.append(lead)
+            return lead.get("conversation_id")
+
+    script = build_script(transcript)
+    conversation_id = f"replay-{index:06d}"
+    # The scripted model follows the slot tracker's wrap-up section like a compliant model would
+    model = FakeRealtimeModel(script, speed=speed, wrapup_marker=WRAPUP_HEADING)
+    sink = MemorySink()
+    submitter = LeadSubmitter(sink)
+
+    session = AgentSession(llm=model)
+    session.output.audio = NullAudioOutput()
+    agent = EdTechBANTAgent(instructions=PROMPT_VARIANTS[prompt_variant])
+    agent.conversation_id = conversation_id
+    agent.lead_submitter = submitter
+    tracker = agent.slot_tracker = SlotTracker(agent, mode=slot_tracker)
+
+    counts = {"parent_turns": 0, "tool_calls": 0, "turns_to_lead": None}
+    usage = metrics.UsageCollector()
+
+    @session.on("conversation_item_added")
+    def _on_item(ev):
+        if ev.item.type == "message":
+            tracker.observe(ev.item)
+            if ev.item.role == "user":
+                counts["parent_turns"] += 1
+
+    @session.on("function_tools_executed")
+    def _on_tools(ev):
+        counts["tool_calls"] += len(ev.function_calls)
+        if counts["turns_to_lead"] is None and any(c.name == "submit_lead" for c in ev.function_calls):
+            counts["turns_to_lead"] = counts["parent_turns"]
+
+    session.on("metrics_collected", lambda ev: usage.collect(ev.metrics))
+
+    started = time.perf_counter()
+    error = None
+    try:
+        await session.start(agent=agent)
+        session.generate_reply(instructions=GREETING_INSTRUCTIONS)
+        await asyncio.wait_for(model.finished.wait(), script_duration(script) / speed * 3 + 30)
+    except Exception as e:
+        error = repr(e)
+    finally:
+        await session.aclose()
+        tracker.finalize()
+        await submitter.aclose()
+    wall = time.perf_counter() - started
+
+    lead = sink.leads[-1] if sink.leads else None
+    if counts["turns_to_lead"] is None and tracker.mode == "submit" and tracker.wrapped_up_at is not None:
+        # The tracker submitted the lead itself when it wrapped up
+        counts["turns_to_lead"] = tracker.wrapped_up_at
+    problems, not_captured = check_lead(transcript, lead, conversation_id)
+    if error:
+        problems.insert(0, error)
+    summary = usage.get_summary()
+    return {
+        "name": transcript.name,
+        "ok": not problems,
+        "problems": problems,
+        "not_captured": not_captured,
+        "parent_turns": counts["parent_turns"],
+        "turns_to_lead": counts["turns_to_lead"],
+        "tool_calls": counts["tool_calls"],
+        "wrapped_up_at": tracker.wrapped_up_at,
+        "lead": lead,
+        "input_tokens": summary.llm_prompt_tokens,
+        "cached_tokens": summary.llm_prompt_cached_tokens,
+        "output_tokens": summary.llm_completion_tokens,
+        "call_seconds": script_duration(script),
+        "wall_seconds": wall,
+    }
+
+
+def _replay_chunk(jobs: list[tuple[int, str]], speed: float, prompt_variant: str, concurrency: int, slot_tracker: str) -> list[dict]:
+    # Runs in a pool process: one event loop replaying `concurrency` conversations at a time
+    from agent.timing import log_tool_latency, remove_tool_timing_hook
+    remove_tool_timing_hook(log_tool_latency)
+    transcripts: dict[str, Transcript] = {}
+
+    async def run() -> list[dict]:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(index: int, path: str) -> dict:
+            async with semaphore:
+                if path not in transcripts:
+                    transcripts[path] = parse_transcript(path)
+                return await replay_one(transcripts[path], index, speed, prompt_variant, slot_tracker)
+
+        return await asyncio.gather(*(one(index, path) for index, path in jobs))
+
+    return asyncio.run(run())
+
+
+def _corpus(paths: list[str]) -> list[str]:
+    files = []
+    for path in paths:
+        p = Path(path)
+        files.extend(sorted(str(f) for f in p.glob("*.md")) if p.is_dir() else [str(p)])
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay sample transcripts and check the captured leads")
+    parser.add_argument("paths", nargs="*", default=DEFAULT_CORPUS, help="Transcript files or directories of .md files")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay each transcript this many times")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Process pool size")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent replays per process")
+    parser.add_argument("--speed", type=float, default=1000.0, help="Replay speed-up over real time")
+    parser.add_argument("--prompt-variant", default=None, help="Prompt variant (default: PROMPT_VARIANT setting)")
+    parser.add_argument("--slot-tracker", default=None, help="Slot tracker mode: off, nudge or submit (default: SLOT_TRACKER setting)")
+    args = parser.parse_args()
+
+    from config.settings import PROMPT_VARIANT, SLOT_TRACKER
+    prompt_variant = args.prompt_variant or PROMPT_VARIANT
+    slot_tracker = args.slot_tracker or SLOT_TRACKER
+    files = _corpus(args.paths)
+    for path in files:
+        # Fail fast on unparseable transcripts before starting the pool
+        parse_transcript(path)
+
+    jobs = [(i, path) for i, path in enumerate(files * args.repeat)]
+    workers = max(1, min(args.workers, len(jobs)))
+    chunks = [jobs[i::workers] for i in range(workers)]
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_replay_chunk, chunk, args.speed, prompt_variant, args.concurrency, slot_tracker) for chunk in chunks]
+        results = [result for future in futures for result in future.result()]
+    elapsed = time.perf_counter() - started
+
+    print("=" * 96)
+    print(f"Replay: {len(files)} transcripts x {args.repeat}, {workers} processes, speed x{args.speed:g}, prompt '{prompt_variant}', slot tracker '{slot_tracker}'")
+    print("=" * 96)
+    print(f"{'transcript':<36} {'runs':>5} {'ok':>5} {'turns':>6} {'to lead':>8} {'tools':>6} {'in tok':>8} {'out tok':>8} {'call s':>7} {'wall ms':>8}")
+    by_name: dict[str, list[dict]] = {}
+    for result in results:
+        by_name.setdefault(result["name"], []).append(result)
+    for name, runs in by_name.items():
+        first = runs[0]
+        walls = [r["wall_seconds"] for r in runs]
+        print(
+            f"{name:<36} {len(runs):>5} {sum(r['ok'] for r in runs):>5} {first['parent_turns']:>6} "
+            f"{first['turns_to_lead'] if first['turns_to_lead'] is not None else '-':>8} {first['tool_calls']:>6} "
+            f"{first['input_tokens']:>8,} {first['output_tokens']:>8,} {first['call_seconds']:>7.1f} "
+            f"{percentile(walls, 50) * 1000:>8.1f}"
+        )
+        if first["not_captured"]:
+            print(f"    expected fields submit_lead does not capture: {', '.join(first['not_captured'])}")
+    print("-" * 96)
+
+    walls = [r["wall_seconds"] for r in results]
+    leads = [r["turns_to_lead"] for r in results if r["turns_to_lead"] is not None]
+    print(f"Conversations: {len(results)} in {elapsed:.2f}s ({len(results) / elapsed:,.1f}/s)")
+    print(f"Wall time per conversation: p50 {percentile(walls, 50) * 1000:.1f} ms, p95 {percentile(walls, 95) * 1000:.1f} ms")
+    if leads:
+        print(f"Turns to lead: mean {sum(leads) / len(leads):.1f}, max {max(leads)}")
+    print(f"Tool calls per conversation: mean {sum(r['tool_calls'] for r in results) / len(results):.2f}")
+
+    failures = [r for r in results if not r["ok"]]
+    if failures:
+        print(f"FAILED: {len(failures)} conversations")
+        for result in failures[:10]:
+            print(f"    {result['name']}: {'; '.join(result['problems'])}")
+    print("=" * 96)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
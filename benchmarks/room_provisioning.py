@@ -0,0 +1,144 @@
+"""
+Bulk room provisioning benchmark.
+
+Provisions `--calls` campaign rooms against a local stand-in RoomService
+(config/room_service_stub.py) with `--latency-ms` of server latency and
+`--fail-rate` of injected 503s:
+  - one at a time: create_room() with a fresh client per call, plus
+    create_client_token(), the way a script looping over generate_token.py
+    and the room API would; timed on `--baseline-calls` calls and extrapolated
+  - bulk: RoomProvisioner.provision() with `--concurrency` workers over one
+    pooled client, retries and a JSONL manifest
+
+and, separately, client tokens per second minted with the SDK's AccessToken
+vs TokenMinter batches (verified with the SDK's TokenVerifier).
+
+Usage:
+    python -m benchmarks.room_provisioning [--calls 5000] [--concurrency 32] [--latency-ms 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from livekit import api
+
+_KEY = "bench-key"
+_SECRET = "bench-secret-bench-secret-bench-secret"
+
+
+async def one_at_a_time(calls: int, url: str) -> tuple[float, int]:
+    """Seconds and attempts for `calls` rooms, one at a time, each failure retried at once."""
+    from config.token_generator import create_client_token, create_room, generate_conversation_id
+
+    attempts = 0
+    started = time.perf_counter()
+    for i in range(calls):
+        conversation_id = generate_conversation_id()
+        for _ in range(5):
+            attempts += 1
+            try:
+                # What create_room() does without a client, pointed at the stand-in
+                async with api.LiveKitAPI(url, _KEY, _SECRET) as lkapi:
+                    await create_room(f"serial-{i:06d}", conversation_id, lkapi=lkapi)
+                break
+            except api.TwirpError:
+                continue
+        create_client_token(f"serial-{i:06d}", f"parent-{i:06d}", conversation_id=conversation_id)
+    return time.perf_counter() - started, attempts
+
+
+async def bulk(calls: int, args, url: str, manifest: str) -> dict:
+    from config.provisioning import RoomProvisioner, campaign_calls
+
+    contacts = ((f"parent-{i:06d}", None) for i in range(calls))
+    async with RoomProvisioner(url, _KEY, _SECRET, concurrency=args.concurrency, rate=args.rate,
+                               backoff=0.05) as provisioner:
+        return await provisioner.provision(campaign_calls("bench", contacts), manifest)
+
+
+def mint_rates(count: int) -> tuple[float, float, bool]:
+    """Tokens/s for create_client_token() and TokenMinter, and whether the minted tokens verify."""
+    from config.token_generator import TokenMinter, create_client_token
+
+    calls = [(f"room-{i}", f"parent-{i}", None, f"conv-{i}") for i in range(count)]
+    started = time.perf_counter()
+    for room, identity, name, conversation_id in calls:
+        create_client_token(room, identity, name, conversation_id)
+    sdk = count / (time.perf_counter() - started)
+
+    minter = TokenMinter(_KEY, _SECRET)
+    started = time.perf_counter()
+    tokens = minter.mint(calls)
+    batch = count / (time.perf_counter() - started)
+
+    verifier = api.TokenVerifier(_KEY, _SECRET)
+    claims = verifier.verify(tokens[-1])
+    room, identity, _, conversation_id = calls[-1]
+    verified = (
+        claims.identity == identity
+        and claims.video.room == room
+        and json.loads(claims.room_config.agents[0].metadata)["conversation_id"] == conversation_id
+    )
+    return sdk, batch, verified
+
+
+async def run(args) -> None:
+    from config.room_service_stub import start_room_service_stub
+
+    stub, runner, url = await start_room_service_stub(latency_ms=args.latency_ms, fail_rate=args.fail_rate)
+    try:
+        serial_seconds, serial_attempts = await one_at_a_time(args.baseline_calls, url)
+        serial_connections = stub.connections
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = os.path.join(tmp, "campaign.jsonl")
+            result = await bulk(args.calls, args, url, manifest)
+            with open(manifest, encoding="utf-8") as f:
+                lines = sum(1 for _ in f)
+        bulk_connections = stub.connections - serial_connections
+    finally:
+        await runner.cleanup()
+    sdk_rate, batch_rate, verified = mint_rates(args.tokens)
+
+    serial_rate = args.baseline_calls / serial_seconds
+    bulk_rate = (result["ok"] + result["failed"]) / result["seconds"]
+    print("=" * 84)
+    print(f"Room provisioning: {args.calls:,} calls, server latency {args.latency_ms:g} ms, "
+          f"{args.fail_rate:.0%} injected failures")
+    print("=" * 84)
+    print(f"{'mode':<26} {'rooms/s':>9} {'time for ' + format(args.calls, ','):>16} {'connections':>12} "
+          f"{'retries':>8} {'failed':>7}")
+    print(f"{'one at a time':<26} {serial_rate:>9,.0f} {args.calls / serial_rate:>15,.1f}s "
+          f"{serial_connections * args.calls / args.baseline_calls:>12,.0f} "
+          f"{(serial_attempts - args.baseline_calls) * args.calls / args.baseline_calls:>8,.0f} {'-':>7}")
+    print(f"{'bulk, ' + str(args.concurrency) + ' in flight':<26} {bulk_rate:>9,.0f} {result['seconds']:>15,.1f}s "
+          f"{bulk_connections:>12,} {result['retries']:>8,} {result['failed']:>7,}")
+    print(f"  (one at a time: measured on {args.baseline_calls:,} calls, scaled to {args.calls:,})")
+    print("-" * 84)
+    print(f"Manifest:                  {lines:,} lines ({result['ok']:,} ok)")
+    print(f"Speed-up:                  {bulk_rate / serial_rate:,.0f}x")
+    print(f"Client tokens/s:           {sdk_rate:,.0f} SDK AccessToken, {batch_rate:,.0f} TokenMinter "
+          f"({batch_rate / sdk_rate:.1f}x); minted tokens verify: {'yes' if verified else 'NO'}")
+    print("=" * 84)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk room provisioning against a local RoomService")
+    parser.add_argument("--calls", type=int, default=5000, help="Campaign calls to provision in bulk")
+    parser.add_argument("--baseline-calls", type=int, default=200, help="Calls for the one-at-a-time baseline")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight for the bulk run")
+    parser.add_argument("--rate", type=float, default=0.0, help="Requests per second for the bulk run (0: unlimited)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Stand-in server latency per request")
+    parser.add_argument("--fail-rate", type=float, default=0.02, help="Fraction of requests answered with 503")
+    parser.add_argument("--tokens", type=int, default=20000, help="Tokens per minting measurement")
+    args = parser.parse_args()
+
+    # Settings are read at import time
+    os.environ.update({"LIVEKIT_API_KEY": _KEY, "LIVEKIT_API_SECRET": _SECRET})
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
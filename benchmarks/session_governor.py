@@ -0,0 +1,240 @@
+"""
+Session governor: call time and tokens saved on calls that go nowhere.
+
+Replays scripted calls through an AgentSession running EdTechBANTAgent, the
+slot tracker and the SessionGovernor (runner/governor.py), once with every
+cap off and once per cap:
+  - stalled:  the parent keeps deflecting for many turns before giving any
+              detail (cut by max_stale_turns)
+  - rambling: the parent gives every detail, but only after several long
+              side questions each (cut by max_minutes or max_tokens)
+  - normal:   conversation_sample_minimal.md, which no cap should cut
+
+The scripted model follows the governor's closing instructions the way a
+compliant model would. The report shows the real-time call seconds and the
+model tokens each call used, and the cut reason. It also times the per-event
+work the governor adds to metrics_collected.
+
+Usage:
+    python -m benchmarks.session_governor [--speed 200] [--max-minutes 3] [--max-tokens 30000] [--max-stale-turns 6]
+"""
+import argparse
+import asyncio
+import time
+
+from .fake_realtime import FakeRealtimeModel, NullAudioOutput, ScriptStep, script_duration
+from .load_test import DEFAULT_SCRIPT
+
+_DEFLECT = [
+    ("Before that, what exactly does your company do? I get a lot of these calls.",
+     "Of course! We offer live online tutoring and exam preparation with experienced teachers, small batches and regular progress reports for parents. Which class is your child currently in?"),
+    ("Hmm, I'm not sure I want to share that yet. How is this different from the coaching centre near us?",
+     "That's a fair question. Our sessions are one on one or in small groups, the timings are flexible and every class is recorded so your child can revise later. Could you tell me which class your child is in?"),
+    ("I need to think about it. Are your teachers any good?",
+     "Our teachers are subject experts with several years of experience, and each one is reviewed by parents after every month. Which class is your child in, so I can suggest the right program?"),
+]
+_SIDE_QUESTIONS = [
+    ("By the way, do you also help with sports coaching or music lessons? My daughter is interested in those as well.",
+     "We focus on academics, so we don't offer sports or music lessons, but many parents pair our tutoring with local academies. I'm happy to tell you more about the academic programs we run for every class."),
+    ("And what about summer camps, do you run any of those during the holidays?",
+     "We run short holiday workshops on topics like coding, public speaking and science experiments, which many students enjoy. The schedule is shared a few weeks before the holidays start."),
+    ("One more thing, my neighbour's son joined some online course last year and didn't like it. What happens if we are not happy?",
+     "We offer a free trial class, and if your child isn't comfortable with a teacher we can switch them at no cost. Our counselors also check in regularly to make sure things are going well."),
+]
+
+
+def stalled_script(rounds: int) -> list[ScriptStep]:
+    """The parent deflects for `rounds` turns before answering; the lead comes at the very end."""
+    script = [DEFAULT_SCRIPT[0], DEFAULT_SCRIPT[1],
+              ScriptStep("agent", "I'd be happy to help! Which class is your child currently in?")]
+    for i in range(rounds):
+        parent, agent = _DEFLECT[i % len(_DEFLECT)]
+        script += [ScriptStep("parent", parent), ScriptStep("agent", agent)]
+    return script + DEFAULT_SCRIPT[3:]
+
+
+def rambling_script(side_questions: int) -> list[ScriptStep]:
+    """The parent asks `side_questions` long side questions before each detail they give."""
+    script = []
+    asked = 0
+    for i, step in enumerate(DEFAULT_SCRIPT):
+        # Every parent answer after the opening line carries a lead detail
+        if step.role == "parent" and i > 1 and asked < 3 * side_questions:
+            question = DEFAULT_SCRIPT[i - 1]
+            for _ in range(side_questions):
+                parent, agent = _SIDE_QUESTIONS[asked % len(_SIDE_QUESTIONS)]
+                script += [ScriptStep("parent", parent), ScriptStep("agent", f"{agent} {question.text}")]
+                asked += 1
+        script.append(step)
+    return script
+
+
+async def replay(script: list[ScriptStep], index: int, args, caps: dict, activity: dict | None = None) -> dict:
+    """
+    Replay one call with the given governor caps; returns call seconds, tokens and the cut reason.
+
+    Args:
+        activity: ActivityMonitor arguments (real-time seconds) to run one next to the governor
+    """
+    from livekit.agents import AgentSession, metrics
+
+    from agent.bant_agent import EdTechBANTAgent
+    from agent.prompt import GREETING_INSTRUCTIONS, PROMPT_VARIANTS, WRAPUP_HEADING
+    from agent.slots import SlotTracker
+    from config.settings import PROMPT_VARIANT
+    from runner.activity import ActivityMonitor
+    from runner.governor import SessionGovernor
+
+    model = FakeRealtimeModel(script, speed=args.speed, wrapup_marker=WRAPUP_HEADING)
+    session = AgentSession(llm=model)
+    session.output.audio = NullAudioOutput()
+    agent = EdTechBANTAgent(instructions=PROMPT_VARIANTS[PROMPT_VARIANT])
+    agent.conversation_id = f"governor-{index:05d}"
+    tracker = agent.slot_tracker = SlotTracker(agent)
+    closed = asyncio.Event()
+    # Minutes are real-time minutes, so the wall-clock cap shrinks with the replay speed
+    governor = SessionGovernor(
+        session, tracker,
+        max_tokens=caps.get("max_tokens", 0),
+        max_minutes=caps.get("max_minutes", 0) / args.speed,
+        max_stale_turns=caps.get("max_stale_turns", 0),
+        closing_timeout=30 / args.speed,
+        shutdown=lambda reason: closed.set(),
+    )
+    monitor = None
+    if activity is not None:
+        monitor = ActivityMonitor(session, governor, **{
+            name: value / args.speed if name.endswith("_after") else value for name, value in activity.items()
+        })
+        session.on("user_state_changed", lambda ev: monitor.user_state(ev.new_state))
+        session.on("agent_state_changed", lambda ev: monitor.agent_state(ev.new_state))
+    usage = metrics.UsageCollector()
+
+    @session.on("conversation_item_added")
+    def _on_item(ev):
+        if monitor is not None:
+            monitor.observe(ev.item)
+        if ev.item.type == "message":
+            tracker.observe(ev.item)
+            governor.observe(ev.item)
+
+    @session.on("metrics_collected")
+    def _on_metrics(ev):
+        governor.on_metrics(ev.metrics)
+        usage.collect(ev.metrics)
+
+    session.on("close", lambda _: closed.set())
+
+    started = time.perf_counter()
+    await session.start(agent=agent)
+    governor.start()
+    if monitor is not None:
+        monitor.start()
+    session.generate_reply(instructions=GREETING_INSTRUCTIONS)
+    waits = [asyncio.create_task(model.finished.wait()), asyncio.create_task(closed.wait())]
+    await asyncio.wait(waits, timeout=script_duration(script) / args.speed * 3 + 30, return_when=asyncio.FIRST_COMPLETED)
+    seconds = (time.perf_counter() - started) * args.speed
+    completed = waits[0].done()
+    for wait in waits:
+        wait.cancel()
+    await session.aclose()
+    governor.close()
+    if monitor is not None:
+        monitor.close()
+    tracker.finalize()
+    summary = usage.get_summary()
+    return {
+        "seconds": seconds,
+        "tokens": summary.llm_prompt_tokens + summary.llm_completion_tokens,
+        "parent_turns": tracker.parent_turns,
+        "cut_reason": governor.cut_reason,
+        "completed": completed,
+        "reprompts": monitor.total_reprompts if monitor is not None else 0,
+        "reclaimed_seconds": monitor.reclaimed_seconds * args.speed if monitor is not None else 0.0,
+    }
+
+
+def time_on_metrics(events: int) -> tuple[float, float]:
+    """Nanoseconds per metrics event for the governor's token check and for the UsageCollector, for scale."""
+    from livekit.agents import metrics
+    from livekit.agents.metrics.base import Metadata
+
+    from runner.governor import SessionGovernor
+
+    ev = metrics.RealtimeModelMetrics(
+        label="bench", request_id="r", timestamp=0.0, duration=1.0, ttft=0.2, cancelled=False,
+        input_tokens=1200, output_tokens=300, total_tokens=1500, tokens_per_second=300.0,
+        input_token_details=metrics.RealtimeModelMetrics.InputTokenDetails(
+            audio_tokens=200, text_tokens=1000, image_tokens=0, cached_tokens=800, cached_tokens_details=None,
+        ),
+        output_token_details=metrics.RealtimeModelMetrics.OutputTokenDetails(text_tokens=50, audio_tokens=250, image_tokens=0),
+        metadata=Metadata(model_name="bench", model_provider="local"),
+    )
+    governor = SessionGovernor(session=None, max_tokens=1 << 62, max_minutes=0)
+    started = time.perf_counter_ns()
+    for _ in range(events):
+        governor.on_metrics(ev)
+    governor_ns = (time.perf_counter_ns() - started) / events
+    collector = metrics.UsageCollector()
+    started = time.perf_counter_ns()
+    for _ in range(events):
+        collector.collect(ev)
+    return governor_ns, (time.perf_counter_ns() - started) / events
+
+
+async def run(args) -> None:
+    from agent.timing import log_tool_latency, remove_tool_timing_hook
+    from .replay import build_script, parse_transcript
+    remove_tool_timing_hook(log_tool_latency)
+
+    scripts = {
+        "stalled": stalled_script(args.rounds),
+        "rambling": rambling_script(args.side_questions),
+        "normal": build_script(parse_transcript("conversation_sample_minimal.md")),
+    }
+    configs = {
+        "off": {},
+        "stale turns": {"max_stale_turns": args.max_stale_turns},
+        "minutes": {"max_minutes": args.max_minutes},
+        "tokens": {"max_tokens": args.max_tokens},
+    }
+
+    print("=" * 84)
+    print(f"Session governor: caps {args.max_stale_turns} stale turns, {args.max_minutes:g} min, "
+          f"{args.max_tokens:,} tokens; speed x{args.speed:g}")
+    print("=" * 84)
+    print(f"{'call':<10} {'caps':<12} {'call s':>8} {'tokens':>10} {'parent turns':>13} {'cut':>14} {'saved':>16}")
+    index = 0
+    for name, script in scripts.items():
+        baseline = None
+        for label, caps in configs.items():
+            index += 1
+            result = await replay(script, index, args, caps)
+            baseline = baseline or result
+            saved = ""
+            if result["cut_reason"]:
+                saved = (f"{1 - result['seconds'] / baseline['seconds']:.0%} s, "
+                         f"{1 - result['tokens'] / baseline['tokens']:.0%} tok")
+            print(f"{name:<10} {label:<12} {result['seconds']:>8.0f} {result['tokens']:>10,} "
+                  f"{result['parent_turns']:>13} {result['cut_reason'] or '-':>14} {saved:>16}")
+    print("-" * 84)
+    governor_ns, collector_ns = time_on_metrics(args.events)
+    print(f"on_metrics per event:      {governor_ns:,.0f} ns (UsageCollector.collect: {collector_ns:,.0f} ns)")
+    print("=" * 84)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure call time and tokens the session governor saves")
+    parser.add_argument("--speed", type=float, default=200.0, help="Replay speed-up over real time")
+    parser.add_argument("--rounds", type=int, default=20, help="Deflections in the stalled call")
+    parser.add_argument("--side-questions", type=int, default=4, help="Side questions before each detail in the rambling call")
+    parser.add_argument("--max-stale-turns", type=int, default=6)
+    parser.add_argument("--max-minutes", type=float, default=3.0, help="Real-time minutes")
+    parser.add_argument("--max-tokens", type=int, default=30_000)
+    parser.add_argument("--events", type=int, default=200_000, help="Metrics events for the overhead timing")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Slot tracker on/off: turns, tokens and leads per call.
+
+Replays the sample transcripts with the slot tracker off, in "nudge" mode
+and in "submit" mode (see agent/slots.py). The scripted model follows the
+tracker's wrap-up section the way a compliant model would, so the report
+shows how many parent turns and model tokens a call saves once every slot
+is known, and how closely the tracker's own values match the expected lead
+when it submits it.
+
+It then cuts every transcript short after half of its parent turns, as if
+the parent hung up, and counts the partial leads persisted with the
+tracker on and off.
+
+Usage:
+    python -m benchmarks.slot_tracker [transcripts ...] [--repeat 5]
+"""
+import argparse
+import asyncio
+from dataclasses import replace
+
+from agent.slots import SLOT_TRACKER_MODES
+from config.settings import PROMPT_VARIANT
+from .replay import DEFAULT_CORPUS, Transcript, parse_transcript, replay_one
+
+
+def dropped_early(transcript: Transcript) -> Transcript:
+    """The transcript cut off after half of its parent turns, with no lead expected."""
+    parent_turns = [i for i, (role, _) in enumerate(transcript.turns) if role == "parent"]
+    cut = parent_turns[len(parent_turns) // 2 - 1] + 1 if len(parent_turns) > 1 else len(transcript.turns)
+    return replace(transcript, turns=transcript.turns[:cut], function_call=None, expected_lead=None)
+
+
+def field_accuracy(transcript: Transcript, lead: dict | None) -> float:
+    """Fraction of the expected submit_lead fields the captured lead matches."""
+    expected = transcript.function_call or {}
+    if not expected:
+        return 1.0
+    if lead is None:
+        return 0.0
+    return sum(lead.get(key) == value for key, value in expected.items()) / len(expected)
+
+
+async def run(args) -> None:
+    from agent.timing import log_tool_latency, remove_tool_timing_hook
+    remove_tool_timing_hook(log_tool_latency)
+
+    transcripts = [parse_transcript(path) for path in args.paths]
+    index = 0
+
+    async def replay_all(corpus: list[Transcript], mode: str) -> list[dict]:
+        nonlocal index
+        results = []
+        for _ in range(args.repeat):
+            for transcript in corpus:
+                index += 1
+                results.append((transcript, await replay_one(transcript, index, args.speed, args.prompt_variant, mode)))
+        return results
+
+    print("=" * 92)
+    print(f"Slot tracker: {len(transcripts)} transcripts x {args.repeat}, prompt '{args.prompt_variant}'")
+    print("=" * 92)
+    print(f"{'mode':<8} {'turns/call':>11} {'tools/call':>11} {'in tok/call':>12} {'out tok/call':>13} "
+          f"{'leads':>6} {'field match':>12}")
+    for mode in SLOT_TRACKER_MODES:
+        results = await replay_all(transcripts, mode)
+        n = len(results)
+        leads = sum(r["lead"] is not None for _, r in results)
+        accuracy = sum(field_accuracy(t, r["lead"]) for t, r in results) / n
+        print(
+            f"{mode:<8} {sum(r['parent_turns'] for _, r in results) / n:>11.1f} "
+            f"{sum(r['tool_calls'] for _, r in results) / n:>11.2f} "
+            f"{sum(r['input_tokens'] for _, r in results) / n:>12,.0f} "
+            f"{sum(r['output_tokens'] for _, r in results) / n:>13,.0f} "
+            f"{leads:>6} {accuracy:>11.0%}"
+        )
+    print("-" * 92)
+    for transcript in transcripts:
+        results = {mode: (await replay_all([transcript], mode))[0][1] for mode in SLOT_TRACKER_MODES}
+        turns = ", ".join(f"{mode} {r['parent_turns']}" for mode, r in results.items())
+        print(f"{transcript.name:<36} parent turns: {turns}; wrap-up after turn {results['nudge']['wrapped_up_at'] or '-'}")
+    print("-" * 92)
+
+    print("Calls dropped after half of the parent turns:")
+    dropped = [dropped_early(t) for t in transcripts]
+    for mode in ("off", "nudge"):
+        results = await replay_all(dropped, mode)
+        partial = [r["lead"] for _, r in results if r["lead"] is not None]
+        with_phone = sum(bool(lead.get("contact_phone")) for lead in partial)
+        print(f"{mode:<8} partial leads persisted: {len(partial)}/{len(results)} ({with_phone} with a phone number)")
+    print("=" * 92)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare turns, tokens and leads per call with the slot tracker on and off")
+    parser.add_argument("paths", nargs="*", default=DEFAULT_CORPUS, help="Transcripts to replay")
+    parser.add_argument("--repeat", type=int, default=3, help="Replays per transcript and mode")
+    parser.add_argument("--speed", type=float, default=1000.0, help="Replay speed-up over real time")
+    parser.add_argument("--prompt-variant", default=PROMPT_VARIANT, help="Prompt variant (default: PROMPT_VARIANT setting)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
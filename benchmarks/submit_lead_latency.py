@@ -0,0 +1,97 @@
+"""
+Tool-call-to-return latency of submit_lead, inline vs background persistence.
+
+Runs the real submit_lead tool against a sink with configurable latency (a
+stand-in for a slow outbox/CRM write) and reports the latency seen by the
+model, collected through the tool timing hook.
+
+Usage:
+    python -m benchmarks.submit_lead_latency [--calls 200] [--sink-latency-ms 150]
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from agent.timing import add_tool_timing_hook, remove_tool_timing_hook, log_tool_latency
+from agent.tools import submit_lead
+from leads import LeadSink, LeadSubmitter
+from leads import sink as lead_sink_module
+from .common import percentile
+
+
+class SlowSink(LeadSink):
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+        self.leads = 0
+        # Leads that reached the sink with the conversation_id of their session
+        self.attributed = 0
+
+    async def submit(self, lead: dict) -> str | None:
+        await asyncio.sleep(self.latency_ms / 1000)
+        self.leads += 1
+        self.attributed += bool(lead.get("conversation_id"))
+        return lead.get("conversation_id")
+
+
+async def measure(mode: str, calls: int, sink: SlowSink) -> tuple[list[float], float]:
+    latencies: list[float] = []
+
+    def hook(tool_name: str, seconds: float, conversation_id: str | None) -> None:
+        latencies.append(seconds)
+
+    submitter = LeadSubmitter(sink) if mode == "background" else None
+    # Inline mode persists through the process-wide sink
+    previous_sink, lead_sink_module._lead_sink = lead_sink_module._lead_sink, sink
+    add_tool_timing_hook(hook)
+    try:
+        for i in range(calls):
+            agent = SimpleNamespace(conversation_id=f"bench-{mode}-{i}")
+            if submitter is not None:
+                agent.lead_submitter = submitter
+            # Shaped like RunContext: the agent is only reachable as session.current_agent
+            context = SimpleNamespace(session=SimpleNamespace(current_agent=agent, userdata={}))
+            await submit_lead(
+                context,
+                child_class="8th grade",
+                subjects="Physics, Chemistry",
+                contact_phone="8512131516",
+                budget_range="Under ₹10,000 per month",
+            )
+        flush_start = time.perf_counter()
+        if submitter is not None:
+            await submitter.aclose()
+        flush_elapsed = time.perf_counter() - flush_start
+    finally:
+        remove_tool_timing_hook(hook)
+        lead_sink_module._lead_sink = previous_sink
+    return latencies, flush_elapsed
+
+
+async def run(args) -> None:
+    remove_tool_timing_hook(log_tool_latency)
+    print("=" * 60)
+    print(f"submit_lead latency ({args.calls} calls, sink latency {args.sink_latency_ms:.0f} ms)")
+    print("=" * 60)
+    for mode in ("inline", "background"):
+        sink = SlowSink(args.sink_latency_ms)
+        latencies, flush_elapsed = await measure(mode, args.calls, sink)
+        print(
+            f"{mode:<11} p50 {percentile(latencies, 50) * 1000:8.3f} ms   "
+            f"p99 {percentile(latencies, 99) * 1000:8.3f} ms   "
+            f"persisted {sink.leads}/{args.calls} ({sink.attributed} with conversation_id)   "
+            f"close flush {flush_elapsed:.2f} s"
+        )
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark submit_lead call-to-return latency")
+    parser.add_argument("--calls", type=int, default=200, help="Number of submit_lead calls per mode")
+    parser.add_argument("--sink-latency-ms", type=float, default=150.0, help="Simulated persistence latency")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Token service load benchmark.
+
+Starts the token service (config/token_service.py) in its own process and
+drives it with `--concurrency` keep-alive connections from this one:
+  - new visitors:       POST /token, every (room, identity) new, so every token is signed
+  - returning visitors: POST /token over `--visitors` identities, mostly served from the cache
+  - batch:              POST /tokens with `--batch` new visitors per request
+
+and compares it with the current way, one `python generate_token.py client
+--json` process per token. Requests and tokens per core are counted against
+the CPU time of the serving process only (the CLI: of the child processes),
+so the load generator sharing the machine does not skew them.
+
+Usage:
+    python -m benchmarks.token_service [--requests 20000] [--concurrency 32] [--cli-runs 10]
+"""
+import argparse
+import asyncio
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+from .common import percentile
+
+_ENV = {"LIVEKIT_API_KEY": "bench-key", "LIVEKIT_API_SECRET": "bench-secret-bench-secret-bench-secret",
+        "LIVEKIT_URL": "wss://bench.livekit.cloud", "TOKEN_SERVICE_API_KEY": ""}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(session: aiohttp.ClientSession, url: str) -> None:
+    for _ in range(200):
+        try:
+            async with session.get(f"{url}/stats") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.05)
+    raise RuntimeError("token service did not start")
+
+
+async def drive(session: aiohttp.ClientSession, url: str, bodies, concurrency: int) -> dict:
+    """Send every (path, body), `concurrency` at a time; server CPU seconds and latencies (ms)."""
+    async with session.get(f"{url}/stats") as response:
+        before = await response.json()
+    bodies = iter(bodies)
+    latencies: list[float] = []
+    tokens = 0
+
+    async def worker() -> None:
+        nonlocal tokens
+        for path, body in bodies:
+            started = time.perf_counter()
+            async with session.post(url + path, json=body) as response:
+                result = await response.json()
+                response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+            tokens += len(result["tokens"]) if "tokens" in result else 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - started
+    async with session.get(f"{url}/stats") as response:
+        after = await response.json()
+    return {
+        "requests": len(latencies),
+        "tokens": tokens,
+        "seconds": seconds,
+        "cpu": after["cpu_seconds"] - before["cpu_seconds"],
+        "hits": after["cache_hits"] - before["cache_hits"],
+        "latencies": latencies,
+    }
+
+
+def run_cli(runs: int) -> dict:
+    """One generate_token.py process per token, as the frontend does today."""
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started = time.perf_counter()
+    latencies = []
+    for i in range(runs):
+        t = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "generate_token.py", "client", "--room", f"cli-{i}", "--identity", f"parent-{i}", "--json"],
+            check=True, capture_output=True, env={**os.environ, **_ENV},
+        )
+        latencies.append((time.perf_counter() - t) * 1000)
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return {"requests": runs, "tokens": runs, "seconds": time.perf_counter() - started, "cpu": cpu,
+            "hits": 0, "latencies": latencies}
+
+
+async def run(args) -> dict[str, dict]:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "config.token_service", "--port", str(port)],
+        env={**os.environ, **_ENV}, stdout=subprocess.DEVNULL,
+    )
+    results = {}
+    try:
+        connector = aiohttp.TCPConnector(limit=args.concurrency)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await _wait_ready(session, url)
+            # Warm up the server's code paths and the connections
+            await drive(session, url, (("/token", {"room": "warm", "identity": f"w{i}"}) for i in range(500)),
+                        args.concurrency)
+            results["new visitors"] = await drive(
+                session, url,
+                (("/token", {"room": f"room-{i}", "identity": f"parent-{i}"}) for i in range(args.requests)),
+                args.concurrency)
+            results["returning visitors"] = await drive(
+                session, url,
+                (("/token", {"room": f"home-{i % args.visitors}", "identity": f"parent-{i % args.visitors}"})
+                 for i in range(args.requests)),
+                args.concurrency)
+            batches = max(1, args.requests // args.batch)
+            results[f"batch of {args.batch}"] = await drive(
+                session, url,
+                (("/tokens", {"requests": [{"room": f"batch-{b}-{i}", "identity": f"parent-{i}"}
+                                           for i in range(args.batch)]}) for b in range(batches)),
+                min(args.concurrency, 4))
+    finally:
+        server.terminate()
+        server.wait()
+    results["generate_token.py per token"] = run_cli(args.cli_runs)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the token service against the token CLI")
+    parser.add_argument("--requests", type=int, default=20000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight")
+    parser.add_argument("--visitors", type=int, default=1000, help="Distinct returning visitors")
+    parser.add_argument("--batch", type=int, default=100, help="Tokens per batch request")
+    parser.add_argument("--cli-runs", type=int, default=10, help="generate_token.py invocations")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    print("=" * 100)
+    print(f"Token service: {args.requests:,} requests per scenario, {args.concurrency} in flight, "
+          f"{os.cpu_count()} CPU(s)")
+    print("=" * 100)
+    print(f"{'scenario':<28} {'req/s':>8} {'req/core-s':>11} {'tokens/core-s':>14} {'cache hits':>11} "
+          f"{'p50 ms':>8} {'p99 ms':>8}")
+    for label, r in results.items():
+        print(f"{label:<28} {r['requests'] / r['seconds']:>8,.0f} {r['requests'] / r['cpu']:>11,.0f} "
+              f"{r['tokens'] / r['cpu']:>14,.0f} {r['hits'] / max(r['tokens'], 1):>11.0%} "
+              f"{percentile(r['latencies'], 50):>8.2f} {percentile(r['latencies'], 99):>8.2f}")
+    print("-" * 100)
+    cli = results["generate_token.py per token"]["tokens"] / results["generate_token.py per token"]["cpu"]
+    for label in ("new visitors", "returning visitors"):
+        r = results[label]
+        print(f"{label + ' vs CLI:':<28} {r['tokens'] / r['cpu'] / cli:,.0f}x tokens per core-second")
+    print("  (req/s shares the machine with the load generator; per core-s counts the server's CPU only)")
+    print("=" * 100)
+
+
+if __name__ == "__main__":
+    main()
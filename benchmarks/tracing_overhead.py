@@ -0,0 +1,85 @@
+"""
+Tracing overhead per session.
+
+Creates the spans one traced call produces (session root, metadata parsing,
+connect, session start, greeting, model turns and a submit_lead call) with
+tracing disabled, sampled out, and sampled into the JSON-lines file
+exporter, and reports the CPU cost per session in each configuration.
+
+Usage:
+    python -m benchmarks.tracing_overhead [--sessions 2000] [--turns 20]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from runner.tracing import JsonLinesSpanExporter
+
+
+def run_session(tracer: trace.Tracer, index: int, turns: int) -> None:
+    conversation_id = f"conv-{index}"
+    session_span = tracer.start_span("session", attributes={"job_id": f"job-{index}"})
+    parent = trace.set_span_in_context(session_span)
+    for name in ("parse_metadata", "connect", "session_start", "greeting"):
+        with tracer.start_as_current_span(name, context=parent, attributes={"conversation_id": conversation_id}):
+            pass
+    now = time.time_ns()
+    for turn in range(turns):
+        span = tracer.start_span(
+            "model_turn",
+            context=parent,
+            start_time=now + turn * 1_000_000,
+            attributes={"conversation_id": conversation_id, "input_tokens": 1200, "output_tokens": 80, "ttft": 0.4},
+        )
+        span.end(end_time=now + turn * 1_000_000 + 500_000)
+    with tracer.start_as_current_span("submit_lead", context=parent) as span:
+        span.set_attribute("conversation_id", conversation_id)
+    session_span.end()
+
+
+def measure(tracer: trace.Tracer, sessions: int, turns: int) -> float:
+    started = time.process_time()
+    for i in range(sessions):
+        run_session(tracer, i, turns)
+    return (time.process_time() - started) / sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tracing overhead per session")
+    parser.add_argument("--sessions", type=int, default=2000, help="Sessions per configuration")
+    parser.add_argument("--turns", type=int, default=20, help="Model turns per session")
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"Tracing overhead: {args.sessions} sessions x {args.turns} model turns")
+    print("=" * 72)
+    print(f"{'configuration':<32} {'CPU us/session':>16} {'spans written':>14}")
+
+    baseline = measure(trace.NoOpTracer(), args.sessions, args.turns)
+    print(f"{'disabled (no-op tracer)':<32} {baseline * 1e6:>16.1f} {0:>14}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rate in (0.0, 0.1, 1.0):
+            path = Path(tmp) / f"spans-{rate}.jsonl"
+            provider = TracerProvider(sampler=ParentBased(TraceIdRatioBased(rate)))
+            provider.add_span_processor(BatchSpanProcessor(JsonLinesSpanExporter(path), max_queue_size=4096))
+            per_session = measure(provider.get_tracer("benchmark"), args.sessions, args.turns)
+            # process_time counts the export thread too; flush the remaining spans so all export CPU is included
+            started = time.process_time()
+            provider.shutdown()
+            per_session += (time.process_time() - started) / args.sessions
+            written = sum(1 for _ in open(path)) if path.exists() else 0
+            print(f"{f'file exporter, sample rate {rate}':<32} {per_session * 1e6:>16.1f} {written:>14,}")
+    print("-" * 72)
+    print(f"A traced session creates {args.turns + 6} spans; spans beyond the processor queue (4096) are dropped")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Transcript search index benchmark.
+
+Writes `--conversations` synthetic sales-call transcripts (as
+transcripts/writer.py does, spread over 90 days) and queues them for indexing
+the way sessions do on close, in batches of `--batch`, with an update after
+each batch (transcripts/index.py). Then measures:
+  - queueing: add() latency per closed session
+  - updates:  conversations indexed per second, segment merges, index bytes per conversation
+  - queries:  support's queries (transcripts/search.py) against the index, vs reading and
+              matching every transcript file, with the results checked against that scan
+  - scale:    the same queries over `--scale` conversations (the index's segments copied
+              under new conversation IDs up to that size, then merged into full segments)
+
+Usage:
+    python -m benchmarks.transcript_index [--conversations 20000] [--batch 2000] [--scale 1000000]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .common import percentile
+
+_DAY = 86400.0
+_EXAMS = ["JEE", "NEET", "CUET", "board exams", "JEE Advanced", "Olympiad"]
+_SUBJECTS = ["physics", "chemistry", "maths", "biology"]
+_CITIES = ["Pune", "Jaipur", "Lucknow", "Patna", "Kota", "Indore", "Nagpur"]
+_AGENT = [
+    "Namaste! I'm calling from the academy about the {exam} programs. Is this a good time?",
+    "Which class is your child in right now, and which exam are they preparing for?",
+    "We have a {exam} batch starting next month with weekend classes and doubt sessions.",
+    "Would you like to book a free demo class this week?",
+    "Do you have a monthly budget in mind for coaching?",
+    "Our fee structure starts at {fee} per month, and there is a crash course at {fee2} for the full term.",
+    "Which subjects does your child find hardest?",
+    "We also have online classes if travelling to the centre in {city} is difficult.",
+    "Great, I'll share the details on WhatsApp and a counsellor will call you back.",
+    "Thank you for your time. Have a good day!",
+]
+_PARENT = [
+    "Yes, tell me. My {relation} is in class {grade}.",
+    "{pronoun} is preparing for {exam}, mainly {subject} is a problem.",
+    "Our budget is {budget} per month, not more than that.",
+    "We can spend around {budget}.",
+    "Is there a hostel? We live in {city}.",
+    "What is the fee for the crash course?",
+    "Can we do the demo class on Saturday?",
+    "We are also looking at {exam} coaching from other institutes.",
+    "Okay, send me the details.",
+    "I will discuss with my husband and call back.",
+]
+
+
+# Calls that must not match a query: (conversation ID, parent's turn, query)
+_KNOWN_MISSES = [
+    ("ffffffff-0000-4000-8000-000000000011",
+     "My son is in class 11, preparing for JEE. Our budget is 20000 per month.",
+     "parent:jee parent:budget parent:<5000"),
+]
+
+
+def _budget(rng: random.Random) -> str:
+    amount = rng.choice([2500, 3000, 3500, 4000, 4500, 5000, 6000, 8000, 10000, 12000, 15000])
+    style = rng.randrange(4)
+    if style == 0:
+        return f"₹{amount:,}"
+    if style == 1:
+        return f"{amount} rupees"
+    if style == 2 and amount % 1000 == 0:
+        return f"{amount // 1000}k"
+    return f"Rs {amount}"
+
+
+def synthetic_conversation(rng: random.Random, started_at: float) -> list[dict]:
+    """Transcript items of one call: the agent and the parent taking turns."""
+    exam = rng.choice(_EXAMS)
+    values = {
+        "exam": exam, "city": rng.choice(_CITIES), "subject": rng.choice(_SUBJECTS),
+        "grade": rng.choice([9, 10, 11, 12]), "relation": rng.choice(["son", "daughter"]),
+        "fee": f"₹{rng.choice([3500, 4500, 6000]):,}", "fee2": f"₹{rng.choice([15000, 25000, 40000]):,}",
+    }
+    values["pronoun"] = "He" if values["relation"] == "son" else "She"
+    items = []
+    t = started_at
+    for turn in range(rng.randint(4, 12)):
+        agent = _AGENT[0] if turn == 0 else rng.choice(_AGENT[1:])
+        parent = rng.choice(_PARENT)
+        for role, template in (("assistant", agent), ("user", parent)):
+            text = template.format(budget=_budget(rng), **values)
+            items.append({"i": len(items), "t": round(t, 3), "r": role, "x": text})
+            t += rng.uniform(3, 12)
+    return items
+
+
+def scan_files(paths: list[Path], conditions, same_turn: bool, since: float | None) -> set[str]:
+    """Conversations matching a query by reading and tokenizing every transcript, as grepping them would."""
+    from transcripts.index import number_term, role_code, tokenize
+
+    found = set()
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            items = [json.loads(line) for line in f]
+        if since and items[0]["t"] < since:
+            continue
+        turns = [(role_code(item["r"]), tokenize(item["x"])) for item in items]
+        met = []
+        for condition in conditions:
+            turns_met = set()
+            for n, (role, tokens) in enumerate(turns):
+                if condition.role is not None and role != condition.role:
+                    continue
+                if condition.terms:
+                    k = len(condition.terms)
+                    if any(tuple(tokens[p:p + k]) == condition.terms for p in range(len(tokens) - k + 1)):
+                        turns_met.add(n)
+                elif any(number_term(condition.low) <= token <= number_term(condition.high) for token in tokens):
+                    turns_met.add(n)
+            met.append(turns_met)
+        if same_turn:
+            if set.intersection(*met):
+                found.add(path.stem)
+        elif all(met):
+            found.add(path.stem)
+    return found
+
+
+def scale_index(source, target_dir: Path, conversations: int, segment_conversations: int):
+    """An index of `conversations` conversations made of copies of `source`'s segments under new IDs."""
+    from transcripts.index import TranscriptIndex, _load_segment, _write_segment
+
+    target = TranscriptIndex(target_dir, source.transcripts_dir, segment_conversations=segment_conversations)
+    target_dir.mkdir(parents=True)
+    segments = [_load_segment(s) for s in source._segments()]
+    made, copy = 0, 0
+    while made < conversations:
+        for segment in segments:
+            if made >= conversations:
+                break
+            arrays = dict(segment)
+            docs = np.array(segment["conversations"])
+            # The synthetic IDs start with four zeros; a copy puts its number there
+            docs["conversation_id"] = [b"%04x" % copy + cid[4:] for cid in docs["conversation_id"].tolist()]
+            arrays["conversations"] = docs
+            _write_segment(target_dir / f"seg-{time.time_ns()}-{copy:06d}", arrays)
+            made += len(docs)
+        copy += 1
+    target.update(optimize=True)
+    return target
+
+
+def time_queries(index, queries, repeats: int) -> list[tuple[float, float, int]]:
+    """(p50 ms, max ms, conversations found) per query."""
+    from transcripts.search import search
+
+    results = []
+    for text, same_turn, since in queries:
+        times, found = [], 0
+        for _ in range(repeats):
+            started = time.perf_counter()
+            found, _ = search(index, text, same_turn=same_turn, since=since, limit=20)
+            times.append(time.perf_counter() - started)
+        results.append((percentile(times, 50) * 1000, max(times) * 1000, found))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the transcript search index")
+    parser.add_argument("--conversations", type=int, default=20000, help="Synthetic transcripts written and indexed")
+    parser.add_argument("--batch", type=int, default=2000, help="Conversations queued per update")
+    parser.add_argument("--scale", type=int, default=1000000, help="Conversations in the scaled-up index (0: skip)")
+    parser.add_argument("--segment-conversations", type=int, default=50000, help="Full segment size")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per query")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        os.environ.update({"TRANSCRIPTS_DIR": str(tmp / "transcripts"), "TRANSCRIPT_INDEX_DIR": str(tmp / "index")})
+        from transcripts.index import TranscriptIndex
+        from transcripts.search import parse_query, search
+
+        rng = random.Random(7)
+        now = time.time()
+        transcripts = tmp / "transcripts"
+        transcripts.mkdir()
+        index = TranscriptIndex(tmp / "index", transcripts, segment_conversations=args.segment_conversations)
+        adds, updates, merged = [], [], 0
+        paths = []
+        for n in range(args.conversations):
+            conversation_id = f"{n:08x}-0000-4000-8000-{rng.getrandbits(48):012x}"
+            items = synthetic_conversation(rng, now - rng.uniform(0, 90 * _DAY))
+            path = transcripts / f"{conversation_id}.jsonl"
+            with open(path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+            paths.append(path)
+            started = time.perf_counter()
+            index.add(conversation_id)
+            adds.append(time.perf_counter() - started)
+            if (n + 1) % args.batch == 0 or n + 1 == args.conversations:
+                stats = index.update()
+                updates.append((stats["conversations"], stats["seconds"]))
+                merged += stats["merged"]
+        for conversation_id, parent, _ in _KNOWN_MISSES:
+            items = [{"i": 0, "t": round(now, 3), "r": "assistant", "x": _AGENT[0].format(exam="JEE")},
+                     {"i": 1, "t": round(now + 5, 3), "r": "user", "x": parent}]
+            path = transcripts / f"{conversation_id}.jsonl"
+            with open(path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+            paths.append(path)
+            index.add(conversation_id)
+        index.update()
+        index_stats = index.stats()
+        transcript_bytes = sum(p.stat().st_size for p in paths)
+
+        week = now - 7 * _DAY
+        queries = [
+            ("parent:jee parent:budget parent:<5000", False, None),
+            ("parent:budget parent:<5000", True, None),
+            ('agent:"demo class" parent:neet', False, None),
+            ("parent:hostel parent:cuet", False, week),
+            ('parent:"crash course"', False, week),
+        ]
+        small = time_queries(index, queries, args.repeats)
+        scans, correct = [], 0
+        for text, same_turn, since in queries:
+            started = time.perf_counter()
+            expected = scan_files(paths, parse_query(text), same_turn, since)
+            scans.append(time.perf_counter() - started)
+            _, hits = search(index, text, same_turn=same_turn, since=since)
+            found = {hit["conversation_id"] for hit in hits}
+            misses = {conversation_id for conversation_id, _, query in _KNOWN_MISSES if query == text}
+            correct += found == expected and not found & misses
+
+        large = None
+        if args.scale:
+            started = time.perf_counter()
+            scaled = scale_index(index, tmp / "scaled", args.scale, args.segment_conversations)
+            build = time.perf_counter() - started
+            scaled_stats = scaled.stats()
+            large = time_queries(scaled, queries, args.repeats)
+
+    indexed = sum(n for n, _ in updates)
+    seconds = sum(s for _, s in updates)
+    n = args.conversations
+    print("=" * 96)
+    print(f"Transcript index: {n:,} conversations ({transcript_bytes / 1e6:,.0f} MB of transcripts), "
+          f"updates every {args.batch:,}")
+    print("=" * 96)
+    print(f"Queueing on close: add() p50 {percentile(adds, 50) * 1e6:.0f} us, p99 {percentile(adds, 99) * 1e6:.0f} us")
+    print(f"Updates: {indexed:,} conversations in {seconds:.1f}s ({indexed / seconds:,.0f}/s), "
+          f"{merged} segments merged, {index_stats['segments']} segments left")
+    print(f"Index: {index_stats['bytes'] / 1e6:,.1f} MB, {index_stats['bytes'] / n:,.0f} bytes per conversation "
+          f"({index_stats['postings'] / n:,.0f} postings, {index_stats['terms']:,} terms)")
+    print("-" * 96)
+    header = f"{'query':<48} {'found':>8} {'p50 ms':>8} {'max ms':>8} {'scan ms':>10}"
+    print(header)
+    for (text, same_turn, since), (p50, worst, found), scan in zip(queries, small, scans):
+        label = text + (" --same-turn" if same_turn else "") + (" --last 7d" if since else "")
+        print(f"{label:<48} {found:>8,} {p50:>8.1f} {worst:>8.1f} {scan * 1000:>10,.0f}")
+    print(f"  results match the scan of every transcript, and leave out the {len(_KNOWN_MISSES)} known "
+          f"non-matches, for {correct}/{len(queries)} queries")
+    if large is not None:
+        print("-" * 96)
+        print(f"Scaled: {scaled_stats['conversations']:,} conversations in {scaled_stats['segments']} segments, "
+              f"{scaled_stats['bytes'] / 1e9:,.2f} GB (copied and merged in {build:.0f}s)")
+        print(f"{'query':<48} {'found':>8} {'p50 ms':>8} {'max ms':>8} {'scan est. s':>10}")
+        for (text, same_turn, since), (p50, worst, found), scan in zip(queries, large, scans):
+            label = text + (" --same-turn" if same_turn else "") + (" --last 7d" if since else "")
+            print(f"{label:<48} {found:>8,} {p50:>8.1f} {worst:>8.1f} {scan * args.scale / n:>10,.0f}")
+    print("=" * 96)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Transcript writer throughput vs event loop lag.
+
+Submits conversation items at increasing rates (as the session event
+handlers would) and measures event loop lag while the writer batches them
+to disk. Reports the highest rate whose p99 loop lag stays under the limit.
+
+Usage:
+    python -m benchmarks.transcript_writer [--start-rate 1000] [--lag-limit-ms 5] [--conversations 200]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+from transcripts import TranscriptWriter
+from .common import LoopLagMonitor, percentile
+
+TEXT = "Mainly Physics and Chemistry. She's struggling a bit with these subjects."
+TICK = 0.005
+
+
+async def run_rate(writer: TranscriptWriter, rate: int, duration: float, conversations: int) -> dict:
+    monitor = LoopLagMonitor(interval=0.001)
+    dropped_before = writer.dropped
+    monitor.start()
+    started = time.perf_counter()
+    sent = 0
+    while (elapsed := time.perf_counter() - started) < duration:
+        # Catch up to the offered rate, then yield until the next tick
+        target = int(rate * elapsed)
+        while sent < target:
+            writer.submit(f"conv-{sent % conversations}", "user" if sent % 2 else "assistant", TEXT)
+            sent += 1
+        await asyncio.sleep(TICK)
+    await writer.flush()
+    elapsed = time.perf_counter() - started
+    lags = await monitor.stop()
+    return {
+        "rate": rate,
+        "achieved": sent / elapsed,
+        "p50_lag_ms": percentile(lags, 50) * 1000,
+        "p99_lag_ms": percentile(lags, 99) * 1000,
+        "dropped": writer.dropped - dropped_before,
+    }
+
+
+async def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = TranscriptWriter(tmp, max_queue=args.queue_size)
+        writer.start()
+
+        print("=" * 72)
+        print(f"Transcript writer: {args.conversations} conversations, queue {args.queue_size}, lag limit {args.lag_limit_ms} ms")
+        print("=" * 72)
+        print(f"{'offered/s':>12} {'achieved/s':>12} {'p50 lag ms':>12} {'p99 lag ms':>12} {'dropped':>10}")
+        best = None
+        rate = args.start_rate
+        while rate <= args.max_rate:
+            result = await run_rate(writer, rate, args.duration, args.conversations)
+            print(
+                f"{result['rate']:>12,} {result['achieved']:>12,.0f} {result['p50_lag_ms']:>12.2f} "
+                f"{result['p99_lag_ms']:>12.2f} {result['dropped']:>10}"
+            )
+            if result["p99_lag_ms"] > args.lag_limit_ms:
+                break
+            best = result
+            rate *= 2
+        await writer.aclose()
+
+    print("-" * 72)
+    if best:
+        print(f"Max rate with p99 loop lag <= {args.lag_limit_ms} ms: {best['achieved']:,.0f} items/sec")
+    else:
+        print(f"Loop lag exceeded {args.lag_limit_ms} ms at the starting rate")
+    print(f"Writer stats: {writer.stats()}")
+    print("=" * 72)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transcript writer throughput vs event loop lag")
+    parser.add_argument("--start-rate", type=int, default=1000, help="First offered rate (items/sec), doubled each step")
+    parser.add_argument("--max-rate", type=int, default=2_000_000, help="Stop ramping at this rate")
+    parser.add_argument("--duration", type=float, default=2.0, help="Seconds per rate step")
+    parser.add_argument("--lag-limit-ms", type=float, default=5.0, help="p99 event loop lag limit")
+    parser.add_argument("--conversations", type=int, default=200, help="Concurrent conversations")
+    parser.add_argument("--queue-size", type=int, default=10000, help="Writer queue capacity")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
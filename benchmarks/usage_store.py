@@ -0,0 +1,145 @@
+"""
+Usage store benchmark.
+
+Fills a store with synthetic sessions (as sealed logs, the way job
+processes leave them) and measures:
+  - append latency of one session record through the live log
+  - compaction throughput into columnar segments
+  - query time of rolling-window totals, cost per prompt version and
+    p50/p95 tokens per call over the whole store, and over the last day
+  - the same totals computed by loading a JSON-lines export, on a sample
+
+Usage:
+    python -m benchmarks.usage_store [--sessions 20000000] [--segment-rows 1000000]
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from usage import UsageStore, make_record
+from usage.query import cost_by, token_percentiles, totals
+from usage.store import RECORD
+from .common import percentile
+
+_VERSIONS = np.array([b"full", b"lean", b"full-v2"])
+_DAY = 86400.0
+
+
+def synthetic_records(count: int, start: float, end: float, rng: np.random.Generator) -> np.ndarray:
+    records = np.zeros(count, dtype=RECORD)
+    records["conversation_id"] = np.char.add(b"conv-", rng.integers(0, 1 << 62, count).astype("S20"))
+    records["prompt_version"] = _VERSIONS[rng.integers(0, len(_VERSIONS), count)]
+    records["model"] = b"gpt-realtime"
+    records["started_at"] = np.sort(rng.uniform(start, end, count))
+    turns = rng.integers(4, 30, count)
+    records["turns"] = turns
+    records["duration"] = turns * rng.uniform(6, 12, count)
+    records["user_speech"] = records["duration"] * 0.35
+    records["agent_speech"] = records["duration"] * 0.45
+    records["input_text"] = turns * rng.integers(900, 1700, count)
+    records["cached_text"] = records["input_text"] * 0.7
+    records["input_audio"] = turns * rng.integers(50, 200, count)
+    records["cached_audio"] = records["input_audio"] // 2
+    records["output_text"] = turns * rng.integers(20, 60, count)
+    records["output_audio"] = turns * rng.integers(100, 400, count)
+    return records
+
+
+def fill(store: UsageStore, sessions: int, days: float, rng: np.random.Generator) -> None:
+    """Write sessions spread over the last `days` as sealed logs of segment_rows each."""
+    store.directory.mkdir(parents=True, exist_ok=True)
+    now = time.time()
+    step = store.segment_rows
+    for i, offset in enumerate(range(0, sessions, step)):
+        count = min(step, sessions - offset)
+        # Logs are sealed in time order, so each covers a slice of the period
+        start = now - days * _DAY * (1 - offset / sessions)
+        end = now - days * _DAY * (1 - (offset + count) / sessions)
+        synthetic_records(count, start, end, rng).tofile(store.directory / f"sealed-{i:020d}-0.log")
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def json_baseline(records: np.ndarray, path: Path) -> float:
+    """Seconds to load a JSON-lines export of `records` and sum its tokens."""
+    with open(path, "w") as f:
+        for row in records:
+            f.write(json.dumps({name: (row[name].decode() if isinstance(row[name], bytes) else row[name].item())
+                                for name in RECORD.names}) + "\n")
+    started = time.perf_counter()
+    total = 0
+    with open(path) as f:
+        for line in f:
+            usage = json.loads(line)
+            total += usage["input_text"] + usage["input_audio"] + usage["output_text"] + usage["output_audio"]
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the per-session usage store")
+    parser.add_argument("--sessions", type=int, default=20_000_000, help="Sessions in the store")
+    parser.add_argument("--days", type=float, default=90, help="Period the sessions are spread over")
+    parser.add_argument("--segment-rows", type=int, default=1_000_000, help="Sessions per segment")
+    parser.add_argument("--appends", type=int, default=20_000, help="Live log appends to time")
+    parser.add_argument("--json-sample", type=int, default=200_000, help="Sessions in the JSON-lines baseline")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        store = UsageStore(tmp / "usage", segment_rows=args.segment_rows)
+        _, fill_seconds = timed(fill, store, args.sessions, args.days, rng)
+        compaction, _ = timed(store.compact)
+
+        record = make_record(conversation_id="bench", prompt_version="full", model="gpt-realtime",
+                             started_at=time.time(), input_text=12_000, output_audio=3_000)
+        latencies = []
+        for _ in range(args.appends):
+            started = time.perf_counter_ns()
+            store.append(record)
+            latencies.append((time.perf_counter_ns() - started) / 1000)
+
+        now = time.time()
+        since = now - args.days * _DAY - 1
+        queries = {}
+        for label, start in (("all", since), ("last 24h", now - _DAY)):
+            window, t1 = timed(totals, store, start, now + 1)
+            hourly, t2 = timed(totals, store, start, now + 1, every=3600 if label != "all" else _DAY)
+            versions, t3 = timed(cost_by, store, start, now + 1)
+            tokens, t4 = timed(token_percentiles, store, start, now + 1)
+            queries[label] = (window, t1, len(hourly["start"]), t2, versions, t3, tokens, t4)
+
+        sample = synthetic_records(min(args.json_sample, args.sessions), since, now, rng)
+        json_seconds = json_baseline(sample, tmp / "usage.jsonl")
+        disk = sum(p.stat().st_size for p in (tmp / "usage").rglob("*") if p.is_file())
+
+    print("=" * 72)
+    print(f"Usage store: {args.sessions:,} sessions over {args.days:g} days (filled in {fill_seconds:.1f}s)")
+    print("=" * 72)
+    print(f"Compaction:                 {compaction['rows']:,} sessions in {compaction['seconds']:.1f}s "
+          f"({compaction['rows'] / compaction['seconds']:,.0f}/s), {compaction['segments']} segments")
+    print(f"On disk:                    {disk / 1024 / 1024:,.0f} MB ({disk / args.sessions:.0f} bytes/session)")
+    print(f"Append (one session):       p50 {percentile(latencies, 50):.1f} us, p99 {percentile(latencies, 99):.1f} us")
+    for label, (window, t1, buckets, t2, versions, t3, tokens, t4) in queries.items():
+        sessions = int(window["sessions"][0])
+        print(f"Window {label + ':':<20}{sessions:,} sessions, ${window['cost'][0]:,.0f}")
+        print(f"  totals                    {t1 * 1000:,.0f} ms ({sessions / t1 / 1e6:,.0f}M sessions/s); "
+              f"{buckets} buckets {t2 * 1000:,.0f} ms")
+        print(f"  cost per prompt version   {t3 * 1000:,.0f} ms ({len(versions)} versions)")
+        print(f"  p50/p95 tokens per call   {t4 * 1000:,.0f} ms (p95 {tokens['all']['total'][1]:,.0f} tokens)")
+    print(f"JSON-lines scan baseline:   {len(sample) / json_seconds:,.0f} sessions/s "
+          f"(~{args.sessions / (len(sample) / json_seconds):,.0f}s for the whole store)")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
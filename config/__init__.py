@@ -10,6 +10,13 @@ from .token_generator import (
     create_client_token,
     generate_conversation_id,
     create_room,
+    TokenMinter,
+)
+from .provisioning import (
+    CampaignCall,
+    ProvisionError,
+    RoomProvisioner,
+    campaign_calls,
 )
 
 __all__ = [
@@ -22,5 +29,10 @@ __all__ = [
     "create_client_token",
     "generate_conversation_id",
     "create_room",
+    "TokenMinter",
+    "CampaignCall",
+    "ProvisionError",
+    "RoomProvisioner",
+    "campaign_calls",
 ]
 
@@ -0,0 +1,435 @@
+"""
+Egress state index fed by LiveKit webhooks.
+
+LiveKit posts egress_started / egress_updated / egress_ended webhooks for
+every recording. This service verifies their signature, keeps the latest
+EgressInfo per egress_id, indexed by room, and answers list and status
+queries from memory, so scripts that watch hundreds of rooms do not call
+ListEgress in a loop. Only a stop calls the Egress API, over one pooled
+client. Webhooks can arrive late, twice or out of order. An update older
+than the one held is ignored, and a finished egress is never marked active
+again.
+
+The index is written to EGRESS_INDEX_SNAPSHOT_PATH (a ListEgressResponse) every
+EGRESS_INDEX_SNAPSHOT_SECONDS when it has changed, and on shutdown, and it is
+loaded again at start. Events missed while the service was down are caught up
+with `--sync`, one ListEgress call at start.
+
+Endpoints:
+    POST /webhook                  LiveKit webhook (Authorization: the signed webhook token)
+    GET  /egress?room=...&active=1 -> {"egresses": [<egress>, ...]}, newest first
+    GET  /egress/{egress_id}       -> <egress>, or 404
+    POST /egress/{egress_id}/stop  -> <egress> after StopEgress (409 if it already ended)
+    GET  /stats                    Webhook, query and API call counters
+
+    <egress> = {"egress_id", "room_name", "status", "active", "started_at", "ended_at",
+                "updated_at", "error", "files"}   (times in Unix seconds)
+
+With EGRESS_INDEX_API_KEY set, requests other than /webhook must send
+"Authorization: Bearer <key>".
+
+Point the LiveKit server's webhook URL at http://<host>:<port>/webhook.
+
+Usage:
+    python -m config.egress_index [--host 127.0.0.1] [--port 8091] [--sync]
+"""
+import argparse
+import asyncio
+import hmac
+import os
+import time
+from pathlib import Path
+
+from aiohttp import web
+from livekit import api
+
+from .settings import (
+    LIVEKIT_URL,
+    LIVEKIT_API_KEY,
+    LIVEKIT_API_SECRET,
+    EGRESS_INDEX_HOST,
+    EGRESS_INDEX_PORT,
+    EGRESS_INDEX_API_KEY,
+    EGRESS_INDEX_SNAPSHOT_PATH,
+    EGRESS_INDEX_SNAPSHOT_SECONDS,
+    EGRESS_INDEX_RETENTION_HOURS,
+)
+
+_ACTIVE = (api.EgressStatus.EGRESS_STARTING, api.EgressStatus.EGRESS_ACTIVE, api.EgressStatus.EGRESS_ENDING)
+_EGRESS_EVENTS = ("egress_started", "egress_updated", "egress_ended")
+
+
+def is_active(info: api.EgressInfo) -> bool:
+    """Whether the egress is still starting, recording or finishing."""
+    return info.status in _ACTIVE
+
+
+def _order(info: api.EgressInfo) -> tuple[bool, int, int]:
+    # Finished beats active, then the later update, then the later status
+    return not is_active(info), info.updated_at, info.status
+
+
+def _seconds(nanoseconds: int) -> float | None:
+    return nanoseconds / 1e9 if nanoseconds else None
+
+
+def egress_json(info: api.EgressInfo) -> dict:
+    """The JSON form of an egress served by the index."""
+    return {
+        "egress_id": info.egress_id,
+        "room_name": info.room_name,
+        "status": api.EgressStatus.Name(info.status),
+        "active": is_active(info),
+        "started_at": _seconds(info.started_at),
+        "ended_at": _seconds(info.ended_at),
+        "updated_at": _seconds(info.updated_at),
+        "error": info.error or None,
+        "files": [f.location or f.filename for f in info.file_results],
+    }
+
+
+class EgressIndex:
+    """
+    Latest EgressInfo per egress_id, with the egress IDs of each room.
+
+    Args:
+        retention_seconds: Finished egresses older than this are dropped by prune()
+    """
+
+    def __init__(self, retention_seconds: float = EGRESS_INDEX_RETENTION_HOURS * 3600):
+        self.retention_seconds = retention_seconds
+        self._egresses: dict[str, api.EgressInfo] = {}
+        # room -> egress IDs in the order they were first seen
+        self._rooms: dict[str, dict[str, None]] = {}
+        # Bumped on every change, so snapshots are only written when there is something new
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._egresses)
+
+    def update(self, info: api.EgressInfo) -> bool:
+        """
+        Record an egress's state unless the one held is newer.
+
+        Returns:
+            Whether the index changed
+        """
+        current = self._egresses.get(info.egress_id)
+        if current is not None and _order(info) <= _order(current):
+            return False
+        if current is not None and current.room_name != info.room_name:
+            self._forget(current)
+        self._egresses[info.egress_id] = info
+        self._rooms.setdefault(info.room_name, {})[info.egress_id] = None
+        self.version += 1
+        return True
+
+    def _forget(self, info: api.EgressInfo) -> None:
+        room = self._rooms.get(info.room_name)
+        if room is not None:
+            room.pop(info.egress_id, None)
+            if not room:
+                del self._rooms[info.room_name]
+
+    def get(self, egress_id: str) -> api.EgressInfo | None:
+        return self._egresses.get(egress_id)
+
+    def list(self, room_name: str | None = None, active: bool = False) -> list[api.EgressInfo]:
+        """Egresses of one room (or all), newest first; only the active ones if `active`."""
+        if room_name:
+            items = [self._egresses[egress_id] for egress_id in self._rooms.get(room_name, ())]
+        else:
+            items = list(self._egresses.values())
+        if active:
+            items = [info for info in items if is_active(info)]
+        items.sort(key=lambda info: info.started_at, reverse=True)
+        return items
+
+    def room_count(self) -> int:
+        return len(self._rooms)
+
+    def active_count(self) -> int:
+        return sum(1 for info in self._egresses.values() if is_active(info))
+
+    def prune(self, now: float | None = None) -> int:
+        """Drop finished egresses that ended more than retention_seconds ago; the number dropped."""
+        cutoff = int(((now if now is not None else time.time()) - self.retention_seconds) * 1e9)
+        expired = [
+            info for info in self._egresses.values()
+            if not is_active(info) and (info.ended_at or info.updated_at) < cutoff
+        ]
+        for info in expired:
+            del self._egresses[info.egress_id]
+            self._forget(info)
+        if expired:
+            self.version += 1
+        return len(expired)
+
+    def snapshot(self) -> bytes:
+        """The index as a serialized ListEgressResponse."""
+        return api.ListEgressResponse(items=self._egresses.values()).SerializeToString()
+
+    def restore(self, data: bytes) -> int:
+        """Merge a snapshot() into the index; the number of egresses read."""
+        items = api.ListEgressResponse.FromString(data).items
+        for info in items:
+            self.update(info)
+        return len(items)
+
+
+def _write_snapshot(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".tmp-{os.getpid()}-{path.name}")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class EgressIndexService:
+    """
+    The egress index's handlers, webhook verification, snapshots and Egress API client.
+
+    Args:
+        index: Egress index (a new EgressIndex by default)
+        url: LiveKit server URL, for StopEgress and --sync
+        api_key: LiveKit API key; webhooks are signed with it
+        api_secret: LiveKit API secret
+        auth_key: Bearer key required for queries and stops; empty disables the check
+        snapshot_path: Snapshot file; None disables snapshots
+        snapshot_seconds: Seconds between snapshots of a changed index
+    """
+
+    def __init__(
+        self,
+        index: EgressIndex | None = None,
+        url: str | None = LIVEKIT_URL,
+        api_key: str | None = LIVEKIT_API_KEY,
+        api_secret: str | None = LIVEKIT_API_SECRET,
+        auth_key: str = EGRESS_INDEX_API_KEY,
+        snapshot_path: str | Path | None = EGRESS_INDEX_SNAPSHOT_PATH,
+        snapshot_seconds: float = EGRESS_INDEX_SNAPSHOT_SECONDS,
+    ):
+        if not api_key or not api_secret:
+            raise ValueError("LIVEKIT_API_KEY and LIVEKIT_API_SECRET must be set")
+        self.index = index or EgressIndex()
+        self.url = url
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.auth_key = auth_key
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.snapshot_seconds = snapshot_seconds
+        self._receiver = api.WebhookReceiver(api.TokenVerifier(api_key, api_secret))
+        self._lkapi: api.LiveKitAPI | None = None
+        self._snapshot_task: asyncio.Task | None = None
+        self._saved_version = -1
+        self.webhooks = 0
+        self.rejected = 0
+        self.ignored = 0
+        self.stale = 0
+        self.queries = 0
+        self.api_calls = 0
+        self.snapshots = 0
+
+        if self.snapshot_path is not None and self.snapshot_path.exists():
+            count = self.index.restore(self.snapshot_path.read_bytes())
+            self._saved_version = self.index.version
+            print(f"Egress index: restored {count:,} egresses from {self.snapshot_path}")
+
+    def _client(self) -> api.LiveKitAPI:
+        # One client for the life of the service; its HTTP session keeps the connections open
+        if self._lkapi is None:
+            if not self.url:
+                raise ValueError("LIVEKIT_URL must be set")
+            self._lkapi = api.LiveKitAPI(self.url, self.api_key, self.api_secret)
+        return self._lkapi
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        if self.auth_key and request.path != "/webhook":
+            supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+            if not hmac.compare_digest(supplied.encode(), self.auth_key.encode()):
+                return web.json_response({"error": "unauthorized"}, status=401)
+        return await handler(request)
+
+    def receive(self, body: str, auth_token: str) -> bool:
+        """
+        Apply one webhook to the index.
+
+        Args:
+            body: The webhook's JSON body, as received
+            auth_token: The webhook's Authorization header
+
+        Returns:
+            Whether the index changed
+
+        Raises:
+            PermissionError: The signature does not match the body or the API key
+        """
+        try:
+            event = self._receiver.receive(body, auth_token)
+        except Exception as e:
+            # WebhookReceiver raises plain Exceptions (hash mismatch) as well as JWT and parse errors
+            self.rejected += 1
+            raise PermissionError(f"invalid webhook: {e}") from e
+        self.webhooks += 1
+        if event.event not in _EGRESS_EVENTS or not event.HasField("egress_info"):
+            self.ignored += 1
+            return False
+        changed = self.index.update(event.egress_info)
+        if not changed:
+            self.stale += 1
+        return changed
+
+    async def handle_webhook(self, request: web.Request) -> web.Response:
+        body = await request.text()
+        try:
+            self.receive(body, request.headers.get("Authorization", ""))
+        except PermissionError as e:
+            return web.json_response({"error": str(e)}, status=401)
+        return web.json_response({})
+
+    async def handle_list(self, request: web.Request) -> web.Response:
+        self.queries += 1
+        active = request.query.get("active", "").lower() in ("1", "true", "yes")
+        items = self.index.list(request.query.get("room") or None, active=active)
+        return web.json_response({"egresses": [egress_json(info) for info in items]})
+
+    async def handle_status(self, request: web.Request) -> web.Response:
+        self.queries += 1
+        info = self.index.get(request.match_info["egress_id"])
+        if info is None:
+            return web.json_response({"error": "unknown egress"}, status=404)
+        return web.json_response(egress_json(info))
+
+    async def handle_stop(self, request: web.Request) -> web.Response:
+        egress_id = request.match_info["egress_id"]
+        info = self.index.get(egress_id)
+        if info is not None and not is_active(info):
+            return web.json_response({**egress_json(info), "error": "egress already ended"}, status=409)
+        # Unknown egresses are tried too: one may have started before the index was running
+        self.api_calls += 1
+        try:
+            info = await self._client().egress.stop_egress(api.StopEgressRequest(egress_id=egress_id))
+        except api.TwirpError as e:
+            return web.json_response({"error": e.message, "code": e.code}, status=e.status or 502)
+        self.index.update(info)
+        return web.json_response(egress_json(self.index.get(egress_id) or info))
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def stats(self) -> dict:
+        return {
+            "egresses": len(self.index),
+            "active": self.index.active_count(),
+            "rooms": self.index.room_count(),
+            "webhooks": self.webhooks,
+            "rejected": self.rejected,
+            "ignored": self.ignored,
+            "stale": self.stale,
+            "queries": self.queries,
+            "api_calls": self.api_calls,
+            "snapshots": self.snapshots,
+        }
+
+    async def sync(self) -> int:
+        """Catch up with one ListEgress call; the number of egresses it returned."""
+        self.api_calls += 1
+        response = await self._client().egress.list_egress(api.ListEgressRequest())
+        for info in response.items:
+            self.index.update(info)
+        return len(response.items)
+
+    async def save_snapshot(self) -> bool:
+        """Write the index to snapshot_path if it changed since the last write."""
+        if self.snapshot_path is None or self.index.version == self._saved_version:
+            return False
+        version = self.index.version
+        # Serialized on the loop, so it is consistent; written on a thread
+        await asyncio.to_thread(_write_snapshot, self.snapshot_path, self.index.snapshot())
+        self._saved_version = version
+        self.snapshots += 1
+        return True
+
+    async def _run_snapshots(self) -> None:
+        while True:
+            await asyncio.sleep(self.snapshot_seconds)
+            try:
+                self.index.prune()
+                await self.save_snapshot()
+            except OSError as e:
+                print(f"Egress index snapshot failed: {e}")
+
+    async def _on_startup(self, app: web.Application) -> None:
+        self._snapshot_task = asyncio.create_task(self._run_snapshots())
+
+    async def _on_cleanup(self, app: web.Application) -> None:
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            await asyncio.gather(self._snapshot_task, return_exceptions=True)
+        await self.save_snapshot()
+        if self._lkapi is not None:
+            await self._lkapi.aclose()
+            self._lkapi = None
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post("/webhook", self.handle_webhook)
+        app.router.add_get("/egress", self.handle_list)
+        app.router.add_get("/egress/{egress_id}", self.handle_status)
+        app.router.add_post("/egress/{egress_id}/stop", self.handle_stop)
+        app.router.add_get("/stats", self.handle_stats)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+
+async def start_egress_index(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    **kwargs,
+) -> tuple[EgressIndexService, web.AppRunner, str]:
+    """
+    Start the egress index on the running event loop.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        **kwargs: Passed to EgressIndexService
+
+    Returns:
+        Tuple of (service, runner, base URL). Call `runner.cleanup()` to stop it and write a final snapshot.
+    """
+    service = EgressIndexService(**kwargs)
+    runner = web.AppRunner(service.create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return service, runner, f"http://{host}:{bound_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LiveKit egress index fed by webhooks")
+    parser.add_argument("--host", default=EGRESS_INDEX_HOST, help=f"Interface to bind (default: {EGRESS_INDEX_HOST})")
+    parser.add_argument("--port", type=int, default=EGRESS_INDEX_PORT, help=f"Port to bind (default: {EGRESS_INDEX_PORT})")
+    parser.add_argument("--sync", action="store_true", help="Catch up with one ListEgress call at start")
+    args = parser.parse_args()
+
+    service = EgressIndexService()
+
+    async def on_startup(app: web.Application) -> None:
+        if args.sync:
+            print(f"Egress index: synced {await service.sync():,} egresses from {service.url}")
+
+    app = service.create_app()
+    app.on_startup.insert(0, on_startup)
+    print(f"Egress index on http://{args.host}:{args.port} ({len(service.index):,} egresses, "
+          f"auth {'on' if service.auth_key else 'off'})")
+    web.run_app(app, host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
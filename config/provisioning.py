@@ -0,0 +1,282 @@
+"""
+Bulk room provisioning for outbound campaigns.
+
+Creates one room per call (with the agent dispatched into it) and mints the
+matching client token, for thousands of calls at a time:
+
+  - every CreateRoom request goes through one LiveKitAPI client on one
+    aiohttp session, whose connector keeps at most `concurrency` pooled
+    keep-alive connections to the server
+  - `concurrency` workers send the requests, paced by a shared rate limiter
+  - transient failures (connection errors, timeouts, Twirp unavailable /
+    resource_exhausted / internal) are retried with exponential backoff
+    and jitter, up to `max_attempts`; other errors fail that call only
+  - client tokens are minted by TokenMinter, one batch at a time, ahead of
+    the room requests that need them
+  - each call is written to a JSON-lines manifest as soon as it completes,
+    so a long campaign can be followed (and resumed) while it runs:
+
+    {"room", "identity", "name", "conversation_id", "status": "ok", "room_sid",
+     "token", "url", "attempts"}
+    {"room", ..., "status": "failed", "error", "attempts"}
+
+Room names are derived from the campaign name and the call's position, so
+re-running with resume=True skips the rooms a previous run provisioned.
+"""
+import asyncio
+import datetime
+import json
+import random
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+import aiohttp
+from livekit import api
+from livekit.api import TwirpError, TwirpErrorCode
+
+from .settings import (
+    LIVEKIT_URL,
+    LIVEKIT_API_KEY,
+    LIVEKIT_API_SECRET,
+    PROVISION_CONCURRENCY,
+    PROVISION_RATE,
+    PROVISION_MAX_ATTEMPTS,
+    PROVISION_TOKEN_TTL_HOURS,
+)
+from .token_generator import TokenMinter, create_room, generate_conversation_id
+
+# Twirp errors worth another attempt; anything else (bad request, auth) fails the call at once
+RETRYABLE_CODES = frozenset({
+    TwirpErrorCode.UNAVAILABLE,
+    TwirpErrorCode.RESOURCE_EXHAUSTED,
+    TwirpErrorCode.INTERNAL,
+    TwirpErrorCode.DEADLINE_EXCEEDED,
+    TwirpErrorCode.ABORTED,
+    TwirpErrorCode.UNKNOWN,
+})
+
+
+class ProvisionError(Exception):
+    """A room that could not be created; `attempts` were made."""
+
+    def __init__(self, room: str, attempts: int, error: BaseException):
+        super().__init__(f"{room}: {error}")
+        self.room = room
+        self.attempts = attempts
+        self.error = error
+
+
+@dataclass
+class CampaignCall:
+    """One outbound call: its room and the parent who will join it."""
+
+    room: str
+    identity: str
+    name: str | None = None
+    conversation_id: str | None = None
+
+
+def campaign_calls(campaign: str, contacts: Iterable[tuple[str, str | None]]) -> Iterable[CampaignCall]:
+    """
+    Calls for a campaign, one per (identity, name) contact.
+
+    Rooms are named "<campaign>-<position>", so the same contact list maps to the same rooms.
+    """
+    prefix = re.sub(r"[^A-Za-z0-9_-]+", "-", campaign).strip("-") or "campaign"
+    for index, (identity, name) in enumerate(contacts):
+        yield CampaignCall(f"{prefix}-{index:06d}", identity, name, generate_conversation_id())
+
+
+class RateLimiter:
+    """
+    Spaces acquisitions at least 1/rate seconds apart, across all tasks.
+
+    Args:
+        rate: Acquisitions per second; 0 disables the limit
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def acquire(self) -> None:
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def _retryable(error: BaseException) -> bool:
+    if isinstance(error, TwirpError):
+        return error.code in RETRYABLE_CODES or error.status >= 500 or error.status == 429
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+class RoomProvisioner:
+    """
+    Creates campaign rooms over one pooled LiveKit API client.
+
+    Use as an async context manager, or call aclose() when done.
+
+    Args:
+        url: LiveKit server URL
+        api_key: LiveKit API key
+        api_secret: LiveKit API secret
+        concurrency: Requests in flight (and pooled connections)
+        rate: CreateRoom requests per second, including retries; 0 disables the limit
+        max_attempts: Attempts per room before it is recorded as failed
+        token_ttl: Lifetime of the minted client tokens
+        backoff: Delay before the first retry (seconds); doubles per attempt, with jitter
+    """
+
+    def __init__(
+        self,
+        url: str | None = LIVEKIT_URL,
+        api_key: str | None = LIVEKIT_API_KEY,
+        api_secret: str | None = LIVEKIT_API_SECRET,
+        concurrency: int = PROVISION_CONCURRENCY,
+        rate: float = PROVISION_RATE,
+        max_attempts: int = PROVISION_MAX_ATTEMPTS,
+        token_ttl: datetime.timedelta = datetime.timedelta(hours=PROVISION_TOKEN_TTL_HOURS),
+        backoff: float = 0.2,
+    ):
+        if not url or not api_key or not api_secret:
+            raise ValueError("LIVEKIT_URL, LIVEKIT_API_KEY, and LIVEKIT_API_SECRET must be set")
+        self.url = url
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.minter = TokenMinter(api_key, api_secret, token_ttl)
+        self.limiter = RateLimiter(rate)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=concurrency),
+            timeout=aiohttp.ClientTimeout(total=30),
+        )
+        self.api = api.LiveKitAPI(url, api_key, api_secret, session=self._session)
+        self.retries = 0
+
+    async def __aenter__(self) -> "RoomProvisioner":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._session.close()
+
+    async def create_room(self, call: CampaignCall) -> tuple[dict, int]:
+        """
+        Create one call's room, retrying transient failures.
+
+        Returns:
+            (room info from create_room(), attempts made)
+
+        Raises:
+            ProvisionError: The last error was not retryable, or the attempts are used up
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            await self.limiter.acquire()
+            try:
+                return await create_room(call.room, call.conversation_id, lkapi=self.api), attempt
+            except Exception as e:
+                if attempt == self.max_attempts or not _retryable(e):
+                    raise ProvisionError(call.room, attempt, e) from e
+                self.retries += 1
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+
+    async def provision(
+        self,
+        calls: Iterable[CampaignCall],
+        manifest: str | Path,
+        batch_size: int = 500,
+        resume: bool = False,
+    ) -> dict:
+        """
+        Provision every call and stream the results to `manifest`.
+
+        Args:
+            calls: The campaign's calls, e.g. from campaign_calls()
+            manifest: JSON-lines file the results are appended to
+            batch_size: Tokens minted per batch, and manifest lines per flush
+            resume: Skip rooms the manifest already lists as provisioned
+
+        Returns:
+            {"ok", "failed", "skipped", "retries", "seconds"}
+        """
+        manifest = Path(manifest)
+        done = _provisioned_rooms(manifest) if resume else set()
+        manifest.parent.mkdir(parents=True, exist_ok=True)
+        started = time.perf_counter()
+        stats = {"ok": 0, "failed": 0, "skipped": 0}
+        queue: asyncio.Queue = asyncio.Queue(maxsize=2 * batch_size)
+        lines: list[str] = []
+
+        with open(manifest, "a" if resume else "w", encoding="utf-8") as out:
+
+            def record(entry: dict) -> None:
+                stats[entry["status"]] += 1
+                lines.append(json.dumps(entry))
+                if len(lines) >= batch_size:
+                    out.write("\n".join(lines) + "\n")
+                    out.flush()
+                    lines.clear()
+
+            async def produce() -> None:
+                batch: list[CampaignCall] = []
+                for call in calls:
+                    if call.room in done:
+                        stats["skipped"] += 1
+                        continue
+                    batch.append(call)
+                    if len(batch) >= batch_size:
+                        await mint(batch)
+                        batch = []
+                if batch:
+                    await mint(batch)
+                for _ in range(self.concurrency):
+                    await queue.put(None)
+
+            async def mint(batch: list[CampaignCall]) -> None:
+                tokens = self.minter.mint([(c.room, c.identity, c.name, c.conversation_id) for c in batch])
+                for call, token in zip(batch, tokens):
+                    await queue.put((call, token))
+
+            async def work() -> None:
+                while (item := await queue.get()) is not None:
+                    call, token = item
+                    entry = {"room": call.room, "identity": call.identity, "name": call.name,
+                             "conversation_id": call.conversation_id}
+                    try:
+                        room, attempts = await self.create_room(call)
+                    except ProvisionError as e:
+                        entry.update(status="failed", error=str(e.error) or repr(e.error), attempts=e.attempts)
+                    else:
+                        entry.update(status="ok", room_sid=room["sid"], token=token, url=self.url, attempts=attempts)
+                    record(entry)
+
+            await asyncio.gather(produce(), *(work() for _ in range(self.concurrency)))
+            if lines:
+                out.write("\n".join(lines) + "\n")
+        return {**stats, "retries": self.retries, "seconds": time.perf_counter() - started}
+
+
+def _provisioned_rooms(manifest: Path) -> set[str]:
+    if not manifest.exists():
+        return set()
+    rooms = set()
+    with open(manifest, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A run that was killed mid-write leaves a partial last line
+                continue
+            if entry.get("status") == "ok":
+                rooms.add(entry["room"])
+    return rooms
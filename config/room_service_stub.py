@@ -0,0 +1,213 @@
+"""
+Local stand-in for the LiveKit RoomService and Egress APIs.
+
+Answers CreateRoom, ListEgress and StopEgress the way a LiveKit server does
+(Twirp, protobuf bodies), keeps the rooms and egresses in memory, and can
+inject latency, failures and a request rate limit to exercise the retry
+paths. It also counts the TCP connections clients opened, to show connection
+reuse. Egresses are added with add_egress(); nothing records media.
+
+Usage:
+    python -m config.room_service_stub [--port 7881] [--latency-ms 20] [--fail-rate 0.02] [--max-rps 0]
+
+Then point the provisioning CLI at it:
+    LIVEKIT_URL=http://127.0.0.1:7881 python provision_rooms.py --campaign test --count 100
+"""
+import argparse
+import asyncio
+import random
+import time
+import weakref
+
+from aiohttp import web
+from livekit import api
+
+_PREFIX = "/twirp/livekit.RoomService"
+_EGRESS_PREFIX = "/twirp/livekit.Egress"
+_ACTIVE = (api.EgressStatus.EGRESS_STARTING, api.EgressStatus.EGRESS_ACTIVE, api.EgressStatus.EGRESS_ENDING)
+
+
+def _twirp_error(code: str, msg: str, status: int) -> web.Response:
+    return web.json_response({"code": code, "msg": msg}, status=status)
+
+
+class RoomServiceStub:
+    """
+    In-memory RoomService and Egress service.
+
+    Args:
+        latency_ms: Added latency per request
+        fail_rate: Fraction of requests answered with a Twirp "unavailable" (503)
+        max_rps: Requests per second above which requests get "resource_exhausted" (429); 0 disables it
+    """
+
+    def __init__(self, latency_ms: float = 0.0, fail_rate: float = 0.0, max_rps: float = 0.0):
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.max_rps = max_rps
+        self.rooms: dict[str, api.Room] = {}
+        self.egresses: dict[str, api.EgressInfo] = {}
+        self.requests = 0
+        self.failures = 0
+        self.throttled = 0
+        self.connections = 0
+        self._transports = weakref.WeakSet()
+        self._window_start = 0.0
+        self._window_requests = 0
+
+    def _throttle(self) -> bool:
+        now = time.monotonic()
+        if now - self._window_start >= 1.0:
+            self._window_start, self._window_requests = now, 0
+        self._window_requests += 1
+        return self._window_requests > self.max_rps
+
+    async def _admit(self, request: web.Request) -> web.Response | None:
+        """Count, authenticate, delay and maybe fail a request; an error response, or None to serve it."""
+        self.requests += 1
+        # TCP connections clients opened; a pooled client reuses a few of them
+        if request.transport not in self._transports:
+            self._transports.add(request.transport)
+            self.connections += 1
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return _twirp_error("unauthenticated", "missing token", 401)
+        if self.max_rps and self._throttle():
+            self.throttled += 1
+            return _twirp_error("resource_exhausted", "rate limit exceeded", 429)
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        if self.fail_rate and random.random() < self.fail_rate:
+            self.failures += 1
+            return _twirp_error("unavailable", "injected failure", 503)
+        return None
+
+    async def handle_create_room(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        error = await self._admit(request)
+        if error is not None:
+            return error
+
+        create = api.CreateRoomRequest.FromString(body)
+        room = self.rooms.get(create.name)
+        if room is None:
+            # CreateRoom is idempotent: an existing room is returned as is
+            room = api.Room(
+                sid=f"RM_{len(self.rooms):012d}",
+                name=create.name,
+                empty_timeout=create.empty_timeout or 300,
+                max_participants=create.max_participants,
+                creation_time=int(time.time()),
+                metadata=create.metadata,
+            )
+            self.rooms[create.name] = room
+        return web.Response(body=room.SerializeToString(), content_type="application/protobuf")
+
+    def add_egress(
+        self,
+        room_name: str,
+        status: int = api.EgressStatus.EGRESS_ACTIVE,
+        egress_id: str | None = None,
+    ) -> api.EgressInfo:
+        """Register an egress for `room_name`, as if one had been started."""
+        now = time.time_ns()
+        info = api.EgressInfo(
+            egress_id=egress_id or f"EG_{len(self.egresses):012d}",
+            room_name=room_name,
+            status=status,
+            started_at=now,
+            updated_at=now,
+        )
+        self.egresses[info.egress_id] = info
+        return info
+
+    async def handle_list_egress(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        error = await self._admit(request)
+        if error is not None:
+            return error
+        query = api.ListEgressRequest.FromString(body)
+        items = [
+            info for info in self.egresses.values()
+            if (not query.room_name or info.room_name == query.room_name)
+            and (not query.egress_id or info.egress_id == query.egress_id)
+            and (not query.active or info.status in _ACTIVE)
+        ]
+        return web.Response(body=api.ListEgressResponse(items=items).SerializeToString(),
+                            content_type="application/protobuf")
+
+    async def handle_stop_egress(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        error = await self._admit(request)
+        if error is not None:
+            return error
+        info = self.egresses.get(api.StopEgressRequest.FromString(body).egress_id)
+        if info is None:
+            return _twirp_error("not_found", "egress does not exist", 404)
+        if info.status not in _ACTIVE:
+            return _twirp_error("failed_precondition", "egress is not active", 412)
+        info.status = api.EgressStatus.EGRESS_ENDING
+        info.updated_at = time.time_ns()
+        return web.Response(body=info.SerializeToString(), content_type="application/protobuf")
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def stats(self) -> dict:
+        return {
+            "rooms": len(self.rooms),
+            "egresses": len(self.egresses),
+            "requests": self.requests,
+            "failures": self.failures,
+            "throttled": self.throttled,
+            "connections": self.connections,
+        }
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(f"{_PREFIX}/CreateRoom", self.handle_create_room)
+        app.router.add_post(f"{_EGRESS_PREFIX}/ListEgress", self.handle_list_egress)
+        app.router.add_post(f"{_EGRESS_PREFIX}/StopEgress", self.handle_stop_egress)
+        app.router.add_get("/stats", self.handle_stats)
+        return app
+
+
+async def start_room_service_stub(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    **kwargs,
+) -> tuple[RoomServiceStub, web.AppRunner, str]:
+    """
+    Start a RoomService and Egress stub on the running event loop.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        **kwargs: Passed to RoomServiceStub
+
+    Returns:
+        Tuple of (stub, runner, server URL for LIVEKIT_URL). Call `runner.cleanup()` to stop it.
+    """
+    stub = RoomServiceStub(**kwargs)
+    runner = web.AppRunner(stub.create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return stub, runner, f"http://{host}:{bound_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in LiveKit RoomService and Egress API")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=7881, help="Port to bind (default: 7881)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--max-rps", type=float, default=0.0, help="Requests per second before answering 429")
+    args = parser.parse_args()
+
+    stub = RoomServiceStub(latency_ms=args.latency_ms, fail_rate=args.fail_rate, max_rps=args.max_rps)
+    web.run_app(stub.create_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
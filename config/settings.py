@@ -1,4 +1,5 @@
 import os
+import socket
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,3 +8,159 @@ LIVEKIT_URL = os.getenv("LIVEKIT_URL")
 LIVEKIT_API_KEY = os.getenv("LIVEKIT_API_KEY")
 LIVEKIT_API_SECRET = os.getenv("LIVEKIT_API_SECRET")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# Lead sink: "outbox" (durable local outbox + CRM delivery) or "stdout"
+LEAD_SINK = os.getenv("LEAD_SINK", "outbox")
+LEAD_OUTBOX_PATH = os.getenv("LEAD_OUTBOX_PATH", "data/lead_outbox.sqlite3")
+CRM_ENDPOINT_URL = os.getenv("CRM_ENDPOINT_URL")
+CRM_API_KEY = os.getenv("CRM_API_KEY")
+CRM_BATCH_SIZE = int(os.getenv("CRM_BATCH_SIZE", "100"))
+CRM_MAX_ATTEMPTS = int(os.getenv("CRM_MAX_ATTEMPTS", "8"))
+# Merge repeat calls from the same phone into one lead (see leads/dedup.py)
+LEAD_DEDUP = os.getenv("LEAD_DEDUP", "true").lower() in ("1", "true", "yes")
+LEAD_DEDUP_BLOOM_PATH = os.getenv("LEAD_DEDUP_BLOOM_PATH", "data/lead_phones.bloom")
+# Distinct phones the bloom filter is sized for (about 18 MB on disk for 10M)
+LEAD_DEDUP_CAPACITY = int(os.getenv("LEAD_DEDUP_CAPACITY", "10000000"))
+# Calls more than this many days after the lead was last seen start a new lead; 0 always merges
+LEAD_DEDUP_WINDOW_DAYS = float(os.getenv("LEAD_DEDUP_WINDOW_DAYS", "90"))
+# "background" returns from submit_lead immediately and persists on a session task; "inline" waits
+LEAD_SUBMIT_MODE = os.getenv("LEAD_SUBMIT_MODE", "background")
+
+# Instructions variant passed to EdTechBANTAgent (see agent/prompt.py PROMPT_VARIANTS)
+PROMPT_VARIANT = os.getenv("PROMPT_VARIANT", "full")
+REALTIME_VOICE = os.getenv("REALTIME_VOICE", "alloy")
+# Pre-rendered greeting audio (see agent/greeting.py), one rendering per voice and prompt version
+GREETING_CACHE = os.getenv("GREETING_CACHE", "true").lower() in ("1", "true", "yes")
+GREETING_CACHE_DIR = os.getenv("GREETING_CACHE_DIR", "data/greetings")
+GREETING_OPUS_BITRATE = int(os.getenv("GREETING_OPUS_BITRATE", "32000"))
+# Program catalog for the lookup_programs tool (see agent/catalog.py), checked for changes at most every CATALOG_RELOAD_SECONDS
+CATALOG_PATH = os.getenv("CATALOG_PATH", "config/catalog.json")
+CATALOG_RELOAD_SECONDS = float(os.getenv("CATALOG_RELOAD_SECONDS", "5"))
+CATALOG_MAX_RESULTS = int(os.getenv("CATALOG_MAX_RESULTS", "3"))
+
+# BANT slot tracker (see agent/slots.py): "off", "nudge" (ask the model to submit and wrap up
+# once every slot is known) or "submit" (persist the lead directly, then wrap up)
+SLOT_TRACKER = os.getenv("SLOT_TRACKER", "nudge")
+# Parent turns without a new slot, once the required slots are known, before wrapping up anyway
+SLOT_STALE_TURNS = int(os.getenv("SLOT_STALE_TURNS", "2"))
+
+# Session governor (see runner/governor.py): per-session caps, 0 disables a cap
+SESSION_MAX_TOKENS = int(os.getenv("SESSION_MAX_TOKENS", "250000"))
+SESSION_MAX_MINUTES = float(os.getenv("SESSION_MAX_MINUTES", "15"))
+# Parent turns in a row that fill no lead slot (counted by the slot tracker, so SLOT_TRACKER must be on)
+SESSION_MAX_STALE_TURNS = int(os.getenv("SESSION_MAX_STALE_TURNS", "6"))
+# Seconds the closing reply may play before the session is closed anyway
+SESSION_CLOSING_TIMEOUT = float(os.getenv("SESSION_CLOSING_TIMEOUT", "20"))
+
+# Activity monitor (see runner/activity.py): seconds of silence before each reprompt, and before hanging up once the reprompts are used
+IDLE_REPROMPT_SECONDS = float(os.getenv("IDLE_REPROMPT_SECONDS", "12"))
+IDLE_MAX_REPROMPTS = int(os.getenv("IDLE_MAX_REPROMPTS", "2"))
+IDLE_HANGUP_SECONDS = float(os.getenv("IDLE_HANGUP_SECONDS", "15"))
+# Seconds without any session event (state change or conversation item) before the session is reaped; 0 disables it
+IDLE_ZOMBIE_SECONDS = float(os.getenv("IDLE_ZOMBIE_SECONDS", "90"))
+
+# In-worker call recorder (see recording/recorder.py): one Ogg/Opus file per conversation_id, parent left, agent right
+CALL_RECORDING = os.getenv("CALL_RECORDING", "false").lower() in ("1", "true", "yes")
+CALL_RECORDING_DIR = os.getenv("CALL_RECORDING_DIR", "data/recordings")
+CALL_RECORDING_BITRATE = int(os.getenv("CALL_RECORDING_BITRATE", "32000"))
+CALL_RECORDING_SAMPLE_RATE = int(os.getenv("CALL_RECORDING_SAMPLE_RATE", "24000"))
+# Ring buffer per session (bounds its memory), and how far behind live the encoder runs so that
+# agent audio cut off by an interruption can still be erased
+CALL_RECORDING_BUFFER_SECONDS = float(os.getenv("CALL_RECORDING_BUFFER_SECONDS", "10"))
+CALL_RECORDING_DELAY_SECONDS = float(os.getenv("CALL_RECORDING_DELAY_SECONDS", "2"))
+# Encoder threads per job process, shared by its sessions
+CALL_RECORDING_THREADS = int(os.getenv("CALL_RECORDING_THREADS", "1"))
+
+# Audio-only session recordings (see record_session.py): Opus bitrate in kbps and sample rate of transcoded files
+RECORDING_AUDIO_BITRATE = int(os.getenv("RECORDING_AUDIO_BITRATE", "24"))
+RECORDING_AUDIO_FREQUENCY = int(os.getenv("RECORDING_AUDIO_FREQUENCY", "48000"))
+
+# Post-call recording processing (see process_recordings.py): mono Opus copies and per-turn segments
+RECORDING_PROCESS_SAMPLE_RATE = int(os.getenv("RECORDING_PROCESS_SAMPLE_RATE", "16000"))
+RECORDING_PROCESS_BITRATE = int(os.getenv("RECORDING_PROCESS_BITRATE", "16"))
+# Worker processes; 0 uses one per CPU
+RECORDING_PROCESS_WORKERS = int(os.getenv("RECORDING_PROCESS_WORKERS", "0"))
+# A 20 ms frame quieter than this is silence; pauses shorter than the max gap stay inside one turn
+RECORDING_SEGMENT_SILENCE_DB = float(os.getenv("RECORDING_SEGMENT_SILENCE_DB", "-40"))
+RECORDING_SEGMENT_MAX_GAP = float(os.getenv("RECORDING_SEGMENT_MAX_GAP", "1.0"))
+
+# Bulk room provisioning for outbound campaigns (see config/provisioning.py, provision_rooms.py)
+PROVISION_CONCURRENCY = int(os.getenv("PROVISION_CONCURRENCY", "32"))
+# CreateRoom requests per second, retries included; 0 disables the limit
+PROVISION_RATE = float(os.getenv("PROVISION_RATE", "100"))
+PROVISION_MAX_ATTEMPTS = int(os.getenv("PROVISION_MAX_ATTEMPTS", "5"))
+PROVISION_TOKEN_TTL_HOURS = float(os.getenv("PROVISION_TOKEN_TTL_HOURS", "24"))
+
+# Token service (see config/token_service.py): HTTP token issuing for the web frontend
+TOKEN_SERVICE_HOST = os.getenv("TOKEN_SERVICE_HOST", "127.0.0.1")
+TOKEN_SERVICE_PORT = int(os.getenv("TOKEN_SERVICE_PORT", "8090"))
+# Bearer key callers must send; empty leaves the service open (bind it to a private interface)
+TOKEN_SERVICE_API_KEY = os.getenv("TOKEN_SERVICE_API_KEY", "")
+TOKEN_SERVICE_MAX_BATCH = int(os.getenv("TOKEN_SERVICE_MAX_BATCH", "1000"))
+# Tokens kept per (room, identity), and seconds of validity below which a cached token is re-issued
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "100000"))
+TOKEN_CACHE_REFRESH_SECONDS = float(os.getenv("TOKEN_CACHE_REFRESH_SECONDS", "1800"))
+
+# Egress index (see config/egress_index.py): egress state kept from LiveKit webhooks
+EGRESS_INDEX_HOST = os.getenv("EGRESS_INDEX_HOST", "127.0.0.1")
+EGRESS_INDEX_PORT = int(os.getenv("EGRESS_INDEX_PORT", "8091"))
+# Where record_session.py sends list, status and stop; empty calls the Egress API directly
+EGRESS_INDEX_URL = os.getenv("EGRESS_INDEX_URL", "")
+# Bearer key for queries and stops; webhooks are checked by their signature instead
+EGRESS_INDEX_API_KEY = os.getenv("EGRESS_INDEX_API_KEY", "")
+EGRESS_INDEX_SNAPSHOT_PATH = os.getenv("EGRESS_INDEX_SNAPSHOT_PATH", "data/egress_index.pb")
+EGRESS_INDEX_SNAPSHOT_SECONDS = float(os.getenv("EGRESS_INDEX_SNAPSHOT_SECONDS", "5"))
+# Finished egresses are forgotten this long after they end
+EGRESS_INDEX_RETENTION_HOURS = float(os.getenv("EGRESS_INDEX_RETENTION_HOURS", "72"))
+
+# Worker admission control (see runner/admission.py)
+WORKER_MAX_SESSIONS = int(os.getenv("WORKER_MAX_SESSIONS", "25"))
+WORKER_MAX_CPU_PERCENT = float(os.getenv("WORKER_MAX_CPU_PERCENT", "85"))
+WORKER_MAX_RSS_MB = float(os.getenv("WORKER_MAX_RSS_MB", "4096"))
+WORKER_LOAD_THRESHOLD = float(os.getenv("WORKER_LOAD_THRESHOLD", "1.0"))
+WORKER_DRAIN_TIMEOUT = int(os.getenv("WORKER_DRAIN_TIMEOUT", "1800"))
+# Interface and port for the /load and /drain endpoints; port 0 disables it
+WORKER_STATS_HOST = os.getenv("WORKER_STATS_HOST", "127.0.0.1")
+WORKER_STATS_PORT = int(os.getenv("WORKER_STATS_PORT", "8082"))
+# Bearer key required by POST /drain; empty disables the check
+WORKER_STATS_API_KEY = os.getenv("WORKER_STATS_API_KEY", "")
+
+# Transcript pipeline (see transcripts/writer.py)
+TRANSCRIPTS_DIR = os.getenv("TRANSCRIPTS_DIR", "data/transcripts")
+TRANSCRIPT_QUEUE_SIZE = int(os.getenv("TRANSCRIPT_QUEUE_SIZE", "10000"))
+TRANSCRIPT_FLUSH_BYTES = int(os.getenv("TRANSCRIPT_FLUSH_BYTES", "65536"))
+TRANSCRIPT_FLUSH_INTERVAL = float(os.getenv("TRANSCRIPT_FLUSH_INTERVAL", "1.0"))
+
+# Transcript search index (see transcripts/index.py); query with python -m transcripts.search.
+# Sessions only queue their conversation; enable this together with the indexer process
+# (python -m transcripts.search update --watch 30), or the queue grows without bound
+TRANSCRIPT_INDEX = os.getenv("TRANSCRIPT_INDEX", "false").lower() in ("1", "true", "yes")
+TRANSCRIPT_INDEX_DIR = os.getenv("TRANSCRIPT_INDEX_DIR", "data/transcript_index")
+# Conversations per segment that small segments are merged up to
+TRANSCRIPT_INDEX_SEGMENT_CONVERSATIONS = int(os.getenv("TRANSCRIPT_INDEX_SEGMENT_CONVERSATIONS", "50000"))
+
+# Per-session usage store (see usage/store.py); query with python -m usage.query
+USAGE_STORE = os.getenv("USAGE_STORE", "true").lower() in ("1", "true", "yes")
+USAGE_DIR = os.getenv("USAGE_DIR", "data/usage")
+# Sessions per live log before it is sealed for compaction into a columnar segment
+USAGE_SEGMENT_ROWS = int(os.getenv("USAGE_SEGMENT_ROWS", "1000000"))
+# USD per 1M tokens for cost queries (defaults: gpt-realtime list prices); cached tokens are part of input
+USAGE_PRICE_TEXT_INPUT = float(os.getenv("USAGE_PRICE_TEXT_INPUT", "4.0"))
+USAGE_PRICE_TEXT_CACHED = float(os.getenv("USAGE_PRICE_TEXT_CACHED", "0.4"))
+USAGE_PRICE_TEXT_OUTPUT = float(os.getenv("USAGE_PRICE_TEXT_OUTPUT", "16.0"))
+USAGE_PRICE_AUDIO_INPUT = float(os.getenv("USAGE_PRICE_AUDIO_INPUT", "32.0"))
+USAGE_PRICE_AUDIO_CACHED = float(os.getenv("USAGE_PRICE_AUDIO_CACHED", "0.4"))
+USAGE_PRICE_AUDIO_OUTPUT = float(os.getenv("USAGE_PRICE_AUDIO_OUTPUT", "64.0"))
+
+# Prometheus metrics served by the worker on :METRICS_PORT/metrics; 0 disables them
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "data/prometheus")
+METRICS_WORKER_NAME = os.getenv("METRICS_WORKER_NAME", socket.gethostname())
+
+# OpenTelemetry tracing (see runner/tracing.py): "none", "otlp" (OTEL_EXPORTER_OTLP_* env) or "file"
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none")
+# Fraction of sessions traced; each session is sampled as a whole
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+TRACING_FILE_DIR = os.getenv("TRACING_FILE_DIR", "data/traces")
+# Also export livekit-agents' internal spans (LLM requests, tool execution)
+TRACING_LIVEKIT_SPANS = os.getenv("TRACING_LIVEKIT_SPANS", "false").lower() in ("1", "true", "yes")
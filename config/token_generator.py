@@ -1,7 +1,12 @@
 """
 Utility functions for generating LiveKit room access tokens for clients.
 """
+import base64
+import datetime
+import hashlib
+import hmac
 import json
+import time
 import uuid
 from livekit import api
 from .settings import LIVEKIT_API_KEY, LIVEKIT_API_SECRET, LIVEKIT_URL
@@ -21,6 +26,7 @@ async def create_room(
     room_name: str,
     conversation_id: str | None = None,
     max_participants: int = 2,
+    lkapi: api.LiveKitAPI | None = None,
 ) -> dict:
     """
     Create a LiveKit room explicitly using the RoomService API.
@@ -32,6 +38,8 @@ async def create_room(
         room_name: Name of the room to create
         conversation_id: Optional conversation ID to store in room metadata
         max_participants: Maximum number of participants allowed in the room
+        lkapi: Client to send the request with; bulk callers pass one shared, pooled client
+            (see config/provisioning.py). Without it a client is opened and closed for this call.
         
     Returns:
         Dictionary containing room information
@@ -39,32 +47,27 @@ async def create_room(
     Raises:
         ValueError: If LIVEKIT_URL, LIVEKIT_API_KEY, or LIVEKIT_API_SECRET are not set
     """
-    if not LIVEKIT_URL or not LIVEKIT_API_KEY or not LIVEKIT_API_SECRET:
-        raise ValueError("LIVEKIT_URL, LIVEKIT_API_KEY, and LIVEKIT_API_SECRET must be set")
-    
-    # Create RoomService client
-    room_service = api.RoomService(LIVEKIT_URL, LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
+    if lkapi is None:
+        if not LIVEKIT_URL or not LIVEKIT_API_KEY or not LIVEKIT_API_SECRET:
+            raise ValueError("LIVEKIT_URL, LIVEKIT_API_KEY, and LIVEKIT_API_SECRET must be set")
+        async with api.LiveKitAPI(LIVEKIT_URL, LIVEKIT_API_KEY, LIVEKIT_API_SECRET) as lkapi:
+            return await create_room(room_name, conversation_id, max_participants, lkapi)
     
     # Prepare room metadata
     metadata = {}
     if conversation_id:
         metadata["conversation_id"] = conversation_id
     
-    # Create room configuration
-    room_config = api.RoomConfiguration(
-        agents=[
-            api.RoomAgentDispatch(
-                metadata=json.dumps(metadata) if metadata else None
-            )
-        ],
-        max_participants=max_participants,
-    )
-    
-    # Create the room
-    room = await room_service.create_room(
+    # Create the room, with the agent dispatched into it
+    room = await lkapi.room.create_room(
         api.CreateRoomRequest(
             name=room_name,
-            config=room_config,
+            max_participants=max_participants,
+            agents=[
+                api.RoomAgentDispatch(
+                    metadata=json.dumps(metadata) if metadata else None
+                )
+            ],
         )
     )
     
@@ -188,3 +191,72 @@ def create_client_token(
         conversation_id=conversation_id,
     )
 
+
+def _b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+class TokenMinter:
+    """
+    Mints client tokens in batches.
+
+    Tokens carry the same claims as create_client_token(). The claims shared by
+    every token, the JWT header and the HMAC key are prepared once; each token
+    only fills in its room, identity and conversation_id, and a batch shares
+    one issue time.
+
+    Args:
+        api_key: LiveKit API key
+        api_secret: LiveKit API secret
+        ttl: Token lifetime
+    """
+
+    _HEADER = _b64url(b'{"alg":"HS256","typ":"JWT"}')
+
+    def __init__(
+        self,
+        api_key: str | None = LIVEKIT_API_KEY,
+        api_secret: str | None = LIVEKIT_API_SECRET,
+        ttl: datetime.timedelta = datetime.timedelta(hours=6),
+    ):
+        if not api_key or not api_secret:
+            raise ValueError("LIVEKIT_API_KEY and LIVEKIT_API_SECRET must be set")
+        self.api_key = api_key
+        self.ttl_seconds = int(ttl.total_seconds())
+        # Claims of a client token, from the SDK itself so both paths stay identical
+        template = api.AccessToken(api_key, api_secret) \
+            .with_identity("-") \
+            .with_name("-") \
+            .with_grants(api.VideoGrants(
+                room_join=True, room="-", can_publish=True, can_subscribe=True, can_publish_data=False,
+            )).with_room_config(api.RoomConfiguration(agents=[api.RoomAgentDispatch(metadata="-")], max_participants=2))
+        self._claims = template.claims.asdict()
+        self._hmac = hmac.new(api_secret.encode(), digestmod=hashlib.sha256)
+
+    def mint(self, calls: list[tuple[str, str, str | None, str]]) -> list[str]:
+        """
+        Mint one client token per (room_name, identity, name, conversation_id).
+
+        Returns:
+            JWTs in the order of `calls`
+        """
+        now = int(time.time())
+        claims = self._claims
+        video, room_config = claims["video"], claims["roomConfig"]
+        tokens = []
+        for room_name, identity, name, conversation_id in calls:
+            payload = {
+                **claims,
+                "name": name or identity,
+                "video": {**video, "room": room_name},
+                "roomConfig": {**room_config, "agents": [{"metadata": json.dumps({"conversation_id": conversation_id})}]},
+                "sub": identity,
+                "iss": self.api_key,
+                "nbf": now,
+                "exp": now + self.ttl_seconds,
+            }
+            signing_input = self._HEADER + b"." + _b64url(json.dumps(payload, separators=(",", ":")).encode())
+            signature = self._hmac.copy()
+            signature.update(signing_input)
+            tokens.append((signing_input + b"." + _b64url(signature.digest())).decode())
+        return tokens
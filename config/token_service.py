@@ -0,0 +1,347 @@
+"""
+HTTP service that issues LiveKit room tokens to the web frontend.
+
+A long-running process, so each token costs one request instead of a Python
+start-up and import of generate_token.py. Tokens are issued with
+create_client_token() / create_room_token() and cached per (room, identity)
+until they are close to expiry. A visitor who reloads the page gets the
+same token and conversation ID back, without another signature.
+
+Endpoints:
+    POST /token    {"room", "identity", "name"?, "conversation_id"?,
+                    "permissions"?: {"can_publish", "can_subscribe", "can_publish_data"}}
+                   (GET /token?room=...&identity=... works too)
+                -> {"token", "conversation_id", "url", "room", "identity", "name"?,
+                    "expires_at", "cached"}
+    POST /tokens   {"requests": [<POST /token body>, ...]}
+                -> {"tokens": [<POST /token response or {"error"}>, ...]}, in request order
+    GET /metrics   Prometheus: request latency per endpoint, cache hits/misses, tokens issued
+    GET /stats     The same counters as JSON, plus the process CPU time
+
+With TOKEN_SERVICE_API_KEY set, requests other than /metrics must send
+"Authorization: Bearer <key>".
+
+Usage:
+    python -m config.token_service [--host 127.0.0.1] [--port 8090]
+"""
+import argparse
+import hmac
+import time
+from collections import OrderedDict
+
+import prometheus_client
+from aiohttp import web
+from livekit.api.access_token import DEFAULT_TTL
+
+from .settings import (
+    LIVEKIT_URL,
+    LIVEKIT_API_KEY,
+    LIVEKIT_API_SECRET,
+    TOKEN_SERVICE_HOST,
+    TOKEN_SERVICE_PORT,
+    TOKEN_SERVICE_API_KEY,
+    TOKEN_SERVICE_MAX_BATCH,
+    TOKEN_CACHE_SIZE,
+    TOKEN_CACHE_REFRESH_SECONDS,
+)
+from .token_generator import create_client_token, create_room_token, generate_conversation_id
+
+_PERMISSIONS = ("can_publish", "can_subscribe", "can_publish_data")
+
+
+class TokenRequestError(ValueError):
+    """A token request that is missing or has malformed fields."""
+
+
+class TokenCache:
+    """
+    LRU cache of issued tokens, keyed by room, identity, name and permissions.
+
+    Args:
+        max_entries: Tokens kept; the least recently used is dropped beyond this
+        refresh_seconds: A cached token with less validity left than this is re-issued
+        ttl_seconds: Validity of the tokens the cache issues
+    """
+
+    def __init__(
+        self,
+        max_entries: int = TOKEN_CACHE_SIZE,
+        refresh_seconds: float = TOKEN_CACHE_REFRESH_SECONDS,
+        ttl_seconds: float = DEFAULT_TTL.total_seconds(),
+    ):
+        self.max_entries = max_entries
+        self.refresh_seconds = refresh_seconds
+        self.ttl_seconds = ttl_seconds
+        # key -> (token, conversation_id, expires_at)
+        self._entries: OrderedDict[tuple, tuple[str, str, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self,
+        room: str,
+        identity: str,
+        name: str | None = None,
+        conversation_id: str | None = None,
+        permissions: tuple[bool, bool, bool] | None = None,
+    ) -> tuple[str, str, float, bool]:
+        """
+        A token for `identity` in `room`, from the cache when a valid one is there.
+
+        Args:
+            room: Room name
+            identity: Participant identity
+            name: Display name (defaults to identity)
+            conversation_id: Required conversation ID; a cached token for another one is not reused
+            permissions: (can_publish, can_subscribe, can_publish_data), or None for a client token
+
+        Returns:
+            Tuple of (JWT, conversation_id, expiry as a Unix time, whether it came from the cache)
+        """
+        key = (room, identity, name, permissions)
+        now = time.time()
+        entry = self._entries.get(key)
+        if (
+            entry is not None
+            and entry[2] - now > self.refresh_seconds
+            and (conversation_id is None or conversation_id == entry[1])
+        ):
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1], entry[2], True
+
+        self.misses += 1
+        conversation_id = conversation_id or (entry[1] if entry is not None else generate_conversation_id())
+        if permissions is None:
+            token, conversation_id = create_client_token(room, identity, name, conversation_id)
+        else:
+            token, conversation_id = create_room_token(room, identity, name, *permissions, conversation_id=conversation_id)
+        expires_at = now + self.ttl_seconds
+        self._entries[key] = (token, conversation_id, expires_at)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return token, conversation_id, expires_at, False
+
+
+def _field(body: dict, name: str, required: bool = False) -> str | None:
+    value = body.get(name)
+    if value is None or value == "":
+        if required:
+            raise TokenRequestError(f"{name} is required")
+        return None
+    if not isinstance(value, str) or len(value) > 256:
+        raise TokenRequestError(f"{name} must be a string of at most 256 characters")
+    return value
+
+
+class TokenService:
+    """
+    The token service's handlers, cache and metrics.
+
+    Args:
+        cache: Token cache (a new TokenCache by default)
+        url: LiveKit server URL returned to clients
+        api_key: Bearer key required from callers; empty disables the check
+        max_batch: Most requests accepted by POST /tokens
+    """
+
+    def __init__(
+        self,
+        cache: TokenCache | None = None,
+        url: str | None = LIVEKIT_URL,
+        api_key: str = TOKEN_SERVICE_API_KEY,
+        max_batch: int = TOKEN_SERVICE_MAX_BATCH,
+    ):
+        if not LIVEKIT_API_KEY or not LIVEKIT_API_SECRET:
+            raise ValueError("LIVEKIT_API_KEY and LIVEKIT_API_SECRET must be set")
+        self.cache = cache or TokenCache()
+        self.url = url
+        self.api_key = api_key
+        self.max_batch = max_batch
+        self.requests = 0
+        # A registry per service, so metrics of the agent processes never mix in
+        self.registry = prometheus_client.CollectorRegistry()
+        self.request_duration = prometheus_client.Histogram(
+            "token_service_request_duration_seconds",
+            "Request latency, from routing to response",
+            ["endpoint", "status"],
+            buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+            registry=self.registry,
+        )
+        self.tokens_served = prometheus_client.Counter(
+            "token_service_tokens",
+            "Tokens returned, by whether they came from the cache",
+            ["source"],
+            registry=self.registry,
+        )
+        self.cache_size = prometheus_client.Gauge(
+            "token_service_cache_entries",
+            "Tokens currently cached",
+            registry=self.registry,
+        )
+        self.cache_size.set_function(lambda: len(self.cache))
+        self._served = {True: self.tokens_served.labels("cache"), False: self.tokens_served.labels("issued")}
+        self._durations: dict[tuple[str, int], prometheus_client.Histogram] = {}
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        started = time.perf_counter()
+        status = 500
+        try:
+            if self.api_key and request.path != "/metrics":
+                supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+                if not hmac.compare_digest(supplied.encode(), self.api_key.encode()):
+                    status = 401
+                    return web.json_response({"error": "unauthorized"}, status=401)
+            response = await handler(request)
+            status = response.status
+            return response
+        except web.HTTPException as e:
+            status = e.status
+            raise
+        finally:
+            self.requests += 1
+            resource = request.match_info.route.resource
+            key = (resource.canonical if resource is not None else "other", status)
+            child = self._durations.get(key)
+            if child is None:
+                # labels() is slow per call; keep one child per (endpoint, status)
+                child = self._durations[key] = self.request_duration.labels(key[0], str(key[1]))
+            child.observe(time.perf_counter() - started)
+
+    def issue(self, body: dict) -> dict:
+        """
+        Token response for one request body.
+
+        Raises:
+            TokenRequestError: A field is missing or malformed
+        """
+        room = _field(body, "room", required=True)
+        identity = _field(body, "identity", required=True)
+        name = _field(body, "name")
+        conversation_id = _field(body, "conversation_id")
+        permissions = body.get("permissions")
+        if permissions is not None:
+            if not isinstance(permissions, dict):
+                raise TokenRequestError("permissions must be an object")
+            permissions = tuple(bool(permissions.get(p, True)) for p in _PERMISSIONS)
+
+        token, conversation_id, expires_at, cached = self.cache.get(room, identity, name, conversation_id, permissions)
+        self._served[cached].inc()
+        response = {
+            "token": token,
+            "conversation_id": conversation_id,
+            "url": self.url,
+            "room": room,
+            "identity": identity,
+            "expires_at": int(expires_at),
+            "cached": cached,
+        }
+        if name:
+            response["name"] = name
+        return response
+
+    async def handle_token(self, request: web.Request) -> web.Response:
+        if request.method == "GET":
+            body = dict(request.query)
+        else:
+            try:
+                body = await request.json()
+            except ValueError:
+                return web.json_response({"error": "body must be JSON"}, status=400)
+        if not isinstance(body, dict):
+            return web.json_response({"error": "body must be a JSON object"}, status=400)
+        try:
+            return web.json_response(self.issue(body))
+        except TokenRequestError as e:
+            return web.json_response({"error": str(e)}, status=400)
+
+    async def handle_tokens(self, request: web.Request) -> web.Response:
+        try:
+            body = await request.json()
+        except ValueError:
+            return web.json_response({"error": "body must be JSON"}, status=400)
+        requests = body.get("requests") if isinstance(body, dict) else None
+        if not isinstance(requests, list):
+            return web.json_response({"error": "requests must be a list"}, status=400)
+        if len(requests) > self.max_batch:
+            return web.json_response({"error": f"at most {self.max_batch} requests per batch"}, status=413)
+        tokens = []
+        for item in requests:
+            try:
+                if not isinstance(item, dict):
+                    raise TokenRequestError("each request must be a JSON object")
+                tokens.append(self.issue(item))
+            except TokenRequestError as e:
+                tokens.append({"error": str(e)})
+        return web.json_response({"tokens": tokens})
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=prometheus_client.generate_latest(self.registry),
+                            headers={"Content-Type": prometheus_client.CONTENT_TYPE_LATEST})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "cache_entries": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "cpu_seconds": time.process_time(),
+        }
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware], client_max_size=8 * 1024 * 1024)
+        app.router.add_route("GET", "/token", self.handle_token)
+        app.router.add_post("/token", self.handle_token)
+        app.router.add_post("/tokens", self.handle_tokens)
+        app.router.add_get("/metrics", self.handle_metrics)
+        app.router.add_get("/stats", self.handle_stats)
+        return app
+
+
+async def start_token_service(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    **kwargs,
+) -> tuple[TokenService, web.AppRunner, str]:
+    """
+    Start the token service on the running event loop.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        **kwargs: Passed to TokenService
+
+    Returns:
+        Tuple of (service, runner, base URL). Call `runner.cleanup()` to stop it.
+    """
+    service = TokenService(**kwargs)
+    runner = web.AppRunner(service.create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return service, runner, f"http://{host}:{bound_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LiveKit token service")
+    parser.add_argument("--host", default=TOKEN_SERVICE_HOST, help=f"Interface to bind (default: {TOKEN_SERVICE_HOST})")
+    parser.add_argument("--port", type=int, default=TOKEN_SERVICE_PORT, help=f"Port to bind (default: {TOKEN_SERVICE_PORT})")
+    args = parser.parse_args()
+
+    service = TokenService()
+    print(f"Token service on http://{args.host}:{args.port} (cache {service.cache.max_entries:,} tokens, "
+          f"auth {'on' if service.api_key else 'off'})")
+    web.run_app(service.create_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
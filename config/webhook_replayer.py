@@ -0,0 +1,168 @@
+"""
+Local LiveKit webhook replayer.
+
+Signs webhook bodies the way a LiveKit server does (a JWT in the
+Authorization header with the body's SHA-256, signed with the API secret)
+and posts them to a receiver such as the egress index. The events either
+come from a JSON-lines file, one webhook body per line (e.g. captured from
+a real server), or are synthesized: each room gets an egress that starts,
+goes active and, for `--ended` of the rooms, completes with a file. The
+order can be shuffled and events sent twice, as a server retrying
+deliveries would, and forged copies with a bad signature can be mixed in.
+
+Usage:
+    python -m config.webhook_replayer http://127.0.0.1:8091/webhook [--rooms 500] [--ended 0.8]
+        [--shuffle] [--duplicates 0.1] [--bad-signatures 0.01] [--from events.jsonl]
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import time
+
+import aiohttp
+from google.protobuf.json_format import MessageToJson
+from livekit import api
+from livekit.protocol.webhook import WebhookEvent
+
+from .settings import LIVEKIT_API_KEY, LIVEKIT_API_SECRET
+
+
+def sign_webhook(body: str, api_key: str, api_secret: str) -> str:
+    """The Authorization header LiveKit sends with `body`."""
+    digest = base64.b64encode(hashlib.sha256(body.encode()).digest()).decode()
+    return api.AccessToken(api_key, api_secret).with_sha256(digest).to_jwt()
+
+
+def egress_events(rooms: int, ended: float = 0.8, seed: int = 7) -> list[WebhookEvent]:
+    """
+    Synthetic egress webhooks for `rooms` rooms, in the order a server sends them.
+
+    Args:
+        rooms: Rooms with one audio-only egress each
+        ended: Fraction of the egresses that complete; the rest are still active
+        seed: Random seed
+
+    Returns:
+        egress_started, egress_updated (active) and, for the ended ones, egress_ended events
+    """
+    rng = random.Random(seed)
+    now = time.time_ns()
+    events = []
+    for i in range(rooms):
+        started = now - rng.randint(60, 3600) * 10**9
+        info = api.EgressInfo(
+            egress_id=f"EG_replay{i:08d}",
+            room_id=f"RM_replay{i:08d}",
+            room_name=f"call-{i:06d}",
+            status=api.EgressStatus.EGRESS_STARTING,
+            started_at=started,
+            updated_at=started,
+        )
+        steps = [("egress_started", api.EgressStatus.EGRESS_STARTING, 0),
+                 ("egress_updated", api.EgressStatus.EGRESS_ACTIVE, 2)]
+        if rng.random() < ended:
+            steps.append(("egress_ended", api.EgressStatus.EGRESS_COMPLETE, rng.randint(60, 900)))
+        for event, status, after in steps:
+            step = api.EgressInfo()
+            step.CopyFrom(info)
+            step.status = status
+            step.updated_at = started + after * 10**9
+            if status == api.EgressStatus.EGRESS_COMPLETE:
+                step.ended_at = step.updated_at
+                step.file_results.add(filename=f"recordings/{info.room_name}.ogg",
+                                      location=f"s3://recordings/{info.room_name}.ogg",
+                                      duration=after * 10**9)
+            events.append(WebhookEvent(event=event, egress_info=step, id=f"EV_{len(events):010d}",
+                                       created_at=step.updated_at // 10**9))
+    return events
+
+
+def load_events(path: str) -> list[str]:
+    """Webhook bodies from a JSON-lines file, one per line."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+async def replay(
+    url: str,
+    bodies: list[str],
+    api_key: str,
+    api_secret: str,
+    concurrency: int = 8,
+    bad_signatures: float = 0.0,
+    seed: int = 7,
+) -> dict:
+    """
+    Post signed webhook bodies to `url`, `concurrency` at a time, plus a `bad_signatures`
+    fraction of extra copies with a wrong signature, each after the event it copies.
+
+    Returns:
+        Dict with sent, accepted, rejected, bad_signatures (how many were sent with one) and seconds
+    """
+    rng = random.Random(seed)
+    signed = []
+    for body in bodies:
+        signed.append((body, sign_webhook(body, api_key, api_secret), False))
+        if rng.random() < bad_signatures:
+            # A copy signed for a different body, as a forged or corrupted request would be
+            signed.append((body, sign_webhook(body + " ", api_key, api_secret), True))
+    pending = iter(signed)
+    counts = {"sent": 0, "accepted": 0, "rejected": 0,
+              "bad_signatures": sum(1 for *_, bad in signed if bad)}
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        for body, token, _ in pending:
+            async with session.post(url, data=body, headers={
+                "Authorization": token, "Content-Type": "application/webhook+json",
+            }) as response:
+                await response.read()
+                counts["sent"] += 1
+                counts["accepted" if response.status == 200 else "rejected"] += 1
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+    counts["seconds"] = time.perf_counter() - started
+    return counts
+
+
+def shuffled(bodies: list[str], duplicates: float = 0.0, seed: int = 7) -> list[str]:
+    """`bodies` in random order, with a `duplicates` fraction of them sent twice."""
+    rng = random.Random(seed)
+    bodies = bodies + [body for body in bodies if rng.random() < duplicates]
+    rng.shuffle(bodies)
+    return bodies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay signed LiveKit webhooks to a receiver")
+    parser.add_argument("url", help="Webhook receiver URL, e.g. http://127.0.0.1:8091/webhook")
+    parser.add_argument("--from", dest="source", help="JSON-lines file of webhook bodies (default: synthetic egress events)")
+    parser.add_argument("--rooms", type=int, default=500, help="Rooms for synthetic events")
+    parser.add_argument("--ended", type=float, default=0.8, help="Fraction of synthetic egresses that complete")
+    parser.add_argument("--shuffle", action="store_true", help="Send the events in random order")
+    parser.add_argument("--duplicates", type=float, default=0.0, help="Fraction of events sent twice (implies --shuffle)")
+    parser.add_argument("--bad-signatures", type=float, default=0.0, help="Fraction of events also sent with a wrong signature")
+    parser.add_argument("--concurrency", type=int, default=8, help="Webhooks in flight")
+    args = parser.parse_args()
+
+    if not LIVEKIT_API_KEY or not LIVEKIT_API_SECRET:
+        raise SystemExit("LIVEKIT_API_KEY and LIVEKIT_API_SECRET must be set (the receiver's key and secret)")
+    if args.source:
+        bodies = load_events(args.source)
+    else:
+        bodies = [MessageToJson(event, indent=None) for event in egress_events(args.rooms, args.ended)]
+    if args.shuffle or args.duplicates:
+        bodies = shuffled(bodies, args.duplicates)
+
+    result = asyncio.run(replay(args.url, bodies, LIVEKIT_API_KEY, LIVEKIT_API_SECRET,
+                                concurrency=args.concurrency, bad_signatures=args.bad_signatures))
+    print(json.dumps({**result, "seconds": round(result["seconds"], 3)}))
+    return 0 if result["accepted"] == result["sent"] - result["bad_signatures"] else 1
+
+
+if __name__ == "__main__":
+    exit(main())
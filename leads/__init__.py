@@ -0,0 +1,28 @@
+from .outbox import LeadOutbox, lead_idempotency_key
+from .delivery import LeadDelivery
+from .dedup import LeadDedupIndex, normalize_phone, merge_leads
+from .sink import (
+    LeadSink,
+    StdoutLeadSink,
+    OutboxLeadSink,
+    create_lead_sink,
+    get_lead_sink,
+    close_lead_sink,
+)
+from .submitter import LeadSubmitter
+
+__all__ = [
+    "LeadOutbox",
+    "lead_idempotency_key",
+    "LeadDelivery",
+    "LeadDedupIndex",
+    "normalize_phone",
+    "merge_leads",
+    "LeadSink",
+    "StdoutLeadSink",
+    "OutboxLeadSink",
+    "create_lead_sink",
+    "get_lead_sink",
+    "close_lead_sink",
+    "LeadSubmitter",
+]
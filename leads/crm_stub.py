@@ -0,0 +1,108 @@
+"""
+Local stand-in for the CRM lead endpoint.
+
+Accepts the batches sent by LeadDelivery, de-duplicates them by idempotency
+key and can inject latency and failures to exercise the retry path.
+
+Usage:
+    python -m leads.crm_stub [--port 8089] [--latency-ms 20] [--fail-rate 0.1]
+
+Then point the worker at it:
+    CRM_ENDPOINT_URL=http://127.0.0.1:8089/leads python main.py dev
+"""
+import argparse
+import asyncio
+import random
+
+from aiohttp import web
+
+
+class CRMStub:
+    """In-memory CRM that records leads by idempotency key."""
+
+    def __init__(self, latency_ms: float = 0.0, fail_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.leads: dict[str, dict] = {}
+        self.requests = 0
+        self.duplicates = 0
+        self.failures = 0
+
+    async def handle_leads(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        if self.fail_rate and random.random() < self.fail_rate:
+            self.failures += 1
+            return web.json_response({"error": "injected failure"}, status=503)
+
+        body = await request.json()
+        results = []
+        for lead in body.get("leads", []):
+            key = lead.get("idempotency_key")
+            if not key:
+                return web.json_response({"error": "idempotency_key is required"}, status=400)
+            status = "updated" if key in self.leads else "created"
+            if status == "updated":
+                self.duplicates += 1
+            self.leads[key] = lead
+            results.append({"idempotency_key": key, "status": status})
+        return web.json_response({"results": results})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def stats(self) -> dict:
+        return {
+            "leads": len(self.leads),
+            "requests": self.requests,
+            "duplicates": self.duplicates,
+            "failures": self.failures,
+        }
+
+    def create_app(self) -> web.Application:
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_post("/leads", self.handle_leads)
+        app.router.add_get("/stats", self.handle_stats)
+        return app
+
+
+async def start_crm_stub(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    **kwargs,
+) -> tuple[CRMStub, web.AppRunner, str]:
+    """
+    Start a CRM stub on the running event loop.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        **kwargs: Passed to CRMStub
+
+    Returns:
+        Tuple of (stub, runner, leads endpoint URL). Call `runner.cleanup()` to stop it.
+    """
+    stub = CRMStub(**kwargs)
+    runner = web.AppRunner(stub.create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return stub, runner, f"http://{host}:{bound_port}/leads"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in CRM lead endpoint")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8089, help="Port to bind (default: 8089)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    stub = CRMStub(latency_ms=args.latency_ms, fail_rate=args.fail_rate)
+    web.run_app(stub.create_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""
+Cross-call lead deduplication by normalized phone number.
+
+Parents often call back during a campaign. The outbox keeps one lead per
+parent: each lead's contact_phone is normalized to its 10 digits and looked
+up in a phone index, and a repeat call is merged into the existing lead
+(same idempotency key, newer values win, every conversation_id kept) instead
+of creating a new record. The CRM sees an update of the lead it already has.
+
+The index is a `lead_phones` table in the outbox database, keyed by the
+phone number as an integer rowid, so a merge commits atomically with the
+lead itself and holds across worker processes. A memory-mapped bloom filter
+file sits in front of it: most callers are new, and for them submit_lead's
+lookup answers from a few bit probes without touching SQLite.
+
+Rebuild the index from the outbox (e.g. after restoring a backup or
+changing LEAD_DEDUP_CAPACITY) with the workers stopped:
+    python -m leads.dedup rebuild [--outbox data/lead_outbox.sqlite3]
+"""
+import argparse
+import json
+import math
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from config.settings import (
+    LEAD_OUTBOX_PATH,
+    LEAD_DEDUP_BLOOM_PATH,
+    LEAD_DEDUP_CAPACITY,
+    LEAD_DEDUP_WINDOW_DAYS,
+)
+from .outbox import _create_schema
+
+_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lead_phones (
+    phone INTEGER PRIMARY KEY,
+    idempotency_key TEXT NOT NULL,
+    last_seen REAL NOT NULL
+);
+"""
+
+_NON_DIGITS = re.compile(r"\D")
+_M64 = (1 << 64) - 1
+
+
+def normalize_phone(raw) -> str | None:
+    """
+    Normalize an Indian phone number to its 10 digits.
+
+    Accepts +91 / 91 / 0091 / 0 prefixes, spaces, dashes, dots and brackets,
+    e.g. "+91 98765-43210" and "098765 43210" both give "9876543210".
+
+    Returns:
+        The 10-digit number, or None if `raw` is not a plausible phone number
+    """
+    if raw is None:
+        return None
+    # Subscriber numbers never start with 0, so leading zeros are trunk/international prefixes
+    digits = _NON_DIGITS.sub("", str(raw)).lstrip("0")
+    if len(digits) == 12 and digits.startswith("91"):
+        digits = digits[2:]
+    if len(digits) != 10 or digits[0] == "1":
+        return None
+    return digits
+
+
+def merge_leads(existing: dict, new: dict) -> dict:
+    """
+    Merge a repeat call's lead into the stored one.
+
+    Values from the newer lead win unless they are empty. The first call's
+    conversation_id is kept and every call is listed in conversation_ids.
+    """
+    merged = dict(existing)
+    for field, value in new.items():
+        if field not in ("conversation_id", "conversation_ids") and value not in (None, ""):
+            merged[field] = value
+    ids = list(existing.get("conversation_ids") or [existing.get("conversation_id")])
+    if new.get("conversation_id") not in ids:
+        ids.append(new.get("conversation_id"))
+    merged["conversation_ids"] = [i for i in ids if i]
+    # A lead stays partial only while every call so far dropped early
+    if existing.get("partial") and new.get("partial"):
+        merged["missing"] = [field for field in new.get("missing", []) if not merged.get(field)]
+    else:
+        merged.pop("partial", None)
+        merged.pop("missing", None)
+    return merged
+
+
+def _mix(x: int) -> int:
+    # splitmix64 finalizer; _mix_array is the same function over uint64 arrays
+    x = (x + 0x9E3779B97F4A7C15) & _M64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _M64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _M64
+    return x ^ (x >> 31)
+
+
+def _mix_array(x: np.ndarray) -> np.ndarray:
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+class PhoneBloomFilter:
+    """
+    Bloom filter over phone numbers in a memory-mapped file.
+
+    Every process maps the same file, so bits set by one worker are seen by
+    all of them. Bits are only set by the outbox writer while it holds the
+    SQLite write lock, which serializes writers across processes.
+
+    Args:
+        path: Filter file; created (sized for `capacity`) if missing
+        capacity: Expected number of distinct phones
+        error_rate: False positive rate at `capacity`
+    """
+
+    _HEADER = struct.Struct("<8sQI4x")
+    _MAGIC = b"LEADBLM1"
+
+    def __init__(self, path: str | Path, capacity: int = 10_000_000, error_rate: float = 0.001):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        bits = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        hashes = max(1, round(bits / capacity * math.log(2)))
+        self.created = False
+        fd = None
+        if not self.path.exists():
+            # Written in full under a private name and linked into place, so a process opening the
+            # filter never reads a header that is not written yet; link() fails if another process
+            # created the filter first, and then that one is used
+            tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.{threading.get_ident()}")
+            fd = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_TRUNC)
+            try:
+                # Sparse until bits are set
+                os.ftruncate(fd, self._HEADER.size + (bits + 7) // 8)
+                os.pwrite(fd, self._HEADER.pack(self._MAGIC, bits, hashes), 0)
+                os.link(tmp, self.path)
+                self.created = True
+            except FileExistsError:
+                os.close(fd)
+                fd = None
+            except BaseException:
+                os.close(fd)
+                raise
+            finally:
+                tmp.unlink(missing_ok=True)
+        if fd is None:
+            fd = os.open(self.path, os.O_RDWR)
+        try:
+            self._mmap = mmap.mmap(fd, 0)
+        finally:
+            os.close(fd)
+        magic, self.bits, self.hashes = self._HEADER.unpack_from(self._mmap, 0)
+        if magic != self._MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{self.path} is not a lead phone bloom filter")
+        self._offset = self._HEADER.size
+
+    def _positions(self, number: int) -> list[int]:
+        # Double hashing: probe i is h1 + i * h2
+        h1 = _mix(number)
+        h2 = _mix(h1) | 1
+        bits = self.bits
+        return [((h1 + i * h2) & _M64) % bits for i in range(self.hashes)]
+
+    def __contains__(self, number: int) -> bool:
+        # Same probes as _positions, computed lazily: a miss usually stops at the first one
+        mm, offset, bits = self._mmap, self._offset, self.bits
+        h1 = _mix(number)
+        h2 = _mix(h1) | 1
+        for i in range(self.hashes):
+            pos = ((h1 + i * h2) & _M64) % bits
+            if not mm[offset + (pos >> 3)] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def add(self, number: int) -> None:
+        mm, offset = self._mmap, self._offset
+        for pos in self._positions(number):
+            index = offset + (pos >> 3)
+            mm[index] |= 1 << (pos & 7)
+
+    def add_many(self, numbers: np.ndarray, chunk: int = 1_000_000) -> None:
+        """Add an array of phone numbers (as integers) at once."""
+        bits = np.frombuffer(self._mmap, dtype=np.uint8, offset=self._offset)
+        rounds = np.arange(self.hashes, dtype=np.uint64)
+        for start in range(0, len(numbers), chunk):
+            h1 = _mix_array(numbers[start:start + chunk].astype(np.uint64))
+            h2 = _mix_array(h1) | np.uint64(1)
+            positions = ((h1[:, None] + rounds[None, :] * h2[:, None]) % np.uint64(self.bits)).ravel()
+            np.bitwise_or.at(bits, positions >> np.uint64(3), np.left_shift(1, positions & np.uint64(7)).astype(np.uint8))
+        del bits
+
+    def close(self) -> None:
+        self._mmap.close()
+
+
+class LeadDedupIndex:
+    """
+    Phone index of the leads in one outbox.
+
+    Args:
+        db_path: Lead outbox database that holds the lead_phones table
+        bloom_path: Bloom filter file in front of the table
+        capacity: Expected number of distinct phones, used to size a new filter
+        window_days: Only merge into leads seen within this many days; 0 merges regardless of age
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path = LEAD_OUTBOX_PATH,
+        bloom_path: str | Path = LEAD_DEDUP_BLOOM_PATH,
+        capacity: int = LEAD_DEDUP_CAPACITY,
+        window_days: float = LEAD_DEDUP_WINDOW_DAYS,
+    ):
+        self.db_path = Path(db_path)
+        self.bloom_path = Path(bloom_path)
+        self.capacity = capacity
+        self.window = window_days * 86400
+        self.merged = 0
+        self._lock = threading.Lock()
+        self._reader = self._connect()
+        self._bloom = PhoneBloomFilter(self.bloom_path, capacity)
+        if self._bloom.created:
+            # New filter over an existing index (first start, or the file was removed)
+            self._bloom.add_many(self._indexed_phones(self._reader))
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        _create_schema(conn)
+        conn.executescript(_INDEX_SCHEMA)
+        return conn
+
+    @staticmethod
+    def _indexed_phones(conn: sqlite3.Connection) -> np.ndarray:
+        cursor = conn.execute("SELECT phone FROM lead_phones")
+        return np.fromiter((row[0] for row in cursor), dtype=np.uint64)
+
+    def _expired(self, last_seen: float, now: float) -> bool:
+        return bool(self.window) and now - last_seen > self.window
+
+    def lookup(self, phone: str | None) -> str | None:
+        """
+        Idempotency key of the lead already stored for `phone`, if any.
+
+        Safe to call from the event loop: a phone that was never indexed is
+        answered by the bloom filter alone.
+        """
+        normalized = normalize_phone(phone)
+        if normalized is None:
+            return None
+        number = int(normalized)
+        if number not in self._bloom:
+            return None
+        with self._lock:
+            row = self._reader.execute(
+                "SELECT idempotency_key, last_seen FROM lead_phones WHERE phone = ?", (number,)
+            ).fetchone()
+        if row is None or self._expired(row[1], time.time()):
+            return None
+        return row[0]
+
+    def resolve(self, conn: sqlite3.Connection, key: str, lead: dict, now: float) -> tuple[str, dict]:
+        """
+        Map a lead being written onto the existing lead for its phone.
+
+        Called by the outbox writer inside its write transaction on `conn`.
+        The table is always consulted here, so a merge never depends on the
+        bloom filter being current.
+
+        Returns:
+            (idempotency key, lead) to store: the existing key and the merged
+            lead for a repeat call, otherwise the arguments unchanged
+        """
+        normalized = normalize_phone(lead.get("contact_phone"))
+        if normalized is None:
+            return key, lead
+        number = int(normalized)
+        lead = {**lead, "contact_phone": normalized}
+        row = conn.execute(
+            "SELECT idempotency_key, last_seen FROM lead_phones WHERE phone = ?", (number,)
+        ).fetchone()
+        if row is not None and row[0] == key:
+            # The phone's own lead submitted again
+            conn.execute("UPDATE lead_phones SET last_seen = ? WHERE phone = ?", (now, number))
+            return key, lead
+        existing = None
+        if row is not None and not self._expired(row[1], now):
+            existing = conn.execute("SELECT payload FROM leads WHERE idempotency_key = ?", (row[0],)).fetchone()
+        if existing is None:
+            # A new phone, or its earlier lead expired or was pruned: this lead becomes the phone's lead
+            conn.execute(
+                "INSERT OR REPLACE INTO lead_phones (phone, idempotency_key, last_seen) VALUES (?, ?, ?)",
+                (number, key, now),
+            )
+            if row is None:
+                self._bloom.add(number)
+            return key, lead
+        conn.execute("UPDATE lead_phones SET last_seen = ? WHERE phone = ?", (now, number))
+        self.merged += 1
+        return row[0], merge_leads(json.loads(existing[0]), lead)
+
+    def rebuild(self, batch_size: int = 50_000) -> dict:
+        """
+        Recreate the phone table and the bloom filter from the leads in the outbox.
+
+        Each phone maps to its oldest lead, last seen when any of its leads
+        was last written (a merge rewrites the lead it merges into). Holds the outbox write lock while
+        it runs; workers that have the old filter mapped keep using it until
+        they restart.
+
+        Returns:
+            Counts of leads scanned, phones indexed, duplicate leads and leads without a phone
+        """
+        started = time.perf_counter()
+        conn = self._connect()
+        scanned = with_phone = 0
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM lead_phones")
+            # SQLite extracts the phone, so the payloads are never parsed in Python
+            cursor = conn.execute(
+                "SELECT idempotency_key, json_extract(payload, '$.contact_phone'), "
+                "COALESCE(updated_at, created_at) FROM leads ORDER BY id"
+            )
+            while rows := cursor.fetchmany(batch_size):
+                scanned += len(rows)
+                entries = []
+                for key, phone, updated_at in rows:
+                    normalized = normalize_phone(phone)
+                    if normalized is not None:
+                        entries.append((int(normalized), key, updated_at))
+                with_phone += len(entries)
+                # Sorted by phone for B-tree locality; the sort is stable, so the oldest lead still comes first
+                entries.sort(key=lambda entry: entry[0])
+                conn.executemany(
+                    "INSERT INTO lead_phones (phone, idempotency_key, last_seen) VALUES (?, ?, ?) "
+                    "ON CONFLICT (phone) DO UPDATE SET last_seen = MAX(last_seen, excluded.last_seen)",
+                    entries,
+                )
+            phones = self._indexed_phones(conn)
+
+            tmp = self.bloom_path.with_name(self.bloom_path.name + ".tmp")
+            tmp.unlink(missing_ok=True)
+            bloom = PhoneBloomFilter(tmp, max(self.capacity, len(phones)))
+            bloom.add_many(phones)
+            bloom.close()
+            os.replace(tmp, self.bloom_path)
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        self._bloom.close()
+        self._bloom = PhoneBloomFilter(self.bloom_path, self.capacity)
+        return {
+            "leads": scanned,
+            "phones": len(phones),
+            "duplicates": with_phone - len(phones),
+            "without_phone": scanned - with_phone,
+            "seconds": time.perf_counter() - started,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._reader.close()
+        self._bloom.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lead phone dedup index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild = sub.add_parser("rebuild", help="Recreate the index from the lead outbox")
+    rebuild.add_argument("--outbox", default=LEAD_OUTBOX_PATH, help="Lead outbox database")
+    rebuild.add_argument("--bloom", default=LEAD_DEDUP_BLOOM_PATH, help="Bloom filter file")
+    rebuild.add_argument("--capacity", type=int, default=LEAD_DEDUP_CAPACITY, help="Expected distinct phones")
+    lookup = sub.add_parser("lookup", help="Print the lead key stored for a phone number")
+    lookup.add_argument("phone")
+    lookup.add_argument("--outbox", default=LEAD_OUTBOX_PATH, help="Lead outbox database")
+    lookup.add_argument("--bloom", default=LEAD_DEDUP_BLOOM_PATH, help="Bloom filter file")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        index = LeadDedupIndex(args.outbox, args.bloom, capacity=args.capacity)
+        stats = index.rebuild()
+        index.close()
+        print(f"Indexed {stats['phones']:,} phones from {stats['leads']:,} leads "
+              f"({stats['duplicates']:,} duplicates, {stats['without_phone']:,} without a phone) in {stats['seconds']:.1f}s")
+    else:
+        index = LeadDedupIndex(args.outbox, args.bloom)
+        print(index.lookup(args.phone) or "not found")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
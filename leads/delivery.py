@@ -0,0 +1,159 @@
+"""
+Background delivery of outbox leads to the CRM.
+
+A single asyncio task per worker process drains the outbox in batches over
+one pooled aiohttp session. Every lead carries its idempotency key so the CRM
+can safely de-duplicate retried or re-submitted leads.
+"""
+import asyncio
+import hashlib
+
+import aiohttp
+
+from .outbox import LeadOutbox
+
+# Client errors that mean "try again later"; any other 4xx is a permanent rejection
+_RETRYABLE_CLIENT_STATUSES = {408, 425, 429}
+
+
+class LeadDelivery:
+    """
+    Drains a LeadOutbox to a CRM HTTP endpoint.
+
+    Args:
+        outbox: Outbox to drain
+        endpoint: CRM URL that accepts POSTed lead batches
+        api_key: Optional bearer token sent with every request
+        batch_size: Maximum number of leads per request
+        max_attempts: Attempts before a lead is parked as failed
+        backoff_base: Initial retry delay in seconds, doubled on every attempt
+        poll_interval: Seconds between outbox polls when idle
+        request_timeout: Per-request timeout in seconds
+        max_connections: Size of the HTTP connection pool
+    """
+
+    def __init__(
+        self,
+        outbox: LeadOutbox,
+        endpoint: str,
+        api_key: str | None = None,
+        batch_size: int = 100,
+        max_attempts: int = 8,
+        backoff_base: float = 1.0,
+        poll_interval: float = 1.0,
+        request_timeout: float = 10.0,
+        max_connections: int = 4,
+    ):
+        self.outbox = outbox
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.poll_interval = poll_interval
+        self.request_timeout = request_timeout
+        self.max_connections = max_connections
+        self._http: aiohttp.ClientSession | None = None
+        self._task: asyncio.Task | None = None
+        self._wakeup = asyncio.Event()
+        self._closing = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the delivery task on the running event loop (idempotent)."""
+        if self.running or self._closing:
+            return
+        self._task = asyncio.create_task(self._run(), name="lead-delivery")
+
+    def notify(self) -> None:
+        """Wake the delivery task after new leads were appended."""
+        self._wakeup.set()
+
+    def _session(self) -> aiohttp.ClientSession:
+        if self._http is None or self._http.closed:
+            headers = {"Content-Type": "application/json"}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+            self._http = aiohttp.ClientSession(
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+            )
+        return self._http
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                claimed = await self.deliver_once()
+            except Exception as e:
+                print(f"Lead delivery error: {e}")
+                claimed = 0
+            if claimed < self.batch_size:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def deliver_once(self) -> int:
+        """
+        Claim and deliver one batch of pending leads.
+
+        Returns:
+            Number of leads claimed from the outbox (0 when it is empty)
+        """
+        rows = await asyncio.to_thread(self.outbox.claim_batch, self.batch_size)
+        if not rows:
+            return 0
+
+        ids = [row_id for row_id, _, _ in rows]
+        keys = [key for _, key, _ in rows]
+        body = {
+            "leads": [{**lead, "idempotency_key": key} for _, key, lead in rows],
+        }
+        batch_key = hashlib.sha256("\n".join(keys).encode()).hexdigest()
+
+        try:
+            async with self._session().post(
+                self.endpoint, json=body, headers={"Idempotency-Key": batch_key}
+            ) as resp:
+                if resp.status < 300:
+                    await asyncio.to_thread(self.outbox.mark_delivered, ids)
+                    return len(rows)
+                error = f"HTTP {resp.status}: {(await resp.text())[:200]}"
+                retry = resp.status >= 500 or resp.status in _RETRYABLE_CLIENT_STATUSES
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = f"{type(e).__name__}: {e}"
+            retry = True
+
+        await asyncio.to_thread(
+            self.outbox.mark_failed, ids, error, retry, self.max_attempts, self.backoff_base
+        )
+        return len(rows)
+
+    async def aclose(self, drain_timeout: float = 5.0) -> None:
+        """
+        Stop the delivery task after a best-effort final drain.
+
+        Leads that could not be delivered within `drain_timeout` stay in the
+        outbox and are picked up by the next worker that opens it.
+        """
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._finish(), drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._task = None
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    async def _finish(self) -> None:
+        await self._task
+        while await self.deliver_once() == self.batch_size:
+            pass
@@ -0,0 +1,339 @@
+"""
+Durable write-ahead outbox for captured leads.
+
+Leads are appended to a local SQLite database (WAL mode) by a single writer
+thread per process. Appends that arrive while a commit is in flight are
+grouped into the next transaction and share one fsync. Grouping only spans
+one process: LiveKit runs each job in its own process, so the sessions of a
+worker commit separately, and SQLite serializes their transactions.
+
+With a LeadDedupIndex (leads/dedup.py), a lead whose phone already has a
+lead is merged into it inside the same transaction.
+"""
+import asyncio
+import json
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    conversation_id TEXT,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0,
+    delivered_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS leads_pending
+    ON leads (next_attempt_at) WHERE status = 'pending';
+"""
+
+_UPSERT = """
+INSERT INTO leads (idempotency_key, conversation_id, payload, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (idempotency_key) DO UPDATE SET
+    payload = excluded.payload,
+    updated_at = excluded.updated_at,
+    status = 'pending',
+    attempts = 0,
+    next_attempt_at = 0,
+    lease_until = 0,
+    delivered_at = NULL,
+    last_error = NULL
+"""
+
+_STOP = object()
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    """Create the leads table, adding columns that databases from older versions lack."""
+    conn.executescript(_SCHEMA)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(leads)")}
+    if "updated_at" not in columns:
+        try:
+            conn.execute("ALTER TABLE leads ADD COLUMN updated_at REAL")
+        except sqlite3.OperationalError as e:
+            # Another process added it first
+            if "duplicate column" not in str(e):
+                raise
+
+
+def lead_idempotency_key(lead: dict) -> str:
+    """
+    Return the idempotency key for a lead.
+
+    The conversation_id is used when present so that a repeated submit_lead
+    call for the same conversation updates the existing record instead of
+    creating a second one.
+    """
+    return lead.get("conversation_id") or str(uuid.uuid4())
+
+
+def _resolve(fut: asyncio.Future, error: BaseException | None, key: str | None = None) -> None:
+    if fut.done():
+        return
+    if error is None:
+        fut.set_result(key)
+    else:
+        fut.set_exception(error)
+
+
+class LeadOutbox:
+    """
+    Append-only lead outbox backed by SQLite.
+
+    Args:
+        path: Location of the SQLite database file
+        max_batch: Maximum number of leads written per transaction
+        synchronous: SQLite synchronous pragma ("FULL" fsyncs every commit)
+        dedup: Phone index used to merge repeat calls into one lead
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_batch: int = 256,
+        synchronous: str = "FULL",
+        dedup=None,
+    ):
+        self.path = Path(path)
+        self.max_batch = max_batch
+        self.synchronous = synchronous
+        self.dedup = dedup
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer: threading.Thread | None = None
+        self._writer_lock = threading.Lock()
+        self._reader: sqlite3.Connection | None = None
+        self._reader_lock = threading.Lock()
+        self._closed = False
+        # Number of committed write transactions (one fsync each with synchronous=FULL)
+        self.commits = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            str(self.path),
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        _create_schema(conn)
+        return conn
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._run_writer, name="lead-outbox-writer", daemon=True
+                )
+                self._writer.start()
+
+    async def append(self, lead: dict) -> str:
+        """
+        Append a lead and wait until it has been committed to disk.
+
+        Args:
+            lead: Lead dictionary as produced by submit_lead
+
+        Returns:
+            The idempotency key the lead was stored under (an earlier lead's
+            key when it was merged into that lead)
+        """
+        if self._closed:
+            raise RuntimeError("Lead outbox is closed")
+        self._ensure_writer()
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        key = lead_idempotency_key(lead)
+        self._queue.put((key, lead, loop, fut))
+        return await fut or key
+
+    def _run_writer(self) -> None:
+        conn = self._connect()
+        try:
+            stop = False
+            while not stop:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                batch = [item]
+                while len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+                self._write_batch(conn, batch)
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: list) -> None:
+        now = time.time()
+        keys = [key for key, _, _, _ in batch]
+        error = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if self.dedup is None:
+                conn.executemany(_UPSERT, [
+                    (key, lead.get("conversation_id"), json.dumps(lead, ensure_ascii=False), now, now)
+                    for key, lead, _, _ in batch
+                ])
+            else:
+                # One row at a time, so a repeat call later in the batch sees the lead it merges into
+                for i, (key, lead, _, _) in enumerate(batch):
+                    keys[i], lead = self.dedup.resolve(conn, key, lead, now)
+                    conn.execute(_UPSERT, (keys[i], lead.get("conversation_id"), json.dumps(lead, ensure_ascii=False), now, now))
+            conn.execute("COMMIT")
+            self.commits += 1
+        except (sqlite3.Error, ValueError) as e:
+            error = e
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+        for key, (_, _, loop, fut) in zip(keys, batch):
+            try:
+                loop.call_soon_threadsafe(_resolve, fut, error, key)
+            except RuntimeError:
+                # The submitting event loop has already been closed
+                pass
+
+    def _read_conn(self) -> sqlite3.Connection:
+        if self._reader is None:
+            self._reader = self._connect()
+        return self._reader
+
+    def claim_batch(self, limit: int, lease_seconds: float = 30.0) -> list[tuple[int, str, dict]]:
+        """
+        Lease up to `limit` pending leads for delivery.
+
+        Leased rows are invisible to other delivery tasks (including ones in
+        other worker processes) until the lease expires.
+
+        Returns:
+            List of (row id, idempotency key, lead) tuples
+        """
+        now = time.time()
+        with self._reader_lock:
+            conn = self._read_conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    """
+                    UPDATE leads SET lease_until = ?
+                    WHERE id IN (
+                        SELECT id FROM leads
+                        WHERE status = 'pending' AND next_attempt_at <= ? AND lease_until <= ?
+                        ORDER BY next_attempt_at, id
+                        LIMIT ?
+                    )
+                    RETURNING id, idempotency_key, payload
+                    """,
+                    (now + lease_seconds, now, now, limit),
+                ).fetchall()
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+        return [(row_id, key, json.loads(payload)) for row_id, key, payload in rows]
+
+    def mark_delivered(self, ids: list[int]) -> None:
+        """
+        Mark leased leads as delivered.
+
+        A lead that was re-submitted while its lease was held has had the
+        lease cleared by the upsert and stays pending, so the newer payload
+        is delivered on the next pass.
+        """
+        now = time.time()
+        with self._reader_lock:
+            conn = self._read_conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "UPDATE leads SET status = 'delivered', delivered_at = ?, lease_until = 0 WHERE id = ? AND lease_until > 0",
+                    [(now, row_id) for row_id in ids],
+                )
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+
+    def mark_failed(
+        self,
+        ids: list[int],
+        error: str,
+        retry: bool = True,
+        max_attempts: int = 8,
+        backoff_base: float = 1.0,
+        backoff_max: float = 300.0,
+    ) -> None:
+        """
+        Record a failed delivery attempt for leased leads.
+
+        Retryable failures are rescheduled with exponential backoff until
+        `max_attempts` is reached, after which the lead is parked as "failed"
+        and kept on disk for inspection.
+        """
+        now = time.time()
+        with self._reader_lock:
+            conn = self._read_conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    """
+                    UPDATE leads SET
+                        attempts = attempts + 1,
+                        status = CASE WHEN ? AND attempts + 1 < ? THEN 'pending' ELSE 'failed' END,
+                        next_attempt_at = ? + MIN(?, ? * (1 << MIN(attempts, 20))),
+                        lease_until = 0,
+                        last_error = ?
+                    WHERE id = ? AND lease_until > 0
+                    """,
+                    [
+                        (int(retry), max_attempts, now, backoff_max, backoff_base, error, row_id)
+                        for row_id in ids
+                    ],
+                )
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+
+    def counts(self) -> dict[str, int]:
+        """Return the number of leads per delivery status."""
+        with self._reader_lock:
+            rows = self._read_conn().execute(
+                "SELECT status, COUNT(*) FROM leads GROUP BY status"
+            ).fetchall()
+        return dict(rows)
+
+    async def aclose(self) -> None:
+        """Flush queued appends and close the outbox."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not None:
+            self._queue.put(_STOP)
+            await asyncio.to_thread(self._writer.join)
+        with self._reader_lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+        if self.dedup is not None:
+            self.dedup.close()
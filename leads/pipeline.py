@@ -0,0 +1,681 @@
+"""
+Batch normalization and priority scoring of captured leads.
+
+submit_lead stores the parent's answers as free text ("Under ₹10,000 per
+month", "As soon as possible", "8th grade"). This pipeline turns lead files
+into typed columns for routing jobs:
+    conversation_id            bytes
+    phone                      normalized 10-digit number, 0 when missing (int64)
+    grade                      class 1-12, 0 pre-primary, 13 after class 12, -1 unknown (int8)
+    subjects                   bitmask over SUBJECTS (uint16)
+    exam                       index into EXAMS (uint8)
+    budget_min, budget_max     ₹ per month, NaN when unknown or open-ended (float32)
+    decision_maker             index into DECISION_MAKERS (uint8)
+    timeline, urgency          index into TIMELINES / URGENCIES (uint8)
+    calls                      conversations merged into the lead (uint8)
+    partial                    lead saved from a dropped call (bool)
+    score                      priority 0-100 (float32)
+
+Input files (JSON lines with one lead per line, or a lead outbox database)
+are split into byte or row ranges, one range per process pool task. Within a
+range each free-text column is factorized: every distinct answer is parsed
+once and the results are gathered back over the rows with NumPy indexing, so
+the regex work grows with the number of distinct answers rather than the
+number of leads. The score is computed over whole columns.
+
+Each range is written as one part file (part-00000.npz, ...) of the output
+directory, next to a schema.json with the code tables:
+    python -m leads.pipeline data/leads.jsonl data/lead_outbox.sqlite3 --out data/lead_columns
+Read it back with load_columns("data/lead_columns").
+"""
+import argparse
+import json
+import math
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from .dedup import normalize_phone
+
+SUBJECTS = (
+    "Mathematics", "Physics", "Chemistry", "Biology", "Science", "English", "Hindi",
+    "Social Science", "Computer Science", "Accountancy", "Economics", "Business Studies",
+    "Languages", "All subjects", "Other",
+)
+EXAMS = ("", "NEET", "JEE", "Boards", "Olympiad", "CUET", "Other")
+DECISION_MAKERS = ("", "Both parents", "Father", "Mother", "Parent", "Other")
+TIMELINES = ("", "Immediate", "Within a month", "Within 3 months", "Later")
+URGENCIES = ("", "Immediate", "Within a month", "Planning ahead", "Low")
+
+# Free-text lead fields, factorized per range
+TEXT_FIELDS = ("child_class", "subjects", "exam_info", "budget_range", "decision_maker", "timeline", "urgency")
+
+# Score points per code, index 0 being unknown; the maxima add up to 100
+URGENCY_POINTS = np.array([10, 35, 25, 12, 3], dtype=np.float32)
+TIMELINE_POINTS = np.array([6, 20, 15, 9, 3], dtype=np.float32)
+DECISION_POINTS = np.array([5, 10, 10, 10, 9, 4], dtype=np.float32)
+BUDGET_POINTS = 20.0
+# Monthly budget that earns all the budget points; unknown budgets get UNKNOWN_BUDGET_POINTS
+FULL_BUDGET = 10_000.0
+UNKNOWN_BUDGET_POINTS = 8.0
+COMPLETENESS_POINTS = 10.0
+EXAM_POINTS = 5.0
+# Multipliers for leads from dropped calls and bonus for parents who called more than once
+PARTIAL_FACTOR = 0.8
+REPEAT_CALLER_POINTS = 5.0
+
+SCHEMA_VERSION = 1
+
+_SPACES = re.compile(r"\s+")
+
+
+def _clean(text: str) -> str:
+    return _SPACES.sub(" ", text.lower()).strip()
+
+
+# --- Budget -------------------------------------------------------------------
+
+_AMOUNT = re.compile(
+    r"(₹|\b(?:rs|inr)\.?)?\s*(\d+(?:,\d+)*(?:\.\d+)?)\s*(k\b|thousand|lakhs?|lacs?|l\b)?"
+    r"(\s*(?:rs\b|rupees?\b|/-)|\s*(?:-|–|to\b)\s*(?=₹|rs\b|\d))?"
+)
+_MULTIPLIERS = {"k": 1e3, "thousand": 1e3, "lakh": 1e5, "lakhs": 1e5, "lac": 1e5, "lacs": 1e5, "l": 1e5}
+_PER = r"(?:per|a|an|/|every|each)\s*"
+_PER_YEAR = re.compile(rf"{_PER}(?:year|yr|annum)\b|\byearly\b|\bannual(?:ly)?\b|\bp\.?\s?a\b")
+_PER_HALF_YEAR = re.compile(r"\bhalf[- ]?year(?:ly)?\b|\bsemester\b|\bsix months\b")
+_PER_QUARTER = re.compile(rf"{_PER}quarter\b|\bquarterly\b")
+_PER_WEEK = re.compile(rf"{_PER}week\b|\bweekly\b")
+# Hourly or per-class rates are not comparable with monthly budgets
+_PER_SESSION = re.compile(rf"{_PER}(?:hour|hr|class|session|lecture)\b|\bhourly\b")
+_BELOW = re.compile(r"\b(?:under|below|less than|up ?to|upto|max(?:imum)?|within|not more than|at most)\b")
+_ABOVE = re.compile(r"\b(?:above|over|more than|at least|min(?:imum)?|starting)\b|\d\s*\+")
+# Bare numbers below this are a count or a class ("2 kids", "class 11") unless they carry a cue
+_MIN_BARE_AMOUNT = 100
+# Without a stated period, amounts this large are yearly fees
+_YEARLY_THRESHOLD = 50_000
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_budget(text: str) -> tuple[float, float]:
+    """
+    Parse a budget answer into a monthly ₹ range.
+
+    "Under ₹10,000 per month" gives (0, 10000), "₹5-8k" gives (5000, 8000),
+    "1.2 lakh per year" gives (10000, 10000) and "Above 5000" gives (5000, nan).
+    Numbers below 100 only count with a ₹/rs prefix or suffix, a k/thousand/lakh
+    unit, or as the start of a range ("5-8k"), so "5000 per month for 2 kids"
+    gives (5000, 5000).
+
+    Returns:
+        (min, max) in ₹ per month; NaN where the answer gives no bound
+    """
+    text = _clean(text)
+    amounts = []
+    multipliers = []
+    for currency, number, unit, cue in _AMOUNT.findall(text):
+        amount = float(number.replace(",", ""))
+        if amount < _MIN_BARE_AMOUNT and not (currency or unit or cue):
+            continue
+        amounts.append(amount)
+        multipliers.append(_MULTIPLIERS.get(unit, 0.0))
+    if not amounts:
+        return math.nan, math.nan
+    # "5-8k": a unit on the last amount applies to smaller bare amounts before it
+    unit = multipliers[-1]
+    amounts = [a * (m or (unit if unit and a < 1000 else 1.0)) for a, m in zip(amounts, multipliers)]
+
+    if _PER_SESSION.search(text):
+        return math.nan, math.nan
+    if _PER_YEAR.search(text):
+        months = 12.0
+    elif _PER_HALF_YEAR.search(text):
+        months = 6.0
+    elif _PER_QUARTER.search(text):
+        months = 3.0
+    elif _PER_WEEK.search(text):
+        months = 12 / 52
+    elif max(amounts) >= _YEARLY_THRESHOLD and "month" not in text:
+        months = 12.0
+    else:
+        months = 1.0
+    amounts = [a / months for a in amounts]
+
+    if len(amounts) > 1:
+        return min(amounts), max(amounts)
+    if _BELOW.search(text):
+        return 0.0, amounts[0]
+    if _ABOVE.search(text):
+        return amounts[0], math.nan
+    return amounts[0], amounts[0]
+
+
+# --- Class --------------------------------------------------------------------
+
+_PRE_PRIMARY = re.compile(r"\b(?:nursery|play ?group|pre-?k|pre-?school|pre-?primary|lkg|ukg|kg|kindergarten)\b")
+_AFTER_SCHOOL = re.compile(r"\b(?:dropper|drop year|repeater|12th pass(?:ed)?|passed 12(?:th)?)\b")
+_PU = re.compile(r"\b(1st|first|i|2nd|second|ii)\s*(?:year\s*)?(?:puc?|pre-?university)\b")
+_GRADE_NUMBER = re.compile(r"\b(\d{1,2})\s*(?:st|nd|rd|th)?\b")
+_GRADE_ROMAN = re.compile(
+    r"\b(?:class|grade|std|standard)\s*([ivx]{1,4})\b|\b([ivx]{1,4})(?:th)?\s*(?:class|grade|std|standard)\b"
+)
+_ROMAN = {"i": 1, "ii": 2, "iii": 3, "iv": 4, "v": 5, "vi": 6, "vii": 7, "viii": 8, "ix": 9, "x": 10, "xi": 11, "xii": 12}
+_GRADE_WORDS = {
+    word: grade
+    for grade, words in enumerate(
+        (
+            ("first", "one"), ("second", "two"), ("third", "three"), ("fourth", "four"),
+            ("fifth", "five"), ("sixth", "six"), ("seventh", "seven"), ("eighth", "eight"),
+            ("ninth", "nine"), ("tenth", "ten"), ("eleventh", "eleven"), ("twelfth", "twelve"),
+        ),
+        start=1,
+    )
+    for word in words
+}
+_GRADE_WORD = re.compile(r"\b(" + "|".join(_GRADE_WORDS) + r")\b")
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_grade(text: str) -> int:
+    """
+    Parse a class answer ("8th grade", "Class IX", "second year PUC", "UKG").
+
+    Returns:
+        1-12, 0 for pre-primary, 13 for students past class 12 (JEE/NEET
+        repeaters), or -1 when no class is recognized
+    """
+    text = _clean(text)
+    if _AFTER_SCHOOL.search(text):
+        return 13
+    match = _PU.search(text)
+    if match:
+        return 11 if match.group(1) in ("1st", "first", "i") else 12
+    if _PRE_PRIMARY.search(text):
+        return 0
+    for number in _GRADE_NUMBER.findall(text):
+        if 1 <= int(number) <= 12:
+            return int(number)
+    match = _GRADE_ROMAN.search(text)
+    if match:
+        return _ROMAN.get(match.group(1) or match.group(2), -1)
+    match = _GRADE_WORD.search(text)
+    if match:
+        return _GRADE_WORDS[match.group(1)]
+    return -1
+
+
+# --- Subjects -----------------------------------------------------------------
+
+# Compound names are matched (and removed) before the single-word ones, so
+# "Social Science" does not also count as Science
+_SUBJECT_PATTERNS = [
+    (SUBJECTS.index(name), re.compile(pattern))
+    for name, pattern in (
+        ("All subjects", r"\ball(?: the)? subjects\b|\bevery subject\b"),
+        ("Social Science", r"\bsocial (?:science|studies)\b|\bsst\b|\bevs\b|\bhistory\b|\bgeography\b|\bcivics\b|\bpolitical science\b"),
+        ("Computer Science", r"\bcomputer(?: science| applications)?\b|\bcs\b|\bcoding\b|\bprogramming\b|\bict\b"),
+        ("Business Studies", r"\bbusiness(?: studies)?\b|\bbst\b|\bcommerce\b"),
+        ("Mathematics", r"\bmaths?\b|\bmathematics\b|\balgebra\b|\bgeometry\b|\bcalculus\b"),
+        ("Physics", r"\bphysics\b|\bphy\b"),
+        ("Chemistry", r"\bchem(?:istry)?\b"),
+        ("Biology", r"\bbio(?:logy)?\b|\bbotany\b|\bzoology\b"),
+        ("Science", r"\bscience\b"),
+        ("English", r"\benglish\b|\beng\b"),
+        ("Hindi", r"\bhindi\b"),
+        ("Accountancy", r"\baccount(?:s|ancy|ing)\b"),
+        ("Economics", r"\beconomics\b|\beco\b"),
+        ("Languages", r"\b(?:sanskrit|kannada|tamil|telugu|malayalam|marathi|bengali|gujarati|french|german|urdu)\b"),
+    )
+]
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_subjects(text: str) -> int:
+    """
+    Parse a subjects answer into a bitmask over SUBJECTS.
+
+    "Physics, Maths" sets the Physics and Mathematics bits; text that names
+    no known subject sets the Other bit.
+    """
+    text = _clean(text)
+    mask = 0
+    for bit, pattern in _SUBJECT_PATTERNS:
+        text, found = pattern.subn(" ", text)
+        if found:
+            mask |= 1 << bit
+    if not mask and text.strip(" ,.-/&"):
+        mask = 1 << SUBJECTS.index("Other")
+    return mask
+
+
+def subject_names(mask: int) -> list[str]:
+    """Names of the subjects set in a bitmask."""
+    return [name for bit, name in enumerate(SUBJECTS) if mask >> bit & 1]
+
+
+# --- Exam, decision maker, timeline, urgency ---------------------------------
+
+_NONE = re.compile(r"^(?:no|none|nothing|nil|not (?:really|yet|sure)|n/?a|-)\b")
+_EXAM_PATTERNS = [
+    (EXAMS.index(name), re.compile(pattern))
+    for name, pattern in (
+        ("NEET", r"\bneet\b|\bmedical entrance\b"),
+        ("JEE", r"\bjee\b|\biit\b|\bengineering entrance\b"),
+        ("CUET", r"\bcuet\b"),
+        ("Olympiad", r"\bolympiads?\b|\bnso\b|\bimo\b|\bntse\b"),
+        ("Boards", r"\bboards?\b|\bcbse\b|\bicse\b|\bsslc\b|\bpuc\b|\bfinal exams?\b"),
+    )
+]
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_exam(text: str) -> int:
+    """Index into EXAMS for an exam answer ("JEE Mains in January" gives JEE)."""
+    text = _clean(text)
+    if not text or _NONE.search(text):
+        return 0
+    for code, pattern in _EXAM_PATTERNS:
+        if pattern.search(text):
+            return code
+    return EXAMS.index("Other")
+
+
+_BOTH = re.compile(r"\bboth\b|\btogether\b|\bjointly\b|\bwe\b|\bparents\b")
+_FATHER = re.compile(r"\bfather\b|\bdad(?:dy)?\b|\bhusband\b|\bpapa\b")
+_MOTHER = re.compile(r"\bmother\b|\bmom\b|\bmum\b|\bwife\b|\bmummy\b|\bmaa\b")
+_PARENT = re.compile(r"\bparent\b|\bme\b|\bmyself\b|\bi\b|\bself\b")
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_decision_maker(text: str) -> int:
+    """Index into DECISION_MAKERS for a decision maker answer."""
+    text = _clean(text)
+    if not text:
+        return 0
+    father, mother = bool(_FATHER.search(text)), bool(_MOTHER.search(text))
+    if (father and mother) or _BOTH.search(text):
+        return DECISION_MAKERS.index("Both parents")
+    if father:
+        return DECISION_MAKERS.index("Father")
+    if mother:
+        return DECISION_MAKERS.index("Mother")
+    if _PARENT.search(text):
+        return DECISION_MAKERS.index("Parent")
+    return DECISION_MAKERS.index("Other")
+
+
+_TIMELINE_PATTERNS = [
+    (TIMELINES.index(name), re.compile(pattern))
+    for name, pattern in (
+        ("Immediate", r"\b(?:immediately|asap|as soon as possible|right away|today|tomorrow|this week|next week|"
+                      r"now|few days|at the earliest|(?:with)?in (?:a|one) week)\b"),
+        ("Within a month", r"\b(?:this month|next month|within (?:a|one|1) month|in a month|few weeks|"
+                           r"couple of weeks|soon)\b"),
+        ("Within 3 months", r"\b(?:couple of months|few months|next quarter|after (?:the )?(?:exams?|holidays|vacation)|"
+                            r"summer|vacation|holidays)\b"),
+        ("Later", r"\b(?:next (?:year|academic year|session|term)|later|no rush|not sure|undecided|"
+                  r"after (?:the )?boards?)\b"),
+    )
+]
+_DURATION = re.compile(r"(\d+)\s*(day|week|month|year)s?\b")
+_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+
+
+def _timeline_bucket(days: int) -> int:
+    if days <= 14:
+        return TIMELINES.index("Immediate")
+    if days <= 31:
+        return TIMELINES.index("Within a month")
+    if days <= 92:
+        return TIMELINES.index("Within 3 months")
+    return TIMELINES.index("Later")
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_timeline(text: str) -> int:
+    """Index into TIMELINES for a timeline answer ("Next week", "in 2 months")."""
+    text = _clean(text)
+    match = _DURATION.search(text)
+    if match:
+        return _timeline_bucket(int(match.group(1)) * _DAYS[match.group(2)])
+    for code, pattern in _TIMELINE_PATTERNS:
+        if pattern.search(text):
+            return code
+    return 0
+
+
+# "Not urgent" must be tested before "urgent"
+_URGENCY_PATTERNS = [
+    (URGENCIES.index(name), re.compile(pattern))
+    for name, pattern in (
+        ("Low", r"\blow\b|\bnot (?:very |that |so )?urgent\b|\bno (?:hurry|rush)\b|\bjust (?:exploring|checking|looking)\b"),
+        ("Immediate", r"\bimmediate(?:ly)?\b|\burgent(?:ly)?\b|\basap\b|\bas soon as possible\b|\bhigh\b|"
+                      r"\bright away\b|\bcritical\b|\bvery\b"),
+        ("Within a month", r"\bwithin a month\b|\bthis month\b|\bmedium\b|\bmoderate\b|\bsoon\b|\bfew weeks\b"),
+        ("Planning ahead", r"\bplanning\b|\bahead\b|\bnext (?:year|term|session|academic year)\b|\blater\b|\bfew months\b"),
+    )
+]
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_urgency(text: str) -> int:
+    """Index into URGENCIES for an urgency answer ("As soon as possible" gives Immediate)."""
+    text = _clean(text)
+    for code, pattern in _URGENCY_PATTERNS:
+        if pattern.search(text):
+            return code
+    return 0
+
+
+# --- Columns ------------------------------------------------------------------
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    return str(value)
+
+
+def _gather(index: dict, codes: list, parse, dtype) -> np.ndarray:
+    # Parse each distinct answer once, then expand over the rows
+    parsed = np.array([parse(value) for value in index], dtype=dtype)
+    return parsed[np.asarray(codes, dtype=np.int32)] if len(parsed) else np.zeros(0, dtype=dtype)
+
+
+def normalize_leads(leads: Iterable[dict]) -> dict[str, np.ndarray]:
+    """
+    Normalize leads into typed columns (see the module docstring), without the score.
+
+    `leads` is consumed once and only the current lead is held, so a
+    generator of parsed lines keeps memory to the distinct answers.
+    """
+    factors = [(field, {}, []) for field in TEXT_FIELDS]
+    conversation_ids = []
+    phones = []
+    calls = []
+    partial = []
+    for lead in leads:
+        for field, index, codes in factors:
+            value = lead.get(field)
+            if value.__class__ is not str:
+                value = _text(value)
+            codes.append(index.setdefault(value, len(index)))
+        conversation_ids.append(lead.get("conversation_id") or "")
+        phones.append(normalize_phone(lead.get("contact_phone")) or 0)
+        calls.append(len(lead.get("conversation_ids") or ()) or 1)
+        partial.append(bool(lead.get("partial")))
+
+    (_, classes, class_codes), (_, subjects, subject_codes), (_, exams, exam_codes), \
+        (_, budgets, budget_codes), (_, deciders, decider_codes), \
+        (_, timelines, timeline_codes), (_, urgencies, urgency_codes) = factors
+
+    budget = _gather(budgets, budget_codes, parse_budget, np.float32)
+    try:
+        ids = np.array(conversation_ids, dtype=np.bytes_)
+    except UnicodeEncodeError:
+        ids = np.array([str(i).encode() for i in conversation_ids], dtype=np.bytes_)
+    return {
+        "conversation_id": ids,
+        "phone": np.array(phones, dtype=np.int64),
+        "grade": _gather(classes, class_codes, parse_grade, np.int8),
+        "subjects": _gather(subjects, subject_codes, parse_subjects, np.uint16),
+        "exam": _gather(exams, exam_codes, parse_exam, np.uint8),
+        "budget_min": budget[:, 0] if budget.ndim == 2 else np.zeros(0, np.float32),
+        "budget_max": budget[:, 1] if budget.ndim == 2 else np.zeros(0, np.float32),
+        "decision_maker": _gather(deciders, decider_codes, parse_decision_maker, np.uint8),
+        "timeline": _gather(timelines, timeline_codes, parse_timeline, np.uint8),
+        "urgency": _gather(urgencies, urgency_codes, parse_urgency, np.uint8),
+        "calls": np.minimum(np.array(calls, dtype=np.int32), 255).astype(np.uint8),
+        "partial": np.array(partial, dtype=bool),
+    }
+
+
+def priority_score(columns: dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Priority score (0-100) of normalized leads; leads without a phone score 0.
+
+    Points come from urgency, timeline, budget (full at FULL_BUDGET per month),
+    the decision maker, how many fields are known and NEET/JEE/board exam
+    preparation. Leads from dropped calls are scaled by PARTIAL_FACTOR and
+    repeat callers get REPEAT_CALLER_POINTS.
+    """
+    budget_min, budget_max = columns["budget_min"], columns["budget_max"]
+    budget = np.where(np.isnan(budget_max), budget_min, budget_max)
+    budget_points = np.where(
+        np.isnan(budget),
+        UNKNOWN_BUDGET_POINTS,
+        BUDGET_POINTS * np.clip(np.nan_to_num(budget) / FULL_BUDGET, 0.0, 1.0),
+    )
+    known = (
+        (columns["grade"] >= 0).astype(np.float32)
+        + (columns["subjects"] > 0)
+        + ~np.isnan(budget)
+        + (columns["decision_maker"] > 0)
+        + (columns["timeline"] > 0)
+        + (columns["urgency"] > 0)
+    )
+    exam = columns["exam"]
+    grade = columns["grade"]
+    exam_points = np.where(
+        (exam == EXAMS.index("NEET")) | (exam == EXAMS.index("JEE")),
+        EXAM_POINTS,
+        np.where((exam == EXAMS.index("Boards")) & ((grade == 10) | (grade == 12)), EXAM_POINTS * 0.6, 0.0),
+    )
+    score = (
+        URGENCY_POINTS[columns["urgency"]]
+        + TIMELINE_POINTS[columns["timeline"]]
+        + DECISION_POINTS[columns["decision_maker"]]
+        + budget_points
+        + COMPLETENESS_POINTS * known / 6
+        + exam_points
+    )
+    score = np.where(columns["partial"], score * PARTIAL_FACTOR, score)
+    score = np.minimum(score + np.where(columns["calls"] > 1, REPEAT_CALLER_POINTS, 0.0), 100.0)
+    return np.where(columns["phone"] > 0, score, 0.0).astype(np.float32)
+
+
+# --- Input ranges ---------------------------------------------------------------
+
+def _is_outbox(path: Path) -> bool:
+    with open(path, "rb") as f:
+        return f.read(16) == b"SQLite format 3\x00"
+
+
+def plan_ranges(paths: Iterable[str | Path], chunk_bytes: int = 32 << 20, chunk_rows: int = 100_000) -> list[tuple]:
+    """
+    Split input files into (kind, path, start, end) ranges.
+
+    JSON lines files are split every `chunk_bytes` (a range owns the lines
+    that start inside it); outbox databases every `chunk_rows` row ids.
+    """
+    ranges = []
+    for path in map(Path, paths):
+        if _is_outbox(path):
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                low, high = conn.execute("SELECT min(id), max(id) FROM leads").fetchone()
+            finally:
+                conn.close()
+            if low is not None:
+                ranges.extend(("outbox", str(path), start, start + chunk_rows)
+                              for start in range(low, high + 1, chunk_rows))
+        else:
+            size = path.stat().st_size
+            ranges.extend(("jsonl", str(path), start, min(start + chunk_bytes, size))
+                          for start in range(0, size, chunk_bytes))
+    return ranges
+
+
+def _read_jsonl(path: str, start: int, end: int) -> list[str]:
+    with open(path, "rb") as f:
+        if start:
+            # The line straddling `start` belongs to the previous range
+            f.seek(start - 1)
+            f.readline()
+        begin = f.tell()
+        if begin >= end:
+            return []
+        data = f.read(end - begin)
+        if not data.endswith(b"\n"):
+            data += f.readline()
+    # Decoding the range once is cheaper than json.loads detecting each line's encoding;
+    # split on "\n" only, as lines may hold a raw U+2028 that str.splitlines breaks on
+    return data.decode("utf-8", errors="replace").split("\n")
+
+
+def _read_outbox(path: str, start: int, end: int) -> list[str]:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("SELECT payload FROM leads WHERE id >= ? AND id < ?", (start, end)).fetchall()
+    finally:
+        conn.close()
+    return [payload for (payload,) in rows]
+
+
+def _parse_lines(lines: list[str], stats: dict):
+    loads = json.JSONDecoder().decode
+    for line in lines:
+        try:
+            lead = loads(line)
+        except ValueError:
+            lead = None
+        if isinstance(lead, dict):
+            yield lead
+        elif line.strip():
+            stats["bad"] += 1
+
+
+def process_range(task: tuple) -> dict:
+    """
+    Normalize and score one input range and write it as an .npz part file.
+
+    Args:
+        task: (kind, path, start, end, part_path) from plan_ranges plus the output file
+
+    Returns:
+        {"part", "rows", "bad", "distinct", "seconds"}
+    """
+    kind, path, start, end, part_path = task
+    started = time.perf_counter()
+    lines = _read_outbox(path, start, end) if kind == "outbox" else _read_jsonl(path, start, end)
+    stats = {"part": Path(part_path).name, "bad": 0}
+    columns = normalize_leads(_parse_lines(lines, stats))
+    del lines
+    columns["score"] = priority_score(columns)
+    stats["rows"] = len(columns["score"])
+    stats["distinct"] = sum(f.cache_info().currsize for f in _PARSERS)
+    tmp = f"{part_path}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **columns)
+    os.replace(tmp, part_path)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+_PARSERS = (parse_grade, parse_subjects, parse_exam, parse_budget, parse_decision_maker, parse_timeline, parse_urgency)
+
+
+def run_pipeline(
+    paths: Iterable[str | Path],
+    out_dir: str | Path,
+    workers: int | None = None,
+    chunk_bytes: int = 32 << 20,
+    chunk_rows: int = 100_000,
+) -> dict:
+    """
+    Normalize and score lead files into a columnar output directory.
+
+    Args:
+        paths: JSON lines files and/or lead outbox databases
+        out_dir: Output directory; existing part files are replaced
+        workers: Processes in the pool (default: CPU count); 1 runs in this process
+        chunk_bytes: Bytes of a JSON lines file per task
+        chunk_rows: Outbox row ids per task
+
+    Returns:
+        {"rows", "bad", "parts", "bytes", "seconds", "workers"}
+    """
+    started = time.perf_counter()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for stale in out_dir.glob("part-*.npz"):
+        stale.unlink()
+    ranges = plan_ranges(paths, chunk_bytes, chunk_rows)
+    tasks = [(*task, str(out_dir / f"part-{i:05d}.npz")) for i, task in enumerate(ranges)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks) or 1))
+    if workers == 1:
+        results = [process_range(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(process_range, tasks))
+
+    parts = [r["part"] for r in results if r["rows"]]
+    for result in results:
+        if not result["rows"]:
+            (out_dir / result["part"]).unlink()
+    schema = {
+        "version": SCHEMA_VERSION,
+        "rows": sum(r["rows"] for r in results),
+        "parts": parts,
+        "subjects": list(SUBJECTS),
+        "exam": list(EXAMS),
+        "decision_maker": list(DECISION_MAKERS),
+        "timeline": list(TIMELINES),
+        "urgency": list(URGENCIES),
+    }
+    (out_dir / "schema.json").write_text(json.dumps(schema, indent=2, ensure_ascii=False))
+    return {
+        "rows": schema["rows"],
+        "bad": sum(r["bad"] for r in results),
+        "parts": len(parts),
+        "bytes": sum((out_dir / part).stat().st_size for part in parts),
+        "seconds": time.perf_counter() - started,
+        "workers": workers,
+    }
+
+
+def load_columns(out_dir: str | Path, columns: Iterable[str] | None = None) -> dict[str, np.ndarray]:
+    """
+    Load a pipeline output directory into one array per column.
+
+    Args:
+        out_dir: Directory written by run_pipeline
+        columns: Column names to load (default: all)
+    """
+    out_dir = Path(out_dir)
+    schema = json.loads((out_dir / "schema.json").read_text())
+    if schema.get("version") != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported lead columns version {schema.get('version')!r} in {out_dir}")
+    loaded: dict[str, list] = {}
+    for part in schema["parts"]:
+        with np.load(out_dir / part) as data:
+            for name in columns or data.files:
+                loaded.setdefault(name, []).append(data[name])
+    return {name: np.concatenate(arrays) for name, arrays in loaded.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalize and score lead files into columns")
+    parser.add_argument("inputs", nargs="+", help="JSON lines lead files and/or lead outbox databases")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-mb", type=int, default=32, help="Megabytes of a JSON lines file per task")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="Outbox rows per task")
+    args = parser.parse_args()
+
+    stats = run_pipeline(args.inputs, args.out, args.workers, args.chunk_mb << 20, args.chunk_rows)
+    print(f"Scored {stats['rows']:,} leads into {stats['parts']} parts ({stats['bytes'] / 1024 / 1024:.1f} MB) "
+          f"in {stats['seconds']:.1f}s on {stats['workers']} workers ({stats['rows'] / stats['seconds']:,.0f} leads/s)")
+    if stats["bad"]:
+        print(f"Skipped {stats['bad']:,} lines that are not JSON lead objects")
+
+
+if __name__ == "__main__":
+    main()
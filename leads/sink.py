@@ -0,0 +1,133 @@
+"""
+Pluggable lead sinks used by the submit_lead tool.
+
+The sink is chosen with the LEAD_SINK setting:
+    outbox - durable local outbox, delivered to CRM_ENDPOINT_URL when set (default);
+             repeat calls from one phone are merged into one lead unless LEAD_DEDUP is off
+    stdout - print the lead as JSON (development only, nothing is persisted)
+"""
+import json
+
+from config.settings import (
+    LEAD_SINK,
+    LEAD_OUTBOX_PATH,
+    LEAD_DEDUP,
+    CRM_ENDPOINT_URL,
+    CRM_API_KEY,
+    CRM_BATCH_SIZE,
+    CRM_MAX_ATTEMPTS,
+)
+from .dedup import LeadDedupIndex
+from .delivery import LeadDelivery
+from .outbox import LeadOutbox
+
+
+class LeadSink:
+    """Base class for lead sinks."""
+
+    def start(self) -> None:
+        """Start any background work. Must be called from the event loop."""
+
+    async def submit(self, lead: dict) -> str | None:
+        """
+        Persist a captured lead.
+
+        Args:
+            lead: Lead dictionary as produced by submit_lead
+
+        Returns:
+            Idempotency key of the stored lead, if the sink assigns one
+        """
+        raise NotImplementedError
+
+    def find_lead(self, phone: str) -> str | None:
+        """
+        Idempotency key of a lead already stored for `phone`, if the sink tracks them.
+
+        Must be cheap: it is called from submit_lead on the event loop.
+        """
+        return None
+
+    async def aclose(self) -> None:
+        """Flush and release resources."""
+
+
+class StdoutLeadSink(LeadSink):
+    """Prints leads to stdout."""
+
+    async def submit(self, lead: dict) -> str | None:
+        print(json.dumps(lead, indent=2, ensure_ascii=False))
+        return None
+
+
+class OutboxLeadSink(LeadSink):
+    """Appends leads to a LeadOutbox and optionally forwards them to the CRM."""
+
+    def __init__(self, outbox: LeadOutbox, delivery: LeadDelivery | None = None):
+        self.outbox = outbox
+        self.delivery = delivery
+
+    def start(self) -> None:
+        if self.delivery is not None:
+            self.delivery.start()
+
+    async def submit(self, lead: dict) -> str | None:
+        key = await self.outbox.append(lead)
+        if self.delivery is not None:
+            self.delivery.start()
+            self.delivery.notify()
+        return key
+
+    def find_lead(self, phone: str) -> str | None:
+        if self.outbox.dedup is None:
+            return None
+        return self.outbox.dedup.lookup(phone)
+
+    async def aclose(self) -> None:
+        if self.delivery is not None:
+            await self.delivery.aclose()
+        await self.outbox.aclose()
+
+
+_lead_sink: LeadSink | None = None
+
+
+def create_lead_sink(kind: str = LEAD_SINK) -> LeadSink:
+    """
+    Build a lead sink from settings.
+
+    Raises:
+        ValueError: If `kind` is not a known sink type
+    """
+    if kind == "stdout":
+        return StdoutLeadSink()
+    if kind == "outbox":
+        dedup = LeadDedupIndex(LEAD_OUTBOX_PATH) if LEAD_DEDUP else None
+        outbox = LeadOutbox(LEAD_OUTBOX_PATH, dedup=dedup)
+        delivery = None
+        if CRM_ENDPOINT_URL:
+            delivery = LeadDelivery(
+                outbox,
+                CRM_ENDPOINT_URL,
+                api_key=CRM_API_KEY,
+                batch_size=CRM_BATCH_SIZE,
+                max_attempts=CRM_MAX_ATTEMPTS,
+            )
+        return OutboxLeadSink(outbox, delivery)
+    raise ValueError(f"Unknown LEAD_SINK: {kind!r} (expected 'outbox' or 'stdout')")
+
+
+def get_lead_sink() -> LeadSink:
+    """Return the process-wide lead sink, creating it on first use."""
+    global _lead_sink
+    if _lead_sink is None:
+        _lead_sink = create_lead_sink()
+    return _lead_sink
+
+
+async def close_lead_sink() -> None:
+    """Flush and close the process-wide lead sink, if one was created."""
+    global _lead_sink
+    sink, _lead_sink = _lead_sink, None
+    if sink is not None:
+        await sink.aclose()
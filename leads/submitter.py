@@ -0,0 +1,123 @@
+"""
+Session-owned background lead submission.
+
+submit_lead validates a lead, hands it to the session's LeadSubmitter and
+returns to the model straight away. Enrichment and persistence run on a
+supervised background task that is flushed when the session closes.
+"""
+import asyncio
+import json
+from typing import Callable
+
+from .sink import LeadSink
+
+LeadEnricher = Callable[[dict], dict]
+
+
+class LeadSubmitter:
+    """
+    Persists leads on a background task owned by one agent session.
+
+    Args:
+        sink: Sink the leads are persisted to
+        enrichers: Functions applied to each lead before it is persisted
+        max_attempts: Attempts per lead before giving up on the sink
+        retry_delay: Base delay in seconds between attempts
+    """
+
+    def __init__(
+        self,
+        sink: LeadSink,
+        enrichers: list[LeadEnricher] | None = None,
+        max_attempts: int = 3,
+        retry_delay: float = 0.5,
+    ):
+        self.sink = sink
+        self.enrichers = list(enrichers or [])
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.submitted = 0
+        self.failed = 0
+        self._queue: asyncio.Queue[dict] = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+        self._closing: asyncio.Future | None = None
+
+    def start(self) -> None:
+        """Start the background task if it is not running."""
+        if self._closing is not None:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="lead-submitter")
+            self._task.add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        # Supervise the worker: restart it if it died unexpectedly
+        if task.cancelled() or self._closing is not None:
+            return
+        error = task.exception()
+        if error is not None:
+            print(f"Lead submitter crashed, restarting: {error!r}")
+            self.start()
+
+    def enqueue(self, lead: dict) -> None:
+        """
+        Queue a lead for persistence without waiting for it.
+
+        Raises:
+            RuntimeError: If the submitter has already been closed
+        """
+        if self._closing is not None:
+            raise RuntimeError("Lead submitter is closed")
+        self._queue.put_nowait(lead)
+        self.start()
+
+    async def _run(self) -> None:
+        while True:
+            lead = await self._queue.get()
+            try:
+                await self._persist(lead)
+            finally:
+                self._queue.task_done()
+
+    async def _persist(self, lead: dict) -> None:
+        for enrich in self.enrichers:
+            try:
+                lead = enrich(lead)
+            except Exception as e:
+                print(f"Lead enrichment {getattr(enrich, '__name__', enrich)} failed: {e!r}")
+
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self.sink.submit(lead)
+                self.submitted += 1
+                return
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    self.failed += 1
+                    # Last resort: keep the lead in the logs rather than dropping it
+                    print(f"Failed to persist lead after {attempt} attempts: {e!r}")
+                    print(json.dumps(lead, indent=2, ensure_ascii=False))
+                    return
+                await asyncio.sleep(self.retry_delay * attempt)
+
+    async def aclose(self, timeout: float = 10.0) -> None:
+        """
+        Persist every queued lead, then stop the background task.
+
+        Safe to call more than once; later callers wait for the same flush.
+        """
+        if self._closing is None:
+            self._closing = asyncio.ensure_future(self._flush(timeout))
+        await asyncio.shield(self._closing)
+
+    async def _flush(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Lead submitter flush timed out with {self._queue.qsize()} lead(s) queued")
+            while not self._queue.empty():
+                self.failed += 1
+                print(json.dumps(self._queue.get_nowait(), indent=2, ensure_ascii=False))
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
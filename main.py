@@ -1,10 +1,47 @@
+import time
+# Started before anything is imported, so the startup report's import time includes livekit
+_import_started = time.perf_counter()
+
+import os
+import shutil
+from config.settings import *
+
+# prometheus_client picks multiprocess mode when it is first imported, so job processes
+# can only share the worker's /metrics endpoint if this is set before livekit is imported
+if METRICS_PORT:
+    # Job processes re-import this module (as __mp_main__) and must not wipe the live metric
+    # files of the worker and the other jobs; only the worker starts from an empty directory
+    if __name__ == "__main__":
+        shutil.rmtree(METRICS_MULTIPROC_DIR, ignore_errors=True)
+        os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = os.path.abspath(METRICS_MULTIPROC_DIR)
+
 from livekit import agents
+from runner.admission import AdmissionPolicy, install_drain_signal, start_stats_server
 from runner.entrypoint import entrypoint
-from config.settings import *
+from runner.prewarm import prewarm
+from runner.startup import record_import
+
+record_import(time.perf_counter() - _import_started)
 
 if __name__ == "__main__":
+    admission = AdmissionPolicy()
+    install_drain_signal(admission)
+    if WORKER_STATS_PORT:
+        start_stats_server(admission, host=WORKER_STATS_HOST, port=WORKER_STATS_PORT, api_key=WORKER_STATS_API_KEY)
+
+    worker_options = {}
+    if METRICS_PORT:
+        worker_options["prometheus_port"] = METRICS_PORT
+
     agents.cli.run_app(
         agents.WorkerOptions(
-            entrypoint_fnc=entrypoint
+            entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
+            request_fnc=admission.request_fnc,
+            load_fnc=admission.load,
+            load_threshold=WORKER_LOAD_THRESHOLD,
+            drain_timeout=WORKER_DRAIN_TIMEOUT,
+            **worker_options,
         )
     )
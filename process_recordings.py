@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+CLI script to process finished call recordings after the calls.
+
+Writes a mono Opus copy of each recording and one clip per conversation turn,
+cut where the turn is heard using the conversation's transcript, plus a
+segment index (segments.jsonl) over all clips. Recordings are processed in
+parallel, one per worker process. Recordings already processed are skipped,
+so the script can be re-run as new recordings arrive.
+
+Usage examples:
+    # Egress recordings (record_session.py) in ./recordings, into ./recordings/processed
+    python process_recordings.py
+
+    # In-worker recordings (CALL_RECORDING=true), 4 workers
+    python process_recordings.py --input data/recordings --out data/processed --workers 4
+
+    # Re-cut everything after changing the segmentation settings
+    python process_recordings.py --force --silence-db -45
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from config.settings import (
+    TRANSCRIPTS_DIR,
+    RECORDING_PROCESS_SAMPLE_RATE,
+    RECORDING_PROCESS_BITRATE,
+    RECORDING_PROCESS_WORKERS,
+    RECORDING_SEGMENT_SILENCE_DB,
+    RECORDING_SEGMENT_MAX_GAP,
+)
+from recording import find_recordings, run_processor
+from record_session import DEFAULT_RECORDINGS_DIR
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Transcode call recordings and cut them into per-turn segments",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument("--input", default=str(DEFAULT_RECORDINGS_DIR), help="Recordings directory")
+    parser.add_argument("--out", help="Output directory (default: <input>/processed)")
+    parser.add_argument("--transcripts", default=TRANSCRIPTS_DIR, help="Transcripts directory")
+    parser.add_argument("--workers", type=int, default=RECORDING_PROCESS_WORKERS, help="Worker processes (0: one per CPU)")
+    parser.add_argument("--sample-rate", type=int, default=RECORDING_PROCESS_SAMPLE_RATE, help="Output sample rate")
+    parser.add_argument("--bitrate", type=int, default=RECORDING_PROCESS_BITRATE, help="Output Opus bitrate (kbps)")
+    parser.add_argument("--silence-db", type=float, default=RECORDING_SEGMENT_SILENCE_DB, help="Silence level (dBFS)")
+    parser.add_argument("--max-gap", type=float, default=RECORDING_SEGMENT_MAX_GAP, help="Longest pause inside a turn (seconds)")
+    parser.add_argument("--force", action="store_true", help="Reprocess recordings already processed")
+    args = parser.parse_args()
+    out = args.out or str(Path(args.input) / "processed")
+
+    if not Path(args.input).is_dir():
+        print(f"Error: no recordings directory at {args.input}", file=sys.stderr)
+        sys.exit(1)
+    tasks = find_recordings(args.input, args.transcripts)
+    result = run_processor(
+        tasks,
+        out,
+        workers=args.workers or None,
+        rate=args.sample_rate,
+        bitrate=args.bitrate * 1000,
+        silence_db=args.silence_db,
+        max_gap=args.max_gap,
+        force=args.force,
+    )
+
+    results = result["results"]
+    print("=" * 60)
+    print("Recording Processing")
+    print("=" * 60)
+    print(f"Input: {args.input} ({len(tasks):,} recordings)")
+    print(f"Processed: {result['recordings']:,}")
+    if result["skipped"]:
+        print(f"Skipped (already processed): {result['skipped']:,}")
+    print(f"Failed: {result['failed']:,}")
+    print(f"Without a transcript: {sum(1 for r in results if not r['error'] and r['aligned'] is None):,}")
+    print(f"Segments: {result['segments']:,}")
+    print(f"Call minutes: {result['call_minutes']:,.1f}")
+    print(f"Workers: {result['workers']}")
+    print(f"Time: {result['seconds']:.1f}s wall, {result['cpu_seconds']:.1f}s CPU")
+    if result["recordings"]:
+        print(f"Throughput: {result['call_minutes'] / max(result['cpu_seconds'], 1e-9):,.2f} call-min per core-second, "
+              f"{result['call_minutes'] / max(result['seconds'], 1e-9):,.2f} per second")
+    print("-" * 60)
+    print(f"Output: {out}")
+    print(f"Segment index: {Path(out) / 'segments.jsonl'}")
+    print("=" * 60)
+    failed = [r for r in results if r["error"]]
+    for r in failed:
+        print(f"  {r['path']}: {r['error']}", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+CLI script to provision LiveKit rooms and client tokens for an outbound campaign.
+
+Creates one room per call, with the agent dispatched into it, and mints the
+parent's token. Results are streamed to a JSON-lines manifest, one line per call.
+
+Usage examples:
+    # 1,000 rooms for numbered contacts (identities parent-000000, parent-000001, ...)
+    python provision_rooms.py --campaign diwali-neet --count 1000
+
+    # One room per row of a CSV with identity,name columns
+    python provision_rooms.py --campaign diwali-neet --contacts parents.csv
+
+    # Re-run after an interruption: rooms already in the manifest are skipped
+    python provision_rooms.py --campaign diwali-neet --contacts parents.csv --resume
+"""
+import argparse
+import asyncio
+import csv
+import sys
+from config import (
+    RoomProvisioner,
+    campaign_calls,
+    LIVEKIT_URL,
+)
+from config.settings import PROVISION_CONCURRENCY, PROVISION_RATE, PROVISION_MAX_ATTEMPTS
+
+
+def read_contacts(path: str):
+    """Yield (identity, name) per row of a CSV with `identity` and optional `name` columns."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            identity = (row.get("identity") or "").strip()
+            if identity:
+                yield identity, (row.get("name") or "").strip() or None
+
+
+async def provision(args) -> dict:
+    if args.contacts:
+        contacts = read_contacts(args.contacts)
+    else:
+        contacts = ((f"parent-{i:06d}", None) for i in range(args.count))
+    async with RoomProvisioner(
+        concurrency=args.concurrency,
+        rate=args.rate,
+        max_attempts=args.max_attempts,
+    ) as provisioner:
+        return await provisioner.provision(
+            campaign_calls(args.campaign, contacts),
+            args.out,
+            batch_size=args.batch_size,
+            resume=args.resume,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Provision LiveKit rooms and client tokens for a campaign",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument("--campaign", required=True, help="Campaign name (prefix of the room names)")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--count", type=int, help="Number of calls, with generated identities")
+    source.add_argument("--contacts", help="CSV file with identity,name columns")
+    parser.add_argument("--out", help="Manifest path (default: data/campaigns/<campaign>.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=PROVISION_CONCURRENCY, help="Requests in flight")
+    parser.add_argument("--rate", type=float, default=PROVISION_RATE, help="Requests per second (0: unlimited)")
+    parser.add_argument("--max-attempts", type=int, default=PROVISION_MAX_ATTEMPTS, help="Attempts per room")
+    parser.add_argument("--batch-size", type=int, default=500, help="Tokens minted per batch")
+    parser.add_argument("--resume", action="store_true", help="Skip rooms the manifest lists as provisioned")
+    args = parser.parse_args()
+    args.out = args.out or f"data/campaigns/{args.campaign}.jsonl"
+
+    try:
+        result = asyncio.run(provision(args))
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"Unexpected error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    total = result["ok"] + result["failed"]
+    print("=" * 60)
+    print("Campaign Room Provisioning")
+    print("=" * 60)
+    print(f"Campaign: {args.campaign}")
+    print(f"URL: {LIVEKIT_URL}")
+    print(f"Provisioned: {result['ok']:,}")
+    print(f"Failed: {result['failed']:,}")
+    if result["skipped"]:
+        print(f"Skipped (already provisioned): {result['skipped']:,}")
+    print(f"Retries: {result['retries']:,}")
+    print(f"Time: {result['seconds']:.1f}s ({total / max(result['seconds'], 1e-9):,.0f} rooms/s)")
+    print("-" * 60)
+    print(f"Manifest: {args.out}")
+    print("=" * 60)
+    if result["failed"]:
+        print("\nFailed calls are listed in the manifest with status \"failed\"; re-run with --resume to retry them.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,20 +16,76 @@ Examples:
     
     # Record to S3
     python record_session.py start my-room --output s3://my-bucket/recordings/session.mp4
+
+    # Audio only: the call mixed into one OGG/Opus file at 24 kbps
+    python record_session.py start my-room --audio-only --bitrate 24
+
+    # Audio only, one OGG file per speaker (participant egress transcodes, track egress copies the Opus as sent)
+    python record_session.py start my-room --per-speaker participant
+    python record_session.py start my-room --per-speaker track
+
+    # List, status and stop answered by the egress index (config/egress_index.py) instead of
+    # the Egress API; only stop reaches LiveKit
+    EGRESS_INDEX_URL=http://127.0.0.1:8091 python record_session.py list my-room
+    python record_session.py status --egress-id EG_xxx --index http://127.0.0.1:8091
 """
 
 import argparse
 import asyncio
 import os
+import re
 from datetime import datetime
 from pathlib import Path
+
+import aiohttp
 from livekit import api
-from config.settings import LIVEKIT_URL, LIVEKIT_API_KEY, LIVEKIT_API_SECRET
+from config.settings import (
+    LIVEKIT_URL,
+    LIVEKIT_API_KEY,
+    LIVEKIT_API_SECRET,
+    RECORDING_AUDIO_BITRATE,
+    RECORDING_AUDIO_FREQUENCY,
+    EGRESS_INDEX_URL,
+    EGRESS_INDEX_API_KEY,
+)
 
 # Default recordings folder
 DEFAULT_RECORDINGS_DIR = Path("recordings")
 
 
+def _recording_path(room_name: str, output_path: str | None, extension: str) -> str:
+    """Output path for a recording; local folders are created, remote (s3://, gs://) paths are left as given."""
+    if output_path and "://" in output_path:
+        return output_path
+    if output_path:
+        # Use provided output path
+        output_file = Path(output_path)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+    else:
+        # Default: save to local recordings folder with timestamp
+        DEFAULT_RECORDINGS_DIR.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = DEFAULT_RECORDINGS_DIR / f"{room_name}_{timestamp}{extension}"
+    return str(output_file.absolute())
+
+
+async def _index_request(method: str, index_url: str, path: str, params: dict | None = None) -> dict:
+    """One request to the egress index; raises RuntimeError with its error message on failure."""
+    headers = {"Authorization": f"Bearer {EGRESS_INDEX_API_KEY}"} if EGRESS_INDEX_API_KEY else {}
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async with session.request(method, index_url.rstrip("/") + path, params=params) as response:
+            body = await response.json()
+            if response.status != 200:
+                raise RuntimeError(f"egress index: {body.get('error', response.reason)} (HTTP {response.status})")
+            return body
+
+
+def _speaker_path(base: str, identity: str) -> str:
+    """`base` with the speaker's identity added before the .ogg extension."""
+    stem = base[:-len(".ogg")] if base.endswith(".ogg") else base
+    return f"{stem}_{re.sub(r'[^A-Za-z0-9_.-]+', '_', identity)}.ogg"
+
+
 async def start_room_recording(
     room_name: str,
     output_path: str | None = None,
@@ -62,16 +118,7 @@ async def start_room_recording(
     # Configure recording options
     # For room composite recording (records all participants)
     # Default: save to local recordings folder with timestamp
-    if output_path:
-        # Use provided output path
-        output_file = Path(output_path)
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-    else:
-        # Default: save to local recordings folder with timestamp
-        DEFAULT_RECORDINGS_DIR.mkdir(parents=True, exist_ok=True)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{room_name}_{timestamp}.mp4"
-        output_file = DEFAULT_RECORDINGS_DIR / filename
+    output_file = _recording_path(room_name, output_path, ".mp4")
     
     recording_request = api.RoomCompositeEgressRequest(
         room_name=room_name,
@@ -79,12 +126,12 @@ async def start_room_recording(
         file_outputs=[
             api.EncodedFileOutput(
                 file_type=api.EncodedFileType.MP4,
-                filepath=str(output_file),
+                filepath=output_file,
             )
         ],
     )
     
-    print(f"Recording will be saved to: {output_file.absolute()}")
+    print(f"Recording will be saved to: {output_file}")
     
     # Start the recording
     print(f"Starting recording for room: {room_name}")
@@ -105,16 +152,144 @@ async def start_room_recording(
     }
 
 
-async def stop_recording(egress_id: str) -> dict:
+async def start_audio_recording(
+    room_name: str,
+    output_path: str | None = None,
+    bitrate: int = RECORDING_AUDIO_BITRATE,
+    per_speaker: str | None = None,
+) -> list[dict]:
+    """
+    Start an audio-only OGG/Opus recording of a LiveKit room session.
+    
+    Voice calls have no video worth keeping, so this skips the video composite
+    encode of start_room_recording() and stores only the audio.
+    
+    Args:
+        room_name: Name of the room to record
+        output_path: Optional output path, as for start_room_recording() (.ogg). Per-speaker
+                    files add the participant identity to it: <name>_<identity>.ogg
+        bitrate: Opus bitrate in kbps for transcoded recordings
+        per_speaker: None to mix the call into one file (room composite egress, audio only);
+                    "participant" for one transcoded file per participant (participant egress);
+                    "track" for one file per published audio track, written as the Opus the
+                    client sent, without transcoding (track egress; `bitrate` does not apply).
+                    Per-speaker recordings cover the participants in the room when this is called.
+    
+    Returns:
+        List of dictionaries with recording information, one per egress started
+    """
+    if not LIVEKIT_URL or not LIVEKIT_API_KEY or not LIVEKIT_API_SECRET:
+        raise ValueError(
+            "LIVEKIT_URL, LIVEKIT_API_KEY, and LIVEKIT_API_SECRET must be set"
+        )
+    if per_speaker not in (None, "participant", "track"):
+        raise ValueError(f"per_speaker must be None, 'participant' or 'track', not {per_speaker!r}")
+    
+    output_file = _recording_path(room_name, output_path, ".ogg")
+    encoding = api.EncodingOptions(
+        audio_codec=api.AudioCodec.OPUS,
+        audio_bitrate=bitrate,
+        audio_frequency=RECORDING_AUDIO_FREQUENCY,
+    )
+    
+    # Create LiveKitAPI client
+    lkapi = api.LiveKitAPI(
+        url=LIVEKIT_URL,
+        api_key=LIVEKIT_API_KEY,
+        api_secret=LIVEKIT_API_SECRET,
+    )
+    
+    recordings = []
+    try:
+        if per_speaker is None:
+            print(f"Starting audio-only recording for room: {room_name} ({bitrate} kbps Opus)")
+            egress_info = await lkapi.egress.start_room_composite_egress(
+                api.RoomCompositeEgressRequest(
+                    room_name=room_name,
+                    audio_only=True,
+                    advanced=encoding,
+                    file_outputs=[
+                        api.EncodedFileOutput(file_type=api.EncodedFileType.OGG, filepath=output_file)
+                    ],
+                )
+            )
+            recordings.append((egress_info, None, output_file))
+        else:
+            participants = await lkapi.room.list_participants(api.ListParticipantsRequest(room=room_name))
+            for participant in participants.participants:
+                audio_tracks = [t for t in participant.tracks if t.type == api.TrackType.AUDIO]
+                if not audio_tracks:
+                    continue
+                filepath = _speaker_path(output_file, participant.identity)
+                print(f"Starting {per_speaker} recording of {participant.identity} in room: {room_name}")
+                if per_speaker == "participant":
+                    egress_info = await lkapi.egress.start_participant_egress(
+                        api.ParticipantEgressRequest(
+                            room_name=room_name,
+                            identity=participant.identity,
+                            advanced=encoding,
+                            file_outputs=[
+                                api.EncodedFileOutput(file_type=api.EncodedFileType.OGG, filepath=filepath)
+                            ],
+                        )
+                    )
+                    recordings.append((egress_info, participant.identity, filepath))
+                else:
+                    for i, track in enumerate(audio_tracks):
+                        track_path = filepath if i == 0 else _speaker_path(filepath, track.sid)
+                        egress_info = await lkapi.egress.start_track_egress(
+                            api.TrackEgressRequest(
+                                room_name=room_name,
+                                track_id=track.sid,
+                                file=api.DirectFileOutput(filepath=track_path),
+                            )
+                        )
+                        recordings.append((egress_info, participant.identity, track_path))
+            if not recordings:
+                print(f"No participant is publishing audio in room: {room_name}")
+    finally:
+        # Close the API client
+        await lkapi.aclose()
+    
+    for egress_info, identity, filepath in recordings:
+        print(f"Recording started successfully!")
+        print(f"Egress ID: {egress_info.egress_id}")
+        if identity:
+            print(f"Speaker: {identity}")
+        print(f"Recording will be saved to: {filepath}")
+        print(f"Status: {egress_info.status}")
+    
+    return [
+        {
+            "egress_id": egress_info.egress_id,
+            "room_name": egress_info.room_name,
+            "status": egress_info.status,
+            "identity": identity,
+            "filepath": filepath,
+        }
+        for egress_info, identity, filepath in recordings
+    ]
+
+
+async def stop_recording(egress_id: str, index_url: str | None = EGRESS_INDEX_URL) -> dict:
     """
     Stop an active recording.
     
     Args:
         egress_id: The Egress ID returned when starting the recording
+        index_url: Egress index to send the stop through (its pooled client calls StopEgress);
+                  empty calls the Egress API from here
     
     Returns:
         Dictionary with updated recording status
     """
+    if index_url:
+        print(f"Stopping recording: {egress_id}")
+        egress = await _index_request("POST", index_url, f"/egress/{egress_id}/stop")
+        print(f"Recording stopped!")
+        print(f"Status: {egress['status']}")
+        return {"egress_id": egress["egress_id"], "status": api.EgressStatus.Value(egress["status"])}
+
     if not LIVEKIT_URL or not LIVEKIT_API_KEY or not LIVEKIT_API_SECRET:
         raise ValueError(
             "LIVEKIT_URL, LIVEKIT_API_KEY, and LIVEKIT_API_SECRET must be set"
@@ -144,16 +319,63 @@ async def stop_recording(egress_id: str) -> dict:
     }
 
 
-async def list_recordings(room_name: str | None = None) -> list:
+async def recording_status(egress_id: str, index_url: str | None = EGRESS_INDEX_URL) -> dict:
+    """
+    Current state of one recording.
+    
+    Args:
+        egress_id: The Egress ID returned when starting the recording
+        index_url: Egress index to ask; empty calls ListEgress instead
+    
+    Returns:
+        Dictionary with the recording's egress_id, room_name and status
+    """
+    if index_url:
+        egress = await _index_request("GET", index_url, f"/egress/{egress_id}")
+        recording = {
+            "egress_id": egress["egress_id"],
+            "room_name": egress["room_name"],
+            "status": api.EgressStatus.Value(egress["status"]),
+        }
+    else:
+        if not LIVEKIT_URL or not LIVEKIT_API_KEY or not LIVEKIT_API_SECRET:
+            raise ValueError(
+                "LIVEKIT_URL, LIVEKIT_API_KEY, and LIVEKIT_API_SECRET must be set"
+            )
+        async with api.LiveKitAPI(url=LIVEKIT_URL, api_key=LIVEKIT_API_KEY, api_secret=LIVEKIT_API_SECRET) as lkapi:
+            response = await lkapi.egress.list_egress(api.ListEgressRequest(egress_id=egress_id))
+        if not response.items:
+            raise ValueError(f"No recording with Egress ID {egress_id}")
+        item = response.items[0]
+        recording = {"egress_id": item.egress_id, "room_name": item.room_name, "status": item.status}
+    
+    print(f"Egress ID: {recording['egress_id']}, Room: {recording['room_name']}, "
+          f"Status: {api.EgressStatus.Name(recording['status'])}")
+    return recording
+
+
+async def list_recordings(room_name: str | None = None, index_url: str | None = EGRESS_INDEX_URL) -> list:
     """
     List active or completed recordings.
     
     Args:
         room_name: Optional room name to filter recordings
+        index_url: Egress index to ask; empty calls ListEgress instead
     
     Returns:
         List of recording information
     """
+    if index_url:
+        response = await _index_request("GET", index_url, "/egress", {"room": room_name} if room_name else None)
+        recordings = [
+            {"egress_id": e["egress_id"], "room_name": e["room_name"], "status": api.EgressStatus.Value(e["status"])}
+            for e in response["egresses"]
+        ]
+        print(f"Found {len(recordings)} recording(s)")
+        for item in recordings:
+            print(f"  - Egress ID: {item['egress_id']}, Room: {item['room_name']}, Status: {item['status']}")
+        return recordings
+
     if not LIVEKIT_URL or not LIVEKIT_API_KEY or not LIVEKIT_API_SECRET:
         raise ValueError(
             "LIVEKIT_URL, LIVEKIT_API_KEY, and LIVEKIT_API_SECRET must be set"
@@ -185,8 +407,8 @@ async def main():
     )
     parser.add_argument(
         "action",
-        choices=["start", "stop", "list"],
-        help="Action to perform: start recording, stop recording, or list recordings",
+        choices=["start", "stop", "status", "list"],
+        help="Action to perform: start recording, stop recording, show a recording's status, or list recordings",
     )
     parser.add_argument(
         "room_name",
@@ -195,7 +417,12 @@ async def main():
     )
     parser.add_argument(
         "--egress-id",
-        help="Egress ID (required for stop action)",
+        help="Egress ID (required for stop and status actions)",
+    )
+    parser.add_argument(
+        "--index",
+        default=EGRESS_INDEX_URL,
+        help="Egress index URL for list, status and stop (default: EGRESS_INDEX_URL; empty calls the Egress API)",
     )
     parser.add_argument(
         "--output",
@@ -207,6 +434,22 @@ async def main():
         default="speaker",
         help="Recording layout (default: speaker)",
     )
+    parser.add_argument(
+        "--audio-only",
+        action="store_true",
+        help="Record only the audio, mixed into one OGG/Opus file. Default output: recordings/<room_name>_<timestamp>.ogg",
+    )
+    parser.add_argument(
+        "--bitrate",
+        type=int,
+        default=RECORDING_AUDIO_BITRATE,
+        help=f"Opus bitrate in kbps for audio-only recordings (default: {RECORDING_AUDIO_BITRATE})",
+    )
+    parser.add_argument(
+        "--per-speaker",
+        choices=["participant", "track"],
+        help="Audio only, one OGG file per speaker: 'participant' transcodes at --bitrate, 'track' keeps the Opus as sent",
+    )
     
     args = parser.parse_args()
     
@@ -214,15 +457,27 @@ async def main():
         if args.action == "start":
             if not args.room_name:
                 parser.error("room_name is required for start action")
-            await start_room_recording(
-                args.room_name, output_path=args.output, layout=args.layout
-            )
+            if args.audio_only or args.per_speaker:
+                await start_audio_recording(
+                    args.room_name,
+                    output_path=args.output,
+                    bitrate=args.bitrate,
+                    per_speaker=args.per_speaker,
+                )
+            else:
+                await start_room_recording(
+                    args.room_name, output_path=args.output, layout=args.layout
+                )
         elif args.action == "stop":
             if not args.egress_id:
                 parser.error("--egress-id is required for stop action")
-            await stop_recording(args.egress_id)
+            await stop_recording(args.egress_id, index_url=args.index)
+        elif args.action == "status":
+            if not args.egress_id:
+                parser.error("--egress-id is required for status action")
+            await recording_status(args.egress_id, index_url=args.index)
         elif args.action == "list":
-            await list_recordings(args.room_name)
+            await list_recordings(args.room_name, index_url=args.index)
     except Exception as e:
         print(f"Error: {e}")
         return 1
@@ -0,0 +1,23 @@
+from .recorder import (
+    CallRecorder,
+    RecordingInput,
+    RecordingOutput,
+    recording_path,
+)
+from .processor import (
+    find_recordings,
+    process_recording,
+    read_index,
+    run_processor,
+)
+
+__all__ = [
+    "CallRecorder",
+    "RecordingInput",
+    "RecordingOutput",
+    "recording_path",
+    "find_recordings",
+    "process_recording",
+    "read_index",
+    "run_processor",
+]
@@ -0,0 +1,483 @@
+"""
+Post-call recording processor.
+
+Turns finished recordings into what QA listens to: a mono Ogg/Opus copy of
+each call and one clip per conversation turn, plus a segment index over all
+of them. Recordings are processed in parallel, one per worker process, and
+each is decoded as a stream of frames, so a long call never sits in memory.
+
+A recording is matched to its transcript (transcripts/writer.py) by
+conversation_id. The ID comes from the recording's JSON sidecar (written by
+recording/recorder.py), or else from the file name, with record_session.py's
+"_<timestamp>" suffix dropped if need be. A transcript "t" is when
+the item was added to the conversation. For the agent, that is when it
+started speaking. For the parent, it is when their speech was transcribed,
+just after they stopped. So each turn is cut where its speaker's voice is:
+  - the agent's turn runs from its "t" to the end of the agent's speech;
+  - the parent's turn is the speech that ends before its "t".
+Pauses shorter than RECORDING_SEGMENT_MAX_GAP stay inside a turn. In a stereo
+in-worker recording, each turn is cut from its speaker's own channel, so
+cross-talk is left out. Other recordings use the mix. Without a sidecar, the
+recording is taken to start where the transcript's first agent turn is first
+heard.
+
+The outputs are named after the recording's file (<recording> is its name
+without the extension), so two recordings of one conversation, say an egress
+and an in-worker one, each keep their own:
+
+    <out>/<recording>.ogg                         the call, mono
+    <out>/<recording>/<turn>-<role>.ogg           one clip per turn
+    <out>/segments.jsonl                          the segment index, one line per clip:
+        {"c": conversation_id, "i": turn index, "r": role, "s": start, "e": end, "f": clip}
+        (seconds from the start of the recording; join with the transcript on "c" and "i")
+"""
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import av
+import numpy as np
+
+from config.settings import (
+    TRANSCRIPTS_DIR,
+    RECORDING_PROCESS_SAMPLE_RATE,
+    RECORDING_PROCESS_BITRATE,
+    RECORDING_SEGMENT_SILENCE_DB,
+    RECORDING_SEGMENT_MAX_GAP,
+)
+from transcripts import read_transcript, transcript_path
+
+AUDIO_EXTENSIONS = (".ogg", ".opus", ".oga", ".mp4", ".m4a", ".webm", ".wav")
+INDEX_NAME = "segments.jsonl"
+# Decoded frames resampled at a time (see _decode)
+_DECODE_BATCH = 50
+_EGRESS_SUFFIX = re.compile(r"_\d{8}_\d{6}$")
+# Envelope resolution: one level per 20 ms
+_STEPS_PER_SECOND = 50
+# Audio kept around each clip so it does not start or end mid-syllable
+_PAD_SECONDS = 0.2
+# The parent's transcript can land a little after they stop; look this far past "t" for their speech
+_TRANSCRIPTION_SLACK = 0.3
+# Transcript roles and the channels of a stereo in-worker recording that carry them
+_ROLE_CHANNELS = {"user": "parent", "assistant": "agent"}
+
+
+def find_recordings(directory: str | Path, transcripts_dir: str | Path = TRANSCRIPTS_DIR) -> list[dict]:
+    """
+    Recordings in `directory` (not its subdirectories), with what is known about each.
+
+    A file with the same name as an earlier one but another extension is the
+    same recording in another format, and is left out.
+
+    Returns:
+        One task per file: {"path", "conversation_id", "started_at" (or None), "channels" (or None),
+        "transcript" (path, or None when there is none)}
+    """
+    tasks, names = [], set()
+    for path in sorted(Path(directory).iterdir()):
+        if not path.is_file() or path.suffix.lower() not in AUDIO_EXTENSIONS or path.stem in names:
+            continue
+        names.add(path.stem)
+        meta = {}
+        sidecar = path.with_suffix(".json")
+        if sidecar.exists():
+            try:
+                meta = json.loads(sidecar.read_text())
+            except (OSError, ValueError):
+                meta = {}
+        conversation_id = meta.get("conversation_id") or path.stem
+        transcript = transcript_path(transcripts_dir, conversation_id)
+        if not transcript.exists() and not meta:
+            # record_session.py names files <room>_<YYYYmmdd_HHMMSS>
+            base = _EGRESS_SUFFIX.sub("", path.stem)
+            if transcript_path(transcripts_dir, base).exists():
+                conversation_id, transcript = base, transcript_path(transcripts_dir, base)
+        tasks.append({
+            "path": str(path),
+            "conversation_id": conversation_id,
+            "started_at": meta.get("started_at"),
+            "channels": meta.get("channels"),
+            "transcript": str(transcript) if transcript.exists() else None,
+        })
+    return tasks
+
+
+def _output_name(task_or_result: dict) -> str:
+    # What a recording's outputs are named after: its file name without the extension
+    return Path(task_or_result["path"]).stem
+
+
+def _decode(path: str, rate: int, channels: int) -> Iterator[np.ndarray]:
+    """The first audio stream as (samples, channels) int16 blocks at `rate`, about a second at a time."""
+    layout = "stereo" if channels == 2 else "mono"
+    with av.open(path) as container:
+        stream = container.streams.audio[0]
+        resampler = av.AudioResampler(format="s16", layout=layout, rate=rate)
+        # PyAV keeps a little memory per resample() call for good, so decoded frames (20 ms for
+        # Opus) are resampled in batches; it adds up to megabytes per call-hour otherwise
+        pending, source = [], None
+
+        def flush() -> Iterator[np.ndarray]:
+            batch = av.AudioFrame.from_ndarray(np.concatenate(pending, axis=1), format=source[0], layout=source[1])
+            batch.sample_rate = source[2]
+            pending.clear()
+            for out in resampler.resample(batch):
+                yield _samples(out, channels)
+
+        for frame in container.decode(stream):
+            kind = (frame.format.name, frame.layout.name, frame.sample_rate)
+            if pending and kind != source:
+                yield from flush()
+            source = kind
+            pending.append(frame.to_ndarray())
+            if len(pending) >= _DECODE_BATCH:
+                yield from flush()
+        if pending:
+            yield from flush()
+        for out in resampler.resample(None):
+            yield _samples(out, channels)
+
+
+def _samples(frame: av.AudioFrame, channels: int) -> np.ndarray:
+    # Read through the buffer: to_ndarray() on a resampled frame holds on to memory too
+    return np.frombuffer(frame.planes[0], dtype=np.int16)[:frame.samples * channels].reshape(-1, channels).copy()
+
+
+class _OpusWriter:
+    """Mono Ogg/Opus file written block by block; renamed into place on close(), removed on abort()."""
+
+    def __init__(self, path: Path, rate: int, bitrate: int):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._part = path.with_name(path.name + ".part")
+        self._container = av.open(str(self._part), "w", format="ogg")
+        try:
+            self._stream = self._container.add_stream("libopus", rate=rate, layout="mono")
+            self._stream.bit_rate = bitrate
+        except BaseException:
+            self.abort()
+            raise
+        self._rate = rate
+        self._pts = 0
+
+    def write(self, samples: np.ndarray) -> None:
+        if not len(samples):
+            return
+        frame = av.AudioFrame.from_ndarray(np.ascontiguousarray(samples).reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = self._rate
+        frame.pts = self._pts
+        self._pts += len(samples)
+        for packet in self._stream.encode(frame):
+            self._container.mux(packet)
+
+    def close(self) -> None:
+        for packet in self._stream.encode(None):
+            self._container.mux(packet)
+        self._container.close()
+        self._container = None
+        os.replace(self._part, self.path)
+
+    def abort(self) -> None:
+        """Stop writing and remove the partial file; does nothing once closed."""
+        if self._container is None:
+            return
+        try:
+            self._container.close()
+        except (OSError, av.FFmpegError):
+            pass
+        self._container = None
+        self._part.unlink(missing_ok=True)
+
+
+def _downmix(block: np.ndarray) -> np.ndarray:
+    if block.shape[1] == 1:
+        return block[:, 0]
+    return (block.astype(np.int32).sum(axis=1) // block.shape[1]).astype(np.int16)
+
+
+class _Envelope:
+    """Mean square level of each channel per 20 ms step, fed one block at a time."""
+
+    def __init__(self, rate: int, channels: int):
+        self._step = rate // _STEPS_PER_SECOND
+        self._carry = np.zeros((0, channels), dtype=np.int16)
+        self._levels: list[np.ndarray] = []
+
+    def add(self, block: np.ndarray) -> None:
+        block = np.concatenate([self._carry, block]) if len(self._carry) else block
+        steps = len(block) // self._step
+        whole = block[:steps * self._step].astype(np.float32)
+        self._levels.append((whole.reshape(steps, self._step, block.shape[1]) ** 2).mean(axis=1))
+        self._carry = block[steps * self._step:]
+
+    def voiced(self, silence_db: float) -> np.ndarray:
+        """(steps, channels) bools: louder than silence_db below full scale."""
+        levels = np.concatenate(self._levels) if self._levels else np.zeros((0, self._carry.shape[1]))
+        return levels > (10 ** (silence_db / 20) * 32768) ** 2
+
+
+def _speech_after(voiced: np.ndarray, start: int, limit: int, gap: int) -> tuple[int, int] | None:
+    # The first stretch of speech in [start, limit), pauses shorter than `gap` included
+    steps = np.flatnonzero(voiced[start:limit])
+    if not len(steps):
+        return None
+    breaks = np.flatnonzero(np.diff(steps) > gap)
+    last = steps[breaks[0]] if len(breaks) else steps[-1]
+    return start + steps[0], start + last + 1
+
+
+def _speech_before(voiced: np.ndarray, floor: int, end: int, gap: int) -> tuple[int, int] | None:
+    # The last stretch of speech in [floor, end), pauses shorter than `gap` included
+    steps = np.flatnonzero(voiced[floor:end])
+    if not len(steps):
+        return None
+    breaks = np.flatnonzero(np.diff(steps) > gap)
+    first = steps[breaks[-1] + 1] if len(breaks) else steps[0]
+    return floor + first, floor + steps[-1] + 1
+
+
+def _split_at_pause(voiced: np.ndarray, start: int, end: int) -> tuple[int, int] | None:
+    # From `start` to the longest pause in the speech of [start, end), or to the end of that speech
+    steps = np.flatnonzero(voiced[start:end])
+    if not len(steps):
+        return None
+    gaps = np.diff(steps)
+    if not len(gaps) or gaps.max() <= 1:
+        return start, start + steps[-1] + 1
+    return start, start + steps[gaps.argmax()] + 1
+
+
+def align_turns(
+    turns: list[dict],
+    voiced: np.ndarray,
+    channel_of: dict[str, int],
+    offset: float,
+    max_gap: float = RECORDING_SEGMENT_MAX_GAP,
+) -> list[tuple[dict, int, int, int]]:
+    """
+    Where each transcript turn is heard in the recording.
+
+    Args:
+        turns: Transcript items with "i", "t" and "r"
+        voiced: (steps, channels) speech flags per 20 ms step
+        channel_of: Column of `voiced` to use per role; roles not in it use column 0
+        offset: Unix time of the recording's first sample
+        max_gap: Longest pause, in seconds, kept inside one turn
+
+    Returns:
+        (item, channel, first step, end step) per turn that could be placed, in time order
+    """
+    gap = int(max_gap * _STEPS_PER_SECOND)
+    slack = int(_TRANSCRIPTION_SLACK * _STEPS_PER_SECOND)
+    total = len(voiced)
+    ordered = sorted((item for item in turns if item.get("r") in _ROLE_CHANNELS), key=lambda item: item["t"])
+    anchors = [int(round((item["t"] - offset) * _STEPS_PER_SECOND)) for item in ordered]
+    # Each channel's speech is claimed by at most one turn
+    floors: dict[int, int] = {}
+    placed = []
+    for n, (item, anchor) in enumerate(zip(ordered, anchors)):
+        channel = channel_of.get(item["r"], 0)
+        floor = floors.get(channel, 0)
+        column = voiced[:, channel]
+        if item["r"] == "assistant":
+            # From when the agent started speaking, up to the next turn heard on the same channel
+            following = [(other, a) for other, a in zip(ordered[n + 1:], anchors[n + 1:])
+                         if channel_of.get(other["r"], 0) == channel]
+            limit = min(following[0][1] if following else total, total)
+            if item.get("int") and n + 1 < len(anchors):
+                # Interrupted: no longer than until the parent's next transcript
+                limit = min(limit, anchors[n + 1])
+            start = max(anchor, floor)
+            if following and following[0][0]["r"] == "user":
+                # Both speakers on one channel, and the parent's reply is part of the speech before
+                # their transcript: the turn changes at the longest pause
+                span = _split_at_pause(column, start, min(limit + slack, total)) if start < limit else None
+            else:
+                speech = _speech_after(column, start, limit, gap) if start < limit else None
+                span = (start, speech[1]) if speech else None
+        else:
+            end = min(anchor + slack, total)
+            span = _speech_before(column, floor, end, gap) if floor < end else None
+        if span is None or span[1] <= span[0]:
+            continue
+        placed.append((item, channel, int(span[0]), int(span[1])))
+        floors[channel] = span[1]
+    return placed
+
+
+def process_recording(task: dict) -> dict:
+    """
+    Transcode one recording to mono and cut its turns (runs in a worker process).
+
+    Args:
+        task: A find_recordings() entry plus "out_dir", "rate", "bitrate" (bits/s), "silence_db" and "max_gap"
+
+    Returns:
+        {"conversation_id", "path", "seconds" (audio), "cpu", "segments": [index entries], "aligned", "error"}
+    """
+    started = time.process_time()
+    conversation_id = task["conversation_id"]
+    name = _output_name(task)
+    result = {"conversation_id": conversation_id, "path": task["path"], "seconds": 0.0, "cpu": 0.0,
+              "segments": [], "aligned": None, "error": None}
+    out_dir = Path(task["out_dir"])
+    rate = task["rate"]
+    # One column per speaker when the recording has a channel each, else the mix
+    speakers = task.get("channels") or []
+    stereo = len(speakers) == 2 and set(speakers) == set(_ROLE_CHANNELS.values())
+    channels = 2 if stereo else 1
+    writer, clips = None, []
+    try:
+        # Pass 1: the mono copy, and each channel's level per 20 ms
+        envelope = _Envelope(rate, channels)
+        writer = _OpusWriter(out_dir / f"{name}.ogg", rate, task["bitrate"])
+        samples = 0
+        for block in _decode(task["path"], rate, channels):
+            writer.write(_downmix(block))
+            envelope.add(block)
+            samples += len(block)
+        writer.close()
+        result["seconds"] = samples / rate
+
+        turns = read_transcript(task["transcript"]) if task["transcript"] else []
+        voiced = envelope.voiced(task["silence_db"])
+        channel_of = {role: speakers.index(name) for role, name in _ROLE_CHANNELS.items()} if stereo else {}
+        offset = task.get("started_at")
+        if offset is not None:
+            result["aligned"] = "sidecar"
+        elif turns:
+            # No start time: line the first agent turn (the greeting) up with the first speech heard
+            first_agent = min((t["t"] for t in turns if t.get("r") == "assistant"), default=None)
+            heard = np.flatnonzero(voiced[:, channel_of.get("assistant", 0)])
+            if first_agent is not None and len(heard):
+                offset = first_agent - heard[0] / _STEPS_PER_SECOND
+                result["aligned"] = "greeting"
+        if offset is None or not turns:
+            return result
+
+        # Pass 2: the clips, each cut from its own channel (or the mix) as the stream goes by
+        pad = int(_PAD_SECONDS * rate)
+        step = rate // _STEPS_PER_SECOND
+        for item, channel, first, end in align_turns(turns, voiced, channel_of, offset, task["max_gap"]):
+            start, stop = max(0, first * step - pad), min(samples, end * step + pad)
+            clip_name = f"{name}/{int(item['i']):03d}-{item['r']}.ogg"
+            clips.append([start, stop, channel if stereo else None, out_dir / clip_name, None])
+            result["segments"].append({
+                "c": conversation_id, "i": int(item["i"]), "r": item["r"],
+                "s": round(start / rate, 2), "e": round(stop / rate, 2), "f": clip_name,
+            })
+        position = 0
+        pending = sorted(clips, key=lambda clip: clip[0])
+        for block in _decode(task["path"], rate, channels):
+            block_end = position + len(block)
+            for clip in pending:
+                start, stop, channel, path, clip_writer = clip
+                if start >= block_end:
+                    break
+                if stop <= position:
+                    continue
+                if clip_writer is None:
+                    clip_writer = clip[4] = _OpusWriter(path, rate, task["bitrate"])
+                part = block[max(start, position) - position:min(stop, block_end) - position]
+                clip_writer.write(part[:, channel] if channel is not None else _downmix(part))
+                if stop <= block_end:
+                    clip_writer.close()
+                    clip[4] = False
+            pending = [clip for clip in pending if clip[4] is not False]
+            position = block_end
+        for clip in pending:
+            if clip[4]:
+                clip[4].close()
+    except (OSError, ValueError, av.FFmpegError) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["segments"] = []
+    finally:
+        # Whatever was still being written when it failed leaves no .part file behind
+        for open_writer in [writer] + [clip[4] for clip in clips]:
+            if open_writer:
+                open_writer.abort()
+        result["cpu"] = time.process_time() - started
+    return result
+
+
+def read_index(out_dir: str | Path) -> list[dict]:
+    """The segment index of a processor output directory."""
+    path = Path(out_dir) / INDEX_NAME
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run_processor(
+    tasks: Iterable[dict],
+    out_dir: str | Path,
+    workers: int | None = None,
+    rate: int = RECORDING_PROCESS_SAMPLE_RATE,
+    bitrate: int = RECORDING_PROCESS_BITRATE * 1000,
+    silence_db: float = RECORDING_SEGMENT_SILENCE_DB,
+    max_gap: float = RECORDING_SEGMENT_MAX_GAP,
+    force: bool = False,
+) -> dict:
+    """
+    Process recordings on a process pool and update the segment index.
+
+    Args:
+        tasks: find_recordings() entries
+        out_dir: Output directory
+        workers: Processes in the pool (default: CPU count); 1 runs in this process
+        rate: Sample rate of the outputs
+        bitrate: Opus bitrate of the outputs (bits/s)
+        silence_db: Level below which a 20 ms step is silence (dBFS)
+        max_gap: Longest pause, in seconds, kept inside one turn
+        force: Reprocess recordings whose mono copy is newer than the recording
+
+    Returns:
+        {"recordings", "skipped", "failed", "segments", "call_minutes", "cpu_seconds", "seconds", "workers", "results"}
+    """
+    started = time.perf_counter()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    todo, skipped = [], 0
+    for task in tasks:
+        done = out_dir / f"{_output_name(task)}.ogg"
+        if not force and done.exists() and done.stat().st_mtime >= Path(task["path"]).stat().st_mtime:
+            skipped += 1
+            continue
+        todo.append({**task, "out_dir": str(out_dir), "rate": rate, "bitrate": bitrate,
+                     "silence_db": silence_db, "max_gap": max_gap})
+    workers = max(1, min(workers or os.cpu_count() or 1, len(todo) or 1))
+    if workers == 1:
+        results = [process_recording(task) for task in todo]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Longest first, so one long call does not finish alone at the end
+            todo.sort(key=lambda task: os.path.getsize(task["path"]), reverse=True)
+            results = list(pool.map(process_recording, todo))
+
+    # The index keeps the entries of recordings not processed this time; a clip's directory is its recording
+    redone = {_output_name(r) for r in results}
+    entries = [e for e in read_index(out_dir) if e["f"].split("/")[0] not in redone]
+    for result in results:
+        entries.extend(result["segments"])
+    entries.sort(key=lambda e: (e["c"], e["f"].split("/")[0], e["s"]))
+    tmp = out_dir / f".tmp-{os.getpid()}-{INDEX_NAME}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(e, separators=(",", ":")) + "\n" for e in entries)
+    os.replace(tmp, out_dir / INDEX_NAME)
+
+    return {
+        "recordings": len(results),
+        "skipped": skipped,
+        "failed": sum(1 for r in results if r["error"]),
+        "segments": sum(len(r["segments"]) for r in results),
+        "call_minutes": sum(r["seconds"] for r in results) / 60,
+        "cpu_seconds": sum(r["cpu"] for r in results),
+        "seconds": time.perf_counter() - started,
+        "workers": workers,
+        "results": results,
+    }
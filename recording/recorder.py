@@ -0,0 +1,376 @@
+"""
+In-worker call recorder.
+
+Records each call from inside the agent session, so there is no egress to
+start by hand. The result is one stereo Ogg/Opus file per conversation_id:
+the parent on the left channel, the agent on the right.
+
+    data/recordings/<conversation_id>.ogg
+    data/recordings/<conversation_id>.json   {"started_at", "seconds", "channels", ...}
+
+The sidecar is written last, so its presence means the recording is complete.
+`started_at` is the Unix time of the first sample, to line the audio up with
+the transcript's timestamps.
+
+Taps on the session's audio input (the parent) and output (the agent) copy
+each frame into a preallocated int16 ring buffer, at the position on the
+call's timeline where it is heard. There is one copy per frame and no
+per-frame allocation. The agent's audio arrives ahead of playout; when
+the parent interrupts, the part that was never played is erased again.
+Once a second the session hands the span that is CALL_RECORDING_DELAY_SECONDS
+old to a background encoder thread, which encodes it to Opus, appends it to the
+file and clears it for reuse. The event loop never encodes or writes, and a
+session's memory is the ring (CALL_RECORDING_BUFFER_SECONDS) plus the
+encoder's state, however long the call runs. If the encoder falls a whole
+buffer behind, new audio is dropped and counted rather than buffered.
+"""
+import asyncio
+import concurrent.futures
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable
+
+import av
+import numpy as np
+from livekit import rtc
+from livekit.agents.voice import io
+
+from config.settings import (
+    CALL_RECORDING_DIR,
+    CALL_RECORDING_BITRATE,
+    CALL_RECORDING_SAMPLE_RATE,
+    CALL_RECORDING_BUFFER_SECONDS,
+    CALL_RECORDING_DELAY_SECONDS,
+    CALL_RECORDING_THREADS,
+)
+
+PARENT, AGENT = 0, 1
+CHANNELS = ("parent", "agent")
+# A channel that falls this far behind the clock (silence, no frames) resumes at the clock
+_JITTER_SECONDS = 0.2
+
+_encoder_pool: concurrent.futures.ThreadPoolExecutor | None = None
+
+
+def _encoders() -> concurrent.futures.ThreadPoolExecutor:
+    global _encoder_pool
+    if _encoder_pool is None:
+        _encoder_pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=CALL_RECORDING_THREADS, thread_name_prefix="call-recorder"
+        )
+    return _encoder_pool
+
+
+def recording_path(directory: str | Path, conversation_id: str) -> Path:
+    """Return the recording file for a conversation."""
+    return Path(directory) / f"{conversation_id}.ogg"
+
+
+class CallRecorder:
+    """
+    Records one session's audio to `<directory>/<conversation_id>.ogg`.
+
+    Wrap the session's audio with tap_input() / tap_output() once it has started, call
+    start(), and aclose() when the session ends.
+
+    Args:
+        conversation_id: Names the file
+        directory: Directory the recordings are written to
+        sample_rate: Sample rate of the recording; frames at other rates are resampled
+        bitrate: Opus bitrate (bits/s, both channels)
+        buffer_seconds: Ring buffer length; bounds the audio held in memory
+        delay_seconds: How far behind the clock audio is encoded
+        flush_interval: Seconds between hand-offs to the encoder
+        clock: Monotonic clock in seconds (harnesses that run faster than real time pass their own)
+    """
+
+    def __init__(
+        self,
+        conversation_id: str,
+        directory: str | Path = CALL_RECORDING_DIR,
+        sample_rate: int = CALL_RECORDING_SAMPLE_RATE,
+        bitrate: int = CALL_RECORDING_BITRATE,
+        buffer_seconds: float = CALL_RECORDING_BUFFER_SECONDS,
+        delay_seconds: float = CALL_RECORDING_DELAY_SECONDS,
+        flush_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if buffer_seconds < delay_seconds + 2 * flush_interval:
+            raise ValueError("buffer_seconds must cover delay_seconds plus two flush intervals")
+        self.conversation_id = conversation_id
+        self.path = recording_path(directory, conversation_id)
+        self.sample_rate = sample_rate
+        self.bitrate = bitrate
+        self.flush_interval = flush_interval
+        self._clock = clock
+        self._frame = sample_rate // 50  # 20 ms, the Opus frame
+        self.capacity = int(buffer_seconds * sample_rate) // self._frame * self._frame
+        self._delay = int(delay_seconds * sample_rate)
+        self._jitter = int(_JITTER_SECONDS * sample_rate)
+        # The only audio buffer: (capacity, 2) int16, allocated once
+        self._ring = np.zeros((self.capacity, len(CHANNELS)), dtype=np.int16)
+        self._resamplers: dict[tuple[int, int, int], rtc.AudioResampler] = {}
+
+        # Positions on the call's timeline, in samples. The event loop writes at the cursors and
+        # hands [_committed, ...) to the encoder; the encoder advances _released once a span is
+        # encoded and cleared, and only then can the loop reuse those ring slots.
+        self._cursors = [0] * len(CHANNELS)
+        self._committed = 0
+        self._released = 0
+        self._origin = clock()
+        self.started_at = time.time()
+
+        self._jobs: deque[tuple[int, int, bool]] = deque()
+        self._jobs_lock = threading.Lock()
+        self._draining = False
+        self._finished: concurrent.futures.Future = concurrent.futures.Future()
+        self._container = None
+        self._stream = None
+        self._task: asyncio.Task | None = None
+        self.closed = False
+
+        self.frames = 0
+        self.dropped = 0
+        self.encode_seconds = 0.0
+        self.bytes = 0
+        self.error: BaseException | None = None
+
+    def tap_input(self, audio_input: io.AudioInput) -> "RecordingInput":
+        """The parent's audio input, recorded as it is read."""
+        return RecordingInput(self, audio_input)
+
+    def tap_output(self, audio_output: io.AudioOutput | None) -> "RecordingOutput":
+        """The agent's audio output, recorded as it is played."""
+        return RecordingOutput(self, audio_output)
+
+    def start(self) -> None:
+        """Start handing audio to the encoder, once per flush_interval."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.commit()
+
+    def _now(self) -> int:
+        return int((self._clock() - self._origin) * self.sample_rate)
+
+    def write(self, channel: int, frame: rtc.AudioFrame) -> None:
+        """Copy a frame into the ring at its place on the call's timeline."""
+        if self.closed:
+            return
+        if frame.sample_rate != self.sample_rate:
+            key = (channel, frame.sample_rate, frame.num_channels)
+            resampler = self._resamplers.get(key)
+            if resampler is None:
+                resampler = self._resamplers[key] = rtc.AudioResampler(
+                    frame.sample_rate, self.sample_rate, num_channels=frame.num_channels
+                )
+            for resampled in resampler.push(frame):
+                self._write(channel, resampled)
+        else:
+            self._write(channel, frame)
+
+    def _write(self, channel: int, frame: rtc.AudioFrame) -> None:
+        # A view of the frame's samples; the ring assignment below is the only copy
+        samples = np.frombuffer(frame.data, dtype=np.int16)
+        if frame.num_channels > 1:
+            samples = samples[::frame.num_channels]
+        self.frames += 1
+
+        position = self._cursors[channel]
+        now = self._now()
+        if position < now - self._jitter:
+            # Nothing was heard on this channel for a while: continue at the clock, leaving silence
+            position = now
+        position = max(position, self._committed)
+        room = self._released + self.capacity - position
+        if room < len(samples):
+            # The encoder is a whole buffer behind; drop rather than grow
+            self.dropped += len(samples) - max(room, 0)
+            samples = samples[:max(room, 0)]
+        start = position % self.capacity
+        first = min(len(samples), self.capacity - start)
+        self._ring[start:start + first, channel] = samples[:first]
+        if first < len(samples):
+            self._ring[:len(samples) - first, channel] = samples[first:]
+        self._cursors[channel] = position + len(samples)
+
+    def rewind(self, channel: int) -> None:
+        """Erase audio written ahead of the clock on `channel` (agent speech cut off before it played)."""
+        position = max(self._now(), self._committed)
+        end = self._cursors[channel]
+        if end <= position:
+            return
+        for start, stop in self._spans(position, end):
+            self._ring[start:stop, channel] = 0
+        self._cursors[channel] = position
+
+    def _spans(self, start: int, end: int) -> list[tuple[int, int]]:
+        # Ring slices covering timeline positions [start, end)
+        first, length = start % self.capacity, end - start
+        if first + length <= self.capacity:
+            return [(first, first + length)]
+        return [(first, self.capacity), (0, first + length - self.capacity)]
+
+    def commit(self, final: bool = False) -> None:
+        """Hand the audio older than the delay (everything, when final) to the encoder."""
+        if final:
+            end = max(max(self._cursors), self._committed)
+        else:
+            end = (self._now() - self._delay) // self._frame * self._frame
+            # Never more than the ring holds: what the loop has written is at most a buffer ahead
+            end = min(end, self._released + self.capacity)
+            if end <= self._committed:
+                return
+        start, self._committed = self._committed, max(end, self._committed)
+        # At most a ring's worth per span; on close the tail past the ring (dropped audio) is silence
+        spans = [(s, min(s + self.capacity, self._committed)) for s in range(start, self._committed, self.capacity)]
+        spans = spans or [(start, start)]
+        with self._jobs_lock:
+            for i, (first, stop) in enumerate(spans):
+                self._jobs.append((first, stop, final and i == len(spans) - 1))
+            if self._draining:
+                return
+            self._draining = True
+        _encoders().submit(self._drain)
+
+    def _drain(self) -> None:
+        # Runs on an encoder thread; a session's spans are encoded in order, one thread at a time
+        while True:
+            with self._jobs_lock:
+                if not self._jobs:
+                    self._draining = False
+                    return
+                start, end, final = self._jobs.popleft()
+            started = time.thread_time()
+            try:
+                if self.error is None:
+                    self._encode(start, end)
+                    if final:
+                        self._finalize()
+            except (OSError, ValueError, av.FFmpegError) as e:
+                self.error = e
+                print(f"Call recording {self.conversation_id} failed: {e!r}")
+            finally:
+                self.encode_seconds += time.thread_time() - started
+                if final:
+                    self._finished.set_result(self.error is None)
+
+    def _encode(self, start: int, end: int) -> None:
+        if end <= start:
+            return
+        if self._container is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._container = av.open(str(self.path) + ".part", "w", format="ogg")
+            self._stream = self._container.add_stream("libopus", rate=self.sample_rate, layout="stereo")
+            self._stream.bit_rate = self.bitrate
+            # Half the CPU of the default (10) for a voice recording, at the same bitrate
+            self._stream.options = {"compression_level": "5"}
+        pts = start
+        for first, stop in self._spans(start, end):
+            span = self._ring[first:stop]
+            frame = av.AudioFrame.from_ndarray(span.reshape(1, -1), format="s16", layout="stereo")
+            frame.sample_rate = self.sample_rate
+            frame.pts = pts
+            pts += stop - first
+            for packet in self._stream.encode(frame):
+                self._container.mux(packet)
+            # Cleared for the next pass around the ring
+            span.fill(0)
+        self._released = end
+
+    def _finalize(self) -> None:
+        if self._container is None:
+            return
+        for packet in self._stream.encode(None):
+            self._container.mux(packet)
+        self._container.close()
+        part = Path(str(self.path) + ".part")
+        self.bytes = part.stat().st_size
+        os.replace(part, self.path)
+        meta = {
+            "conversation_id": self.conversation_id,
+            "started_at": self.started_at,
+            "seconds": round(self._released / self.sample_rate, 3),
+            "sample_rate": self.sample_rate,
+            "channels": list(CHANNELS),
+            "bitrate": self.bitrate,
+            "bytes": self.bytes,
+            "dropped_seconds": round(self.dropped / self.sample_rate, 3),
+        }
+        sidecar = self.path.with_suffix(".json")
+        tmp = sidecar.with_name(f".tmp-{os.getpid()}-{sidecar.name}")
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, sidecar)
+
+    async def aclose(self) -> bool:
+        """
+        Encode what is left and finalize the file. Safe to call more than once.
+
+        Returns:
+            Whether the recording was written
+        """
+        if not self.closed:
+            self.closed = True
+            if self._task is not None:
+                self._task.cancel()
+            self.commit(final=True)
+            ok = await asyncio.wrap_future(self._finished)
+            if ok and self._container is not None:
+                print(f"Call recording saved: {self.path} ({self._released / self.sample_rate:.1f}s, "
+                      f"{self.bytes:,} bytes, encoded in {self.encode_seconds * 1000:.0f} ms CPU"
+                      + (f", {self.dropped / self.sample_rate:.1f}s dropped" if self.dropped else "") + ")")
+        return await asyncio.wrap_future(self._finished)
+
+    def memory_bytes(self) -> int:
+        """Bytes of audio buffer held by this recorder (fixed at construction)."""
+        return self._ring.nbytes
+
+
+class RecordingInput(io.AudioInput):
+    """Audio input that records the parent's frames on their way to the agent."""
+
+    def __init__(self, recorder: CallRecorder, source: io.AudioInput):
+        super().__init__(label="CallRecorder", source=source)
+        self._recorder = recorder
+
+    async def __anext__(self) -> rtc.AudioFrame:
+        frame = await self.source.__anext__()
+        self._recorder.write(PARENT, frame)
+        return frame
+
+
+class RecordingOutput(io.AudioOutput):
+    """Audio output that records the agent's frames on their way to the room."""
+
+    def __init__(self, recorder: CallRecorder, audio_output: io.AudioOutput | None):
+        super().__init__(
+            label="CallRecorder",
+            next_in_chain=audio_output,
+            sample_rate=audio_output.sample_rate if audio_output is not None else None,
+            capabilities=io.AudioOutputCapabilities(pause=True),  # depends on the next_in_chain
+        )
+        self._recorder = recorder
+
+    async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+        await super().capture_frame(frame)
+        self._recorder.write(AGENT, frame)
+        if self.next_in_chain:
+            await self.next_in_chain.capture_frame(frame)
+
+    def flush(self) -> None:
+        super().flush()
+        if self.next_in_chain:
+            self.next_in_chain.flush()
+
+    def clear_buffer(self) -> None:
+        # Interrupted: what was queued ahead of playout is never heard
+        self._recorder.rewind(AGENT)
+        if self.next_in_chain:
+            self.next_in_chain.clear_buffer()
@@ -0,0 +1,173 @@
+"""
+Per-session activity monitor: reprompts a silent parent and reaps dead sessions.
+
+`close_on_disconnect` only ends a session when the parent leaves the room
+cleanly. A parent who stops talking, or a half-dead connection, keeps the
+realtime session, its model connection and the job process alive. The
+monitor tracks the last user speech, the last agent audio and the last
+conversation item, and applies a reprompt-then-hangup policy:
+
+    silent for reprompt_after seconds   -> ask whether the parent is still there
+                                           (up to max_reprompts times)
+    still silent for hangup_after       -> say goodbye and close ("idle")
+    no session event for zombie_after   -> close at once, no reply ("zombie")
+
+Silence only counts while neither side is speaking and the agent is not
+thinking; the zombie check counts any event, so it also catches a session
+stuck mid-turn. Sessions are ended through SessionGovernor.cut(), so the
+reason is recorded like the governor's own caps. Each reaped session adds
+to the worker-wide sales_agent_sessions_reclaimed and
+sales_agent_reclaimed_seconds counters.
+
+Events only update timestamps; a single loop timer, re-armed for the next
+deadline, runs the checks.
+"""
+import asyncio
+import time
+
+from agent.prompt import REPROMPT_INSTRUCTIONS, closing_instructions
+from config.settings import (
+    IDLE_REPROMPT_SECONDS,
+    IDLE_MAX_REPROMPTS,
+    IDLE_HANGUP_SECONDS,
+    IDLE_ZOMBIE_SECONDS,
+)
+from . import metrics as session_metrics
+
+# Agent states in which the session is not waiting on the parent
+_BUSY_AGENT_STATES = ("thinking", "speaking")
+
+
+class ActivityMonitor:
+    """
+    Reprompts, hangs up on or reaps an inactive session.
+
+    Args:
+        session: The AgentSession to watch
+        governor: The session's SessionGovernor, which closes the session and records the reason
+        reprompt_after: Seconds of silence before each reprompt; 0 disables reprompts and hangups
+        max_reprompts: Reprompts before hanging up
+        hangup_after: Seconds of silence after the last reprompt before hanging up
+        zombie_after: Seconds without any session event before reaping; 0 disables it
+    """
+
+    def __init__(
+        self,
+        session,
+        governor,
+        reprompt_after: float = IDLE_REPROMPT_SECONDS,
+        max_reprompts: int = IDLE_MAX_REPROMPTS,
+        hangup_after: float = IDLE_HANGUP_SECONDS,
+        zombie_after: float = IDLE_ZOMBIE_SECONDS,
+    ):
+        self.session = session
+        self.governor = governor
+        self.reprompt_after = reprompt_after
+        self.max_reprompts = max_reprompts
+        self.hangup_after = hangup_after
+        self.zombie_after = zombie_after
+        now = time.monotonic()
+        self.last_user_speech = now
+        self.last_agent_audio = now
+        self.last_item = now
+        # Reprompts since the parent last spoke, and over the whole session
+        self.reprompts = 0
+        self.total_reprompts = 0
+        self.reclaimed_seconds = 0.0
+        self._last_event = now
+        self._user_speaking = False
+        self._agent_state = "initializing"
+        self._timer: asyncio.TimerHandle | None = None
+        self._closed = False
+
+    @property
+    def last_activity(self) -> float:
+        return max(self.last_user_speech, self.last_agent_audio, self.last_item)
+
+    @property
+    def busy(self) -> bool:
+        return self._user_speaking or self._agent_state in _BUSY_AGENT_STATES
+
+    def start(self) -> None:
+        """Start the checks. Must be called from the event loop."""
+        now = time.monotonic()
+        self.last_user_speech = self.last_agent_audio = self.last_item = self._last_event = now
+        self._schedule(now)
+
+    def user_state(self, state: str) -> None:
+        """Track a user_state_changed new_state."""
+        now = self._last_event = time.monotonic()
+        # "away" is livekit's own inactivity state, not speech
+        if state == "away":
+            return
+        if state == "speaking" or self._user_speaking:
+            self.last_user_speech = now
+            self.reprompts = 0
+        self._user_speaking = state == "speaking"
+
+    def agent_state(self, state: str) -> None:
+        """Track an agent_state_changed new_state."""
+        now = self._last_event = time.monotonic()
+        if state == "speaking" or self._agent_state == "speaking":
+            self.last_agent_audio = now
+        self._agent_state = state
+
+    def observe(self, item) -> None:
+        """Track a conversation item."""
+        self.last_item = self._last_event = time.monotonic()
+
+    def close(self) -> None:
+        """Stop the checks; call when the session closes."""
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _deadlines(self, now: float) -> tuple[float | None, float | None]:
+        idle = None
+        if self.reprompt_after:
+            wait = self.reprompt_after if self.reprompts < self.max_reprompts else self.hangup_after
+            # While someone speaks, look again after one full wait
+            idle = now + wait if self.busy else self.last_activity + wait
+        zombie = self._last_event + self.zombie_after if self.zombie_after else None
+        return idle, zombie
+
+    def _schedule(self, now: float) -> None:
+        if self._closed or self.governor.cut_reason is not None:
+            return
+        deadlines = [d for d in self._deadlines(now) if d is not None]
+        if deadlines:
+            self._timer = asyncio.get_running_loop().call_later(max(min(deadlines) - now, 0.01), self._check)
+
+    def _check(self) -> None:
+        self._timer = None
+        now = time.monotonic()
+        idle, zombie = self._deadlines(now)
+        if zombie is not None and now >= zombie:
+            self._reap("zombie", None)
+            return
+        if idle is not None and now >= idle and not self.busy:
+            if self.reprompts < self.max_reprompts:
+                self.reprompts += 1
+                self.total_reprompts += 1
+                print(f"Parent silent for {now - self.last_activity:.0f}s, reprompt {self.reprompts}/{self.max_reprompts}")
+                # Counts as activity, so a reprompt that never plays still leads to the hangup
+                self.last_agent_audio = now
+                try:
+                    self.session.generate_reply(instructions=REPROMPT_INSTRUCTIONS)
+                except RuntimeError as e:
+                    print(f"Reprompt failed: {e!r}")
+            else:
+                self._reap("idle", closing_instructions(self.governor.lead_saved, idle=True))
+                return
+        self._schedule(now)
+
+    def _reap(self, reason: str, instructions: str | None) -> None:
+        governor = self.governor
+        if governor.cut_reason is not None:
+            return
+        # Capacity recovered: what the session had left before the governor's minutes cap would end it
+        if governor.max_minutes:
+            self.reclaimed_seconds = max(0.0, governor.max_minutes * 60 - governor.elapsed)
+        governor.cut(reason, instructions)
+        session_metrics.session_reclaimed(reason, self.reclaimed_seconds)
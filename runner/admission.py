@@ -0,0 +1,228 @@
+"""
+Load-aware admission control and drain mode for the agent worker.
+
+`AdmissionPolicy.load` is passed to WorkerOptions as load_fnc. The value is
+reported to the LiveKit dispatcher, which stops routing jobs to this worker
+once it reaches load_threshold, so calls are spread across nodes.
+`AdmissionPolicy.request_fnc` re-checks the per-worker caps for every job
+request, because several requests can arrive between two load updates.
+
+Drain mode reports full load and rejects new jobs while in-flight calls
+finish. It is entered on SIGUSR1, on POST /drain to the stats server, or
+automatically when the CLI starts draining on SIGTERM.
+"""
+import hmac
+import json
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import psutil
+from livekit.agents import JobRequest
+
+from config.settings import (
+    WORKER_MAX_SESSIONS,
+    WORKER_MAX_CPU_PERCENT,
+    WORKER_MAX_RSS_MB,
+)
+
+
+class AdmissionPolicy:
+    """
+    Per-worker caps on concurrent sessions, CPU and memory.
+
+    Args:
+        max_sessions: Maximum concurrent sessions (jobs) on this worker
+        max_cpu_percent: System CPU utilisation at which the worker is full
+        max_rss_mb: Resident memory of the worker and its job processes at which it is full
+        pending_ttl: Seconds an accepted job counts as pending before it shows up as active
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = WORKER_MAX_SESSIONS,
+        max_cpu_percent: float = WORKER_MAX_CPU_PERCENT,
+        max_rss_mb: float = WORKER_MAX_RSS_MB,
+        pending_ttl: float = 30.0,
+    ):
+        self.max_sessions = max_sessions
+        self.max_cpu_percent = max_cpu_percent
+        self.max_rss_mb = max_rss_mb
+        self.pending_ttl = pending_ttl
+        self.draining = False
+        self.accepted = 0
+        self.rejected = 0
+        self._process = psutil.Process()
+        self._lock = threading.Lock()
+        # Job ids accepted but not yet reported as active by the worker
+        self._pending: dict[str, float] = {}
+        self._stats = {
+            "load": 0.0,
+            "active_sessions": 0,
+            "pending_sessions": 0,
+            "cpu_percent": 0.0,
+            "rss_mb": 0.0,
+            "updated_at": None,
+        }
+        # The first cpu_percent() call only primes the counters
+        psutil.cpu_percent(interval=None)
+
+    def _tree_rss_mb(self) -> float:
+        total = self._process.memory_info().rss
+        for child in self._process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                # The job process exited between listing and sampling
+                pass
+        return total / (1024 * 1024)
+
+    def load(self, worker) -> float:
+        """
+        Compute the worker load in [0, 1] (WorkerOptions.load_fnc).
+
+        Called by the worker every 0.5s from a thread pool.
+        """
+        active_ids = {info.job.id for info in worker.active_jobs}
+        now = time.monotonic()
+        with self._lock:
+            for job_id, accepted_at in list(self._pending.items()):
+                if job_id in active_ids or now - accepted_at > self.pending_ttl:
+                    del self._pending[job_id]
+            pending = len(self._pending)
+
+        cpu_percent = psutil.cpu_percent(interval=None)
+        rss_mb = self._tree_rss_mb()
+        # The CLI drains the worker on SIGTERM; stop admitting as soon as it does
+        if getattr(worker, "_draining", False):
+            self.draining = True
+
+        if self.draining:
+            load = 1.0
+        else:
+            load = min(1.0, max(
+                (len(active_ids) + pending) / self.max_sessions,
+                cpu_percent / self.max_cpu_percent,
+                rss_mb / self.max_rss_mb,
+            ))
+
+        self._stats = {
+            "load": round(load, 4),
+            "active_sessions": len(active_ids),
+            "pending_sessions": pending,
+            "cpu_percent": cpu_percent,
+            "rss_mb": round(rss_mb, 1),
+            "updated_at": time.time(),
+        }
+        return load
+
+    def rejection_reason(self) -> str | None:
+        """Return why a new job would be rejected right now, or None to accept it."""
+        if self.draining:
+            return "worker is draining"
+        stats = self._stats
+        with self._lock:
+            sessions = stats["active_sessions"] + len(self._pending)
+        if sessions >= self.max_sessions:
+            return f"session cap reached ({sessions}/{self.max_sessions})"
+        if stats["cpu_percent"] >= self.max_cpu_percent:
+            return f"CPU cap reached ({stats['cpu_percent']:.0f}%)"
+        if stats["rss_mb"] >= self.max_rss_mb:
+            return f"memory cap reached ({stats['rss_mb']:.0f} MB)"
+        return None
+
+    async def request_fnc(self, req: JobRequest) -> None:
+        """Accept or reject a dispatched job (WorkerOptions.request_fnc)."""
+        reason = self.rejection_reason()
+        if reason:
+            self.rejected += 1
+            print(f"Rejecting job {req.id}: {reason}")
+            await req.reject()
+            return
+        with self._lock:
+            self._pending[req.id] = time.monotonic()
+        self.accepted += 1
+        await req.accept()
+
+    def start_draining(self, reason: str = "requested") -> None:
+        """Stop admitting new jobs; in-flight calls keep running."""
+        if not self.draining:
+            print(f"Worker draining: {reason}")
+        self.draining = True
+
+    def snapshot(self) -> dict:
+        """Live load numbers and caps for this worker."""
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            **self._stats,
+            "pending_sessions": pending,
+            "draining": self.draining,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "max_sessions": self.max_sessions,
+            "max_cpu_percent": self.max_cpu_percent,
+            "max_rss_mb": self.max_rss_mb,
+        }
+
+
+def install_drain_signal(policy: AdmissionPolicy, sig: int = signal.SIGUSR1) -> None:
+    """Enter drain mode when the process receives `sig`."""
+    signal.signal(sig, lambda signum, frame: policy.start_draining(f"signal {signum}"))
+
+
+def start_stats_server(
+    policy: AdmissionPolicy,
+    host: str = "127.0.0.1",
+    port: int = 8082,
+    api_key: str = "",
+) -> ThreadingHTTPServer:
+    """
+    Serve the policy's live load numbers over HTTP on a daemon thread.
+
+    Endpoints:
+        GET /load   - JSON snapshot of load, sessions, CPU, RSS and caps
+        POST /drain - enter drain mode; with `api_key` set, only with "Authorization: Bearer <key>"
+
+    Args:
+        policy: The worker's admission policy
+        host: Interface to bind; keep it private unless `api_key` is set
+        port: Port to bind
+        api_key: Bearer key POST requests must send; empty disables the check
+    """
+
+    class _Handler(BaseHTTPRequestHandler):
+        def _send_json(self, body: dict, status: int = 200) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/load":
+                self._send_json(policy.snapshot())
+            else:
+                self._send_json({"error": "not found"}, status=404)
+
+        def do_POST(self):
+            if api_key:
+                supplied = self.headers.get("Authorization", "").removeprefix("Bearer ")
+                if not hmac.compare_digest(supplied.encode(), api_key.encode()):
+                    self._send_json({"error": "unauthorized"}, status=401)
+                    return
+            if self.path == "/drain":
+                policy.start_draining("POST /drain")
+                self._send_json(policy.snapshot())
+            else:
+                self._send_json({"error": "not found"}, status=404)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="worker-stats", daemon=True).start()
+    return server
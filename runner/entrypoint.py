@@ -1,73 +1,231 @@
+import time
+_import_started = time.perf_counter()
+
 import asyncio
 import json
-from livekit.agents import ConversationItemAddedEvent, JobContext, AgentSession, MetricsCollectedEvent, RoomInputOptions, metrics
-from livekit.plugins import openai as openai_plugin
+from opentelemetry import context as otel_context, trace
+from livekit.agents import AgentStateChangedEvent, ConversationItemAddedEvent, JobContext, AgentSession, MetricsCollectedEvent, RoomInputOptions, UserStateChangedEvent
 
 from agent.bant_agent import EdTechBANTAgent
+from agent.greeting import GreetingRecorder, get_greeting_cache, save_rendering, seed_greeting
+from agent.prompt import GREETING_INSTRUCTIONS
+from agent.slots import SlotTracker
+from config.settings import CALL_RECORDING, PROMPT_VARIANT, TRANSCRIPT_INDEX, USAGE_STORE
 from config.token_generator import generate_conversation_id
+from leads import LeadSubmitter, get_lead_sink, close_lead_sink
+from recording import CallRecorder
+from transcripts import get_transcript_writer, close_transcript_writer, get_transcript_index
+from usage import SessionUsage, get_usage_store
+from . import metrics as session_metrics
+from .activity import ActivityMonitor
+from .governor import SessionGovernor
+from .prewarm import create_realtime_model, get_prewarmed
+from .startup import JobStartupTimer, job_accepted_at, record_import
+from .tracing import tracer, flush_tracing, record_model_turn
+
+# Without main.py (offline harnesses) this is the only import timing; main.py overwrites it with
+# one that also covers livekit and the config
+record_import(time.perf_counter() - _import_started)
 
 
 async def entrypoint(ctx: JobContext):
-    await ctx.connect()
+    startup = JobStartupTimer(warm=bool(ctx.proc.userdata.get("prewarmed")), accepted_at=job_accepted_at(ctx.job))
+    prewarmed = get_prewarmed(ctx.proc)
 
-    # Extract or generate conversation_id
-    conversation_id = None
-    try:
-        # Try to extract conversation_id from room metadata
-        if ctx.room and hasattr(ctx.room, 'metadata'):
-            metadata = ctx.job.metadata
-            if metadata:
-                try:
-                    metadata_dict = json.loads(metadata)
-                    conversation_id = metadata_dict.get("conversation_id")
-                except (json.JSONDecodeError, AttributeError):
-                    pass
-    except (AttributeError, TypeError):
-        pass
-    
-    # Generate new conversation_id if not found
-    if not conversation_id:
-        conversation_id = generate_conversation_id()
-    
-    llm = openai_plugin.realtime.RealtimeModel(
-        voice="alloy"
-    )
+    # Root span for the whole call. Sampling is decided here, and making it current
+    # parents the spans of every task spawned from this entrypoint (tool calls included)
+    session_span = tracer.start_span("session", attributes={"job_id": ctx.job.id, "room": ctx.job.room.name})
+    otel_context.attach(trace.set_span_in_context(session_span))
 
-    def _on_conversation_item(event: ConversationItemAddedEvent):
-        asyncio.create_task(log_transcription(event))
+    # conversation_id comes from the job metadata, so it is known before connecting
+    with tracer.start_as_current_span("parse_metadata") as span:
+        # Extract or generate conversation_id
+        conversation_id = None
+        try:
+            # Try to extract conversation_id from room metadata
+            if ctx.room and hasattr(ctx.room, 'metadata'):
+                metadata = ctx.job.metadata
+                if metadata:
+                    try:
+                        metadata_dict = json.loads(metadata)
+                        conversation_id = metadata_dict.get("conversation_id")
+                    except (json.JSONDecodeError, AttributeError):
+                        pass
+        except (AttributeError, TypeError):
+            pass
+
+        # Generate new conversation_id if not found
+        if not conversation_id:
+            conversation_id = generate_conversation_id()
+        span.set_attribute("conversation_id", conversation_id)
+    session_span.set_attribute("conversation_id", conversation_id)
+
+    with tracer.start_as_current_span("connect", attributes={"conversation_id": conversation_id}):
+        await ctx.connect()
+    startup.mark("connected")
+
+    # Start lead delivery early so leads left over from a previous worker are drained
+    lead_sink = get_lead_sink()
+    lead_sink.start()
+    # Session-owned background task that persists leads after submit_lead returns
+    lead_submitter = LeadSubmitter(lead_sink)
+
+    # Shutdown callbacks run concurrently, so flush the submitter before closing the sink
+    async def _flush_leads():
+        await lead_submitter.aclose()
+        await close_lead_sink()
+
+    ctx.add_shutdown_callback(_flush_leads)
+    ctx.add_shutdown_callback(close_transcript_writer)
+
+    async def _finish_trace():
+        # The session span normally ends on close; end it here if the session never started
+        if session_span.is_recording():
+            session_span.end()
+        await flush_tracing()
+
+    ctx.add_shutdown_callback(_finish_trace)
 
-    async def log_transcription(event: ConversationItemAddedEvent):
+    # Reuse the model built by prewarm; it is per-job state from here on
+    llm = prewarmed.pop("llm", None) or create_realtime_model()
+
+    # One bounded queue + consumer per process batches transcript items to disk
+    transcript_writer = get_transcript_writer()
+    transcript_writer.start()
+
+    def _on_conversation_item(event: ConversationItemAddedEvent):
         item = event.item
-        role = item.role
-        text = item.text_content or ""
-        print(f"Logging History: {role} : {text}")
+        activity.observe(item)
+        if item.type != "message":
+            return
+        slot_tracker.observe(item)
+        governor.observe(item)
+        transcript_writer.submit(
+            conversation_id,
+            item.role,
+            item.text_content or "",
+            created_at=item.created_at,
+            interrupted=item.interrupted,
+        )
 
     session = AgentSession(
         llm=llm,
     )
+    session.on("conversation_item_added", _on_conversation_item)
+
+    agent = EdTechBANTAgent(
+        instructions=prewarmed["prompts"][PROMPT_VARIANT],
+        tools=prewarmed["tools"],
+    )
+
+    # Fills the BANT slots as the call goes and wraps the call up once they are known
+    slot_tracker = SlotTracker(agent)
+    # Ends the call once it passes its token, time or no-progress cap
+    governor = SessionGovernor(
+        session, slot_tracker, shutdown=lambda reason: ctx.shutdown(reason=f"session cut: {reason}")
+    )
+    # Reprompts a silent parent, then hangs up; reaps sessions that stop producing events
+    activity = ActivityMonitor(session, governor)
+
+    # Usage Metrics, persisted per conversation_id when the session closes
+    session_usage = SessionUsage(conversation_id, PROMPT_VARIANT, model=getattr(llm, "model", ""))
+
+    # Streams the parent's and agent's audio to data/recordings/<conversation_id>.ogg
+    call_recorder = CallRecorder(conversation_id) if CALL_RECORDING else None
+    if call_recorder is not None:
+        ctx.add_shutdown_callback(call_recorder.aclose)
+
+    @session.on("agent_state_changed")
+    def _on_agent_state_changed(ev: AgentStateChangedEvent):
+        session_usage.agent_state(ev.new_state)
+        activity.agent_state(ev.new_state)
+        if ev.new_state == "speaking" and not startup.reported:
+            startup.mark("first_audio")
+            startup.log_report()
+
+    @session.on("user_state_changed")
+    def _on_user_state_changed(ev: UserStateChangedEvent):
+        session_usage.user_state(ev.new_state)
+        activity.user_state(ev.new_state)
 
-    agent = EdTechBANTAgent()
-    
-    # Usage Metrics
-    usage_collector = metrics.UsageCollector()
     @session.on("metrics_collected")
     def _on_metrics_collected(ev: MetricsCollectedEvent):
-        usage_collector.collect(ev.metrics)
+        governor.on_metrics(ev.metrics)
+        session_usage.collect(ev.metrics)
+        session_metrics.record_agent_metrics(ev.metrics)
+        record_model_turn(session_span, ev.metrics, conversation_id)
 
+    # The recorder is bound as a default so no later assignment in this function can swap it out
     @session.on("close")
-    def _on_close(_):
+    def _on_close(_, call_recorder=call_recorder):
+        session_metrics.session_ended()
+        governor.close()
+        activity.close()
+        if governor.cut_reason:
+            session_usage.end_reason = governor.cut_reason
+            session_span.set_attribute("cut_reason", governor.cut_reason)
+            session_metrics.session_cut(governor.cut_reason)
+        session_span.end()
         asyncio.create_task(log_llm_tokens())
+        # A call that drops before submit_lead still leaves a partial lead
+        slot_tracker.finalize()
+        asyncio.create_task(lead_submitter.aclose())
+        asyncio.create_task(flush_transcript())
+        if call_recorder is not None:
+            asyncio.create_task(call_recorder.aclose())
+        # Report even if the call ended before the agent spoke
+        startup.log_report()
+        if governor.cut_reason:
+            # Free the job process instead of waiting for the parent to hang up
+            ctx.shutdown(reason=f"session cut: {governor.cut_reason}")
     
+    async def flush_transcript():
+        await transcript_writer.flush()
+        transcript_writer.forget(conversation_id)
+        stats = transcript_writer.stats()
+        if stats["dropped"]:
+            print(f"Transcript items dropped (queue full): {stats['dropped']}")
+        if TRANSCRIPT_INDEX:
+            # Queued for the background indexer (python -m transcripts.search update --watch)
+            try:
+                get_transcript_index().add(conversation_id)
+            except (OSError, ValueError) as e:
+                print(f"Failed to queue the transcript for indexing: {e!r}")
+
     async def log_llm_tokens():
-        usage = usage_collector.get_summary()
+        usage = session_usage.summary()
         print(f"LLM Tokens: {usage}")
+        if USAGE_STORE:
+            try:
+                get_usage_store().append(session_usage.record())
+            except OSError as e:
+                print(f"Failed to record session usage: {e!r}")
     # Store conversation_id on the agent instance for tracking
-    # This is accessible from tools via context.agent
+    # Tools reach it as context.session.current_agent
     agent.conversation_id = conversation_id
+    agent.lead_submitter = lead_submitter
+    agent.slot_tracker = slot_tracker
 
-    await session.start(room=ctx.room, agent=agent,room_input_options=RoomInputOptions(
-            close_on_disconnect = True
-        ))
+    # Offline harnesses (benchmarks/load_test.py) run without a room and attach their own I/O
+    attach_io = prewarmed.get("attach_io")
+    with tracer.start_as_current_span("session_start", attributes={"conversation_id": conversation_id}):
+        if attach_io is not None:
+            attach_io(session)
+            await session.start(agent=agent)
+        else:
+            await session.start(room=ctx.room, agent=agent,room_input_options=RoomInputOptions(
+                    close_on_disconnect = True
+                ))
+    startup.mark("session_started")
+    if call_recorder is not None:
+        # RoomIO creates the session's audio input and output in start(); tap them before the greeting
+        if session.input.audio is not None:
+            session.input.audio = call_recorder.tap_input(session.input.audio)
+        session.output.audio = call_recorder.tap_output(session.output.audio)
+        call_recorder.start()
+    session_metrics.session_started()
+    governor.start()
+    activity.start()
 
     # Try to store conversation_id in session userdata after session is started
     # userdata is a property that raises ValueError if not set
@@ -77,7 +235,23 @@ async def entrypoint(ctx: JobContext):
         # If userdata is not available, that's okay - we have it on the agent
         pass
 
-    # Greet parent
-    await session.generate_reply(
-        instructions="Greet the parent by introducing yourself as Sales Agent. Say that you want to know more about the student and ask which class their child is studying in."
-    )
+    # Greet parent: play the pre-rendered greeting if there is one, otherwise generate it (and record it)
+    greeting_key = prewarmed.get("greeting_key")
+    greeting = get_greeting_cache().get(greeting_key) if greeting_key else None
+    with tracer.start_as_current_span(
+        "greeting", attributes={"conversation_id": conversation_id, "cached": greeting is not None}
+    ):
+        if greeting is not None:
+            handle = session.say(greeting.text, audio=greeting.audio(), add_to_chat_ctx=False)
+            # The model did not say it, so tell it (and the slot tracker and transcript) what was said
+            _on_conversation_item(ConversationItemAddedEvent(item=await seed_greeting(agent, greeting.text)))
+            await handle
+        else:
+            greeting_recorder = None
+            if greeting_key:
+                greeting_recorder = GreetingRecorder(session.output.audio)
+                session.output.audio = greeting_recorder
+            handle = session.generate_reply(instructions=GREETING_INSTRUCTIONS)
+            await handle
+            if greeting_recorder is not None:
+                asyncio.create_task(save_rendering(greeting_key, greeting_recorder, handle))
@@ -0,0 +1,155 @@
+"""
+Per-session token, time and progress budget.
+
+A stuck or chatty call keeps a realtime session (and a job process) busy and
+runs up tokens. The governor ends a session that passes one of its caps:
+    max_tokens       model tokens (input + output, summed over responses)
+    max_minutes      wall-clock minutes since the governor started
+    max_stale_turns  parent turns in a row that fill no lead slot (from the SlotTracker)
+
+On the first cap hit it asks the model for a short closing reply
+(closing_instructions(), worded by whether a lead was saved), waits for it to play out (at most `closing_timeout`
+seconds) and closes the AgentSession. The reason is kept in `cut_reason`
+for the entrypoint to record. The activity monitor (runner/activity.py)
+ends idle and zombie sessions through cut() as well. If the session does
+not close within `closing_timeout` either, `shutdown` is called so the job
+process exits anyway.
+
+Checks are O(1) per event: metrics events add to a counter, the time cap is
+a single loop timer and the stale-turn cap reads the tracker's counter.
+"""
+import asyncio
+import time
+from typing import Callable
+
+from agent.prompt import closing_instructions
+from config.settings import (
+    SESSION_MAX_TOKENS,
+    SESSION_MAX_MINUTES,
+    SESSION_MAX_STALE_TURNS,
+    SESSION_CLOSING_TIMEOUT,
+)
+
+# Values of cut_reason
+CUT_REASONS = ("max_tokens", "max_minutes", "no_progress", "idle", "zombie")
+
+
+class SessionGovernor:
+    """
+    Ends a session that exceeds its budget.
+
+    Args:
+        session: The AgentSession to close
+        slot_tracker: The session's SlotTracker, for the stale-turn cap
+        max_tokens: Token cap; 0 disables it
+        max_minutes: Duration cap; 0 disables it
+        max_stale_turns: Cap on parent turns in a row without slot progress; 0 disables it
+        closing_timeout: Seconds the closing reply may take before the session is closed anyway,
+            and the close itself may take before `shutdown` is called
+        shutdown: Called with the cut reason if the session does not close in time
+    """
+
+    def __init__(
+        self,
+        session,
+        slot_tracker=None,
+        max_tokens: int = SESSION_MAX_TOKENS,
+        max_minutes: float = SESSION_MAX_MINUTES,
+        max_stale_turns: int = SESSION_MAX_STALE_TURNS,
+        closing_timeout: float = SESSION_CLOSING_TIMEOUT,
+        shutdown: Callable[[str], None] | None = None,
+    ):
+        self.session = session
+        self.slot_tracker = slot_tracker
+        self.max_tokens = max_tokens
+        self.max_minutes = max_minutes
+        self.max_stale_turns = max_stale_turns
+        self.closing_timeout = closing_timeout
+        self.shutdown = shutdown
+        self.tokens = 0
+        self.cut_reason: str | None = None
+        # Seconds after start() at which the session was cut
+        self.cut_after: float | None = None
+        self._started = time.monotonic()
+        self._timer: asyncio.TimerHandle | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since start()."""
+        return time.monotonic() - self._started
+
+    def start(self) -> None:
+        """Start the wall-clock cap. Must be called from the event loop."""
+        self._started = time.monotonic()
+        if self.max_minutes:
+            self._timer = asyncio.get_running_loop().call_later(self.max_minutes * 60, self.cut, "max_minutes")
+
+    def on_metrics(self, ev) -> None:
+        """Count a metrics_collected payload's tokens (model metrics only)."""
+        tokens = getattr(ev, "total_tokens", 0)
+        if tokens:
+            self.tokens += tokens
+            if self.max_tokens and self.tokens >= self.max_tokens:
+                self.cut("max_tokens")
+
+    def observe(self, item) -> None:
+        """Check the stale-turn cap after a parent turn; call after the slot tracker has seen `item`."""
+        if (
+            self.max_stale_turns
+            and self.slot_tracker is not None
+            and item.role == "user"
+            and self.slot_tracker.turns_without_progress >= self.max_stale_turns
+        ):
+            self.cut("no_progress")
+
+    @property
+    def lead_saved(self) -> bool:
+        """True if a lead was persisted for this session, so the closing reply may say so."""
+        return self.slot_tracker is not None and self.slot_tracker.submitted
+
+    def cut(self, reason: str, instructions: str | None = "") -> None:
+        """
+        Wrap the call up and close the session; later calls are ignored.
+
+        Args:
+            reason: One of CUT_REASONS
+            instructions: Instructions for the closing reply; "" for closing_instructions(),
+                None closes without one
+        """
+        if self.cut_reason is not None:
+            return
+        if instructions == "":
+            instructions = closing_instructions(self.lead_saved)
+        self.cut_reason = reason
+        self.cut_after = self.elapsed
+        self._cancel_timer()
+        print(f"Session cut ({reason}) after {self.cut_after:.0f}s and {self.tokens:,} tokens")
+        self._task = asyncio.create_task(self._close(instructions))
+
+    def close(self) -> None:
+        """Stop the timer; call when the session closes."""
+        self._cancel_timer()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    async def _close(self, instructions: str | None) -> None:
+        if instructions:
+            try:
+                handle = self.session.generate_reply(instructions=instructions)
+                await asyncio.wait_for(handle.wait_for_playout(), self.closing_timeout)
+            except asyncio.TimeoutError:
+                print(f"Closing reply did not finish within {self.closing_timeout:g}s")
+            except Exception as e:
+                # The session may already be closing (e.g. the parent hung up)
+                print(f"Closing reply failed: {e!r}")
+        try:
+            # Shielded so a slow close still finishes after the job is told to shut down
+            await asyncio.wait_for(asyncio.shield(self.session.aclose()), self.closing_timeout)
+        except asyncio.TimeoutError:
+            print(f"Session did not close within {self.closing_timeout:g}s")
+            if self.shutdown is not None:
+                self.shutdown(self.cut_reason)
@@ -0,0 +1,140 @@
+"""
+Prometheus metrics for live sessions.
+
+Job processes update these metrics directly; in multiprocess mode (set up in
+main.py) prometheus_client writes each update to a per-process mmap file and
+the worker serves all processes from one /metrics endpoint on METRICS_PORT.
+Every update is an in-memory write (about 10us per metrics event with cached
+label children), so it is safe to call from session event handlers on the
+audio loop.
+"""
+import functools
+
+import prometheus_client
+from livekit.agents import metrics as lk_metrics
+
+from agent.timing import add_tool_timing_hook
+from config.settings import METRICS_WORKER_NAME, PROMPT_VARIANT
+
+_LABELS = ["worker", "prompt_version"]
+
+# Buckets tuned for conversational latency: 50ms .. 10s
+_LATENCY_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+END_OF_UTTERANCE_DELAY = prometheus_client.Histogram(
+    "sales_agent_end_of_utterance_delay_seconds",
+    "Time from the end of user speech to the turn being committed",
+    _LABELS,
+    buckets=_LATENCY_BUCKETS,
+)
+TIME_TO_FIRST_TOKEN = prometheus_client.Histogram(
+    "sales_agent_time_to_first_token_seconds",
+    "Time from the model request to its first token",
+    _LABELS + ["model"],
+    buckets=_LATENCY_BUCKETS,
+)
+TIME_TO_FIRST_AUDIO = prometheus_client.Histogram(
+    "sales_agent_time_to_first_audio_seconds",
+    "Time from the request to the first agent audio",
+    _LABELS + ["model"],
+    buckets=_LATENCY_BUCKETS,
+)
+TOOL_CALL_DURATION = prometheus_client.Histogram(
+    "sales_agent_tool_call_duration_seconds",
+    "Tool call-to-return latency",
+    _LABELS + ["tool"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+TOKENS = prometheus_client.Counter(
+    "sales_agent_tokens",
+    "Model tokens by kind (input, output, cached)",
+    _LABELS + ["model", "kind"],
+)
+SESSIONS_CUT = prometheus_client.Counter(
+    "sales_agent_sessions_cut",
+    "Sessions ended by the session governor, by cap",
+    _LABELS + ["reason"],
+)
+SESSIONS_RECLAIMED = prometheus_client.Counter(
+    "sales_agent_sessions_reclaimed",
+    "Idle and zombie sessions ended by the activity monitor",
+    _LABELS + ["reason"],
+)
+RECLAIMED_SECONDS = prometheus_client.Counter(
+    "sales_agent_reclaimed_seconds",
+    "Session seconds freed by the activity monitor (time left before the minutes cap)",
+    _LABELS + ["reason"],
+)
+ACTIVE_SESSIONS = prometheus_client.Gauge(
+    "sales_agent_active_sessions",
+    "Agent sessions currently running",
+    _LABELS,
+    multiprocess_mode="livesum",
+)
+
+_base_labels = {"worker": METRICS_WORKER_NAME, "prompt_version": PROMPT_VARIANT}
+
+
+@functools.lru_cache(maxsize=256)
+def _child(metric, **labels):
+    # labels() takes a lock and rebuilds the label key on every call; cache the children
+    return metric.labels(**_base_labels, **labels)
+
+
+def _model_name(ev, default: str) -> str:
+    metadata = getattr(ev, "metadata", None)
+    return (metadata and metadata.model_name) or ev.label or default
+
+
+def observe_tool_latency(tool_name: str, seconds: float, conversation_id: str | None) -> None:
+    _child(TOOL_CALL_DURATION, tool=tool_name).observe(seconds)
+
+
+def record_agent_metrics(ev: lk_metrics.AgentMetrics) -> None:
+    """Record one MetricsCollectedEvent payload."""
+    if isinstance(ev, lk_metrics.RealtimeModelMetrics):
+        model = _model_name(ev, "realtime")
+        # For realtime models ttft is the first audio token (-1 if no audio was sent)
+        if ev.ttft >= 0:
+            _child(TIME_TO_FIRST_TOKEN, model=model).observe(ev.ttft)
+            _child(TIME_TO_FIRST_AUDIO, model=model).observe(ev.ttft)
+        _record_tokens(model, ev.input_tokens, ev.output_tokens, ev.input_token_details.cached_tokens)
+    elif isinstance(ev, lk_metrics.LLMMetrics):
+        model = _model_name(ev, "llm")
+        if ev.ttft >= 0:
+            _child(TIME_TO_FIRST_TOKEN, model=model).observe(ev.ttft)
+        _record_tokens(model, ev.prompt_tokens, ev.completion_tokens, ev.prompt_cached_tokens)
+    elif isinstance(ev, lk_metrics.TTSMetrics):
+        if ev.ttfb >= 0:
+            _child(TIME_TO_FIRST_AUDIO, model=_model_name(ev, "tts")).observe(ev.ttfb)
+    elif isinstance(ev, lk_metrics.EOUMetrics):
+        _child(END_OF_UTTERANCE_DELAY).observe(ev.end_of_utterance_delay)
+
+
+def _record_tokens(model: str, input_tokens: int, output_tokens: int, cached_tokens: int) -> None:
+    if input_tokens:
+        _child(TOKENS, model=model, kind="input").inc(input_tokens)
+    if output_tokens:
+        _child(TOKENS, model=model, kind="output").inc(output_tokens)
+    if cached_tokens:
+        _child(TOKENS, model=model, kind="cached").inc(cached_tokens)
+
+
+def session_started() -> None:
+    _child(ACTIVE_SESSIONS).inc()
+
+
+def session_ended() -> None:
+    _child(ACTIVE_SESSIONS).dec()
+
+
+def session_cut(reason: str) -> None:
+    _child(SESSIONS_CUT, reason=reason).inc()
+
+
+def session_reclaimed(reason: str, seconds: float) -> None:
+    _child(SESSIONS_RECLAIMED, reason=reason).inc()
+    _child(RECLAIMED_SECONDS, reason=reason).inc(seconds)
+
+
+add_tool_timing_hook(observe_tool_latency)
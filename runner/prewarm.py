@@ -0,0 +1,83 @@
+"""
+Per-process prewarm for agent jobs.
+
+Everything that does not depend on a particular call is built once per job
+process by `prewarm` (passed to WorkerOptions as prewarm_fnc) and cached in
+`JobProcess.userdata`, so the entrypoint only creates per-session objects.
+"""
+import time
+from typing import Callable
+
+from livekit.agents import JobProcess, llm
+from livekit.agents.llm import utils as llm_utils
+from livekit.agents.llm.tool_context import get_function_info
+from livekit.plugins import openai as openai_plugin
+
+from agent.greeting import get_greeting_cache, greeting_key
+from agent.prompt import PROMPT_VARIANTS
+from agent.slots import SLOT_TRACKER_MODES
+from agent.catalog import get_catalog
+from agent.tools import lookup_programs, submit_lead
+from config.settings import GREETING_CACHE, PROMPT_VARIANT, REALTIME_VOICE, SLOT_TRACKER
+from leads import get_lead_sink
+from .startup import record_prewarm
+from .tracing import setup_tracing
+
+
+def create_realtime_model() -> openai_plugin.realtime.RealtimeModel:
+    return openai_plugin.realtime.RealtimeModel(
+        voice=REALTIME_VOICE
+    )
+
+
+def prewarm(proc: JobProcess, llm_factory: Callable[[], llm.RealtimeModel] = create_realtime_model) -> None:
+    """
+    Build and cache the session-independent agent objects for this process.
+
+    Args:
+        proc: Job process whose userdata holds the cache
+        llm_factory: Builds the realtime model (benchmarks pass a local fake)
+    """
+    started = time.perf_counter()
+    # Tracer provider and exporter are per process; spans are exported on a background thread
+    setup_tracing()
+
+    tools = [submit_lead, lookup_programs]
+    proc.userdata["tools"] = tools
+    # Building the schemas once loads pydantic/docstring parsing before the first call
+    # and keeps the exact schema the realtime session will send, for inspection
+    proc.userdata["tool_schemas"] = {
+        get_function_info(tool).name: llm_utils.build_legacy_openai_schema(tool, internally_tagged=True)
+        for tool in tools
+    }
+    if PROMPT_VARIANT not in PROMPT_VARIANTS:
+        raise ValueError(f"Unknown PROMPT_VARIANT: {PROMPT_VARIANT!r} (expected one of {sorted(PROMPT_VARIANTS)})")
+    if SLOT_TRACKER not in SLOT_TRACKER_MODES:
+        raise ValueError(f"Unknown SLOT_TRACKER: {SLOT_TRACKER!r} (expected one of {list(SLOT_TRACKER_MODES)})")
+    proc.userdata["prompts"] = dict(PROMPT_VARIANTS)
+    proc.userdata["llm"] = llm_factory()
+    if GREETING_CACHE:
+        key = greeting_key(REALTIME_VOICE, PROMPT_VARIANT, PROMPT_VARIANTS[PROMPT_VARIANT],
+                           getattr(proc.userdata["llm"], "model", ""))
+        proc.userdata["greeting_key"] = key
+        # Decode the greeting rendering now, if one exists, so the first session plays it at once
+        get_greeting_cache().get(key)
+    # Construct the lead sink so the first submit_lead only has to open the outbox
+    get_lead_sink()
+    # Build the catalog index so lookup_programs never parses the file during a call
+    get_catalog()
+
+    proc.userdata["prewarmed"] = True
+    record_prewarm(time.perf_counter() - started)
+
+
+def get_prewarmed(proc: JobProcess) -> dict:
+    """
+    Return the prewarm cache for `proc`, running prewarm inline if it was skipped.
+
+    Returns:
+        The process userdata populated by `prewarm`
+    """
+    if not proc.userdata.get("prewarmed"):
+        prewarm(proc)
+    return proc.userdata
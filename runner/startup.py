@@ -0,0 +1,90 @@
+"""
+Startup timing for agent worker processes.
+
+Records how long a job process spent importing the agent stack, running the
+prewarm hook and going from job accept to the agent's first audio, so cold
+and warm starts can be compared per worker process.
+"""
+import os
+import time
+
+_process_timings = {
+    "pid": os.getpid(),
+    "import_s": None,
+    "prewarm_s": None,
+    "jobs": 0,
+}
+
+
+def record_import(seconds: float) -> None:
+    """Record the time spent importing the agent stack in this process."""
+    _process_timings["import_s"] = seconds
+
+
+def record_prewarm(seconds: float) -> None:
+    """Record the time spent in the prewarm hook in this process."""
+    _process_timings["prewarm_s"] = seconds
+
+
+def process_timings() -> dict:
+    """Return a copy of this process's startup timings."""
+    return dict(_process_timings, pid=os.getpid())
+
+
+def job_accepted_at(job) -> float | None:
+    """
+    Unix time the server started the job (JobState.started_at), or None if it is not set.
+
+    Args:
+        job: The job's livekit.protocol.agent.Job (JobContext.job)
+    """
+    started_ms = getattr(getattr(job, "state", None), "started_at", 0)
+    return started_ms / 1000 if started_ms else None
+
+
+class JobStartupTimer:
+    """
+    Measures the milestones of one job from accept to first agent audio.
+
+    Args:
+        warm: True if the process was prewarmed before the job was accepted
+        accepted_at: Unix time the job was accepted (job_accepted_at()); None starts the clock now,
+            at the entrypoint, which leaves out dispatch to the job process
+    """
+
+    def __init__(self, warm: bool, accepted_at: float | None = None):
+        self.warm = warm
+        now = time.perf_counter()
+        self.accepted_at = now
+        self.marks: dict[str, float] = {}
+        if accepted_at is not None:
+            # Marks are perf_counter based; move the origin back by the wall-clock time since accept
+            self.accepted_at = now - max(time.time() - accepted_at, 0.0)
+            self.marks["entrypoint"] = now - self.accepted_at
+        self.reported = False
+        _process_timings["jobs"] += 1
+        self.job_index = _process_timings["jobs"]
+
+    def mark(self, name: str) -> None:
+        """Record the first time `name` was reached, relative to job accept."""
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.accepted_at
+
+    def report(self) -> dict:
+        return {
+            **process_timings(),
+            "start": "warm" if self.warm else "cold",
+            "job_index": self.job_index,
+            **{f"{name}_s": round(seconds, 4) for name, seconds in self.marks.items()},
+        }
+
+    def log_report(self) -> None:
+        """Print the startup report once per job."""
+        if self.reported:
+            return
+        self.reported = True
+        report = self.report()
+        for key in ("import_s", "prewarm_s"):
+            if report[key] is not None:
+                report[key] = round(report[key], 4)
+        print(f"Startup timing: {report}")
@@ -0,0 +1,168 @@
+"""
+OpenTelemetry tracing for the session lifecycle.
+
+`setup_tracing` installs a tracer provider once per job process. Spans are
+exported on a background thread by a BatchSpanProcessor, either over OTLP
+(production) or to a local JSON-lines file (offline analysis). Sampling is
+decided once per session root span (ParentBased + TraceIdRatioBased), so a
+session is traced completely or not at all and the overhead scales with
+TRACING_SAMPLE_RATE.
+
+Code that creates spans only depends on the OpenTelemetry API; with
+TRACING_EXPORTER=none the API's no-op tracer is used.
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Sequence
+
+from livekit.agents import metrics as lk_metrics
+from opentelemetry import trace
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from config.settings import (
+    TRACING_EXPORTER,
+    TRACING_SAMPLE_RATE,
+    TRACING_FILE_DIR,
+    TRACING_LIVEKIT_SPANS,
+)
+
+tracer = trace.get_tracer("sales_voice_agent")
+
+_provider: TracerProvider | None = None
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Appends finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        data = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        with self._lock:
+            if self._file.closed:
+                return SpanExportResult.FAILURE
+            self._file.write(data)
+            self._file.flush()
+        return SpanExportResult.SUCCESS
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+        return True
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def create_span_exporter(kind: str = TRACING_EXPORTER) -> SpanExporter | None:
+    """
+    Build the span exporter selected by TRACING_EXPORTER.
+
+    Raises:
+        ValueError: If `kind` is not "none", "otlp" or "file"
+    """
+    if kind == "none":
+        return None
+    if kind == "otlp":
+        # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    if kind == "file":
+        # One file per process so concurrent job processes never interleave lines
+        return JsonLinesSpanExporter(Path(TRACING_FILE_DIR) / f"spans-{os.getpid()}.jsonl")
+    raise ValueError(f"Unknown TRACING_EXPORTER: {kind!r} (expected 'none', 'otlp' or 'file')")
+
+
+def setup_tracing(
+    kind: str = TRACING_EXPORTER,
+    sample_rate: float = TRACING_SAMPLE_RATE,
+) -> TracerProvider | None:
+    """
+    Install the process-wide tracer provider (idempotent).
+
+    Returns:
+        The provider, or None when tracing is disabled
+    """
+    global _provider
+    if _provider is not None:
+        return _provider
+    exporter = create_span_exporter(kind)
+    if exporter is None:
+        return None
+
+    provider = TracerProvider(
+        resource=Resource.create({SERVICE_NAME: "sales-voice-agent"}),
+        sampler=ParentBased(TraceIdRatioBased(sample_rate)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter, max_queue_size=4096))
+    trace.set_tracer_provider(provider)
+    if TRACING_LIVEKIT_SPANS:
+        # Also route livekit-agents' internal spans (LLM requests, tool execution) to our exporter
+        from livekit.agents.telemetry import set_tracer_provider
+        set_tracer_provider(provider)
+    _provider = provider
+    return provider
+
+
+async def flush_tracing() -> None:
+    """Export spans that are still buffered (called at job shutdown)."""
+    if _provider is not None:
+        import asyncio
+        await asyncio.to_thread(_provider.force_flush)
+
+
+def _time_ns(timestamp: float) -> int:
+    return int(timestamp * 1e9)
+
+
+def record_model_turn(
+    session_span: trace.Span,
+    ev: lk_metrics.AgentMetrics,
+    conversation_id: str,
+) -> None:
+    """
+    Record one model turn as a child of the session span.
+
+    Realtime and LLM metrics are emitted once a generation finishes, so the
+    span is created after the fact from the metrics' start timestamp and duration.
+    """
+    if not session_span.is_recording():
+        return
+    if isinstance(ev, lk_metrics.RealtimeModelMetrics):
+        attributes = {
+            "input_tokens": ev.input_tokens,
+            "output_tokens": ev.output_tokens,
+            "cached_tokens": ev.input_token_details.cached_tokens,
+        }
+    elif isinstance(ev, lk_metrics.LLMMetrics):
+        attributes = {
+            "input_tokens": ev.prompt_tokens,
+            "output_tokens": ev.completion_tokens,
+            "cached_tokens": ev.prompt_cached_tokens,
+        }
+    else:
+        return
+    attributes.update(
+        conversation_id=conversation_id,
+        model=(ev.metadata and ev.metadata.model_name) or ev.label,
+        request_id=ev.request_id,
+        ttft=ev.ttft,
+        cancelled=ev.cancelled,
+    )
+    span = tracer.start_span(
+        "model_turn",
+        context=trace.set_span_in_context(session_span),
+        start_time=_time_ns(ev.timestamp),
+        attributes=attributes,
+    )
+    span.end(end_time=_time_ns(ev.timestamp + ev.duration))
@@ -0,0 +1,18 @@
+from .writer import (
+    TranscriptWriter,
+    transcript_path,
+    read_transcript,
+    get_transcript_writer,
+    close_transcript_writer,
+)
+from .index import TranscriptIndex, get_transcript_index
+
+__all__ = [
+    "TranscriptWriter",
+    "transcript_path",
+    "read_transcript",
+    "get_transcript_writer",
+    "close_transcript_writer",
+    "TranscriptIndex",
+    "get_transcript_index",
+]
@@ -0,0 +1,509 @@
+"""
+Full-text index over conversation transcripts.
+
+When a session closes, its conversation_id is appended to `<dir>/pending.log`:
+one short write under a shared flock, as usage/store.py appends. `update()`
+seals the pending log, reads those conversations' transcript files
+(transcripts/writer.py) and writes them as one segment. It also merges small
+segments up to `segment_conversations`. Run it in its own process in the
+background (`python -m transcripts.search update --watch 30`), so no job
+process spends its CPU on tokenizing. Conversations that are not indexed yet
+are searched straight from their transcript files, so a call can be found as
+soon as its session closes.
+
+A segment is a directory of .npy arrays that queries memory-map:
+
+    conversations.npy  conversation_id, started_at (its first item) and turns, per conversation
+    terms.npy          the segment's terms, sorted (S24: longer terms are cut to 24 bytes)
+    offsets.npy        where each term's postings start (one more entry than terms)
+    doc.npy, turn.npy, pos.npy, role.npy
+                       the postings, one column each: conversation, turn, position and role of
+                       every occurrence, grouped by term, then in conversation, turn and
+                       position order
+    bitmaps.npy        for terms in at least 1/64 of the conversations, one bit per
+                       conversation: said by anyone, then by each of ROLES
+    bitmap_rows.npy    each term's first row in bitmaps.npy, or -1
+    meta.json          counts, started_at range and the segments a merge replaced
+
+A query looks up each term with a binary search of terms.npy and reads only that
+term's postings, and only the columns it needs. Common terms ("budget", "fee")
+have postings in most conversations; asking whether a call mentions one at all
+is an AND of their bitmaps instead. Amounts are indexed as numbers, so "₹5,000",
+"5000 rupees", "5k" and "5 thousand" are the same term, and a range of amounts is
+one contiguous run of terms. A number is an amount when it has a currency sign or
+word, a unit, or three or more digits with a money word ("budget", "fee") close
+by; "class 11" or "2 kids" are indexed as words.
+
+    data/transcript_index/pending.log
+    data/transcript_index/sealed-<ns>-<pid>.log
+    data/transcript_index/seg-<ns>-<pid>/{meta.json, conversations.npy, terms.npy, offsets.npy, ...}
+"""
+import fcntl
+import json
+import math
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from config.settings import TRANSCRIPTS_DIR, TRANSCRIPT_INDEX_DIR, TRANSCRIPT_INDEX_SEGMENT_CONVERSATIONS
+from .writer import read_transcript, transcript_path
+
+TERM_BYTES = 24
+# Longest conversation ID the index holds (a UUID); add() refuses longer ones rather than storing them cut short
+ID_BYTES = 36
+CONVERSATION = np.dtype([
+    ("conversation_id", f"S{ID_BYTES}"),
+    ("started_at", "<f8"),
+    ("turns", "<u2"),
+])
+POSTING_COLUMNS = {"doc": np.dtype("<u4"), "turn": np.dtype("<u2"), "pos": np.dtype("<u2"), "role": np.dtype("u1")}
+# Role codes in postings; other roles are stored as len(ROLES)
+ROLES = ("user", "assistant")
+ARRAYS = ("conversations", "terms", "offsets", *POSTING_COLUMNS, "bitmaps", "bitmap_rows")
+
+_PENDING = "pending.log"
+# Segments of a size merged at a time
+_MERGE_FANIN = 8
+# Terms in at least 1/_BITMAP_SHARE of a segment's conversations get bitmaps
+_BITMAP_SHARE = 64
+# Numbers sort as terms in numeric order: "#" and 15 digits
+_NUMBER_DIGITS = 15
+_TOKEN = re.compile(
+    r"(?P<number>\d[\d,]*(?:\.\d+)?)(?:\s*(?P<unit>k|thousand|lakhs?|lacs?|crores?|cr)\b)?"
+    r"|(?P<word>[^\W\d_]+)",
+    re.IGNORECASE,
+)
+_UNITS = {"k": 1e3, "thousand": 1e3, "lakh": 1e5, "lac": 1e5, "crore": 1e7, "cr": 1e7}
+_CURRENCY_BEFORE = re.compile(r"(?:₹|\b(?:rs|inr|rupees?)\.?)\s*$", re.IGNORECASE)
+_CURRENCY_AFTER = re.compile(r"\s*(?:₹|rs\b|rupees?\b|/-)", re.IGNORECASE)
+# Bare numbers of at least _MONEY_DIGITS digits are amounts within _MONEY_WINDOW terms of one of these
+_MONEY_WORDS = frozenset([
+    b"budget", b"fee", b"fees", b"afford", b"spend", b"pay", b"cost", b"costs", b"charge", b"charges",
+    b"price", b"month", b"monthly",
+])
+_MONEY_DIGITS = 3
+_MONEY_WINDOW = 3
+_AMOUNT = re.compile(
+    r"(?:₹|rs\.?|inr)?\s*(?P<number>\d[\d,]*(?:\.\d+)?)\s*(?P<unit>k|thousand|lakhs?|lacs?|crores?|cr)?",
+    re.IGNORECASE,
+)
+
+
+def number_term(value: float) -> bytes:
+    """The term an amount is indexed as."""
+    return b"#%0*d" % (_NUMBER_DIGITS, min(max(int(round(value)), 0), 10 ** _NUMBER_DIGITS - 1))
+
+
+def _value(number: str, unit: str | None) -> float:
+    return float(number.replace(",", "")) * _UNITS.get((unit or "").lower().rstrip("s"), 1)
+
+
+def parse_amount(text: str) -> float | None:
+    """The amount `text` is on its own ("5000", "₹4,500", "4.5k"), as in a query; None if it is not one."""
+    match = _AMOUNT.fullmatch(text.strip())
+    return _value(match.group("number"), match.group("unit")) if match else None
+
+
+def tokenize(text: str) -> list[bytes]:
+    """
+    Terms of `text` in order: lowercase words, and amounts as number_term().
+
+    Numbers without a money cue (see the module docstring) are words of their digits.
+    """
+    terms = []
+    # (term index, value) of bare numbers long enough to be amounts next to a money word
+    bare = []
+    for match in _TOKEN.finditer(text):
+        word = match.group("word")
+        if word:
+            terms.append(word.lower().encode()[:TERM_BYTES])
+            continue
+        number, unit = match.group("number"), match.group("unit")
+        if (unit or _CURRENCY_BEFORE.search(text, max(0, match.start() - 10), match.start())
+                or _CURRENCY_AFTER.match(text, match.end())):
+            terms.append(number_term(_value(number, unit)))
+            continue
+        digits = number.replace(",", "")
+        if len(digits.split(".")[0]) >= _MONEY_DIGITS:
+            bare.append((len(terms), _value(number, None)))
+        terms.append(digits.encode()[:TERM_BYTES])
+    for n, value in bare:
+        if not _MONEY_WORDS.isdisjoint(terms[max(0, n - _MONEY_WINDOW):n + _MONEY_WINDOW + 1]):
+            terms[n] = number_term(value)
+    return terms
+
+
+def role_code(role: str) -> int:
+    return ROLES.index(role) if role in ROLES else len(ROLES)
+
+
+def conversation_bitmap(docs: np.ndarray, conversations: int) -> np.ndarray:
+    """Packed bits, one per conversation of a segment, set for `docs`."""
+    bits = np.zeros(conversations, dtype=bool)
+    bits[docs] = True
+    return np.packbits(bits)
+
+
+def build_segment(conversations: Iterable[tuple[str, list[dict]]]) -> dict[str, np.ndarray]:
+    """
+    Index arrays (see the module docstring) for transcripts.
+
+    Args:
+        conversations: (conversation_id, transcript items) pairs, as read_transcript() returns them
+
+    Raises:
+        ValueError: On a conversation ID longer than ID_BYTES
+    """
+    docs, terms, doc_col, turn_col, pos_col, role_col = [], [], [], [], [], []
+    for doc, (conversation_id, items) in enumerate(conversations):
+        encoded = conversation_id.encode()
+        if len(encoded) > ID_BYTES:
+            raise ValueError(f"conversation ID longer than {ID_BYTES} bytes: {conversation_id!r}")
+        docs.append((encoded, min((item["t"] for item in items), default=0.0),
+                     min(len(items), 0xFFFF)))
+        for item in items:
+            tokens = tokenize(item.get("x") or "")[:0xFFFF]
+            n = len(tokens)
+            terms.extend(tokens)
+            doc_col.extend([doc] * n)
+            turn_col.extend([min(int(item.get("i", 0)), 0xFFFF)] * n)
+            pos_col.extend(range(n))
+            role_col.extend([role_code(item.get("r", ""))] * n)
+    vocab, term_ids = np.unique(np.array(terms, dtype=f"S{TERM_BYTES}"), return_inverse=True)
+    # Stable, so each term's postings stay in conversation, turn and position order
+    order = np.argsort(term_ids, kind="stable")
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=offsets[1:])
+    arrays = {
+        "conversations": np.array(docs, dtype=CONVERSATION),
+        "terms": vocab.astype(f"S{TERM_BYTES}"),
+        "offsets": offsets,
+    }
+    for name, column in (("doc", doc_col), ("turn", turn_col), ("pos", pos_col), ("role", role_col)):
+        arrays[name] = np.asarray(column, dtype=POSTING_COLUMNS[name])[order]
+    return _add_bitmaps(arrays)
+
+
+class TranscriptIndex:
+    """
+    Inverted index over the transcripts in one directory.
+
+    Args:
+        directory: Index directory (created on first add)
+        transcripts_dir: Where the transcript files are
+        segment_conversations: Size, in conversations, small segments are merged up to
+    """
+
+    def __init__(
+        self,
+        directory: str | Path = TRANSCRIPT_INDEX_DIR,
+        transcripts_dir: str | Path = TRANSCRIPTS_DIR,
+        segment_conversations: int = TRANSCRIPT_INDEX_SEGMENT_CONVERSATIONS,
+    ):
+        self.directory = Path(directory)
+        self.transcripts_dir = Path(transcripts_dir)
+        self.segment_conversations = segment_conversations
+        self._pending = self.directory / _PENDING
+        # Segments are never changed once written, so their maps are kept open across queries
+        self._open: dict[str, dict[str, np.ndarray]] = {}
+
+    def add(self, conversation_id: str) -> None:
+        """
+        Queue a closed session's conversation for indexing.
+
+        Blocking, but one small write under a shared lock: cheap enough for a session close handler.
+
+        Raises:
+            ValueError: If the conversation ID is longer than ID_BYTES, which the index cannot hold
+        """
+        data = f"{conversation_id}\n".encode()
+        if len(data) - 1 > ID_BYTES:
+            raise ValueError(f"conversation ID longer than {ID_BYTES} bytes: {conversation_id!r}")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        while True:
+            fd = os.open(self._pending, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH)
+                # The log may have been sealed between open() and flock(); append to the new one
+                try:
+                    current = os.stat(self._pending).st_ino
+                except FileNotFoundError:
+                    current = None
+                if os.fstat(fd).st_ino != current:
+                    continue
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+            break
+
+    def seal(self) -> Path | None:
+        """Rename the pending log so update() picks it up; returns the sealed log, if any."""
+        sealed = self.directory / f"sealed-{time.time_ns()}-{os.getpid()}.log"
+        try:
+            os.rename(self._pending, sealed)
+        except FileNotFoundError:
+            return None
+        return sealed
+
+    def update(self, optimize: bool = False) -> dict:
+        """
+        Index the queued conversations as a new segment and merge small segments.
+
+        Only one update runs at a time; a concurrent call returns at once.
+
+        Args:
+            optimize: Merge every small segment (up to segment_conversations each), not only
+                _MERGE_FANIN segments of a size
+
+        Returns:
+            {"logs", "conversations", "missing" (no transcript file), "merged", "segments", "seconds"}
+        """
+        started = time.perf_counter()
+        stats = {"logs": 0, "conversations": 0, "missing": 0, "merged": 0, "segments": 0, "seconds": 0.0}
+        if not self.directory.exists():
+            return stats
+        lock = os.open(self.directory / "update.lock", os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return stats
+            self._drop_merged()
+            self.seal()
+            for log in sorted(self.directory.glob("sealed-*.log")):
+                segment = self.directory / f"seg-{log.stem[len('sealed-'):]}"
+                if not segment.exists():
+                    with open(log, "rb") as f:
+                        # Wait for writers that opened this log before it was sealed
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                        conversation_ids = _read_ids(f.read())
+                    conversations = list(self._read(conversation_ids))
+                    stats["missing"] += len(conversation_ids) - len(conversations)
+                    if conversations:
+                        _write_segment(segment, build_segment(conversations))
+                        stats["conversations"] += len(conversations)
+                log.unlink()
+                stats["logs"] += 1
+            stats["merged"] = self._merge_small(optimize)
+            stats["segments"] = len(self._segments())
+        finally:
+            os.close(lock)
+        stats["seconds"] = time.perf_counter() - started
+        return stats
+
+    def _read(self, conversation_ids: Iterable[str]) -> Iterator[tuple[str, list[dict]]]:
+        for conversation_id in conversation_ids:
+            if len(conversation_id.encode()) > ID_BYTES:
+                # Queued before add() refused such IDs; update() counts it as missing
+                continue
+            try:
+                yield conversation_id, read_transcript(transcript_path(self.transcripts_dir, conversation_id))
+            except FileNotFoundError:
+                continue
+
+    def _segments(self) -> list[Path]:
+        return sorted(p for p in self.directory.glob("seg-*") if (p / "meta.json").exists())
+
+    def _drop_merged(self) -> None:
+        # A merge that crashed before removing its inputs leaves them next to the merged segment
+        for segment in self._segments():
+            for name in _read_meta(segment).get("merged_from", []):
+                shutil.rmtree(self.directory / name, ignore_errors=True)
+
+    def _merge_small(self, optimize: bool = False) -> int:
+        # Size-tiered: segments of about the same size are merged _MERGE_FANIN at a time, so a
+        # conversation is rewritten a few times on its way into a full segment, not once per update
+        tiers: dict[int, list[Path]] = {}
+        for segment in self._segments():
+            size = _read_meta(segment)["conversations"]
+            if size < self.segment_conversations:
+                tier = 0 if optimize else int(math.log(max(size, 1), _MERGE_FANIN))
+                tiers.setdefault(tier, []).append(segment)
+        merged = 0
+        for _, small in sorted(tiers.items()):
+            group: list[Path] = []
+            size = 0
+            for segment in small:
+                group.append(segment)
+                size += _read_meta(segment)["conversations"]
+                if size >= self.segment_conversations or (not optimize and len(group) == _MERGE_FANIN):
+                    merged += self._merge_group(group)
+                    group, size = [], 0
+            if optimize:
+                merged += self._merge_group(group)
+        return merged
+
+    def _merge_group(self, group: list[Path]) -> int:
+        if len(group) < 2:
+            return 0
+        target = self.directory / f"seg-{time.time_ns()}-{os.getpid()}"
+        _write_segment(target, _merge([_load_segment(s) for s in group]), merged_from=[s.name for s in group])
+        for s in group:
+            shutil.rmtree(s)
+        return len(group)
+
+    def segments(self, since: float | None = None, until: float | None = None) -> Iterator[dict[str, np.ndarray]]:
+        """
+        Yield the memory-mapped arrays of each segment with conversations started in [since, until),
+        then the conversations not indexed yet, indexed in memory.
+
+        A conversation indexed more than once (queued twice, or still pending while an update
+        writes it) can come up in more than one; callers keep one.
+        """
+        metas = {}
+        for segment in self._segments():
+            try:
+                metas[segment] = _read_meta(segment)
+            except FileNotFoundError:
+                continue
+        # Inputs of a merge are removed right after the merged segment appears; never read both
+        merged = {name for meta in metas.values() for name in meta["merged_from"]}
+        for name in set(self._open) - {segment.name for segment in metas}:
+            del self._open[name]
+        for segment, meta in metas.items():
+            if segment.name in merged or not meta["conversations"]:
+                continue
+            low, high = meta["started_at"]
+            if (since and high < since) or (until and low >= until):
+                continue
+            if segment.name not in self._open:
+                try:
+                    self._open[segment.name] = _load_segment(segment)
+                except FileNotFoundError:
+                    continue
+            yield self._open[segment.name]
+        pending = self.pending()
+        if pending:
+            yield build_segment(self._read(pending))
+
+    def pending(self) -> list[str]:
+        """Conversations queued for indexing."""
+        conversation_ids = []
+        for log in sorted(self.directory.glob("sealed-*.log")) + [self._pending]:
+            try:
+                conversation_ids.extend(_read_ids(log.read_bytes()))
+            except FileNotFoundError:
+                continue
+        return list(dict.fromkeys(conversation_ids))
+
+    def stats(self) -> dict:
+        """Segments, conversations, postings and bytes on disk, and conversations pending."""
+        segments = self._segments()
+        metas = [_read_meta(s) for s in segments]
+        return {
+            "segments": len(segments),
+            "conversations": sum(m["conversations"] for m in metas),
+            "postings": sum(m["postings"] for m in metas),
+            "terms": sum(m["terms"] for m in metas),
+            "bytes": sum(f.stat().st_size for s in segments for f in s.iterdir()),
+            "pending": len(self.pending()),
+        }
+
+
+def _read_ids(data: bytes) -> list[str]:
+    return list(dict.fromkeys(line for line in data.decode(errors="replace").split("\n") if line))
+
+
+def _merge(parts: list[dict[str, np.ndarray]]) -> dict[str, np.ndarray]:
+    # A conversation indexed again (queued twice) keeps its last version
+    ids = np.concatenate([part["conversations"]["conversation_id"] for part in parts])
+    _, last = np.unique(ids[::-1], return_index=True)
+    keep = np.zeros(len(ids), dtype=bool)
+    keep[len(ids) - 1 - last] = True
+    new_doc = (np.cumsum(keep) - 1).astype(np.uint32)
+    vocab = np.unique(np.concatenate([part["terms"] for part in parts]))
+    term_ids = []
+    columns: dict[str, list[np.ndarray]] = {name: [] for name in POSTING_COLUMNS}
+    base = 0
+    for part in parts:
+        ids_in_part = np.repeat(np.searchsorted(vocab, part["terms"]).astype(np.uint32), np.diff(part["offsets"]))
+        docs = part["doc"].astype(np.int64) + base
+        kept = keep[docs]
+        term_ids.append(ids_in_part[kept])
+        columns["doc"].append(new_doc[docs[kept]])
+        for name in ("turn", "pos", "role"):
+            columns[name].append(np.asarray(part[name])[kept])
+        base += len(part["conversations"])
+    term_ids = np.concatenate(term_ids)
+    # Later parts have higher conversation numbers, so a stable sort keeps each term's postings in order
+    order = np.argsort(term_ids, kind="stable")
+    counts = np.bincount(term_ids, minlength=len(vocab))
+    offsets = np.zeros(int(np.count_nonzero(counts)) + 1, dtype=np.int64)
+    np.cumsum(counts[counts > 0], out=offsets[1:])
+    arrays = {
+        "conversations": np.concatenate([part["conversations"] for part in parts])[keep],
+        "terms": vocab[counts > 0],
+        "offsets": offsets,
+    }
+    for name, parts_column in columns.items():
+        arrays[name] = np.concatenate(parts_column)[order]
+    return _add_bitmaps(arrays)
+
+
+def _add_bitmaps(arrays: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    # Bitmaps (see the module docstring) of the terms found in many conversations
+    conversations = len(arrays["conversations"])
+    offsets, doc, role = arrays["offsets"], arrays["doc"], arrays["role"]
+    count = len(offsets) - 1
+    term_ids = np.repeat(np.arange(count, dtype=np.uint32), np.diff(offsets))
+    first = np.ones(len(doc), dtype=bool)
+    first[1:] = (doc[1:] != doc[:-1]) | (term_ids[1:] != term_ids[:-1])
+    spread = np.bincount(term_ids[first], minlength=count)
+    dense = np.flatnonzero(spread * _BITMAP_SHARE >= max(conversations, 1))
+    width = len(ROLES) + 1
+    rows = np.full(count, -1, dtype=np.int32)
+    rows[dense] = np.arange(len(dense), dtype=np.int32) * width
+    bitmaps = np.zeros((len(dense) * width, (conversations + 7) // 8), dtype=np.uint8)
+    for term in dense.tolist():
+        start, end = offsets[term], offsets[term + 1]
+        docs, roles = doc[start:end], role[start:end]
+        bitmaps[rows[term]] = conversation_bitmap(docs, conversations)
+        for code in range(len(ROLES)):
+            bitmaps[rows[term] + 1 + code] = conversation_bitmap(docs[roles == code], conversations)
+    arrays["bitmaps"] = bitmaps
+    arrays["bitmap_rows"] = rows
+    return arrays
+
+
+def _read_meta(segment: Path) -> dict:
+    return json.loads((segment / "meta.json").read_text())
+
+
+def _load_segment(segment: Path) -> dict[str, np.ndarray]:
+    # Plain ndarray views of the maps: np.memmap's Python-level indexing costs more than small reads
+    return {name: np.load(segment / f"{name}.npy", mmap_mode="r").view(np.ndarray) for name in ARRAYS}
+
+
+def _write_segment(segment: Path, arrays: dict[str, np.ndarray], merged_from: list[str] | None = None) -> None:
+    # Written under a temporary name and renamed, so readers never see a partial segment
+    tmp = segment.with_name(f".tmp-{segment.name}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for name in ARRAYS:
+        np.save(tmp / f"{name}.npy", np.ascontiguousarray(arrays[name]))
+    started_at = arrays["conversations"]["started_at"]
+    meta = {
+        "conversations": len(started_at),
+        "postings": len(arrays["doc"]),
+        "terms": len(arrays["terms"]),
+        "started_at": [float(started_at.min()), float(started_at.max())] if len(started_at) else [0.0, 0.0],
+        "merged_from": merged_from or [],
+    }
+    (tmp / "meta.json").write_text(json.dumps(meta))
+    os.rename(tmp, segment)
+
+
+_transcript_index: TranscriptIndex | None = None
+
+
+def get_transcript_index() -> TranscriptIndex:
+    """Return the process-wide transcript index."""
+    global _transcript_index
+    if _transcript_index is None:
+        _transcript_index = TranscriptIndex()
+    return _transcript_index
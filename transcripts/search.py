@@ -0,0 +1,428 @@
+"""
+Full-text search over transcripts (see transcripts/index.py).
+
+A query is a list of conditions a conversation must all meet:
+    jee                 a word
+    "fee structure"     a phrase, words in a row within one turn
+    <5000  >=1k  2000..8000
+                        an amount in a range ("₹4,500", "4.5k" and "4500 rupees" are all 4500;
+                        a bare "11" in a transcript is a word, see transcripts/index.py)
+    parent:jee  agent:"demo class"  parent:<5000
+                        said by the parent (user) or the agent (assistant)
+With --same-turn, all conditions must be met within one turn rather than anywhere in the call.
+
+Each term is a binary search of a segment's sorted terms and a slice of its
+memory-mapped postings, so a query reads only the postings of its own terms.
+Whether a call mentions a common term at all comes from the term's bitmap
+instead, and conditions are combined as an AND of conversation bitmaps;
+--same-turn and phrases intersect sorted (conversation, turn) keys.
+Turns are looked up only for the conversations listed.
+
+Usage:
+    python -m transcripts.search query 'parent:jee parent:budget parent:<5000' [--last 30d] [--show]
+    python -m transcripts.search query '"fee structure"' --role agent --since 2026-10-01 --until 2026-10-15
+    python -m transcripts.search update [--watch 30] [--optimize]
+    python -m transcripts.search stats
+"""
+import argparse
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from config.settings import TRANSCRIPTS_DIR, TRANSCRIPT_INDEX_DIR
+from usage.query import parse_duration
+from .index import TranscriptIndex, conversation_bitmap, number_term, parse_amount, tokenize
+from .writer import read_transcript, transcript_path
+
+# Role names accepted in queries, and their codes in the postings (index.ROLES)
+ROLE_CODES = {"parent": 0, "user": 0, "agent": 1, "assistant": 1}
+
+_CONDITION = re.compile(
+    r'(?:(?P<role>[a-z]+):)?'
+    r'(?:"(?P<phrase>[^"]*)"?|(?P<op><=|>=|<|>)(?P<amount>\S+)|(?P<low>[^\s.]+)\.\.(?P<high>\S+)|(?P<word>\S+))',
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class Condition:
+    """Terms in a row, or (with no terms) an amount in [low, high]; role None matches anyone."""
+
+    terms: tuple[bytes, ...] = ()
+    low: int = 0
+    high: int = 0
+    role: int | None = None
+
+
+def _amount(text: str) -> int:
+    value = parse_amount(text)
+    if value is None:
+        raise ValueError(f"not an amount: {text!r}")
+    return int(number_term(value)[1:])
+
+
+def parse_query(text: str, role: str | None = None) -> list[Condition]:
+    """
+    Conditions of a query (see the module docstring).
+
+    Args:
+        text: The query
+        role: Role for conditions without one (parent/user or agent/assistant)
+
+    Raises:
+        ValueError: On an unknown role or an amount that is not a number
+    """
+    conditions = []
+    for match in _CONDITION.finditer(text):
+        name = (match.group("role") or role or "").lower()
+        if name and name not in ROLE_CODES:
+            raise ValueError(f"unknown role {name!r} (expected one of {', '.join(ROLE_CODES)})")
+        code = ROLE_CODES.get(name)
+        if match.group("op"):
+            value = _amount(match.group("amount"))
+            op = match.group("op")
+            low = value + 1 if op == ">" else value if op == ">=" else 0
+            high = value - 1 if op == "<" else value if op == "<=" else 10 ** 15
+            conditions.append(Condition(low=low, high=high, role=code))
+        elif match.group("low"):
+            conditions.append(Condition(low=_amount(match.group("low")), high=_amount(match.group("high")), role=code))
+        else:
+            terms = tuple(tokenize(match.group("phrase") if match.group("phrase") is not None else match.group("word")))
+            if terms:
+                conditions.append(Condition(terms=terms, role=code))
+    return conditions
+
+
+def _term_range(segment: dict[str, np.ndarray], low: bytes, high: bytes) -> tuple[int, int]:
+    # Terms in [low, high]: one contiguous run, as terms are sorted
+    terms = segment["terms"]
+    return int(np.searchsorted(terms, low, "left")), int(np.searchsorted(terms, high, "right"))
+
+
+def _condition_range(segment: dict[str, np.ndarray], condition: Condition, term: bytes | None = None) -> tuple[int, int]:
+    if not condition.terms:
+        return _term_range(segment, number_term(condition.low), number_term(condition.high))
+    return _term_range(segment, term, term)
+
+
+def _columns(
+    segment: dict[str, np.ndarray],
+    start: int,
+    end: int,
+    names: tuple[str, ...],
+    docs: np.ndarray | None = None,
+) -> dict[str, np.ndarray]:
+    """Postings columns of terms [start, end): one slice, as postings are grouped by term; or only those of `docs`."""
+    offsets = segment["offsets"]
+    if docs is None:
+        low, high = int(offsets[start]), int(offsets[end])
+        return {name: segment[name][low:high] for name in names}
+    rows, bitmaps, doc = segment["bitmap_rows"], segment["bitmaps"], segment["doc"]
+    spans = []
+    for term in range(start, end):
+        if rows[term] >= 0 and not (bitmaps[rows[term], docs >> 3] & (0x80 >> (docs & 7))).any():
+            continue
+        # A term's postings are in conversation order
+        low, high = int(offsets[term]), int(offsets[term + 1])
+        run = doc[low:high]
+        spans.extend(zip((low + np.searchsorted(run, docs, "left")).tolist(),
+                         (low + np.searchsorted(run, docs, "right")).tolist()))
+    return {name: np.concatenate([segment[name][a:b] for a, b in spans if b > a] or [segment[name][:0]]) for name in names}
+
+
+def _size(segment: dict[str, np.ndarray], condition: Condition) -> int:
+    # Postings a condition reads at most, to evaluate the rarest first
+    offsets = segment["offsets"]
+    terms = condition.terms or (None,)
+    return min(int(offsets[end] - offsets[start]) for start, end in (_condition_range(segment, condition, t) for t in terms))
+
+
+def _unique_sorted(keys: np.ndarray) -> np.ndarray:
+    if len(keys) < 2:
+        return keys
+    return keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+
+
+def _intersect(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # Both sorted and unique; a binary search per element of the smaller one
+    if len(a) > len(b):
+        a, b = b, a
+    if not len(a):
+        return a
+    at = np.searchsorted(b, a)
+    at[at == len(b)] = 0
+    return a[b[at] == a]
+
+
+def _turns(
+    segment: dict[str, np.ndarray],
+    condition: Condition,
+    docs: np.ndarray | None = None,
+    within: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Sorted (conversation << 16 | turn) keys of the turns that meet the condition.
+
+    Args:
+        docs: Only these conversations (sorted), read with a binary search per term
+        within: Only conversations whose flag is set (one bool per conversation), filtered after reading
+    """
+    names = ("doc", "turn") if condition.role is None else ("doc", "turn", "role")
+    if len(condition.terms) <= 1:
+        postings = _columns(segment, *_condition_range(segment, condition, *condition.terms), names, docs)
+        mask = _mask(postings, condition, within)
+        keys = (postings["doc"].astype(np.int64) << 16) | postings["turn"]
+        if mask is not None:
+            keys = keys[mask]
+        # A range's postings (or a few conversations' of each term) come in runs, not in conversation order
+        return _unique_sorted(keys) if condition.terms and docs is None else np.unique(keys)
+    hits = None
+    for offset, term in enumerate(condition.terms):
+        postings = _columns(segment, *_term_range(segment, term, term), names + ("pos",), docs)
+        mask = postings["pos"] >= offset
+        extra = _mask(postings, condition, within)
+        if extra is not None:
+            mask &= extra
+        # Where the phrase would start if this term is in place; sorted, as postings are
+        keys = ((postings["doc"][mask].astype(np.int64) << 32) | (postings["turn"][mask].astype(np.int64) << 16)
+                | (postings["pos"][mask].astype(np.int64) - offset))
+        hits = keys if hits is None else _intersect(hits, keys)
+        if not len(hits):
+            break
+    return _unique_sorted(hits >> 16)
+
+
+def _mask(postings: dict[str, np.ndarray], condition: Condition, within: np.ndarray | None) -> np.ndarray | None:
+    # Postings said in the condition's role and in conversations `within`, or None for all
+    mask = None
+    if condition.role is not None:
+        mask = postings["role"] == condition.role
+    if within is not None:
+        mask = within[postings["doc"]] if mask is None else mask & within[postings["doc"]]
+    return mask
+
+
+def _conversations(segment: dict[str, np.ndarray], condition: Condition, within: np.ndarray | None = None) -> np.ndarray:
+    """
+    Packed bitmap (index.conversation_bitmap) of the conversations that meet the condition anywhere.
+
+    Args:
+        within: Flags of the conversations still in question; phrases are only matched in those
+    """
+    n = len(segment["conversations"])
+    if len(condition.terms) > 1:
+        return conversation_bitmap(_turns(segment, condition, within=within) >> 16, n)
+    start, end = _condition_range(segment, condition, *condition.terms)
+    rows = np.asarray(segment["bitmap_rows"][start:end])
+    dense = rows >= 0
+    bits = conversation_bitmap(np.zeros(0, dtype=np.int64), n)
+    if dense.any():
+        row = 0 if condition.role is None else 1 + condition.role
+        bits |= np.bitwise_or.reduce(segment["bitmaps"][rows[dense] + row], axis=0)
+    # Terms without bitmaps are rare; read their postings, a run of consecutive terms at a time
+    sparse = np.flatnonzero(~dense) + start
+    docs = []
+    for run in np.split(sparse, np.flatnonzero(np.diff(sparse) != 1) + 1) if len(sparse) else []:
+        names = ("doc",) if condition.role is None else ("doc", "role")
+        postings = _columns(segment, int(run[0]), int(run[-1]) + 1, names)
+        docs.append(postings["doc"] if condition.role is None else postings["doc"][postings["role"] == condition.role])
+    if docs:
+        bits |= conversation_bitmap(np.concatenate(docs), n)
+    return bits
+
+
+def match_segment(
+    segment: dict[str, np.ndarray],
+    conditions: list[Condition],
+    same_turn: bool = False,
+    since: float | None = None,
+    until: float | None = None,
+) -> np.ndarray:
+    """Sorted numbers, within the segment, of the conversations that match."""
+    n = len(segment["conversations"])
+    if not conditions or not n:
+        return np.zeros(0, dtype=np.int64)
+    within = None
+    if since or until:
+        started_at = segment["conversations"]["started_at"]
+        within = np.ones(n, dtype=bool)
+        if since:
+            within &= started_at >= since
+        if until:
+            within &= started_at < until
+    if same_turn:
+        keys = None
+        for condition in sorted(conditions, key=lambda c: _size(segment, c)):
+            hits = _turns(segment, condition, within=within)
+            keys = hits if keys is None else _intersect(keys, hits)
+            if not len(keys):
+                break
+        return _unique_sorted(keys >> 16)
+    bits = None if within is None else np.packbits(within)
+    # Phrases last: they read positions, and only in the conversations the other conditions left
+    for condition in sorted(conditions, key=lambda c: (len(c.terms) > 1, _size(segment, c))):
+        if bits is not None and len(condition.terms) > 1:
+            within = np.unpackbits(bits, count=n).view(bool)
+        hits = _conversations(segment, condition, within)
+        bits = hits if bits is None else bits & hits
+        if not bits.any():
+            return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(np.unpackbits(bits, count=n))
+
+
+def _hit_turns(
+    segment: dict[str, np.ndarray],
+    conditions: list[Condition],
+    docs: np.ndarray,
+    same_turn: bool,
+) -> dict[int, list[int]]:
+    # Turns of each listed conversation that met a condition (all of them, with same_turn)
+    docs = np.unique(docs)
+    turns = [_turns(segment, condition, docs) for condition in conditions]
+    if same_turn:
+        keys = turns[0]
+        for hits in turns[1:]:
+            keys = _intersect(keys, hits)
+    else:
+        keys = np.unique(np.concatenate(turns))
+    bounds = np.searchsorted(keys, np.concatenate((docs << 16, (docs + 1) << 16)))
+    return {d: (keys[a:b] & 0xFFFF).tolist() for d, a, b in zip(docs.tolist(), bounds[:len(docs)], bounds[len(docs):])}
+
+
+def search(
+    index: TranscriptIndex,
+    query: str | list[Condition],
+    role: str | None = None,
+    same_turn: bool = False,
+    since: float | None = None,
+    until: float | None = None,
+    limit: int | None = None,
+) -> tuple[int, list[dict]]:
+    """
+    Conversations matching a query, newest first.
+
+    Returns:
+        How many conversations matched, and the newest `limit` of them (all if None):
+        [{"conversation_id", "started_at", "turns" (indexes of the turns that met a condition)}]
+    """
+    conditions = parse_query(query, role) if isinstance(query, str) else query
+    matches = []
+    for segment in index.segments(since, until):
+        docs = match_segment(segment, conditions, same_turn, since, until)
+        if len(docs):
+            matches.append((segment, docs))
+    if not matches:
+        return 0, []
+    ids = np.concatenate([segment["conversations"]["conversation_id"][docs] for segment, docs in matches])
+    started_at = np.concatenate([segment["conversations"]["started_at"][docs] for segment, docs in matches])
+    source = np.repeat(np.arange(len(matches)), [len(docs) for _, docs in matches])
+    doc = np.concatenate([docs for _, docs in matches])
+    # Later segments hold the newer copy of a conversation indexed twice
+    _, last = np.unique(ids[::-1], return_index=True)
+    keep = len(ids) - 1 - last
+    if limit is not None and len(keep) > limit:
+        keep_top = keep[np.argpartition(-started_at[keep], limit)[:limit]]
+    else:
+        keep_top = keep
+    order = keep_top[np.argsort(-started_at[keep_top], kind="stable")]
+    # Turns are looked up only for the conversations listed, a segment at a time
+    turns = {}
+    for m in np.unique(source[order]).tolist():
+        turns[m] = _hit_turns(matches[m][0], conditions, doc[order][source[order] == m].astype(np.int64), same_turn)
+    hits = []
+    for i in order.tolist():
+        hits.append({
+            "conversation_id": ids[i].decode(),
+            "started_at": float(started_at[i]),
+            "turns": turns[source[i]][int(doc[i])],
+        })
+    return len(keep), hits
+
+
+def parse_time(text: str) -> float:
+    """Unix seconds from a date (2026-10-01), a date and time (2026-10-01T14:30) or unix seconds."""
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time {text!r} (expected e.g. 2026-10-01 or 2026-10-01T14:30)")
+
+
+def _format_time(seconds: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(seconds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search conversation transcripts")
+    parser.add_argument("--dir", default=TRANSCRIPT_INDEX_DIR, help="Index directory")
+    parser.add_argument("--transcripts", default=TRANSCRIPTS_DIR, help="Transcripts directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    query = sub.add_parser("query", help="Conversations matching a query")
+    query.add_argument("query", help="Words, \"phrases\", amount ranges (<5000, 1k..5k), each optionally role:")
+    query.add_argument("--role", choices=sorted(ROLE_CODES), help="Role for conditions without one")
+    query.add_argument("--same-turn", action="store_true", help="All conditions within one turn")
+    query.add_argument("--since", type=parse_time, help="Calls started at or after (date or unix seconds)")
+    query.add_argument("--until", type=parse_time, help="Calls started before (date or unix seconds)")
+    query.add_argument("--last", type=parse_duration, help="Calls started in the last e.g. 24h or 7d")
+    query.add_argument("--limit", type=int, default=20, help="Conversations listed")
+    query.add_argument("--show", action="store_true", help="Print the matching turns")
+    update = sub.add_parser("update", help="Index queued conversations and merge small segments")
+    update.add_argument("--watch", type=float, default=0, help="Keep updating every this many seconds")
+    update.add_argument("--optimize", action="store_true", help="Merge all small segments")
+    sub.add_parser("stats", help="Segments, conversations and size of the index")
+    args = parser.parse_args()
+
+    index = TranscriptIndex(args.dir, args.transcripts)
+    if args.command == "update":
+        while True:
+            stats = index.update(optimize=args.optimize)
+            if stats["conversations"] or stats["merged"] or not args.watch:
+                print(f"Indexed {stats['conversations']:,} conversations from {stats['logs']} logs "
+                      f"({stats['missing']} without a transcript), merged {stats['merged']} segments; "
+                      f"{stats['segments']} segments in {stats['seconds']:.2f}s")
+            if not args.watch:
+                return
+            time.sleep(args.watch)
+    if args.command == "stats":
+        stats = index.stats()
+        print(f"Segments: {stats['segments']}")
+        print(f"Conversations: {stats['conversations']:,} indexed, {stats['pending']:,} pending")
+        print(f"Terms: {stats['terms']:,}  Postings: {stats['postings']:,}")
+        print(f"Size: {stats['bytes'] / 1e6:,.1f} MB "
+              f"({stats['bytes'] / max(stats['conversations'], 1):,.0f} bytes per conversation)")
+        return
+
+    since, until = args.since, args.until
+    if args.last:
+        until = until or time.time()
+        since = until - args.last
+    started = time.perf_counter()
+    try:
+        total, hits = search(index, args.query, args.role, args.same_turn, since, until, args.limit)
+    except ValueError as e:
+        parser.error(str(e))
+    seconds = time.perf_counter() - started
+    print(f"{total:,} conversations ({seconds * 1000:.1f} ms)")
+    for hit in hits:
+        print(f"{_format_time(hit['started_at'])}  {hit['conversation_id']}  turns {', '.join(map(str, hit['turns']))}")
+        if args.show:
+            path = transcript_path(Path(args.transcripts), hit["conversation_id"])
+            try:
+                items = {item["i"]: item for item in read_transcript(path)}
+            except FileNotFoundError:
+                continue
+            for turn in hit["turns"]:
+                item = items.get(turn)
+                if item:
+                    print(f"    [{turn}] {item['r']}: {item['x']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Bounded, batched transcript writer.
+
+Conversation items are handed to a single per-process consumer through one
+bounded asyncio queue. The consumer batches them and appends compact JSON
+lines to one file per conversation_id, flushing when the buffered size or
+the flush interval is reached. File writes run on a thread so the audio
+event loop never blocks on disk.
+
+Each line is a JSON object with short keys:
+    {"i": turn index, "t": created_at (unix seconds), "r": role, "x": text}
+plus "int": true for interrupted agent turns.
+"""
+import asyncio
+import json
+import time
+from pathlib import Path
+
+from config.settings import (
+    TRANSCRIPTS_DIR,
+    TRANSCRIPT_QUEUE_SIZE,
+    TRANSCRIPT_FLUSH_BYTES,
+    TRANSCRIPT_FLUSH_INTERVAL,
+)
+
+
+def transcript_path(directory: str | Path, conversation_id: str) -> Path:
+    """Return the transcript file for a conversation."""
+    return Path(directory) / f"{conversation_id}.jsonl"
+
+
+def read_transcript(path: str | Path) -> list[dict]:
+    """Read a transcript file written by TranscriptWriter."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class TranscriptWriter:
+    """
+    Per-process transcript pipeline.
+
+    Args:
+        directory: Directory the per-conversation files are written to
+        max_queue: Queue capacity; items submitted while it is full are dropped and counted
+        flush_bytes: Flush once this many encoded bytes are buffered
+        flush_interval: Flush at least this often (seconds) while items are buffered
+    """
+
+    def __init__(
+        self,
+        directory: str | Path = TRANSCRIPTS_DIR,
+        max_queue: int = TRANSCRIPT_QUEUE_SIZE,
+        flush_bytes: int = TRANSCRIPT_FLUSH_BYTES,
+        flush_interval: float = TRANSCRIPT_FLUSH_INTERVAL,
+    ):
+        self.directory = Path(directory)
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.submitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.flushes = 0
+        self._queue: asyncio.Queue[tuple] = asyncio.Queue(maxsize=max_queue)
+        self._turns: dict[str, int] = {}
+        self._buffers: dict[str, list[str]] = {}
+        self._buffered_bytes = 0
+        self._task: asyncio.Task | None = None
+        self._flush_lock = asyncio.Lock()
+
+    def start(self) -> None:
+        """Start the consumer task on the running event loop (idempotent)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="transcript-writer")
+
+    def submit(
+        self,
+        conversation_id: str,
+        role: str,
+        text: str,
+        created_at: float | None = None,
+        interrupted: bool = False,
+    ) -> bool:
+        """
+        Queue one conversation item without blocking.
+
+        Returns:
+            False if the queue was full and the item was dropped
+        """
+        try:
+            self._queue.put_nowait(
+                (conversation_id, role, text, created_at or time.time(), interrupted)
+            )
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    async def _run(self) -> None:
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                item = None
+
+            if item is not None:
+                self._buffer(item)
+                self._queue.task_done()
+                # Drain whatever else is already queued before deciding to flush
+                while not self._queue.empty() and self._buffered_bytes < self.flush_bytes:
+                    self._buffer(self._queue.get_nowait())
+                    self._queue.task_done()
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if self._buffered_bytes >= self.flush_bytes or (
+                deadline is not None and time.monotonic() >= deadline
+            ):
+                await self._flush_buffers()
+                deadline = None
+
+    def _buffer(self, item: tuple) -> None:
+        conversation_id, role, text, created_at, interrupted = item
+        turn = self._turns.get(conversation_id, 0)
+        self._turns[conversation_id] = turn + 1
+        record = {"i": turn, "t": round(created_at, 3), "r": role, "x": text}
+        if interrupted:
+            record["int"] = True
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        self._buffers.setdefault(conversation_id, []).append(line)
+        self._buffered_bytes += len(line)
+
+    async def _flush_buffers(self) -> None:
+        async with self._flush_lock:
+            if not self._buffers:
+                return
+            buffers, self._buffers = self._buffers, {}
+            self._buffered_bytes = 0
+            await asyncio.to_thread(self._write_files, buffers)
+            self.written += sum(len(lines) for lines in buffers.values())
+            self.flushes += 1
+
+    def _write_files(self, buffers: dict[str, list[str]]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for conversation_id, lines in buffers.items():
+            with open(transcript_path(self.directory, conversation_id), "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+
+    async def flush(self) -> None:
+        """Write everything submitted so far to disk."""
+        while not self._queue.empty():
+            self._buffer(self._queue.get_nowait())
+            self._queue.task_done()
+        await self._flush_buffers()
+
+    def forget(self, conversation_id: str) -> None:
+        """Drop the per-conversation turn counter once a session is over."""
+        self._turns.pop(conversation_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "written": self.written,
+            "flushes": self.flushes,
+            "queued": self._queue.qsize(),
+        }
+
+    async def aclose(self) -> None:
+        """Stop the consumer after a final flush."""
+        if self._task is not None:
+            # Holding the flush lock makes sure a write in progress completes first
+            async with self._flush_lock:
+                self._task.cancel()
+                await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+
+_transcript_writer: TranscriptWriter | None = None
+
+
+def get_transcript_writer() -> TranscriptWriter:
+    """Return the process-wide transcript writer, creating it on first use."""
+    global _transcript_writer
+    if _transcript_writer is None:
+        _transcript_writer = TranscriptWriter()
+    return _transcript_writer
+
+
+async def close_transcript_writer() -> None:
+    """Flush and stop the process-wide transcript writer, if one was created."""
+    global _transcript_writer
+    writer, _transcript_writer = _transcript_writer, None
+    if writer is not None:
+        await writer.aclose()
@@ -0,0 +1,9 @@
+from .store import UsageStore, make_record, get_usage_store
+from .recorder import SessionUsage
+
+__all__ = [
+    "UsageStore",
+    "make_record",
+    "get_usage_store",
+    "SessionUsage",
+]
@@ -0,0 +1,250 @@
+"""
+Queries over the per-session usage store.
+
+Every query is a vectorized scan of the memory-mapped columns it needs
+(see usage/store.py); segments outside the time window are skipped from
+their metadata alone.
+
+Usage:
+    python -m usage.query totals --last 24h [--every 1h]
+    python -m usage.query cost --last 30d
+    python -m usage.query tokens --last 7d [--by-version]
+    python -m usage.query cuts --last 7d
+    python -m usage.query compact
+"""
+import argparse
+import re
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from config.settings import (
+    USAGE_DIR,
+    USAGE_PRICE_TEXT_INPUT,
+    USAGE_PRICE_TEXT_CACHED,
+    USAGE_PRICE_TEXT_OUTPUT,
+    USAGE_PRICE_AUDIO_INPUT,
+    USAGE_PRICE_AUDIO_CACHED,
+    USAGE_PRICE_AUDIO_OUTPUT,
+)
+from .store import TOKEN_COLUMNS, UsageStore
+
+# Summed by totals(), next to the session count and cost
+SUM_COLUMNS = TOKEN_COLUMNS + ("duration", "user_speech", "agent_speech", "turns")
+
+
+@dataclass(frozen=True)
+class Prices:
+    """USD per 1M tokens. Cached tokens are billed at the cached rate and are part of input."""
+
+    text_input: float = USAGE_PRICE_TEXT_INPUT
+    text_cached: float = USAGE_PRICE_TEXT_CACHED
+    text_output: float = USAGE_PRICE_TEXT_OUTPUT
+    audio_input: float = USAGE_PRICE_AUDIO_INPUT
+    audio_cached: float = USAGE_PRICE_AUDIO_CACHED
+    audio_output: float = USAGE_PRICE_AUDIO_OUTPUT
+
+
+def session_cost(chunk: dict[str, np.ndarray], prices: Prices = Prices()) -> np.ndarray:
+    """Cost in USD of each session in a scanned chunk (needs the TOKEN_COLUMNS)."""
+    text = chunk["input_text"].astype(np.float64)
+    audio = chunk["input_audio"].astype(np.float64)
+    cached_text = np.minimum(chunk["cached_text"], chunk["input_text"]).astype(np.float64)
+    cached_audio = np.minimum(chunk["cached_audio"], chunk["input_audio"]).astype(np.float64)
+    return (
+        (text - cached_text) * prices.text_input
+        + cached_text * prices.text_cached
+        + chunk["output_text"] * prices.text_output
+        + (audio - cached_audio) * prices.audio_input
+        + cached_audio * prices.audio_cached
+        + chunk["output_audio"].astype(np.float64) * prices.audio_output
+    ) / 1e6
+
+
+def _call_tokens(chunk: dict[str, np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    input_tokens = chunk["input_text"].astype(np.int64) + chunk["input_audio"]
+    output_tokens = chunk["output_text"].astype(np.int64) + chunk["output_audio"]
+    return input_tokens, output_tokens
+
+
+def totals(
+    store: UsageStore,
+    since: float,
+    until: float,
+    every: float | None = None,
+    prices: Prices = Prices(),
+) -> dict[str, np.ndarray]:
+    """
+    Sums over sessions started in [since, until), optionally per `every`-second bucket.
+
+    Returns:
+        {"start": bucket start times, "sessions": counts, "cost": USD, <SUM_COLUMNS>: sums},
+        one array element per bucket
+    """
+    every = every or (until - since)
+    buckets = max(1, int(np.ceil((until - since) / every)))
+    result = {name: np.zeros(buckets) for name in ("sessions", "cost") + SUM_COLUMNS}
+    for chunk in store.scan(("started_at",) + SUM_COLUMNS, since, until):
+        if not len(chunk["started_at"]):
+            continue
+        bucket = ((chunk["started_at"] - since) // every).astype(np.int64)
+        result["sessions"] += np.bincount(bucket, minlength=buckets)
+        result["cost"] += np.bincount(bucket, weights=session_cost(chunk, prices), minlength=buckets)
+        for name in SUM_COLUMNS:
+            result[name] += np.bincount(bucket, weights=chunk[name], minlength=buckets)
+    result["start"] = since + every * np.arange(buckets)
+    return result
+
+
+def cost_by(
+    store: UsageStore,
+    since: float,
+    until: float,
+    column: str = "prompt_version",
+    prices: Prices = Prices(),
+) -> dict[str, dict]:
+    """
+    Sessions, tokens, minutes and cost per value of a label column (prompt_version, model or end_reason).
+
+    Returns:
+        {value: {"sessions", "input_tokens", "cached_tokens", "output_tokens", "minutes", "cost"}}
+    """
+    result: dict[str, dict] = {}
+    for chunk in store.scan((column, "duration") + TOKEN_COLUMNS, since, until):
+        labels = chunk["labels"][column]
+        codes = chunk[column]
+        if not len(codes):
+            continue
+        input_tokens, output_tokens = _call_tokens(chunk)
+        cached = chunk["cached_text"].astype(np.int64) + chunk["cached_audio"]
+        sums = {
+            "sessions": np.bincount(codes, minlength=len(labels)),
+            "input_tokens": np.bincount(codes, weights=input_tokens, minlength=len(labels)),
+            "cached_tokens": np.bincount(codes, weights=cached, minlength=len(labels)),
+            "output_tokens": np.bincount(codes, weights=output_tokens, minlength=len(labels)),
+            "minutes": np.bincount(codes, weights=chunk["duration"], minlength=len(labels)) / 60,
+            "cost": np.bincount(codes, weights=session_cost(chunk, prices), minlength=len(labels)),
+        }
+        for code, label in enumerate(labels):
+            entry = result.setdefault(label, dict.fromkeys(sums, 0))
+            for name, values in sums.items():
+                entry[name] += values[code].item()
+    return result
+
+
+def token_percentiles(
+    store: UsageStore,
+    since: float,
+    until: float,
+    percentiles: tuple[float, ...] = (50, 95),
+    by_version: bool = False,
+) -> dict[str, dict]:
+    """
+    Percentiles of input, output and total tokens per call.
+
+    Returns:
+        {group: {"calls": n, "input": [...], "output": [...], "total": [...]}}, one value per
+        percentile; the group is the prompt version, or "all"
+    """
+    groups: dict[str, list[tuple[np.ndarray, np.ndarray]]] = {}
+    for chunk in store.scan(("prompt_version",) + TOKEN_COLUMNS, since, until):
+        input_tokens, output_tokens = _call_tokens(chunk)
+        if not by_version:
+            groups.setdefault("all", []).append((input_tokens, output_tokens))
+            continue
+        labels = chunk["labels"]["prompt_version"]
+        for code, label in enumerate(labels):
+            mask = chunk["prompt_version"] == code
+            groups.setdefault(label, []).append((input_tokens[mask], output_tokens[mask]))
+    result = {}
+    for group, parts in groups.items():
+        input_tokens = np.concatenate([p[0] for p in parts])
+        output_tokens = np.concatenate([p[1] for p in parts])
+        if not len(input_tokens):
+            continue
+        result[group] = {
+            "calls": len(input_tokens),
+            "input": np.percentile(input_tokens, percentiles).tolist(),
+            "output": np.percentile(output_tokens, percentiles).tolist(),
+            "total": np.percentile(input_tokens + output_tokens, percentiles).tolist(),
+        }
+    return result
+
+
+_DURATION = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(text: str) -> float:
+    """Seconds in a duration like "90s", "15m", "24h" or "7d"."""
+    match = _DURATION.match(text.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid duration {text!r} (expected e.g. 15m, 24h, 7d)")
+    return float(match.group(1)) * _SECONDS[match.group(2)]
+
+
+def _format_time(seconds: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(seconds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query per-session usage")
+    parser.add_argument("--dir", default=USAGE_DIR, help="Usage store directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (
+        ("totals", "Tokens, audio, duration and cost of sessions in a window"),
+        ("cost", "Cost per prompt version"),
+        ("tokens", "p50/p95 tokens per call"),
+        ("cuts", "Sessions ended by the session governor, by cap"),
+    ):
+        command = sub.add_parser(name, help=help_text)
+        command.add_argument("--last", type=parse_duration, default=parse_duration("24h"), help="Window, e.g. 24h or 7d")
+        command.add_argument("--until", type=float, default=None, help="Window end (unix seconds, default: now)")
+    sub.choices["totals"].add_argument("--every", type=parse_duration, default=None, help="Bucket size, e.g. 1h")
+    sub.choices["tokens"].add_argument("--by-version", action="store_true", help="One row per prompt version")
+    sub.add_parser("compact", help="Seal the live log and convert logs into columnar segments")
+    args = parser.parse_args()
+
+    store = UsageStore(args.dir)
+    if args.command == "compact":
+        stats = store.compact(seal_live=True)
+        print(f"Compacted {stats['rows']:,} sessions from {stats['logs']} logs, merged {stats['merged']} segments; "
+              f"{stats['segments']} segments in {stats['seconds']:.2f}s")
+        return
+
+    until = args.until or time.time()
+    since = until - args.last
+    started = time.perf_counter()
+    if args.command == "totals":
+        result = totals(store, since, until, args.every)
+        print(f"{'start':<17} {'sessions':>9} {'input':>12} {'cached':>12} {'output':>12} "
+              f"{'call min':>9} {'user min':>9} {'agent min':>9} {'cost $':>10}")
+        for i, start in enumerate(result["start"]):
+            inputs = result["input_text"][i] + result["input_audio"][i]
+            cached = result["cached_text"][i] + result["cached_audio"][i]
+            outputs = result["output_text"][i] + result["output_audio"][i]
+            print(f"{_format_time(start):<17} {result['sessions'][i]:>9,.0f} {inputs:>12,.0f} {cached:>12,.0f} "
+                  f"{outputs:>12,.0f} {result['duration'][i] / 60:>9,.1f} {result['user_speech'][i] / 60:>9,.1f} "
+                  f"{result['agent_speech'][i] / 60:>9,.1f} {result['cost'][i]:>10,.2f}")
+    elif args.command in ("cost", "cuts"):
+        column = "prompt_version" if args.command == "cost" else "end_reason"
+        header = "prompt version" if args.command == "cost" else "end reason"
+        print(f"{header:<16} {'sessions':>10} {'input':>14} {'cached':>14} {'output':>14} "
+              f"{'call min':>10} {'cost $':>12} {'$/session':>10}")
+        for value, entry in sorted(cost_by(store, since, until, column).items()):
+            # Sessions the governor did not cut have an empty end_reason
+            label = value or ("-" if args.command == "cost" else "not cut")
+            print(f"{label:<16} {entry['sessions']:>10,} {entry['input_tokens']:>14,.0f} "
+                  f"{entry['cached_tokens']:>14,.0f} {entry['output_tokens']:>14,.0f} {entry['minutes']:>10,.1f} "
+                  f"{entry['cost']:>12,.2f} {entry['cost'] / entry['sessions']:>10,.4f}")
+    else:
+        print(f"{'group':<16} {'calls':>10} {'input p50/p95':>16} {'output p50/p95':>16} {'total p50/p95':>16}")
+        for group, entry in sorted(token_percentiles(store, since, until, by_version=args.by_version).items()):
+            cells = [f"{entry[k][0]:,.0f}/{entry[k][1]:,.0f}" for k in ("input", "output", "total")]
+            print(f"{group or '-':<16} {entry['calls']:>10,} {cells[0]:>16} {cells[1]:>16} {cells[2]:>16}")
+    print(f"({time.perf_counter() - started:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
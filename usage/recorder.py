@@ -0,0 +1,99 @@
+"""
+Per-session usage accumulation for the usage store.
+
+SessionUsage wraps livekit's UsageCollector, counts model responses and
+times user and agent speech from the session's state changes, and turns the
+totals into one UsageStore record when the session closes.
+"""
+import time
+
+import numpy as np
+from livekit.agents import metrics
+
+from .store import make_record
+
+
+class SessionUsage:
+    """
+    Usage of one session.
+
+    Args:
+        conversation_id: Conversation the record is keyed by
+        prompt_version: Prompt variant the session ran with
+        model: Model name used until a metrics event reports one
+    """
+
+    def __init__(self, conversation_id: str, prompt_version: str, model: str = ""):
+        self.conversation_id = conversation_id
+        self.prompt_version = prompt_version
+        self.model = model
+        self.collector = metrics.UsageCollector()
+        self.started_at = time.time()
+        self.turns = 0
+        # Why the session was ended early (runner/governor.py CUT_REASONS); empty if it was not
+        self.end_reason = ""
+        self.user_speech = 0.0
+        self.agent_speech = 0.0
+        self._user_since: float | None = None
+        self._agent_since: float | None = None
+
+    def collect(self, ev: metrics.AgentMetrics) -> None:
+        """Add one metrics_collected payload."""
+        self.collector.collect(ev)
+        if isinstance(ev, (metrics.RealtimeModelMetrics, metrics.LLMMetrics)):
+            self.turns += 1
+            metadata = getattr(ev, "metadata", None)
+            if metadata and metadata.model_name:
+                self.model = metadata.model_name
+
+    def user_state(self, state: str) -> None:
+        """Track a user_state_changed new_state."""
+        now = time.monotonic()
+        if state == "speaking":
+            self._user_since = self._user_since or now
+        elif self._user_since is not None:
+            self.user_speech += now - self._user_since
+            self._user_since = None
+
+    def agent_state(self, state: str) -> None:
+        """Track an agent_state_changed new_state."""
+        now = time.monotonic()
+        if state == "speaking":
+            self._agent_since = self._agent_since or now
+        elif self._agent_since is not None:
+            self.agent_speech += now - self._agent_since
+            self._agent_since = None
+
+    def summary(self) -> metrics.UsageSummary:
+        return self.collector.get_summary()
+
+    def record(self) -> np.ndarray:
+        """The session's UsageStore record, closing any speech still in progress."""
+        self.user_state("listening")
+        self.agent_state("listening")
+        usage = self.summary()
+        input_text, cached_text, output_text = (
+            usage.llm_input_text_tokens, usage.llm_input_cached_text_tokens, usage.llm_output_text_tokens
+        )
+        # Text LLMs report only totals, no text/audio split
+        if not (input_text or usage.llm_input_audio_tokens):
+            input_text, cached_text = usage.llm_prompt_tokens, usage.llm_prompt_cached_tokens
+        if not (output_text or usage.llm_output_audio_tokens):
+            output_text = usage.llm_completion_tokens
+        return make_record(
+            conversation_id=self.conversation_id,
+            prompt_version=self.prompt_version,
+            model=self.model,
+            end_reason=self.end_reason,
+            started_at=self.started_at,
+            duration=time.time() - self.started_at,
+            user_speech=self.user_speech,
+            agent_speech=self.agent_speech,
+            turns=self.turns,
+            input_text=input_text,
+            input_audio=usage.llm_input_audio_tokens,
+            cached_text=cached_text,
+            cached_audio=usage.llm_input_cached_audio_tokens,
+            output_text=output_text,
+            output_audio=usage.llm_output_audio_tokens,
+        )
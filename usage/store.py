@@ -0,0 +1,327 @@
+"""
+Append-only columnar store of per-session usage.
+
+Every session appends one fixed-size binary record (RECORD) to
+`<dir>/live.log`. Job processes append under a shared flock with O_APPEND,
+so concurrent writers never interleave and a record is one write() call.
+Once the live log holds `segment_rows` records, the writer that crossed the
+limit renames it to sealed-<ns>-<pid>.log and later appends start a new one.
+
+`compact()` turns sealed logs into columnar segments: a directory per
+segment with one .npy file per column (prompt_version, model and end_reason as uint8
+codes into the labels in meta.json) plus the segment's row count and
+started_at range. Queries memory-map only the columns they need and skip
+segments outside the time window, so a scan reads a few bytes per session
+per column. Small segments are merged up to `segment_rows` as they compact.
+The live and sealed logs are scanned too (as memory-mapped record arrays),
+so sessions are queryable as soon as they close.
+
+    data/usage/live.log
+    data/usage/sealed-<ns>-<pid>.log
+    data/usage/seg-<ns>-<pid>/{meta.json, started_at.npy, input_text.npy, ...}
+"""
+import fcntl
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from config.settings import USAGE_DIR, USAGE_SEGMENT_ROWS
+
+RECORD = np.dtype([
+    ("conversation_id", "S36"),
+    ("prompt_version", "S16"),
+    ("model", "S32"),
+    ("end_reason", "S16"),
+    ("started_at", "<f8"),
+    ("duration", "<f4"),
+    ("user_speech", "<f4"),
+    ("agent_speech", "<f4"),
+    ("turns", "<u2"),
+    ("input_text", "<u4"),
+    ("input_audio", "<u4"),
+    ("cached_text", "<u4"),
+    ("cached_audio", "<u4"),
+    ("output_text", "<u4"),
+    ("output_audio", "<u4"),
+])
+
+# Columns stored as uint8 codes into the segment's labels
+LABEL_COLUMNS = ("prompt_version", "model", "end_reason")
+TOKEN_COLUMNS = ("input_text", "input_audio", "cached_text", "cached_audio", "output_text", "output_audio")
+COLUMNS = RECORD.names
+
+_LIVE = "live.log"
+
+
+def make_record(**values) -> np.ndarray:
+    """One RECORD row from keyword values; missing fields are zero."""
+    record = np.zeros(1, dtype=RECORD)
+    for name, value in values.items():
+        if name in LABEL_COLUMNS or name == "conversation_id":
+            value = str(value or "").encode()[:RECORD[name].itemsize]
+        elif name in TOKEN_COLUMNS or name == "turns":
+            value = min(max(int(value or 0), 0), np.iinfo(RECORD[name]).max)
+        record[name] = value
+    return record
+
+
+class UsageStore:
+    """
+    Per-session usage records in one directory.
+
+    Args:
+        directory: Store directory (created on first append)
+        segment_rows: Records per live log before it is sealed, and the
+            size small segments are merged up to
+    """
+
+    def __init__(self, directory: str | Path = USAGE_DIR, segment_rows: int = USAGE_SEGMENT_ROWS):
+        self.directory = Path(directory)
+        self.segment_rows = segment_rows
+        self._live = self.directory / _LIVE
+
+    def append(self, record: np.ndarray) -> None:
+        """
+        Append one session's record (see make_record).
+
+        Blocking, but a single small write under a shared lock: a few tens of
+        microseconds, cheap enough for a session close handler.
+        """
+        data = np.asarray(record, dtype=RECORD).tobytes()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        while True:
+            fd = os.open(self._live, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH)
+                # The log may have been sealed between open() and flock(); append to the new one
+                try:
+                    current = os.stat(self._live).st_ino
+                except FileNotFoundError:
+                    current = None
+                if os.fstat(fd).st_ino != current:
+                    continue
+                os.write(fd, data)
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+            break
+        # Only the append that crosses the limit seals, so concurrent writers seal once
+        limit = self.segment_rows * RECORD.itemsize
+        if size - len(data) < limit <= size:
+            self.seal()
+
+    def seal(self) -> Path | None:
+        """Rename the live log so compact() picks it up; returns the sealed log, if any."""
+        sealed = self.directory / f"sealed-{time.time_ns()}-{os.getpid()}.log"
+        try:
+            os.rename(self._live, sealed)
+        except FileNotFoundError:
+            return None
+        return sealed
+
+    def compact(self, seal_live: bool = False) -> dict:
+        """
+        Convert sealed logs into columnar segments and merge small segments.
+
+        Only one compaction runs at a time; a concurrent call returns at once.
+
+        Args:
+            seal_live: Seal the live log first, so every record ends up columnar
+
+        Returns:
+            {"logs", "rows", "merged", "segments", "seconds"}
+        """
+        started = time.perf_counter()
+        stats = {"logs": 0, "rows": 0, "merged": 0, "segments": 0, "seconds": 0.0}
+        if not self.directory.exists():
+            return stats
+        lock = os.open(self.directory / "compact.lock", os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return stats
+            self._drop_merged()
+            if seal_live:
+                self.seal()
+            for log in sorted(self.directory.glob("sealed-*.log")):
+                segment = self.directory / f"seg-{log.stem[len('sealed-'):]}"
+                if not segment.exists():
+                    with open(log, "rb") as f:
+                        # Wait for writers that opened this log before it was sealed
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                        records = np.fromfile(f, dtype=RECORD, count=os.fstat(f.fileno()).st_size // RECORD.itemsize)
+                    if len(records):
+                        _write_segment(segment, _record_columns(records))
+                        stats["rows"] += len(records)
+                log.unlink()
+                stats["logs"] += 1
+            stats["merged"] = self._merge_small()
+            stats["segments"] = len(self._segments())
+        finally:
+            os.close(lock)
+        stats["seconds"] = time.perf_counter() - started
+        return stats
+
+    def _segments(self) -> list[Path]:
+        return sorted(p for p in self.directory.glob("seg-*") if (p / "meta.json").exists())
+
+    def _drop_merged(self) -> None:
+        # A merge that crashed before removing its inputs leaves them next to the merged segment
+        for segment in self._segments():
+            for name in _read_meta(segment).get("merged_from", []):
+                shutil.rmtree(self.directory / name, ignore_errors=True)
+
+    def _merge_small(self) -> int:
+        small = [s for s in self._segments() if _read_meta(s)["rows"] < self.segment_rows]
+        merged = 0
+        group: list[Path] = []
+        rows = 0
+        for segment in small + [None]:
+            if segment is not None:
+                group.append(segment)
+                rows += _read_meta(segment)["rows"]
+            if (segment is None or rows >= self.segment_rows) and len(group) > 1:
+                parts = [{**_load_segment(s, COLUMNS), "labels": _read_meta(s)["labels"]} for s in group]
+                columns = _concat(parts)
+                target = self.directory / f"seg-{time.time_ns()}-{os.getpid()}"
+                _write_segment(target, columns, merged_from=[s.name for s in group])
+                for s in group:
+                    shutil.rmtree(s)
+                merged += len(group)
+            if segment is None or rows >= self.segment_rows:
+                group, rows = [], 0
+        return merged
+
+    def scan(
+        self,
+        columns: Iterable[str],
+        since: float | None = None,
+        until: float | None = None,
+    ) -> Iterator[dict[str, np.ndarray]]:
+        """
+        Yield the requested columns, one dict of arrays per segment or log.
+
+        Rows are limited to started_at in [since, until). Label columns come as
+        uint8 codes with the code tables under the "labels" key.
+        """
+        columns = list(columns)
+        needed = columns + ["started_at"] if (since or until) and "started_at" not in columns else columns
+        # Compaction may remove a log or segment while the scan lists them; skip what is gone
+        metas = {}
+        for segment in self._segments():
+            try:
+                metas[segment] = _read_meta(segment)
+            except FileNotFoundError:
+                continue
+        # Inputs of a merge are removed right after the merged segment appears; never count both
+        merged = {name for meta in metas.values() for name in meta["merged_from"]}
+        for segment, meta in metas.items():
+            if segment.name in merged:
+                continue
+            try:
+                low, high = meta["started_at"]
+                if (since and high < since) or (until and low >= until):
+                    continue
+                chunk = _load_segment(segment, needed)
+            except FileNotFoundError:
+                continue
+            chunk["labels"] = meta["labels"]
+            if (since and low < since) or (until and high >= until):
+                chunk = _window(chunk, since, until)
+            yield _select(chunk, columns)
+        for log in sorted(self.directory.glob("sealed-*.log")) + [self._live]:
+            try:
+                records = np.memmap(log, dtype=RECORD, mode="r", shape=(log.stat().st_size // RECORD.itemsize,))
+            except (FileNotFoundError, ValueError):
+                # ValueError: an empty file cannot be mapped
+                continue
+            chunk = _record_columns(records, needed)
+            if since or until:
+                chunk = _window(chunk, since, until)
+            yield _select(chunk, columns)
+
+
+def _record_columns(records: np.ndarray, names: Iterable[str] = COLUMNS) -> dict[str, np.ndarray]:
+    chunk = {"labels": {}}
+    for name in names:
+        if name in LABEL_COLUMNS:
+            labels, codes = np.unique(records[name], return_inverse=True)
+            chunk[name] = codes.astype(np.uint8)
+            chunk["labels"][name] = [label.decode(errors="replace") for label in labels]
+        else:
+            chunk[name] = records[name]
+    return chunk
+
+
+def _window(chunk: dict, since: float | None, until: float | None) -> dict:
+    started_at = chunk["started_at"]
+    mask = np.ones(len(started_at), dtype=bool)
+    if since:
+        mask &= started_at >= since
+    if until:
+        mask &= started_at < until
+    return {name: value if name == "labels" else value[mask] for name, value in chunk.items()}
+
+
+def _select(chunk: dict, columns: list[str]) -> dict:
+    return {name: chunk[name] for name in columns + ["labels"] if name in chunk}
+
+
+def _read_meta(segment: Path) -> dict:
+    return json.loads((segment / "meta.json").read_text())
+
+
+def _load_segment(segment: Path, names: Iterable[str]) -> dict[str, np.ndarray]:
+    return {name: np.load(segment / f"{name}.npy", mmap_mode="r") for name in names}
+
+
+def _concat(parts: list[dict]) -> dict[str, np.ndarray]:
+    # Re-code label columns against the union of the parts' labels
+    columns = {}
+    for name in COLUMNS:
+        if name in LABEL_COLUMNS:
+            labels = sorted({label for part in parts for label in part["labels"][name]})
+            lookup = {label: code for code, label in enumerate(labels)}
+            columns[name] = np.concatenate([
+                np.array([lookup[label] for label in part["labels"][name]], dtype=np.uint8)[part[name]]
+                for part in parts
+            ])
+            columns.setdefault("labels", {})[name] = labels
+        else:
+            columns[name] = np.concatenate([part[name] for part in parts])
+    return columns
+
+
+def _write_segment(segment: Path, columns: dict, merged_from: list[str] | None = None) -> None:
+    # Written under a temporary name and renamed, so readers never see a partial segment
+    tmp = segment.with_name(f".tmp-{segment.name}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for name in COLUMNS:
+        np.save(tmp / f"{name}.npy", np.ascontiguousarray(columns[name]))
+    started_at = columns["started_at"]
+    meta = {
+        "rows": len(started_at),
+        "started_at": [float(started_at.min()), float(started_at.max())],
+        "labels": columns["labels"],
+        "merged_from": merged_from or [],
+    }
+    (tmp / "meta.json").write_text(json.dumps(meta))
+    os.rename(tmp, segment)
+
+
+_usage_store: UsageStore | None = None
+
+
+def get_usage_store() -> UsageStore:
+    """Return the process-wide usage store."""
+    global _usage_store
+    if _usage_store is None:
+        _usage_store = UsageStore()
+    return _usage_store